@@ -8,12 +8,24 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.default import DefaultBotProperties
 from aiogram.exceptions import TelegramUnauthorizedError, TelegramAPIError
 
-from config import BOT_TOKEN
+from config import BOT_TOKEN, METRICS_HOST, METRICS_PORT, WATCHDOG_INTERVAL, WATCHDOG_SLOW_CALLBACK
+from handlers.admin import register_admin_handlers, setup_profiling_signal
+from handlers.alerts import register_alert_handlers
 from handlers.common import register_common_handlers
+from handlers.export import register_export_handlers
+from handlers.imports import register_import_handlers
 from handlers.wallets import register_wallet_handlers
 from handlers.subscription import register_subscription_handlers
 from services.db import init_db
+from services.metrics import start_metrics_server
 from services.monitor import start_wallet_monitor
+from services.backfill import start_backfill_worker
+from services.retention import start_retention_worker
+from services.export import start_export_workers
+from services.payments import start_payment_sweeper
+from services.prices import load_price_snapshot, start_price_updater
+from services.offload import shutdown_offload
+from services.watchdog import start_watchdog
 from utils.logging import setup_logging
 from middlewares.subscription import SubscriptionMiddleware
 
@@ -30,6 +42,10 @@ async def set_commands(bot: Bot):
             BotCommand(command="/balance", description="Проверить баланс"),
             BotCommand(command="/transactions", description="Последние транзакции"),
             BotCommand(command="/settings", description="Настройки уведомлений"),
+            BotCommand(command="/filters", description="Фильтры уведомлений"),
+            BotCommand(command="/alerts", description="Оповещения о крупных движениях"),
+            BotCommand(command="/export", description="Выгрузить историю транзакций"),
+            BotCommand(command="/import", description="Добавить кошельки из файла"),
             BotCommand(command="/subscribe", description="Оформить премиум подписку"),
             BotCommand(command="/test_premium", description="Активировать тестовую подписку"),
             BotCommand(command="/help", description="Помощь по командам")
@@ -42,10 +58,16 @@ async def set_commands(bot: Bot):
 # Функция регистрации всех обработчиков
 def register_all_handlers(dp):
     # Регистрируем обработчики из разных модулей
-    register_common_handlers(dp)
+    register_admin_handlers(dp)
+    register_alert_handlers(dp)
+    register_export_handlers(dp)
+    register_import_handlers(dp)
     register_wallet_handlers(dp)
     register_subscription_handlers(dp)
     # Здесь будут добавляться другие обработчики по мере их создания
+    # Общие - последними: обработчик неизвестных команд перехватывает любой текст с "/",
+    # включая команды остальных роутеров и /skip в диалоге добавления кошелька
+    register_common_handlers(dp)
 
 # Основная функция запуска бота
 async def main():
@@ -66,9 +88,21 @@ async def main():
     # Инициализация базы данных
     await init_db()
     
+    # Последние сохраненные котировки: /balance показывает суммы в USD сразу после запуска
+    await load_price_snapshot()
+    
+    # Эндпоинт метрик для Prometheus
+    metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+    
+    # Сторожевая задача: задержка цикла событий и блокирующие его колбэки
+    watchdog_task = start_watchdog(WATCHDOG_INTERVAL, WATCHDOG_SLOW_CALLBACK)
+    
     # Регистрация всех обработчиков
     register_all_handlers(dp)
     
+    # Профилирование по сигналу SIGUSR1
+    setup_profiling_signal(bot)
+    
     # Установка команд бота
     try:
         await set_commands(bot)
@@ -84,6 +118,21 @@ async def main():
         # Запуск фоновой задачи мониторинга кошельков
         asyncio.create_task(start_wallet_monitor(bot))
         
+        # Запуск фонового обновления котировок
+        asyncio.create_task(start_price_updater())
+        
+        # Запуск фоновой загрузки истории новых кошельков
+        asyncio.create_task(start_backfill_worker(bot))
+        
+        # Запуск очистки устаревшей истории транзакций
+        asyncio.create_task(start_retention_worker())
+        
+        # Запуск очереди выгрузок истории
+        asyncio.create_task(start_export_workers(bot))
+        
+        # Запуск отмены неоплаченных платежей с истекшим сроком
+        asyncio.create_task(start_payment_sweeper())
+        
         # Запуск бота
         logger.info("Бот запущен")
         await dp.start_polling(bot)
@@ -99,6 +148,17 @@ async def main():
         logger.error(f"Непредвиденная ошибка: {e}")
         print(f"\n\033[91mНепредвиденная ошибка: {e}\033[0m")
     finally:
+        # Останавливаем сторожевую задачу
+        if watchdog_task:
+            watchdog_task.cancel()
+        
+        # Останавливаем пул процессов декодирования
+        shutdown_offload()
+        
+        # Останавливаем эндпоинт метрик
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        
         # Закрываем сессию бота
         if bot.session and not bot.session.closed:
             await bot.session.close()
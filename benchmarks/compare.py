@@ -0,0 +1,72 @@
+"""
+Сравнение двух результатов benchmarks.run
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Печатает сводные метрики обеих ревизий и изменение в процентах. Код возврата 1,
+если хотя бы одна метрика ухудшилась больше чем на --threshold процентов.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# (путь в summary, больше - лучше)
+METRICS: List[Tuple[str, bool]] = [
+    ("cycle_seconds.p50", False),
+    ("cycle_seconds.max", False),
+    ("wallets_per_second", True),
+    ("detection_to_delivery_seconds.p50", False),
+    ("detection_to_delivery_seconds.p99", False),
+    ("db_rows_per_second", True),
+    ("peak_rss_mb", False),
+]
+
+def _get(summary: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = summary
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> bool:
+    """
+    Печатает таблицу сравнения
+
+    :return: True, если регрессий больше порога нет
+    """
+    ok = True
+    print(f"{'metric':40} {baseline.get('revision') or 'baseline':>12} {candidate.get('revision') or 'candidate':>12} {'change':>9}")
+
+    for path, higher_is_better in METRICS:
+        old, new = _get(baseline["summary"], path), _get(candidate["summary"], path)
+        if old is None or new is None or old == 0:
+            print(f"{path:40} {str(old):>12} {str(new):>12} {'-':>9}")
+            continue
+
+        change = (new - old) / old * 100
+        regressed = (change < -threshold) if higher_is_better else (change > threshold)
+        ok = ok and not regressed
+        print(f"{path:40} {old:12.4f} {new:12.4f} {change:+8.1f}%{'  !' if regressed else ''}")
+
+    missed_old = baseline["summary"]["expected_deliveries"] - baseline["summary"]["deliveries"]
+    missed_new = candidate["summary"]["expected_deliveries"] - candidate["summary"]["deliveries"]
+    print(f"{'missed_deliveries':40} {missed_old:12d} {missed_new:12d}")
+
+    return ok
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение результатов бенчмарка")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="допустимое ухудшение, %%")
+    args = parser.parse_args()
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.candidate) as file:
+        candidate = json.load(file)
+
+    sys.exit(0 if compare(baseline, candidate, args.threshold) else 1)
+
+if __name__ == "__main__":
+    main()
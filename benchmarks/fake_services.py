@@ -0,0 +1,389 @@
+"""
+Локальный имитатор внешних сервисов для бенчмарков
+
+Один aiohttp-сервер обслуживает:
+- обозреватели в стиле Etherscan: /etherscan/api, /bscscan/api
+- BlockCypher: /blockcypher/v1/btc/main/...
+- blockchain.info: /blockchain-info/multiaddr
+- JSON-RPC узлы: /rpc/eth, /rpc/bnb
+- котировки в стиле CoinGecko: /prices/api/v3/simple/price, /prices/api/v3/simple/token_price/{platform}
+- Telegram Bot API: /bot{token}/{method}
+- управление бенчмарком: /_bench/emit, /_bench/deliveries
+
+Задержка и доля ошибок задаются отдельно для провайдеров и для Telegram.
+Транзакции создаются только по команде /_bench/emit, поэтому их поток
+воспроизводим при одинаковом seed.
+
+Имитатор можно запустить отдельно, например как источник котировок для бота:
+    python -m benchmarks.fake_services --port 8099
+    PRICE_API_URL=http://127.0.0.1:8099/prices/api/v3 python app.py
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+# Сколько последних транзакций хранится на адрес
+HISTORY_PER_ADDRESS = 50
+
+# Базовые котировки монет в USD; цены медленно колеблются вокруг них
+BASE_PRICES = {"bitcoin": 60_000.0, "ethereum": 3_000.0, "binancecoin": 550.0}
+
+# Начальные высоты цепочек
+START_HEIGHTS = {"ETH": 18_000_000, "BNB": 35_000_000, "BTC": 820_000}
+
+# Сокращенный хеш в тексте уведомления: hash[:10]...hash[-8:]
+SHORT_HASH_RE = re.compile(r"(?<![0-9A-Za-z])([0-9A-Za-z]{10}\.\.\.[0-9A-Za-z]{8})(?![0-9A-Za-z])")
+
+def short_hash(tx_hash: str) -> str:
+    """Возвращает сокращенный хеш в том виде, в котором он попадает в уведомление"""
+    return f"{tx_hash[:10]}...{tx_hash[-8:]}"
+
+class FakeNetwork:
+    """Состояние имитируемых блокчейнов: высоты, хеши блоков и история адресов"""
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.heights = dict(START_HEIGHTS)
+        self.history: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = {}
+        self.counter = 0
+
+    def block_hash(self, chain: str, height: int) -> str:
+        digest = hashlib.sha256(f"{self.seed}:{chain}:{height}".encode()).hexdigest()
+        return digest if chain == "BTC" else "0x" + digest
+
+    def _key(self, chain: str, address: str) -> Tuple[str, str]:
+        return (chain, address if chain == "BTC" else address.lower())
+
+    def _sender(self, chain: str) -> str:
+        if chain == "BTC":
+            return "bc1q" + "".join(self.rng.choice("qpzry9x8gf2tvdw0s3jn54khce6mua7l") for _ in range(38))
+        return "0x" + f"{self.rng.getrandbits(160):040x}"
+
+    def emit(self, targets: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Добывает по одному блоку в каждой цепочке и создает входящие транзакции
+
+        :param targets: Пары (блокчейн, адрес получателя)
+        :return: Созданные транзакции (хеш, блокчейн, адрес, время создания)
+        """
+        for chain in self.heights:
+            self.heights[chain] += 1
+
+        now = time.time()
+        emitted = []
+
+        for chain, address in targets:
+            self.counter += 1
+            digest = hashlib.sha256(f"{self.seed}:tx:{self.counter}".encode()).hexdigest()
+            tx_hash = digest if chain == "BTC" else "0x" + digest
+            unit = 10**8 if chain == "BTC" else 10**18
+
+            tx = {
+                "chain": chain,
+                "hash": tx_hash,
+                "from": self._sender(chain),
+                "to": address,
+                "value": self.rng.randint(1, 5 * unit),
+                "fee": self.rng.randint(1000, unit // 1000),
+                "height": self.heights[chain],
+                "time": now,
+            }
+            self.history.setdefault(self._key(chain, address), deque(maxlen=HISTORY_PER_ADDRESS)).appendleft(tx)
+            emitted.append({"hash": tx_hash, "chain": chain, "address": address, "created_at": now})
+
+        return emitted
+
+    def transactions(self, chain: str, address: str, limit: int) -> List[Dict[str, Any]]:
+        return list(self.history.get(self._key(chain, address), ()))[:limit]
+
+    def confirmations(self, tx: Dict[str, Any]) -> int:
+        return self.heights[tx["chain"]] - tx["height"] + 1
+
+    def balance(self, chain: str, address: str) -> int:
+        return sum(tx["value"] for tx in self.history.get(self._key(chain, address), ()))
+
+class FakeServices:
+    """aiohttp-приложение, имитирующее провайдеров и Telegram Bot API"""
+
+    def __init__(self, options: Dict[str, Any]):
+        self.options = options
+        self.network = FakeNetwork(options.get("seed", 1))
+        self.faults = random.Random(options.get("seed", 1) + 1)
+        self.deliveries: List[Tuple[str, int, float]] = []
+        self.message_id = 0
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._inject_faults], client_max_size=64 * 1024 * 1024)
+        app.router.add_get("/etherscan/api", self._explorer)
+        app.router.add_get("/bscscan/api", self._explorer)
+        app.router.add_get("/blockcypher/v1/btc/main", self._blockcypher_root)
+        app.router.add_get("/blockcypher/v1/btc/main/addrs/{addrs}/{endpoint}", self._blockcypher_addrs)
+        app.router.add_get("/blockcypher/v1/btc/main/blocks/{heights}", self._blockcypher_blocks)
+        app.router.add_get("/blockchain-info/multiaddr", self._multiaddr)
+        app.router.add_post("/rpc/{chain}", self._rpc)
+        app.router.add_get("/prices/api/v3/simple/price", self._prices)
+        app.router.add_get("/prices/api/v3/simple/token_price/{platform}", self._token_prices)
+        app.router.add_post("/bot{token}/{method}", self._telegram)
+        app.router.add_post("/_bench/emit", self._emit)
+        app.router.add_get("/_bench/deliveries", self._deliveries)
+        return app
+
+    def _delay(self, mean_ms: float, jitter_ms: float) -> float:
+        return max(self.faults.gauss(mean_ms, jitter_ms), 0) / 1000
+
+    @web.middleware
+    async def _inject_faults(self, request: web.Request, handler):
+        if request.path.startswith("/_bench/"):
+            return await handler(request)
+
+        if request.path.startswith("/bot"):
+            await asyncio.sleep(self._delay(self.options.get("telegram_latency_ms", 0), 0))
+            return await handler(request)
+
+        await asyncio.sleep(self._delay(self.options.get("latency_ms", 0), self.options.get("jitter_ms", 0)))
+        if self.faults.random() < self.options.get("error_rate", 0):
+            return web.Response(status=429, text="Rate limit exceeded")
+
+        return await handler(request)
+
+    # Обозреватели в стиле Etherscan
+    async def _explorer(self, request: web.Request) -> web.Response:
+        chain = "ETH" if request.path.startswith("/etherscan") else "BNB"
+        query = request.query
+        action = query.get("action")
+        network = self.network
+
+        if action == "balance":
+            return web.json_response({"status": "1", "message": "OK", "result": str(network.balance(chain, query["address"]))})
+
+        if action == "balancemulti":
+            return web.json_response({"status": "1", "message": "OK", "result": [
+                {"account": address, "balance": str(network.balance(chain, address))}
+                for address in query["address"].split(",")
+            ]})
+
+        if action == "txlist":
+            # endblock ограничивает страницу сверху (загрузка полной истории, services/backfill.py)
+            end_block = int(query.get("endblock", 99999999))
+            txs = [tx for tx in network.transactions(chain, query["address"], HISTORY_PER_ADDRESS) if tx["height"] <= end_block]
+            txs = txs[:int(query.get("offset", 10))]
+            if not txs:
+                return web.json_response({"status": "0", "message": "No transactions found", "result": []})
+
+            return web.json_response({"status": "1", "message": "OK", "result": [{
+                "blockNumber": str(tx["height"]),
+                "timeStamp": str(int(tx["time"]) + 1),  # округление вверх: время блока не раньше появления транзакции
+                "hash": tx["hash"],
+                "blockHash": network.block_hash(chain, tx["height"]),
+                "from": tx["from"],
+                "to": tx["to"],
+                "value": str(tx["value"]),
+                "gasPrice": str(tx["fee"] // 21000 or 1),
+                "gasUsed": "21000",
+                "confirmations": str(network.confirmations(tx)),
+            } for tx in txs]})
+
+        if action == "tokentx":
+            return web.json_response({"status": "0", "message": "No transactions found", "result": []})
+
+        if action == "eth_blockNumber":
+            return web.json_response({"jsonrpc": "2.0", "id": 1, "result": hex(network.heights[chain])})
+
+        if action == "eth_getBlockByNumber":
+            return web.json_response({"jsonrpc": "2.0", "id": 1, "result": self._evm_block(chain, int(query["tag"], 16))})
+
+        return web.json_response({"status": "0", "message": "NOTOK", "result": f"Unsupported action {action}"})
+
+    def _evm_block(self, chain: str, height: int) -> Optional[Dict[str, Any]]:
+        if height > self.network.heights[chain]:
+            return None
+        return {"number": hex(height), "hash": self.network.block_hash(chain, height), "timestamp": hex(int(time.time()))}
+
+    # BlockCypher
+    async def _blockcypher_root(self, request: web.Request) -> web.Response:
+        return web.json_response({"name": "BTC.main", "height": self.network.heights["BTC"]})
+
+    def _blockcypher_tx(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "hash": tx["hash"],
+            "block_height": tx["height"],
+            "block_hash": self.network.block_hash("BTC", tx["height"]),
+            "confirmations": self.network.confirmations(tx),
+            "received": datetime.utcfromtimestamp(tx["time"]).isoformat() + "Z",
+            "fees": tx["fee"],
+            "inputs": [{"addresses": [tx["from"]], "output_value": tx["value"] + tx["fee"]}],
+            "outputs": [{"addresses": [tx["to"]], "value": tx["value"]}],
+        }
+
+    async def _blockcypher_addrs(self, request: web.Request) -> web.Response:
+        addresses = request.match_info["addrs"].split(";")
+        endpoint = request.match_info["endpoint"]
+        limit = int(request.query.get("limit", 10))
+        before = int(request.query.get("before", 1 << 62))
+
+        items = []
+        for address in addresses:
+            if endpoint == "balance":
+                items.append({"address": address, "final_balance": self.network.balance("BTC", address)})
+            else:
+                items.append({
+                    "address": address,
+                    "txs": [
+                        self._blockcypher_tx(tx) for tx in self.network.transactions("BTC", address, HISTORY_PER_ADDRESS)
+                        if tx["height"] < before
+                    ][:limit]
+                })
+
+        return web.json_response(items if len(items) > 1 else items[0])
+
+    async def _blockcypher_blocks(self, request: web.Request) -> web.Response:
+        blocks = [
+            {"height": int(height), "hash": self.network.block_hash("BTC", int(height))}
+            for height in request.match_info["heights"].split(";")
+            if int(height) <= self.network.heights["BTC"]
+        ]
+        return web.json_response(blocks if len(blocks) != 1 else blocks[0])
+
+    # blockchain.info
+    async def _multiaddr(self, request: web.Request) -> web.Response:
+        addresses = request.query.get("active", "").split("|")
+        limit = int(request.query.get("n", 50))
+        network = self.network
+
+        txs = sorted(
+            {tx["hash"]: tx for address in addresses for tx in network.transactions("BTC", address, limit)}.values(),
+            key=lambda tx: tx["height"], reverse=True
+        )[:limit]
+
+        return web.json_response({
+            "addresses": [{"address": address, "final_balance": network.balance("BTC", address)} for address in addresses],
+            "txs": [{
+                "hash": tx["hash"],
+                "time": int(tx["time"]),
+                "block_height": tx["height"],
+                "fee": tx["fee"],
+                "inputs": [{"prev_out": {"addr": tx["from"], "value": tx["value"] + tx["fee"]}}],
+                "out": [{"addr": tx["to"], "value": tx["value"]}],
+            } for tx in txs],
+            "info": {"latest_block": {"height": network.heights["BTC"]}},
+        })
+
+    # JSON-RPC
+    async def _rpc(self, request: web.Request) -> web.Response:
+        chain = "BNB" if request.match_info["chain"] == "bnb" else "ETH"
+        payload = await request.json()
+        calls = payload if isinstance(payload, list) else [payload]
+
+        responses = []
+        for call in calls:
+            method, params = call.get("method"), call.get("params") or []
+
+            if method == "eth_blockNumber":
+                result = hex(self.network.heights[chain])
+            elif method == "eth_getBlockByNumber":
+                result = self._evm_block(chain, int(params[0], 16))
+            elif method == "eth_getLogs":
+                result = []
+            else:
+                result = "0x"
+
+            responses.append({"jsonrpc": "2.0", "id": call.get("id"), "result": result})
+
+        return web.json_response(responses if isinstance(payload, list) else responses[0])
+
+    # Telegram Bot API
+    async def _telegram(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = await request.post()
+
+        if method == "getMe":
+            return web.json_response({"ok": True, "result": {
+                "id": 1, "is_bot": True, "first_name": "Benchmark", "username": "benchmark_bot"
+            }})
+
+        if method == "sendMessage":
+            now = time.time()
+            chat_id = int(data.get("chat_id", 0))
+            text = data.get("text", "")
+
+            for match in SHORT_HASH_RE.finditer(text):
+                self.deliveries.append((match.group(1), chat_id, now))
+
+            self.message_id += 1
+            return web.json_response({"ok": True, "result": {
+                "message_id": self.message_id,
+                "date": int(now),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": text,
+            }})
+
+        return web.json_response({"ok": True, "result": True})
+
+    # Котировки в стиле CoinGecko
+    def _quote(self, base: float) -> float:
+        # Детерминированное колебание +-2% с периодом 10 минут
+        return round(base * (1 + 0.02 * math.sin(time.time() / 600 * 2 * math.pi)), 6)
+
+    async def _prices(self, request: web.Request) -> web.Response:
+        ids = [price_id for price_id in request.query.get("ids", "").split(",") if price_id in BASE_PRICES]
+        return web.json_response({price_id: {"usd": self._quote(BASE_PRICES[price_id])} for price_id in ids})
+
+    async def _token_prices(self, request: web.Request) -> web.Response:
+        contracts = [contract.lower() for contract in request.query.get("contract_addresses", "").split(",") if contract]
+        # Цена токена выводится из адреса контракта: от 0.01 до 100 USD
+        return web.json_response({
+            contract: {"usd": self._quote(10 ** (int(hashlib.sha1(contract.encode()).hexdigest()[:4], 16) % 5 - 2))}
+            for contract in contracts
+        })
+
+    # Управление бенчмарком
+    async def _emit(self, request: web.Request) -> web.Response:
+        targets = [tuple(target) for target in await request.json()]
+        return web.json_response(self.network.emit(targets))
+
+    async def _deliveries(self, request: web.Request) -> web.Response:
+        deliveries, self.deliveries = self.deliveries, []
+        return web.Response(text=json.dumps(deliveries), content_type="application/json")
+
+async def _serve(options: Dict[str, Any], port_queue) -> None:
+    runner = web.AppRunner(FakeServices(options).app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", options.get("port", 0))
+    await site.start()
+
+    port_queue.put(runner.addresses[0][1])
+    await asyncio.Event().wait()
+
+def serve(options: Dict[str, Any], port_queue) -> None:
+    """Точка входа дочернего процесса: запускает сервер и сообщает выбранный порт"""
+    asyncio.run(_serve(options, port_queue))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Имитатор провайдеров, котировок и Telegram Bot API")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    class _PortPrinter:
+        def put(self, port: int) -> None:
+            print(f"Имитатор запущен на http://127.0.0.1:{port}", flush=True)
+
+    try:
+        serve({"port": args.port, "latency_ms": args.latency_ms, "error_rate": args.error_rate}, _PortPrinter())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
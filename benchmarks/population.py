@@ -0,0 +1,122 @@
+"""
+Генератор синтетической популяции пользователей и кошельков
+
+Часть кошельков следит за общими "горячими" адресами (биржи, популярные
+контракты). Популярность горячих адресов распределена по закону Ципфа,
+поэтому несколько адресов отслеживаются тысячами кошельков, а большинство - единицами.
+"""
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import accumulate
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import insert
+
+from models.user import User
+from models.wallet import Wallet, BlockchainType
+from utils.validation import encode_segwit_address
+
+# Размер пакета при массовой вставке
+INSERT_CHUNK = 10_000
+
+@dataclass
+class Population:
+    """Сгенерированная популяция"""
+    user_ids: List[int]
+    wallets: List[Tuple[int, str, str]]  # (ID пользователя, блокчейн, адрес)
+    subscribers: Counter = field(default_factory=Counter)  # (блокчейн, адрес) -> число кошельков
+
+    @property
+    def addresses(self) -> List[Tuple[str, str]]:
+        """Уникальные пары (блокчейн, адрес) в порядке появления"""
+        return list(self.subscribers)
+
+def _address(rng: random.Random, chain: str) -> str:
+    if chain == "BTC":
+        # P2WPKH с корректной контрольной суммой: мониторинг пропускает некорректные адреса
+        return encode_segwit_address(0, rng.getrandbits(160).to_bytes(20, "big"))
+    return "0x" + f"{rng.getrandbits(160):040x}"
+
+def generate_population(
+    wallets: int,
+    chains: Sequence[str] = ("ETH", "BTC", "BNB"),
+    shared_ratio: float = 0.2,
+    skew: float = 1.1,
+    wallets_per_user: int = 3,
+    seed: int = 1
+) -> Population:
+    """
+    Генерирует популяцию кошельков
+
+    :param wallets: Количество кошельков
+    :param chains: Блокчейны, между которыми кошельки распределяются равномерно
+    :param shared_ratio: Доля кошельков, следящих за общими адресами
+    :param skew: Показатель распределения Ципфа для общих адресов
+    :param wallets_per_user: Кошельков на пользователя
+    :param seed: Начальное значение генератора
+    :return: Популяция; дубликаты адресов у одного пользователя отбрасываются
+    """
+    rng = random.Random(seed)
+
+    shared = int(wallets * shared_ratio)
+    hot_count = max(shared // 50, 1)
+    hot = [(chain, _address(rng, chain)) for chain in (rng.choice(chains) for _ in range(hot_count))]
+    cum_weights = list(accumulate(1 / (rank ** skew) for rank in range(1, hot_count + 1)))
+
+    entries = rng.choices(hot, cum_weights=cum_weights, k=shared) if shared else []
+    entries += [(chain, _address(rng, chain)) for chain in (rng.choice(chains) for _ in range(wallets - shared))]
+    rng.shuffle(entries)
+
+    population = Population(user_ids=[], wallets=[])
+    seen = set()
+
+    for i, (chain, address) in enumerate(entries):
+        user_id = 1_000_000 + i // wallets_per_user
+        if not population.user_ids or population.user_ids[-1] != user_id:
+            population.user_ids.append(user_id)
+
+        if (user_id, address) in seen:
+            continue
+
+        seen.add((user_id, address))
+        population.wallets.append((user_id, chain, address))
+        population.subscribers[(chain, address)] += 1
+
+    return population
+
+async def insert_population(session, population: Population, confirmation_threshold: int) -> None:
+    """
+    Записывает популяцию в базу данных многострочными вставками
+
+    :param session: Сессия базы данных
+    :param population: Популяция
+    :param confirmation_threshold: Порог подтверждений для всех кошельков
+    """
+    for start in range(0, len(population.user_ids), INSERT_CHUNK):
+        await session.execute(insert(User), [
+            {"user_id": user_id, "username": f"bench{user_id}"}
+            for user_id in population.user_ids[start:start + INSERT_CHUNK]
+        ])
+
+    for start in range(0, len(population.wallets), INSERT_CHUNK):
+        await session.execute(insert(Wallet), [
+            {
+                "user_id": user_id,
+                "blockchain_type": BlockchainType(chain),
+                "address": address,
+                "confirmation_threshold": confirmation_threshold,
+            }
+            for user_id, chain, address in population.wallets[start:start + INSERT_CHUNK]
+        ])
+
+    await session.commit()
+
+def pick_targets(population: Population, count: int, rng: random.Random) -> List[Tuple[str, str]]:
+    """Выбирает адреса, получающие новые транзакции (равномерно по уникальным адресам)"""
+    addresses = population.addresses
+    return [addresses[rng.randrange(len(addresses))] for _ in range(count)] if addresses else []
+
+def expected_deliveries(population: Population, emitted: List[Dict]) -> int:
+    """Количество уведомлений, которое должно быть доставлено по созданным транзакциям"""
+    return sum(population.subscribers[(tx["chain"], tx["address"])] for tx in emitted)
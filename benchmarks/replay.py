@@ -0,0 +1,205 @@
+"""
+Воспроизведение записанного трафика провайдеров через цикл мониторинга
+
+Трафик записывается ботом при заданном HTTP_RECORD_DIR (services/http.py).
+Здесь записи подаются настоящему services.monitor.run_monitor_cycle без обращения
+к сети, с исходными задержками, ускоренными в --speed раз (0 - без задержек),
+чтобы профилировать разбор ответов и запись в БД на реальных данных.
+
+Кошельки берутся из копии рабочей базы (--db) или восстанавливаются по адресам
+из записанных запросов. URL провайдеров в окружении должны совпадать с теми,
+что использовались при записи. Записанные транзакции старше времени последней
+проверки кошелька отбрасываются фильтром монитора, поэтому новые записи в БД и
+уведомления появляются в основном в первом цикле.
+
+Пример:
+    python -m benchmarks.replay --trace records/ --speed 100 --cycles 10 --output replay.json
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from yarl import URL
+
+from benchmarks.fake_services import serve
+from benchmarks.population import Population, insert_population
+from benchmarks.run import BOT_TOKEN, current_rss_mb, git_revision, percentiles
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Воспроизведение записанного трафика провайдеров")
+    parser.add_argument("--trace", required=True, help="файл .jsonl.gz или каталог с записями")
+    parser.add_argument("--speed", type=float, default=0, help="ускорение исходных задержек (0 - без задержек)")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--db", help="SQLite-база с кошельками (используется копия)")
+    parser.add_argument("--confirmations", type=int, default=1, help="порог подтверждений для восстановленных кошельков")
+    parser.add_argument("--telegram-latency-ms", type=float, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="файл для JSON-результата (по умолчанию stdout)")
+    return parser.parse_args(argv)
+
+def _trace_files(path: str) -> List[str]:
+    if os.path.isfile(path):
+        return [path]
+    return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".jsonl.gz"))
+
+def population_from_trace(path: str) -> Population:
+    """
+    Восстанавливает кошельки по адресам из записанных запросов
+
+    Адреса добавляются в порядке первого появления, поэтому пакеты BTC-адресов
+    при воспроизведении формируются так же, как при записи.
+    """
+    population = Population(user_ids=[], wallets=[], subscribers=Counter())
+
+    def add(chain: str, address: str) -> None:
+        if (chain, address) not in population.subscribers:
+            user_id = 1_000_000 + len(population.user_ids)
+            population.user_ids.append(user_id)
+            population.wallets.append((user_id, chain, address))
+            population.subscribers[(chain, address)] += 1
+
+    for file_path in _trace_files(path):
+        with gzip.open(file_path, "rt", encoding="utf-8") as file:
+            for line in file:
+                url = URL(json.loads(line)["key"].split(" ", 2)[1])
+                query = url.query
+
+                if query.get("action") == "txlist" and query.get("address"):
+                    add("BNB" if "bscscan" in str(url) else "ETH", query["address"])
+                elif "/addrs/" in url.path:
+                    segments = url.path.split("/")
+                    for address in segments[segments.index("addrs") + 1].split(";"):
+                        add("BTC", address)
+                elif query.get("active"):
+                    for address in query["active"].split("|"):
+                        add("BTC", address)
+
+    return population
+
+async def run_replay(args: argparse.Namespace, base_url: str, workdir: str) -> Dict[str, Any]:
+    db_path = os.path.join(workdir, "replay.db")
+    if args.db:
+        shutil.copy(args.db, db_path)
+
+    os.environ.update({
+        "BOT_TOKEN": BOT_TOKEN,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}",
+        "HTTP_REPLAY_PATH": args.trace,
+        "HTTP_REPLAY_SPEED": str(args.speed),
+        "HTTP_RECORD_DIR": "",
+        "METRICS_PORT": "0",
+    })
+
+    # Модули бота читают окружение при импорте
+    import aiohttp
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from services.db import async_session, init_db
+    from services.http import replay_stats
+    from services.metrics import DB_COMMIT_SECONDS
+    from services.monitor import run_monitor_cycle
+
+    await init_db()
+    population = None
+    if not args.db:
+        population = population_from_trace(args.trace)
+        async with async_session() as session:
+            await insert_population(session, population, args.confirmations)
+
+    bot = Bot(
+        token=BOT_TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)),
+        default=DefaultBotProperties(parse_mode="HTML")
+    )
+    cycles = []
+
+    try:
+        async with aiohttp.ClientSession(base_url) as control:
+            for index in range(args.cycles):
+                hits_before, misses_before = replay_stats()
+                commits_before, _ = DB_COMMIT_SECONDS.snapshot()
+
+                started = time.perf_counter()
+                wallets = await run_monitor_cycle(bot)
+                seconds = time.perf_counter() - started
+
+                hits, misses = replay_stats()
+                commits, _ = DB_COMMIT_SECONDS.snapshot()
+                async with control.get("/_bench/deliveries") as response:
+                    delivered = len(await response.json())
+
+                cycles.append({
+                    "cycle": index + 1,
+                    "seconds": seconds,
+                    "wallets": wallets,
+                    "replayed": hits - hits_before,
+                    "unmatched": misses - misses_before,
+                    "commits": commits - commits_before,
+                    "notifications": delivered,
+                    "rss_mb": current_rss_mb(),
+                })
+    finally:
+        await bot.session.close()
+
+    cycle_seconds = [cycle["seconds"] for cycle in cycles]
+    return {
+        "revision": git_revision(),
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "python": sys.version.split()[0],
+        "params": vars(args),
+        "wallets_from_trace": len(population.wallets) if population else None,
+        "cycles": cycles,
+        "summary": {
+            "cycle_seconds": percentiles(cycle_seconds),
+            "replayed": sum(cycle["replayed"] for cycle in cycles),
+            "unmatched": sum(cycle["unmatched"] for cycle in cycles),
+            "notifications": sum(cycle["notifications"] for cycle in cycles),
+        },
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    args.trace = os.path.abspath(args.trace)
+
+    import logging
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+
+    # Имитатор нужен только как приемник Telegram Bot API
+    context = multiprocessing.get_context("spawn")
+    port_queue = context.Queue()
+    server = context.Process(
+        target=serve, args=({"telegram_latency_ms": args.telegram_latency_ms}, port_queue), daemon=True
+    )
+    server.start()
+
+    try:
+        base_url = f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+
+        with tempfile.TemporaryDirectory() as workdir:
+            result = asyncio.run(run_replay(args, base_url, workdir))
+    finally:
+        server.terminate()
+        server.join()
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
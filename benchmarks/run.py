@@ -0,0 +1,266 @@
+"""
+Офлайн-бенчмарк цикла мониторинга
+
+Запускает имитатор провайдеров и Telegram Bot API в отдельном процессе, создает
+временную базу с синтетической популяцией кошельков и прогоняет настоящий
+services.monitor.run_monitor_cycle. Перед каждым циклом имитатор добывает блок
+и создает --tx-rate новых транзакций. Результат - JSON с параметрами запуска,
+ревизией и метриками: время цикла, задержка от появления транзакции до доставки
+уведомления (перцентили), скорость записи в БД и пиковая память.
+
+Пример:
+    python -m benchmarks.run --wallets 10000 --cycles 5 --latency-ms 50 --output results.json
+    python -m benchmarks.compare baseline.json results.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from benchmarks.fake_services import serve, short_hash
+from benchmarks.population import expected_deliveries, generate_population, insert_population, pick_targets
+
+BOT_TOKEN = "123456:BENCHMARK-abcdefghijklmnopqrstuvwxyz"
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк мониторинга кошельков")
+    parser.add_argument("--wallets", type=int, default=1000, help="количество кошельков (1k - 1M)")
+    parser.add_argument("--chains", default="ETH,BTC,BNB", help="блокчейны через запятую")
+    parser.add_argument("--shared-ratio", type=float, default=0.2, help="доля кошельков, следящих за общими адресами")
+    parser.add_argument("--skew", type=float, default=1.1, help="показатель Ципфа для популярности общих адресов")
+    parser.add_argument("--wallets-per-user", type=int, default=3)
+    parser.add_argument("--cycles", type=int, default=5, help="измеряемые циклы мониторинга")
+    parser.add_argument("--tx-rate", type=int, default=100, help="новых транзакций перед каждым циклом")
+    parser.add_argument("--confirmations", type=int, default=1, help="порог подтверждений кошельков")
+    parser.add_argument("--latency-ms", type=float, default=20, help="средняя задержка ответа провайдера")
+    parser.add_argument("--jitter-ms", type=float, default=5, help="стандартное отклонение задержки провайдера")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов провайдера с ошибкой 429")
+    parser.add_argument("--telegram-latency-ms", type=float, default=30, help="задержка Telegram Bot API")
+    parser.add_argument("--rpc", action="store_true", help="использовать JSON-RPC узлы для ETH/BNB")
+    parser.add_argument("--btc-batch", type=int, default=100, help="размер пакета адресов BlockCypher")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="файл для JSON-результата (по умолчанию stdout)")
+    return parser.parse_args(argv)
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Перцентили методом ближайшего ранга"""
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None, "mean": None}
+
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        return ordered[min(int(q * len(ordered) + 0.5), len(ordered) - 1)]
+
+    return {
+        "p50": rank(0.50),
+        "p90": rank(0.90),
+        "p99": rank(0.99),
+        "max": ordered[-1],
+        "mean": sum(ordered) / len(ordered),
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def current_rss_mb() -> Optional[float]:
+    """Текущий RSS процесса (только Linux)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+def configure_environment(args: argparse.Namespace, base_url: str, db_path: str) -> None:
+    """Направляет бота на имитатор; вызывается до импорта модулей бота, читающих окружение"""
+    os.environ.update({
+        "BOT_TOKEN": BOT_TOKEN,
+        "ETHERSCAN_API_KEY": "benchmark",
+        "BSCSCAN_API_KEY": "benchmark",
+        "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}",
+        "ETHERSCAN_API_URL": f"{base_url}/etherscan/api",
+        "BSCSCAN_API_URL": f"{base_url}/bscscan/api",
+        "BLOCKCYPHER_API_URL": f"{base_url}/blockcypher/v1/btc/main",
+        "BLOCKCHAIN_INFO_MULTIADDR_URL": f"{base_url}/blockchain-info/multiaddr",
+        "BLOCKCYPHER_BATCH_SIZE": str(args.btc_batch),
+        "ETH_RPC_URL": f"{base_url}/rpc/eth" if args.rpc else "",
+        "BSC_RPC_URL": f"{base_url}/rpc/bnb" if args.rpc else "",
+        "METRICS_PORT": "0",
+    })
+
+async def run_benchmark(args: argparse.Namespace, base_url: str, db_path: str) -> Dict[str, Any]:
+    configure_environment(args, base_url, db_path)
+
+    # Модули бота читают окружение при импорте
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from sqlalchemy import func, select
+
+    from models.transaction import Transaction
+    from services.db import async_session, init_db
+    from services.metrics import DB_COMMIT_SECONDS
+    from services.monitor import run_monitor_cycle
+
+    chains = [chain.strip().upper() for chain in args.chains.split(",") if chain.strip()]
+    population = generate_population(
+        args.wallets, chains, args.shared_ratio, args.skew, args.wallets_per_user, args.seed
+    )
+
+    await init_db()
+    started = time.perf_counter()
+    async with async_session() as session:
+        await insert_population(session, population, args.confirmations)
+    populate_seconds = time.perf_counter() - started
+
+    bot = Bot(
+        token=BOT_TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)),
+        default=DefaultBotProperties(parse_mode="HTML")
+    )
+    rng = random.Random(args.seed)
+    emitted: Dict[str, float] = {}
+    expected = 0
+    cycles = []
+    deliveries: List[list] = []
+
+    async def count_rows() -> int:
+        async with async_session() as session:
+            return (await session.execute(select(func.count(Transaction.tx_id)))).scalar_one()
+
+    async with aiohttp.ClientSession(base_url) as control:
+        async def emit(count: int) -> List[Dict[str, Any]]:
+            async with control.post("/_bench/emit", json=pick_targets(population, count, rng)) as response:
+                return await response.json()
+
+        async def collect() -> None:
+            async with control.get("/_bench/deliveries") as response:
+                deliveries.extend(await response.json())
+
+        try:
+            # Прогревочный цикл: выставляет время последней проверки всем кошелькам
+            await run_monitor_cycle(bot)
+            await collect()
+            deliveries.clear()
+
+            # Дополнительные циклы без новых транзакций доводят последние до порога подтверждений
+            drain = max(args.confirmations - 1, 0)
+
+            for index in range(args.cycles + drain):
+                batch = await emit(args.tx_rate if index < args.cycles else 0)
+                for tx in batch:
+                    emitted[short_hash(tx["hash"])] = tx["created_at"]
+                expected += expected_deliveries(population, batch)
+
+                rows_before = await count_rows()
+                commits_before, commit_seconds_before = DB_COMMIT_SECONDS.snapshot()
+
+                started = time.perf_counter()
+                wallets = await run_monitor_cycle(bot)
+                seconds = time.perf_counter() - started
+
+                rows = await count_rows() - rows_before
+                commits, commit_seconds = DB_COMMIT_SECONDS.snapshot()
+                await collect()
+
+                cycles.append({
+                    "cycle": index + 1,
+                    "seconds": seconds,
+                    "wallets": wallets,
+                    "tx_emitted": len(batch),
+                    "rows_written": rows,
+                    "commits": commits - commits_before,
+                    "commit_seconds": commit_seconds - commit_seconds_before,
+                    "rss_mb": current_rss_mb(),
+                })
+        finally:
+            await bot.session.close()
+
+    latencies = [delivered_at - emitted[key] for key, _, delivered_at in deliveries if key in emitted]
+    cycle_seconds = [cycle["seconds"] for cycle in cycles]
+    total_seconds = sum(cycle_seconds)
+    total_rows = sum(cycle["rows_written"] for cycle in cycles)
+
+    return {
+        "revision": git_revision(),
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "python": sys.version.split()[0],
+        "params": vars(args),
+        "population": {
+            "wallets": len(population.wallets),
+            "users": len(population.user_ids),
+            "unique_addresses": len(population.subscribers),
+            "max_subscribers": max(population.subscribers.values(), default=0),
+            "populate_seconds": populate_seconds,
+        },
+        "cycles": cycles,
+        "summary": {
+            "cycle_seconds": percentiles(cycle_seconds),
+            "wallets_per_second": sum(cycle["wallets"] for cycle in cycles) / total_seconds if total_seconds else None,
+            "detection_to_delivery_seconds": percentiles(latencies),
+            "deliveries": len(latencies),
+            "expected_deliveries": expected,
+            "db_rows_written": total_rows,
+            "db_rows_per_second": total_rows / total_seconds if total_seconds else None,
+            "db_commits": sum(cycle["commits"] for cycle in cycles),
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+
+    import logging
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+
+    context = multiprocessing.get_context("spawn")
+    port_queue = context.Queue()
+    server = context.Process(
+        target=serve,
+        args=({
+            "seed": args.seed,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "telegram_latency_ms": args.telegram_latency_ms,
+        }, port_queue),
+        daemon=True
+    )
+    server.start()
+
+    try:
+        base_url = f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+
+        with tempfile.TemporaryDirectory() as tmp:
+            result = asyncio.run(run_benchmark(args, base_url, os.path.join(tmp, "bench.db")))
+    finally:
+        server.terminate()
+        server.join()
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
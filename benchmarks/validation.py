@@ -0,0 +1,145 @@
+"""
+Микробенчмарк проверки адресов (utils/validation.py)
+
+Генерирует корректные адреса каждого вида и адреса с одной измененной буквой,
+затем измеряет число проверок в секунду без кэша (функции проверки напрямую) -
+это основной результат: новые адреса при записи кошелька в кэше не встречаются.
+Скорость через кэширующий is_valid_address при повторной проверке тех же адресов
+приводится отдельно.
+
+Виды адресов со скоростью без кэша ниже --target перечисляются в below_target и
+в предупреждении; с --strict бенчмарк в этом случае завершается с кодом 1.
+Без pycryptodome keccak-256 вычисляется на чистом Python, и проверка EIP-55
+(evm_checksum) медленнее цели на порядки; это указывается в keccak_fallback.
+
+Пример:
+    python -m benchmarks.validation --count 20000 --strict
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from models.wallet import BlockchainType
+from utils.validation import (
+    encode_segwit_address, is_valid_address, is_valid_btc_address, is_valid_evm_address,
+    to_checksum_address, _keccak_backend
+)
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+# Целевая скорость проверки без кэша для каждого вида адресов
+TARGET_PER_SECOND = 100_000
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Микробенчмарк проверки адресов")
+    parser.add_argument("--count", type=int, default=20000, help="адресов каждого вида")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--target", type=int, default=TARGET_PER_SECOND, help="проверок в секунду без кэша")
+    parser.add_argument("--strict", action="store_true", help="код возврата 1, если вид адресов медленнее цели")
+    parser.add_argument("--output", help="файл для JSON-результата (по умолчанию stdout)")
+    return parser.parse_args(argv)
+
+def _base58check(payload: bytes) -> str:
+    raw = payload + hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+    number = int.from_bytes(raw, "big")
+    chars = []
+    while number:
+        number, rest = divmod(number, 58)
+        chars.append(BASE58_ALPHABET[rest])
+    zeros = len(raw) - len(raw.lstrip(b"\x00"))
+    return "1" * zeros + "".join(reversed(chars))
+
+def _corrupt(rng: random.Random, address: str, alphabet: str) -> str:
+    # Замена одного символа данных: контрольная сумма должна это обнаружить
+    index = rng.randrange(len(address) - 20, len(address))
+    return address[:index] + rng.choice(alphabet.replace(address[index], "")) + address[index + 1:]
+
+def generate_addresses(count: int, seed: int) -> Dict[str, List[str]]:
+    """Адреса по видам: {вид: список адресов}"""
+    rng = random.Random(seed)
+
+    def random_bytes(size: int) -> bytes:
+        return rng.getrandbits(8 * size).to_bytes(size, "big")
+
+    lowercase = ["0x" + random_bytes(20).hex() for _ in range(count)]
+    bech32 = [encode_segwit_address(0, random_bytes(20)) for _ in range(count)]
+    return {
+        "evm_lowercase": lowercase,
+        "evm_checksum": [to_checksum_address(address) for address in lowercase],
+        "btc_p2pkh": [_base58check(b"\x00" + random_bytes(20)) for _ in range(count)],
+        "btc_p2sh": [_base58check(b"\x05" + random_bytes(20)) for _ in range(count)],
+        "btc_p2wpkh": bech32,
+        "btc_taproot": [encode_segwit_address(1, random_bytes(32)) for _ in range(count)],
+        "btc_bech32_typo": [_corrupt(rng, address, "qpzry9x8gf2tvdw0s3jn54khce6mua7l") for address in bech32],
+    }
+
+def measure(validator: Callable[[str], bool], addresses: List[str]) -> Dict[str, float]:
+    """Проверяет все адреса и возвращает скорость и долю корректных"""
+    started = time.perf_counter()
+    valid = sum(1 for address in addresses if validator(address))
+    elapsed = time.perf_counter() - started
+    return {
+        "per_second": round(len(addresses) / elapsed) if elapsed > 0 else None,
+        "valid_ratio": valid / len(addresses),
+    }
+
+def run(args: argparse.Namespace) -> Dict[str, object]:
+    """Выполняет измерения для всех видов адресов"""
+    addresses = generate_addresses(args.count, args.seed)
+    results = {}
+
+    for kind, items in addresses.items():
+        if kind.startswith("evm"):
+            validator, blockchain_type = is_valid_evm_address, BlockchainType.ETH
+        else:
+            validator, blockchain_type = is_valid_btc_address, BlockchainType.BTC
+
+        is_valid_address.cache_clear()
+        cached = lambda address: is_valid_address(blockchain_type, address)
+        measure(cached, items)  # заполнение кэша
+
+        results[kind] = {
+            "uncached": measure(validator, items),
+            "cached": measure(cached, items),
+        }
+
+    uncached = {kind: result["uncached"]["per_second"] for kind, result in results.items()}
+    report = {
+        "count": args.count,
+        "target_per_second": args.target,
+        "keccak_backend": "pycryptodome" if _keccak_backend is not None else "python",
+        "uncached_per_second": uncached,
+        "below_target": [kind for kind, rate in uncached.items() if rate is not None and rate < args.target],
+        "results": results,
+    }
+    if _keccak_backend is None:
+        report["keccak_fallback"] = (
+            f"pycryptodome не установлен: EIP-55 на чистом Python, {uncached['evm_checksum']} проверок/с "
+            f"против {uncached['evm_lowercase']} для адресов без контрольной суммы"
+        )
+    return report
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    report = run(args)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    for kind in report["below_target"]:
+        print(f"Предупреждение: {kind} - {report['uncached_per_second'][kind]} проверок/с без кэша, "
+              f"цель {args.target}", file=sys.stderr)
+    if "keccak_fallback" in report:
+        print(f"Предупреждение: {report['keccak_fallback']}", file=sys.stderr)
+    if args.strict and report["below_target"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,17 @@ load_dotenv()
 # Telegram Bot
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
+# Администраторы бота (Telegram ID через запятую): доступ к /profile, /tasks
+ADMIN_IDS = [int(user_id) for user_id in os.getenv("ADMIN_IDS", "").split(",") if user_id.strip()]
+
 # Blockchain API Keys
 ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
 BSCSCAN_API_KEY = os.getenv("BSCSCAN_API_KEY")
 
+# JSON-RPC узлы (необязательно); при их наличии токен-трансферы читаются через eth_getLogs
+ETH_RPC_URL = os.getenv("ETH_RPC_URL")
+BSC_RPC_URL = os.getenv("BSC_RPC_URL")
+
 # Платежные системы
 CRYPTO_PAYMENT_API_KEY = os.getenv("CRYPTO_PAYMENT_API_KEY")
 CRYPTO_PAYMENT_API_SECRET = os.getenv("CRYPTO_PAYMENT_API_SECRET")
@@ -25,10 +32,117 @@ DB_NAME = os.getenv("DB_NAME", "crypto_monitor")
 # Настройки ограничений
 FREE_WALLET_LIMIT = 3
 PREMIUM_WALLET_LIMIT = 20
+ALERT_RULE_LIMIT = 10  # правил оповещений о крупных движениях на пользователя
+ALERT_MAX_WINDOW_HOURS = 168  # наибольшее окно правила, часы
 
 # Стоимость подписки
 MONTHLY_SUBSCRIPTION_PRICE = 3.0
 YEARLY_SUBSCRIPTION_PRICE = 30.0
 
+# Платежи (services/payments.py)
+PAYMENT_TTL = int(os.getenv("PAYMENT_TTL", str(60 * 60)))  # секунды до истечения неоплаченного платежа
+PAYMENT_SWEEP_INTERVAL = int(os.getenv("PAYMENT_SWEEP_INTERVAL", "300"))  # секунды между проверками истекших платежей
+PAYMENT_CACHE_TTL = int(os.getenv("PAYMENT_CACHE_TTL", "30"))  # секунды доверия кэшу ожидающего платежа
+
 # Параметры мониторинга
-MONITOR_INTERVAL = 60  # секунды между проверками кошельков 
\ No newline at end of file
+MONITOR_INTERVAL = 60  # секунды между проверками кошельков
+TOKEN_LOG_BLOCK_RANGE = 2000  # максимальный диапазон блоков в одном запросе eth_getLogs
+TOKEN_LOG_CATCHUP_BLOCKS = 20 * TOKEN_LOG_BLOCK_RANGE  # наибольшее число блоков, просматриваемых за цикл после простоя
+
+# Сторожевая задача цикла событий (services/watchdog.py); WATCHDOG_INTERVAL=0 отключает ее
+WATCHDOG_INTERVAL = float(os.getenv("WATCHDOG_INTERVAL", "0.5"))  # секунды между замерами задержки
+WATCHDOG_SLOW_CALLBACK = float(os.getenv("WATCHDOG_SLOW_CALLBACK", "0.1"))  # блокировка дольше - медленный колбэк
+
+# Эндпоинт метрик Prometheus (/metrics); METRICS_PORT=0 отключает его
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# Запись и воспроизведение обменов с провайдерами (services/http.py)
+HTTP_RECORD_DIR = os.getenv("HTTP_RECORD_DIR")  # каталог для записи сжатых JSONL-файлов
+HTTP_REPLAY_PATH = os.getenv("HTTP_REPLAY_PATH")  # файл или каталог с записями; сеть не используется
+HTTP_REPLAY_SPEED = float(os.getenv("HTTP_REPLAY_SPEED", "1"))  # ускорение задержек и пауз мониторинга (0 - без пауз)
+
+# Логирование (utils/logging.py)
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # формат консоли: text или json; файл всегда в JSON
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))  # ротация по размеру файла
+LOG_ROTATE_INTERVAL = int(os.getenv("LOG_ROTATE_INTERVAL", str(24 * 60 * 60)))  # ротация по времени, секунды
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "14"))
+LOG_HOT_PATH_RATE = float(os.getenv("LOG_HOT_PATH_RATE", "5"))  # сообщений в секунду на горячий путь (0 - без ограничения)
+
+# Профилирование по команде /profile или сигналу SIGUSR1 (services/profiling.py)
+PROFILE_DEFAULT_SECONDS = int(os.getenv("PROFILE_DEFAULT_SECONDS", "30"))
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "600"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))  # секунды между снимками стека
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")  # каталог для копий отчетов
+
+# Пул процессов для декодирования крупных ответов провайдеров (services/offload.py); 0 - без пула
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", "0"))
+OFFLOAD_MIN_BYTES = int(os.getenv("OFFLOAD_MIN_BYTES", str(256 * 1024)))  # меньшие ответы декодируются на месте
+
+# Балансы в /balance (services/balances.py)
+BALANCE_CACHE_TTL = int(os.getenv("BALANCE_CACHE_TTL", "300"))  # секунды; мониторинг сбрасывает значение при новой транзакции
+BALANCE_EDIT_INTERVAL = float(os.getenv("BALANCE_EDIT_INTERVAL", "1.5"))  # минимальный интервал между правками сообщения
+
+# История транзакций из локальной базы (services/history.py)
+HISTORY_BACKFILL_LIMIT = int(os.getenv("HISTORY_BACKFILL_LIMIT", "100"))  # транзакций, загружаемых у провайдера по запросу
+
+# Фоновая загрузка полной истории новых кошельков (services/backfill.py)
+BACKFILL_PAGE_SIZE = int(os.getenv("BACKFILL_PAGE_SIZE", "1000"))  # транзакций в запросе к обозревателю
+BACKFILL_INSERT_CHUNK = int(os.getenv("BACKFILL_INSERT_CHUNK", "2000"))  # транзакций в одной фиксации вместе с курсором
+BACKFILL_MAX_RETRIES = int(os.getenv("BACKFILL_MAX_RETRIES", "5"))  # подряд неудачных запросов до остановки задания
+BACKFILL_POLL_INTERVAL = int(os.getenv("BACKFILL_POLL_INTERVAL", "30"))  # секунды между проверками очереди заданий
+
+# Хранение истории транзакций (services/retention.py)
+RETENTION_DAYS_FREE = int(os.getenv("RETENTION_DAYS_FREE", "180"))  # дни; 0 - хранить бессрочно
+RETENTION_DAYS_PREMIUM = int(os.getenv("RETENTION_DAYS_PREMIUM", "0"))
+RETENTION_INTERVAL = int(os.getenv("RETENTION_INTERVAL", str(60 * 60)))  # секунды между запусками очистки
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))  # строк в одной транзакции удаления
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", "")  # каталог архива удаляемых строк (пусто - без архива)
+
+# Массовое добавление кошельков /import (services/importer.py)
+IMPORT_MAX_LINES = int(os.getenv("IMPORT_MAX_LINES", "10000"))  # строк файла, обрабатываемых за один импорт
+IMPORT_MAX_FILE_SIZE = int(os.getenv("IMPORT_MAX_FILE_SIZE", str(2 * 1024 * 1024)))  # байт
+IMPORT_INSERT_CHUNK = int(os.getenv("IMPORT_INSERT_CHUNK", "500"))  # кошельков в одном INSERT
+IMPORT_WARMUP_BATCH = int(os.getenv("IMPORT_WARMUP_BATCH", "100"))  # адресов в одном запросе прогрева балансов
+
+# Выгрузка истории /export (services/export.py)
+EXPORT_ROWS_FREE = int(os.getenv("EXPORT_ROWS_FREE", "10000"))  # транзакций в одной выгрузке, бесплатный уровень
+EXPORT_ROWS_PREMIUM = int(os.getenv("EXPORT_ROWS_PREMIUM", "1000000"))  # то же для премиум подписки
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))  # строк, читаемых из базы за один раз
+EXPORT_QUEUE_SIZE = int(os.getenv("EXPORT_QUEUE_SIZE", "50"))  # заданий, ожидающих в очереди
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "1"))  # одновременно выполняемых заданий
+
+# Тексты сообщений (utils/i18n.py): каталог по языку пользователя из Telegram, иначе DEFAULT_LANGUAGE
+DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "ru")
+LOCALES_DIR = os.getenv("LOCALES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales"))
+
+# Общий лимит частоты запросов к провайдерам, запросов в секунду (services/ratelimit.py)
+PROVIDER_RATE_LIMITS = {
+    provider.strip(): float(rate)
+    for provider, rate in (
+        item.split("=", 1) for item in os.getenv(
+            "PROVIDER_RATE_LIMITS", "etherscan=5,bscscan=5,blockcypher=3,blockchain_info=1,coingecko=0.5"
+        ).split(",") if "=" in item
+    )
+}
+
+# Котировки в USD (services/prices.py): API в стиле CoinGecko, локальный имитатор - benchmarks/fake_services.py
+PRICE_API_URL = os.getenv("PRICE_API_URL", "https://api.coingecko.com/api/v3")
+PRICE_REFRESH_INTERVAL = int(os.getenv("PRICE_REFRESH_INTERVAL", "120"))  # секунды между обновлениями
+PRICE_MAX_AGE = int(os.getenv("PRICE_MAX_AGE", "1800"))  # более старые котировки не используются
+
+# Декодирование JSON: "json" (стандартный модуль) или "orjson" (быстрее, требует пакета orjson)
+JSON_BACKEND = os.getenv("JSON_BACKEND", "json") 
+
+# Подтверждения транзакций
+# Порог подтверждений по умолчанию, после которого транзакция считается окончательной
+CONFIRMATION_THRESHOLDS = {
+    "BTC": 2,
+    "ETH": 12,
+    "BNB": 15
+}
+CONFIRMATION_OPTIONS = [0, 1, 3, 6, 12]  # варианты порога, доступные пользователю
+PENDING_TX_TIMEOUT = 24 * 60 * 60  # секунды, после которых невключенная в блок транзакция считается отброшенной
+REORG_WATCH_DEPTH = 6  # блоков после порога, в течение которых уведомленная транзакция проверяется на реорганизацию
+ORPHAN_GRACE_DEPTH = 6  # блоков, в течение которых исключенная из цепочки транзакция ожидает повторного включения до исправления
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+import signal
+from typing import Iterable, List
+
+from aiogram import Router, Dispatcher, Bot, F
+from aiogram.types import Message, BufferedInputFile
+from aiogram.filters import Command, CommandObject
+
+from config import ADMIN_IDS, PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS, PROFILE_DIR
+from services.profiling import Report, dump_tasks, is_profiling, start_profiling, stop_profiling
+
+logger = logging.getLogger(__name__)
+
+# Создаем роутер для команд администратора; остальные пользователи его не видят
+router = Router()
+router.message.filter(F.from_user.id.in_(ADMIN_IDS))
+
+async def send_reports(bot: Bot, chat_ids: Iterable[int], reports: List[Report]):
+    """
+    Сохраняет отчеты профилирования в PROFILE_DIR и отправляет их файлами
+
+    :param bot: Объект бота
+    :param chat_ids: Чаты, в которые отправляются отчеты
+    :param reports: Отчеты (имя файла, содержимое)
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    for filename, content in reports:
+        with open(os.path.join(PROFILE_DIR, filename), "wb") as file:
+            file.write(content)
+
+    for chat_id in chat_ids:
+        for filename, content in reports:
+            try:
+                await bot.send_document(chat_id, BufferedInputFile(content, filename=filename))
+            except Exception as e:
+                logger.error(f"Ошибка при отправке отчета {filename} в чат {chat_id}: {e}")
+
+# Обработчик команды /profile [секунды]
+@router.message(Command("profile"))
+async def cmd_profile(message: Message, command: CommandObject, bot: Bot):
+    """Запускает профилирование на заданное число секунд"""
+    try:
+        seconds = int(command.args) if command.args else PROFILE_DEFAULT_SECONDS
+    except ValueError:
+        await message.answer("Использование: /profile [секунды]")
+        return
+
+    seconds = max(1, min(seconds, PROFILE_MAX_SECONDS))
+    chat_id = message.chat.id
+
+    if not start_profiling(seconds, lambda reports: send_reports(bot, [chat_id], reports)):
+        await message.answer("⏳ Профилирование уже запущено. Остановить: /profile_stop")
+        return
+
+    await message.answer(
+        f"🔬 Профилирование запущено на {seconds} с.\n"
+        f"Отчеты (профиль, стеки, задачи, память) придут файлами. Остановить раньше: /profile_stop"
+    )
+    logger.info(f"Администратор {message.from_user.id} запустил профилирование на {seconds} с")
+
+# Обработчик команды /profile_stop
+@router.message(Command("profile_stop"))
+async def cmd_profile_stop(message: Message):
+    """Досрочно завершает профилирование"""
+    if not stop_profiling():
+        await message.answer("Профилирование не запущено.")
+        return
+
+    await message.answer("⏹ Профилирование остановлено, отчеты формируются.")
+
+# Обработчик команды /tasks
+@router.message(Command("tasks"))
+async def cmd_tasks(message: Message):
+    """Отправляет дамп ожидающих asyncio-задач"""
+    dump = dump_tasks()
+    await message.answer_document(BufferedInputFile(dump.encode("utf-8"), filename="tasks.txt"))
+
+def setup_profiling_signal(bot: Bot):
+    """
+    Включает/выключает профилирование по сигналу SIGUSR1 (kill -USR1 <pid>)
+
+    Отчеты сохраняются в PROFILE_DIR и отправляются всем администраторам.
+    """
+    def toggle():
+        if is_profiling():
+            stop_profiling()
+        else:
+            start_profiling(PROFILE_DEFAULT_SECONDS, lambda reports: send_reports(bot, ADMIN_IDS, reports))
+
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, toggle)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        # На Windows SIGUSR1 и обработчики сигналов цикла событий недоступны
+        logger.info("Профилирование по сигналу недоступно на этой платформе")
+
+def register_admin_handlers(dp: Dispatcher):
+    """Регистрация обработчиков команд администратора"""
+    dp.include_router(router)
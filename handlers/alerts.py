@@ -0,0 +1,230 @@
+import logging
+from decimal import Decimal, InvalidOperation
+from aiogram import Router, Dispatcher
+from aiogram.types import Message
+from aiogram.filters import Command, CommandObject
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from config import ALERT_RULE_LIMIT, ALERT_MAX_WINDOW_HOURS
+from models.alert import AlertRule, AlertMetric
+from services.db import async_session, get_or_create_user, get_user_wallets
+from services.filters import FilterRuleError, validate_rule, merge_rules, describe_rules
+from services.rollups import rule_assets
+from utils.chains import CHAINS, KNOWN_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Создаем роутер для фильтров уведомлений и правил оповещений
+router = Router()
+
+# Команды /filters: короткие имена правил и разбор значений
+FILTER_COMMANDS = {
+    "min": ("min_value", lambda value: value),
+    "dir": ("direction", lambda value: {"in": "incoming", "out": "outgoing"}.get(value, value)),
+    "allow": ("allow", lambda value: value.split(",")),
+    "deny": ("deny", lambda value: value.split(",")),
+    "tokens": ("tokens", lambda value: value.split(","))
+}
+
+FILTERS_USAGE = (
+    "⚙️ <b>Фильтры уведомлений</b>\n\n"
+    "/filters [#ID] min 0.01 - минимальная сумма\n"
+    "/filters [#ID] dir in|out|all - направление\n"
+    "/filters [#ID] allow адрес1,адрес2 - только эти адреса\n"
+    "/filters [#ID] deny адрес1,адрес2 - кроме этих адресов\n"
+    "/filters [#ID] tokens USDT,USDC - только эти токены\n"
+    "/filters [#ID] reset [min|dir|allow|deny|tokens] - сбросить\n\n"
+    "Без #ID правило действует для всех кошельков, с #ID - только для кошелька с этим номером."
+)
+
+# Обработчик команды /filters
+@router.message(Command("filters"))
+async def cmd_filters(message: Message, command: CommandObject):
+    """Просмотр и изменение фильтров уведомлений пользователя или кошелька"""
+    user_id = message.from_user.id
+    args = (command.args or "").split()
+    
+    async with async_session() as session:
+        user = await get_or_create_user(session, user_id)
+        wallets = await get_user_wallets(session, user_id)
+        
+        if not args:
+            text = f"{FILTERS_USAGE}\n\n<b>Общие правила:</b>\n{describe_rules(merge_rules(user.notification_settings, None))}"
+            for wallet in wallets:
+                if wallet.alert_filters:
+                    text += (
+                        f"\n\n<b>#{wallet.id} {wallet.label or 'Без метки'} ({wallet.blockchain_type.value}):</b>\n"
+                        f"{describe_rules(merge_rules(user.notification_settings, wallet.alert_filters))}"
+                    )
+            await message.answer(text)
+            return
+        
+        wallet = None
+        if args[0].startswith("#"):
+            wallet = next((w for w in wallets if f"#{w.id}" == args[0]), None)
+            if wallet is None:
+                await message.answer("Кошелек не найден.")
+                return
+            args = args[1:]
+        
+        # Правила хранятся в JSON: изменения сохраняются присваиванием нового словаря
+        rules = dict(wallet.alert_filters or {}) if wallet else dict((user.notification_settings or {}).get("filters") or {})
+        
+        try:
+            if len(args) in (1, 2) and args[0] == "reset":
+                if len(args) == 1:
+                    rules = {}
+                elif args[1] in FILTER_COMMANDS:
+                    rules.pop(FILTER_COMMANDS[args[1]][0], None)
+                else:
+                    raise FilterRuleError(f"Неизвестное правило: {args[1]}")
+            elif len(args) == 2 and args[0] in FILTER_COMMANDS:
+                name, parse = FILTER_COMMANDS[args[0]]
+                if name == "direction" and args[1] == "all":
+                    rules.pop(name, None)
+                else:
+                    rules[name] = validate_rule(name, parse(args[1]))
+            else:
+                await message.answer(FILTERS_USAGE)
+                return
+        except FilterRuleError as e:
+            await message.answer(f"⚠️ {e}")
+            return
+        
+        if wallet:
+            wallet.alert_filters = rules or None
+        else:
+            user.notification_settings = {**(user.notification_settings or {}), "filters": rules}
+        await session.commit()
+        
+        effective = merge_rules(user.notification_settings, wallet.alert_filters if wallet else None)
+    
+    target = f"кошелька #{wallet.id}" if wallet else "всех кошельков"
+    logger.info(f"Пользователь {user_id} изменил фильтры уведомлений {target}: {rules}")
+    await message.answer(f"✅ Фильтры {target} обновлены:\n{describe_rules(effective)}")
+
+# Символы, которые можно указать в правиле вместо адреса контракта
+RULE_SYMBOLS = [chain.symbol for chain in CHAINS.values()] + sorted({
+    symbol for tokens in KNOWN_TOKENS.values() for symbol in tokens
+})
+
+ALERTS_USAGE = (
+    "🐋 <b>Оповещения о крупных движениях</b>\n\n"
+    "/alerts add in|out|net|count ПОРОГ АКТИВ ЧАСЫ [#ID] [all]\n"
+    "  in - поступления, out - списания, net - чистый отток, count - число транзакций\n"
+    "  #ID - только кошелек с этим номером; all - сумма по кошелькам вместо каждого отдельно\n"
+    f"  АКТИВ - {', '.join(RULE_SYMBOLS)} или адрес контракта токена 0x...\n"
+    "  Пример: /alerts add out 100 ETH 1 - любой кошелек списал за час не меньше 100 ETH\n"
+    "/alerts del N - удалить правило #N"
+)
+
+def describe_alert_rule(rule: AlertRule) -> str:
+    """Строка описания правила для списка"""
+    threshold = f"{rule.threshold:.8f}".rstrip('0').rstrip('.')
+    scope = f"кошелек #{rule.wallet_id}" if rule.wallet_id else "все кошельки"
+    mode = ", сумма" if rule.combined else ""
+    return f"#{rule.id}: {rule.metric.value} {rule.asset} ≥ {threshold} за {rule.window_hours} ч ({scope}{mode})"
+
+def parse_alert_rule(args, wallet_ids) -> AlertRule:
+    """
+    Разбирает аргументы /alerts add
+
+    :param args: Аргументы после "add"
+    :param wallet_ids: ID кошельков пользователя
+    :return: Новое правило (без пользователя)
+    :raises ValueError: Если аргументы некорректны
+    """
+    if len(args) < 4:
+        raise ValueError("Недостаточно аргументов")
+
+    metric = next((item for item in AlertMetric if item.value == args[0]), None)
+    if metric is None:
+        raise ValueError(f"Неизвестный показатель: {args[0]}")
+
+    try:
+        threshold = Decimal(args[1])
+    except InvalidOperation:
+        raise ValueError(f"Некорректный порог: {args[1]}")
+    if not threshold.is_finite() or threshold <= 0:
+        raise ValueError(f"Некорректный порог: {args[1]}")
+
+    # Символ токена означает только его известные контракты, другой токен задается адресом контракта
+    asset = args[2].lower() if args[2].lower().startswith("0x") else args[2].upper()
+    if not rule_assets(asset):
+        raise ValueError(f"Неизвестный актив: {args[2]}. Укажите монету, известный токен или адрес контракта")
+
+    try:
+        window_hours = int(args[3].rstrip("hч"))
+    except ValueError:
+        raise ValueError(f"Некорректное окно: {args[3]}")
+    if not 1 <= window_hours <= ALERT_MAX_WINDOW_HOURS:
+        raise ValueError(f"Окно должно быть от 1 до {ALERT_MAX_WINDOW_HOURS} ч")
+
+    wallet_id = None
+    combined = False
+    for option in args[4:]:
+        if option == "all":
+            combined = True
+        elif option.startswith("#") and option[1:].isdigit() and int(option[1:]) in wallet_ids:
+            wallet_id = int(option[1:])
+        else:
+            raise ValueError(f"Неизвестный параметр: {option}")
+
+    return AlertRule(
+        metric=metric, asset=asset, threshold=threshold,
+        window_hours=window_hours, wallet_id=wallet_id, combined=combined
+    )
+
+# Обработчик команды /alerts
+@router.message(Command("alerts"))
+async def cmd_alerts(message: Message, command: CommandObject):
+    """Просмотр, добавление и удаление правил оповещений о крупных движениях"""
+    user_id = message.from_user.id
+    args = (command.args or "").split()
+    
+    async with async_session() as session:
+        await get_or_create_user(session, user_id)
+        
+        if args and args[0] == "add":
+            wallets = await get_user_wallets(session, user_id)
+            count = await session.execute(select(func.count()).select_from(AlertRule).where(AlertRule.user_id == user_id))
+            if count.scalar_one() >= ALERT_RULE_LIMIT:
+                await message.answer(f"⚠️ Достигнут лимит правил: {ALERT_RULE_LIMIT}")
+                return
+            
+            try:
+                rule = parse_alert_rule(args[1:], {wallet.id for wallet in wallets})
+            except ValueError as e:
+                await message.answer(f"⚠️ {e}\n\n{ALERTS_USAGE}")
+                return
+            
+            rule.user_id = user_id
+            session.add(rule)
+            await session.commit()
+            
+            logger.info(f"Пользователь {user_id} добавил правило оповещений {rule.id}")
+            await message.answer(f"✅ Правило добавлено:\n{describe_alert_rule(rule)}")
+            return
+        
+        if len(args) == 2 and args[0] == "del" and args[1].lstrip("#").isdigit():
+            rule = await session.get(AlertRule, int(args[1].lstrip("#")))
+            if rule is None or rule.user_id != user_id:
+                await message.answer("Правило не найдено.")
+                return
+            
+            await session.delete(rule)
+            await session.commit()
+            await message.answer(f"🗑 Правило #{rule.id} удалено.")
+            return
+        
+        result = await session.execute(select(AlertRule).where(AlertRule.user_id == user_id).order_by(AlertRule.id))
+        rules = result.scalars().all()
+    
+    text = ALERTS_USAGE + "\n\n<b>Ваши правила:</b>\n"
+    text += "\n".join(describe_alert_rule(rule) for rule in rules) if rules else "нет"
+    await message.answer(text)
+
+def register_alert_handlers(dp: Dispatcher):
+    """Регистрация обработчиков фильтров уведомлений и правил оповещений"""
+    dp.include_router(router)
@@ -6,7 +6,9 @@ from sqlalchemy.future import select
 
 from models.user import User
 from services.db import async_session
+from config import FREE_WALLET_LIMIT, PREMIUM_WALLET_LIMIT
 from keyboards.common_kb import get_main_keyboard
+from utils.i18n import get_language, render
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +23,7 @@ async def cmd_start(message: Message):
     username = message.from_user.username
     full_name = f"{message.from_user.first_name or ''} {message.from_user.last_name or ''}".strip()
     language_code = message.from_user.language_code
+    language = get_language(language_code)
     
     try:
         # Проверяем, существует ли пользователь в базе
@@ -41,19 +44,7 @@ async def cmd_start(message: Message):
                 
                 logger.info(f"Создан новый пользователь: {user_id} ({username})")
                 
-                welcome_message = (
-                    f"👋 <b>Добро пожаловать в CryptoWalletMonitor Bot!</b>\n\n"
-                    f"Этот бот поможет вам отслеживать активность ваших криптовалютных кошельков и получать уведомления о новых транзакциях.\n\n"
-                    f"<b>Что умеет этот бот:</b>\n"
-                    f"• Мониторинг ETH и BSC кошельков\n"
-                    f"• Уведомления о новых транзакциях\n"
-                    f"• Проверка баланса кошельков\n"
-                    f"• Просмотр истории транзакций\n\n"
-                    f"<b>Начните работу с ботом:</b>\n"
-                    f"1) Добавьте кошелек через команду /add_wallet\n"
-                    f"2) Настройте уведомления через /settings\n"
-                    f"3) Просматривайте информацию через /my_wallets"
-                )
+                welcome_message = render("start.welcome", language)
             else:
                 # Обновляем информацию о пользователе, если она изменилась
                 if user.username != username or user.full_name != full_name or user.language_code != language_code:
@@ -63,16 +54,10 @@ async def cmd_start(message: Message):
                     await session.commit()
                     logger.info(f"Обновлена информация о пользователе: {user_id} ({username})")
                 
-                welcome_message = (
-                    f"👋 <b>С возвращением!</b>\n\n"
-                    f"Вы снова с CryptoWalletMonitor Bot. Выберите действие из меню ниже."
-                )
+                welcome_message = render("start.welcome_back", language)
     except Exception as e:
         logger.error(f"Ошибка при обработке команды /start: {e}")
-        welcome_message = (
-            f"👋 <b>Добро пожаловать в CryptoWalletMonitor Bot!</b>\n\n"
-            f"К сожалению, произошла ошибка при работе с базой данных. Пожалуйста, попробуйте позже."
-        )
+        welcome_message = render("start.error", language)
     
     # Отправляем приветственное сообщение
     await message.answer(
@@ -86,21 +71,9 @@ async def cmd_start(message: Message):
 @router.message(Command("help"))
 async def cmd_help(message: Message):
     """Обработчик команды /help"""
-    help_text = (
-        f"🔍 <b>Справка по командам бота:</b>\n\n"
-        f"/start - Начать работу с ботом\n"
-        f"/add_wallet - Добавить новый кошелек для мониторинга\n"
-        f"/my_wallets - Просмотр списка ваших кошельков\n"
-        f"/balance - Проверка баланса кошельков\n"
-        f"/transactions - Просмотр последних транзакций\n"
-        f"/settings - Настройка уведомлений\n"
-        f"/subscribe - Оформить премиум подписку\n"
-        f"/test_premium - Активировать тестовую подписку\n"
-        f"/help - Показать эту справку\n\n"
-        f"<b>Дополнительная информация:</b>\n"
-        f"• Бесплатная версия: до 3 кошельков\n"
-        f"• Премиум версия: до 20 кошельков\n\n"
-        f"По всем вопросам обращайтесь к @admin"
+    help_text = render(
+        "help.text", get_language(message.from_user.language_code),
+        free_limit=FREE_WALLET_LIMIT, premium_limit=PREMIUM_WALLET_LIMIT
     )
     
     await message.answer(
@@ -115,7 +88,7 @@ async def cmd_help(message: Message):
 async def cmd_unknown(message: Message):
     """Обработчик неизвестных команд"""
     await message.answer(
-        "❓ Неизвестная команда. Воспользуйтесь /help для просмотра доступных команд.",
+        render("unknown_command", get_language(message.from_user.language_code)),
         reply_markup=get_main_keyboard()
     )
 
@@ -0,0 +1,68 @@
+import logging
+from aiogram import Router, Dispatcher
+from aiogram.types import Message
+from aiogram.filters import Command, CommandObject
+
+from config import ADMIN_IDS
+from services.db import async_session, get_user_wallets
+from services.export import ExportJob, FORMAT_CSV, FORMAT_JSONL, enqueue_export
+
+logger = logging.getLogger(__name__)
+
+# Создаем роутер для выгрузки истории
+router = Router()
+
+EXPORT_USAGE = (
+    "📦 <b>Выгрузка истории транзакций</b>\n\n"
+    "/export [#ID] [csv|json]\n"
+    "Без #ID выгружается история всех ваших кошельков, с #ID - только кошелька с этим номером. "
+    "Файл сжат gzip; по умолчанию формат CSV."
+)
+
+# Обработчик команды /export
+@router.message(Command("export"))
+async def cmd_export(message: Message, command: CommandObject):
+    """Ставит выгрузку истории транзакций в очередь"""
+    user_id = message.from_user.id
+    target_user_id = user_id
+    wallet_id = None
+    export_format = FORMAT_CSV
+    
+    args = (command.args or "").split()
+    while args:
+        arg = args.pop(0)
+        if arg == "csv":
+            export_format = FORMAT_CSV
+        elif arg in ("json", "jsonl"):
+            export_format = FORMAT_JSONL
+        elif arg.startswith("#") and arg[1:].isdigit():
+            wallet_id = int(arg[1:])
+        elif arg == "user" and args and args[0].isdigit() and user_id in ADMIN_IDS:
+            # Администраторы выгружают историю любого пользователя
+            target_user_id = int(args.pop(0))
+        else:
+            await message.answer(EXPORT_USAGE)
+            return
+    
+    async with async_session() as session:
+        wallets = await get_user_wallets(session, target_user_id)
+    
+    if wallet_id is not None and wallet_id not in {wallet.id for wallet in wallets}:
+        await message.answer("Кошелек не найден.")
+        return
+    
+    if not wallets:
+        await message.answer("У вас нет добавленных кошельков.")
+        return
+    
+    position = enqueue_export(ExportJob(user_id, message.chat.id, target_user_id, wallet_id, export_format))
+    if position is None:
+        await message.answer("⏳ Выгрузка уже выполняется или очередь заполнена. Попробуйте позже.")
+        return
+    
+    logger.info(f"Пользователь {user_id} запросил выгрузку истории пользователя {target_user_id} ({export_format})")
+    await message.answer(f"📦 Выгрузка поставлена в очередь (позиция {position}). Файл придет отдельным сообщением.")
+
+def register_export_handlers(dp: Dispatcher):
+    """Регистрация обработчиков выгрузки истории"""
+    dp.include_router(router)
@@ -0,0 +1,134 @@
+import logging
+import os
+import tempfile
+from aiogram import Router, Dispatcher, F
+from aiogram.types import Message
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+
+from config import ADMIN_IDS, FREE_WALLET_LIMIT, PREMIUM_WALLET_LIMIT, IMPORT_MAX_FILE_SIZE, IMPORT_MAX_LINES
+from models.user import SubscriptionLevel
+from models.wallet import BlockchainType
+from services.db import async_session, get_or_create_user
+from services.importer import ImportResult, import_wallets, schedule_balance_warmup
+from keyboards.common_kb import get_main_keyboard, get_cancel_keyboard
+
+logger = logging.getLogger(__name__)
+
+# Создаем роутер для массового добавления кошельков
+router = Router()
+
+class ImportStates(StatesGroup):
+    waiting_file = State()
+
+IMPORT_USAGE = (
+    "📥 <b>Массовое добавление кошельков</b>\n\n"
+    "Отправьте файл CSV или TXT, по одному кошельку в строке:\n"
+    "<code>адрес</code>, <code>адрес,метка</code> или <code>блокчейн,адрес,метка</code>\n\n"
+    "Блокчейн для строк без него задается в команде: /import BTC, /import ETH, /import BNB.\n"
+    f"Не более {IMPORT_MAX_LINES} строк."
+)
+
+def _format_lines(lines) -> str:
+    shown = ", ".join(str(line) for line in lines[:10])
+    return shown + (f" и еще {len(lines) - 10}" if len(lines) > 10 else "")
+
+def format_import_result(result: ImportResult) -> str:
+    """Текст итога импорта"""
+    text = f"📥 <b>Импорт завершен</b>\n\n✅ Добавлено кошельков: {len(result.added)}\n"
+    if result.duplicates:
+        text += f"🔁 Уже добавлены (строки): {_format_lines(result.duplicates)}\n"
+    if result.invalid:
+        text += f"⚠️ Некорректные адреса (строки): {_format_lines(result.invalid)}\n"
+    if result.over_limit:
+        text += f"⛔ Сверх лимита кошельков (строки): {_format_lines(result.over_limit)}\n"
+    if result.truncated:
+        text += f"✂️ Обработаны только первые {IMPORT_MAX_LINES} строк\n"
+    if result.added:
+        text += "\nИстория транзакций новых кошельков загрузится в фоне."
+    return text
+
+async def _run_import(message: Message, default_chain):
+    """Загружает файл из сообщения и добавляет кошельки"""
+    document = message.document
+    if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+        await message.answer(f"⚠️ Файл слишком большой (не более {IMPORT_MAX_FILE_SIZE // 1024} КБ).")
+        return
+    
+    user_id = message.from_user.id
+    async with async_session() as session:
+        user = await get_or_create_user(session, user_id)
+    
+    if user_id in ADMIN_IDS:
+        limit = None
+    elif user.subscription_level == SubscriptionLevel.premium:
+        limit = PREMIUM_WALLET_LIMIT
+    else:
+        limit = FREE_WALLET_LIMIT
+    
+    fd, path = tempfile.mkstemp(prefix="import-")
+    os.close(fd)
+    try:
+        await message.bot.download(document, destination=path)
+        
+        # Файл читается построчно в потоке импорта; BOM и некорректные байты не прерывают импорт
+        with open(path, encoding="utf-8-sig", errors="replace", newline="") as file:
+            result = await import_wallets(user_id, file, default_chain, limit)
+    except Exception as e:
+        logger.error(f"Ошибка при импорте кошельков пользователя {user_id}: {e}")
+        await message.answer("❌ Не удалось обработать файл. Попробуйте позже.", reply_markup=get_main_keyboard())
+        return
+    finally:
+        os.remove(path)
+    
+    # Балансы новых адресов запрашиваются в фоне: /balance возьмет их из кэша
+    schedule_balance_warmup(result.added)
+    await message.answer(format_import_result(result), reply_markup=get_main_keyboard())
+
+def _parse_chain(args):
+    if not args:
+        return None
+    return BlockchainType.__members__.get(args.strip().upper())
+
+# Файл, отправленный с подписью /import [блокчейн]; до обработчика команды, который тоже учитывает подпись
+@router.message(F.document, F.caption.startswith("/import"))
+async def import_with_caption(message: Message, state: FSMContext):
+    """Добавляет кошельки из файла, отправленного с командой в подписи"""
+    await state.clear()
+    await _run_import(message, _parse_chain(message.caption[len("/import"):]))
+
+# Обработчик команды /import [блокчейн]
+@router.message(Command("import"))
+async def cmd_import(message: Message, command: CommandObject, state: FSMContext):
+    """Запрашивает файл для массового добавления кошельков"""
+    default_chain = _parse_chain(command.args)
+    if command.args and default_chain is None:
+        await message.answer(IMPORT_USAGE)
+        return
+    
+    await state.set_state(ImportStates.waiting_file)
+    await state.update_data(chain=default_chain.value if default_chain else None)
+    await message.answer(IMPORT_USAGE, reply_markup=get_cancel_keyboard())
+
+# Файл после команды /import
+@router.message(ImportStates.waiting_file, F.document)
+async def import_file_received(message: Message, state: FSMContext):
+    """Добавляет кошельки из отправленного файла"""
+    data = await state.get_data()
+    await state.clear()
+    await _run_import(message, BlockchainType[data["chain"]] if data.get("chain") else None)
+
+@router.message(ImportStates.waiting_file)
+async def import_waiting_file(message: Message, state: FSMContext):
+    """Отмена импорта или напоминание отправить файл"""
+    if message.text == "❌ Отмена":
+        await state.clear()
+        await message.answer("❌ Импорт отменен.", reply_markup=get_main_keyboard())
+        return
+    
+    await message.answer("Отправьте файл CSV или TXT со списком кошельков или нажмите «❌ Отмена».")
+
+def register_import_handlers(dp: Dispatcher):
+    """Регистрация обработчиков массового добавления кошельков"""
+    dp.include_router(router)
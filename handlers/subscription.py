@@ -241,9 +241,9 @@ async def process_check_payment(callback_query: CallbackQuery, state: FSMContext
         
         if payment_status == "completed":
             # Если платеж завершен успешно
-            # Получаем данные из состояния
+            # План хранится в платеже: состояние диалога могло остаться на другом экземпляре бота
             data = await state.get_data()
-            plan_type = data.get('plan_type')
+            plan_type = result["payment_data"].get("plan_type") or data.get('plan_type')
             
             # Активируем подписку
             async with async_session() as session:
@@ -1,19 +1,31 @@
+import asyncio
 import logging
+import time
+from typing import Dict, List, Optional, Set
 from aiogram import Router, Dispatcher, F
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy.future import select
 
-from models.wallet import Wallet, BlockchainType, TransactionType, Transaction
+from models.wallet import Wallet, BlockchainType, TransactionType
+from models.transaction import TransactionStatus
+from models.backfill import BackfillStatus
 from models.user import User, SubscriptionLevel
 from services.db import async_session, get_user_wallets, get_wallets_count, add_wallet, get_wallet_by_id, update_wallet_label, delete_wallet
-from services.blockchain import check_address_valid, get_balance, get_latest_transactions
-from keyboards.common_kb import get_main_keyboard, get_cancel_keyboard, get_blockchain_selection_keyboard, get_yes_no_keyboard
-from keyboards.wallet_kb import generate_wallets_keyboard, generate_wallet_actions_keyboard, get_transaction_limit_keyboard
+from services.blockchain import check_address_valid, get_balance
+from services.balances import get_cached_balance, fetch_balances
+from services.history import OLDER, NEWER, Cursor, get_history_page, backfill_wallet_history
+from services.backfill import enqueue_backfill, get_backfill_job
+from keyboards.common_kb import get_main_keyboard, get_cancel_keyboard, get_blockchain_selection_keyboard, get_yes_no_keyboard, get_back_inline_keyboard
+from keyboards.wallet_kb import generate_wallets_keyboard, generate_wallet_actions_keyboard, get_transaction_limit_keyboard, get_confirmations_keyboard, get_history_keyboard
+from services.confirmations import get_confirmation_threshold
+from services.prices import get_price, portfolio_total
+from utils.chains import get_chain
 from utils.notifications import send_balance_notification
-from config import FREE_WALLET_LIMIT, PREMIUM_WALLET_LIMIT
+from config import FREE_WALLET_LIMIT, PREMIUM_WALLET_LIMIT, CONFIRMATION_OPTIONS, BALANCE_EDIT_INTERVAL
 
 logger = logging.getLogger(__name__)
 
@@ -193,17 +205,21 @@ async def label_entered(message: Message, state: FSMContext):
                     success_message += f"<b>Метка:</b> {label}\n"
                 
                 success_message += (
-                    f"\nБот начнет мониторить транзакции этого кошелька и уведомлять вас о новых операциях."
+                    f"\nБот начнет мониторить транзакции этого кошелька и уведомлять вас о новых операциях. "
+                    f"История транзакций загрузится в фоне - мы сообщим, когда она будет готова."
                 )
                 
                 await message.answer(success_message, reply_markup=get_main_keyboard())
                 
+                # Полная история загружается фоновой задачей без уведомлений о старых транзакциях
+                await enqueue_backfill(wallet.id)
+                
                 # Проверяем текущий баланс кошелька
                 balance = await get_balance(blockchain_type, address)
                 if balance is not None:
                     # Отправляем уведомление о текущем балансе
                     bot = message.bot
-                    await send_balance_notification(bot, message.from_user.id, wallet, balance)
+                    await send_balance_notification(bot, message.from_user.id, wallet, balance, message.from_user.language_code)
                 
                 logger.info(f"Пользователь {message.from_user.id} добавил новый кошелек: {address} ({blockchain_type.value})")
             except Exception as e:
@@ -332,54 +348,31 @@ async def wallet_action(callback_query: CallbackQuery, state: FSMContext):
                 # Форматируем сумму баланса
                 formatted_balance = f"{balance:.8f}".rstrip('0').rstrip('.')
                 
-                # Определяем символ валюты в зависимости от типа блокчейна
-                currency = wallet.blockchain_type.value
+                chain = get_chain(wallet.blockchain_type)
                 
                 balance_message = (
                     f"💰 <b>Баланс кошелька</b>\n\n"
                     f"<b>Кошелек:</b> {wallet.label or 'Без метки'} ({wallet.blockchain_type.value})\n"
                     f"<b>Адрес:</b> {wallet.address[:8]}...{wallet.address[-6:]}\n\n"
-                    f"<b>Текущий баланс:</b> {formatted_balance} {currency}\n\n"
+                    f"<b>Текущий баланс:</b> {formatted_balance} {chain.symbol}\n\n"
                 )
                 
-                # Формируем URL для просмотра кошелька в обозревателе блокчейна
-                explorer_url = None
-                if wallet.blockchain_type.value == "ETH":
-                    explorer_url = f"https://etherscan.io/address/{wallet.address}"
-                elif wallet.blockchain_type.value == "BTC":
-                    explorer_url = f"https://www.blockchain.com/btc/address/{wallet.address}"
-                elif wallet.blockchain_type.value == "BNB":
-                    explorer_url = f"https://bscscan.com/address/{wallet.address}"
-                
-                from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-                kb = []
-                
-                if explorer_url:
-                    kb.append([InlineKeyboardButton(text="🔍 Просмотреть на обозревателе", url=explorer_url)])
-                
-                kb.append([InlineKeyboardButton(text="◀️ Назад", callback_data=f"wallet:{wallet_id}")])
-                
-                keyboard = InlineKeyboardMarkup(inline_keyboard=kb)
+                keyboard = get_back_inline_keyboard(f"wallet:{wallet_id}", chain.explorer_address_url(wallet.address))
                 
                 await callback_query.message.edit_text(
                     balance_message,
                     reply_markup=keyboard
                 )
             else:
-                from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-                
                 error_message = (
                     f"⚠️ <b>Ошибка при получении баланса</b>\n\n"
                     f"Не удалось получить баланс для кошелька {wallet.address[:8]}...{wallet.address[-6:]} ({wallet.blockchain_type.value}).\n"
                     f"Пожалуйста, попробуйте позже."
                 )
                 
-                kb = [[InlineKeyboardButton(text="◀️ Назад", callback_data=f"wallet:{wallet_id}")]]
-                keyboard = InlineKeyboardMarkup(inline_keyboard=kb)
-                
                 await callback_query.message.edit_text(
                     error_message,
-                    reply_markup=keyboard
+                    reply_markup=get_back_inline_keyboard(f"wallet:{wallet_id}")
                 )
             
             await callback_query.answer()
@@ -396,6 +389,19 @@ async def wallet_action(callback_query: CallbackQuery, state: FSMContext):
             )
             await callback_query.answer()
         
+        elif action == "confirmations":
+            # Выбор порога подтверждений
+            current = get_confirmation_threshold(wallet)
+            await callback_query.message.edit_text(
+                f"⏱ <b>Порог подтверждений</b>\n\n"
+                f"<b>Кошелек:</b> {wallet.label or 'Без метки'} ({wallet.blockchain_type.value})\n"
+                f"<b>Текущий порог:</b> {current}\n\n"
+                f"Уведомление о транзакции придет, когда она наберет выбранное число подтверждений. "
+                f"0 - уведомлять сразу после появления транзакции.",
+                reply_markup=get_confirmations_keyboard(wallet_id, CONFIRMATION_OPTIONS, current)
+            )
+            await callback_query.answer()
+        
         elif action == "delete":
             # Удаление кошелька
             await callback_query.message.edit_text(
@@ -408,6 +414,41 @@ async def wallet_action(callback_query: CallbackQuery, state: FSMContext):
             )
             await callback_query.answer()
 
+# Обработчик выбора порога подтверждений
+@router.callback_query(F.data.startswith("confirmations:"))
+async def confirmation_threshold_selected(callback_query: CallbackQuery):
+    """Обработчик выбора порога подтверждений для кошелька"""
+    parts = callback_query.data.split(":")
+    
+    try:
+        wallet_id = int(parts[1])
+        threshold = int(parts[2])
+    except (IndexError, ValueError):
+        await callback_query.answer("Ошибка обработки действия")
+        return
+    
+    if threshold not in CONFIRMATION_OPTIONS:
+        await callback_query.answer("Недопустимое значение")
+        return
+    
+    async with async_session() as session:
+        wallet = await get_wallet_by_id(session, wallet_id)
+        
+        if not wallet or wallet.user_id != callback_query.from_user.id:
+            await callback_query.answer("У вас нет доступа к этому кошельку")
+            return
+        
+        wallet.confirmation_threshold = threshold
+        await session.commit()
+    
+    logger.info(f"Пользователь {callback_query.from_user.id} установил порог подтверждений {threshold} для кошелька {wallet_id}")
+    
+    await callback_query.message.edit_text(
+        f"✅ Порог подтверждений установлен: {threshold}",
+        reply_markup=generate_wallet_actions_keyboard(wallet_id)
+    )
+    await callback_query.answer()
+
 # Обработчик подтверждения удаления кошелька
 @router.callback_query(F.data.startswith("delete_wallet:"))
 async def delete_wallet_confirm(callback_query: CallbackQuery):
@@ -514,11 +555,36 @@ async def transaction_count_selected(callback_query: CallbackQuery):
         # Получаем транзакции
         await get_wallet_transactions(callback_query, wallet_id, tx_count)
 
-async def get_wallet_transactions(callback_query: CallbackQuery, wallet_id: int, limit: int = 5):
+def format_backfill_status(job) -> str:
+    """
+    Формирует строку о ходе фоновой загрузки истории кошелька
+
+    :param job: Задание загрузки истории или None
+    :return: Текст (пустой, если загрузка не идет)
+    """
+    if job is None or job.status == BackfillStatus.done:
+        return ""
+    
+    if job.status == BackfillStatus.failed:
+        return "⚠️ Загрузка истории прервана. Нажмите «🔄 Загрузить из сети», чтобы продолжить.\n\n"
+    
+    if job.status == BackfillStatus.pending and not job.pages:
+        return "⏳ История кошелька ожидает загрузки.\n\n"
+    
+    progress = f"{job.inserted} из ~{job.total}" if job.total else str(job.inserted)
+    position = f", дошли до блока {job.cursor}" if job.cursor else ""
+    return f"⏳ Загружается история: {progress} транзакций{position}.\n\n"
+
+async def get_wallet_transactions(callback_query: CallbackQuery, wallet_id: int, limit: int = 5, direction: str = OLDER, cursor: Optional[Cursor] = None):
     """
-    Получает и отображает последние транзакции для указанного кошелька
+    Отображает страницу истории транзакций кошелька из локальной базы данных
+
+    :param callback_query: Запрос обратного вызова
+    :param wallet_id: ID кошелька
+    :param limit: Размер страницы
+    :param direction: Направление листания относительно курсора (OLDER, NEWER)
+    :param cursor: Курсор страницы (None - самые новые транзакции)
     """
-    # Получаем данные кошелька из базы данных
     async with async_session() as session:
         wallet = await get_wallet_by_id(session, wallet_id)
         
@@ -526,177 +592,292 @@ async def get_wallet_transactions(callback_query: CallbackQuery, wallet_id: int,
             await callback_query.answer("Кошелек не найден")
             return
         
-        # Получаем транзакции через сервис блокчейна
-        transactions = await get_latest_transactions(wallet.address, wallet.blockchain_type, limit)
+        page = await get_history_page(session, wallet_id, limit, direction, cursor)
+        backfill_status = format_backfill_status(await get_backfill_job(session, wallet_id))
         
-        if not transactions:
-            # Создаем сообщение об отсутствии транзакций
-            no_transactions_message = (
-                f"📊 <b>Транзакции кошелька</b>\n\n"
-                f"<b>Кошелек:</b> {wallet.label or 'Без метки'} ({wallet.blockchain_type.value})\n"
-                f"<b>Адрес:</b> {wallet.address[:8]}...{wallet.address[-6:]}\n\n"
-                f"Транзакции не найдены."
-            )
-            
-            # Создаем клавиатуру для возврата
-            kb = [[InlineKeyboardButton(text="◀️ Назад", callback_data=f"wallet:{wallet_id}")]]
-            keyboard = InlineKeyboardMarkup(inline_keyboard=kb)
-            
-            await callback_query.message.edit_text(
-                no_transactions_message,
-                reply_markup=keyboard
-            )
-            return
-        
-        # Формируем сообщение со списком транзакций
-        currency = wallet.blockchain_type.value
-        
-        header = (
-            f"📊 <b>Последние {len(transactions)} транзакций</b>\n\n"
+        if not page.transactions and cursor is None:
+            # Локальной истории еще нет (кошелек только добавлен): загружаем ее у провайдера
+            await callback_query.message.edit_text("⏳ Загрузка истории транзакций...")
+            await backfill_wallet_history(wallet)
+            page = await get_history_page(session, wallet_id, limit)
+    
+    # Добавляем кнопку для просмотра на обозревателе блокчейна
+    chain = get_chain(wallet.blockchain_type)
+    keyboard = get_history_keyboard(wallet_id, limit, page.older, page.newer, chain.explorer_address_url(wallet.address))
+    
+    if not page.transactions:
+        await callback_query.message.edit_text(
+            f"📊 <b>Транзакции кошелька</b>\n\n"
             f"<b>Кошелек:</b> {wallet.label or 'Без метки'} ({wallet.blockchain_type.value})\n"
             f"<b>Адрес:</b> {wallet.address[:8]}...{wallet.address[-6:]}\n\n"
+            f"{backfill_status}"
+            f"Транзакции не найдены.",
+            reply_markup=keyboard
         )
-        
-        transactions_text = ""
-        
-        for i, tx in enumerate(transactions, 1):
-            # Форматируем дату в читаемом виде
-            date_str = tx.date.strftime("%d.%m.%Y %H:%M") if tx.date else "Неизвестно"
-            
-            # Определяем тип транзакции и эмодзи
-            tx_type_emoji = "⬅️" if tx.type == TransactionType.INCOMING else "➡️"
-            tx_type_text = "Входящая" if tx.type == TransactionType.INCOMING else "Исходящая"
-            
-            # Форматируем сумму с точностью до 6 знаков
-            amount_str = f"{tx.amount:.6f}".rstrip('0').rstrip('.') if tx.amount != 0 else "0"
-            
-            # Добавляем информацию о транзакции
-            transactions_text += (
-                f"{i}. {tx_type_emoji} <b>{tx_type_text}</b> ({date_str})\n"
-                f"   Сумма: {amount_str} {currency}\n"
-                f"   Комиссия: {tx.fee:.6f} {currency}\n"
-                f"   Подтверждений: {tx.confirmations}\n"
-                f"   ID: {tx.txid[:8]}...{tx.txid[-6:]}\n\n"
-            )
-        
-        # Формируем полное сообщение
-        message_text = header + transactions_text
-        
-        # Если сообщение слишком длинное, обрезаем его
-        if len(message_text) > 4000:
-            message_text = message_text[:3900] + "...\n\n(Сообщение слишком длинное и было обрезано)"
-        
-        # Создаем клавиатуру с кнопками для выбора количества транзакций и возврата
-        kb = []
-        
-        # Добавляем кнопки для количества транзакций
-        limits_row = []
-        for num in [5, 10, 20]:
-            if num == limit:
-                text = f"✓ {num} транзакций"
-            else:
-                text = f"{num} транзакций"
-            limits_row.append(InlineKeyboardButton(text=text, callback_data=f"transactions:{wallet_id}:{num}"))
-        
-        kb.append(limits_row)
-        
-        # Добавляем кнопку для просмотра на обозревателе блокчейна
-        explorer_url = None
-        if wallet.blockchain_type.value == "ETH":
-            explorer_url = f"https://etherscan.io/address/{wallet.address}"
-        elif wallet.blockchain_type.value == "BTC":
-            explorer_url = f"https://www.blockchain.com/btc/address/{wallet.address}"
-        elif wallet.blockchain_type.value == "BNB":
-            explorer_url = f"https://bscscan.com/address/{wallet.address}"
-        
-        if explorer_url:
-            kb.append([InlineKeyboardButton(text="🔍 Просмотреть на обозревателе", url=explorer_url)])
-        
-        # Добавляем кнопку возврата
-        kb.append([InlineKeyboardButton(text="◀️ Назад", callback_data=f"wallet:{wallet_id}")])
-        
-        # Создаем клавиатуру
-        keyboard = InlineKeyboardMarkup(inline_keyboard=kb)
-        
-        # Отправляем сообщение с информацией о транзакциях
+        return
+    
+    # Формируем сообщение со списком транзакций
+    currency = chain.symbol
+    
+    header = (
+        f"📊 <b>Транзакции кошелька</b>\n\n"
+        f"<b>Кошелек:</b> {wallet.label or 'Без метки'} ({wallet.blockchain_type.value})\n"
+        f"<b>Адрес:</b> {wallet.address[:8]}...{wallet.address[-6:]}\n\n"
+        f"{backfill_status}"
+    )
+    
+    transactions_text = ""
+    
+    for tx in page.transactions:
+        # Форматируем дату в читаемом виде
+        date_str = tx.timestamp.strftime("%d.%m.%Y %H:%M")
+        
+        # Направление сохраняется мониторингом; для старых записей определяем его по адресу отправителя
+        incoming = (
+            tx.type == TransactionType.INCOMING if tx.type is not None
+            else (tx.from_address or "").lower() != wallet.address.lower()
+        )
+        tx_type_emoji = "⬅️" if incoming else "➡️"
+        tx_type_text = "Входящая" if incoming else "Исходящая"
+        
+        # Форматируем сумму с точностью до 6 знаков
+        amount_str = f"{tx.value:.6f}".rstrip('0').rstrip('.') if tx.value else "0"
+        fee_text = f"   Комиссия: {tx.fee:.6f} {currency}\n" if tx.fee is not None else ""
+        status_text = " ⚠️ исключена из цепочки" if tx.status == TransactionStatus.orphaned else ""
+        
+        transactions_text += (
+            f"{tx_type_emoji} <b>{tx_type_text}</b> ({date_str})\n"
+            f"   Сумма: {amount_str} {tx.token_symbol or currency}\n"
+            f"{fee_text}"
+            f"   Подтверждений: {tx.confirmations}{status_text}\n"
+            f"   ID: {tx.hash[:8]}...{tx.hash[-6:]}\n\n"
+        )
+    
+    # Формируем полное сообщение
+    message_text = header + transactions_text
+    
+    # Если сообщение слишком длинное, обрезаем его
+    if len(message_text) > 4000:
+        message_text = message_text[:3900] + "...\n\n(Сообщение слишком длинное и было обрезано)"
+    
+    try:
         await callback_query.message.edit_text(
             message_text,
             reply_markup=keyboard
         )
+    except TelegramBadRequest:
+        # Страница не изменилась (например, повторное нажатие той же кнопки)
+        pass
+
+async def check_wallet_access(callback_query: CallbackQuery, wallet_id: int) -> bool:
+    """
+    Проверяет, что кошелек существует и принадлежит пользователю
+
+    :param callback_query: Запрос обратного вызова
+    :param wallet_id: ID кошелька
+    :return: True, если доступ разрешен (иначе пользователь уже получил ответ)
+    """
+    async with async_session() as session:
+        wallet = await get_wallet_by_id(session, wallet_id)
+    
+    if not wallet:
+        await callback_query.answer("Кошелек не найден")
+        return False
+    
+    if wallet.user_id != callback_query.from_user.id:
+        await callback_query.answer("У вас нет доступа к этому кошельку")
+        return False
+    
+    return True
+
+# Обработчик листания истории транзакций
+@router.callback_query(F.data.startswith("txh:"))
+async def transaction_history_page(callback_query: CallbackQuery):
+    """Обработчик выбора размера и листания страниц истории транзакций"""
+    parts = callback_query.data.split(":")
+    
+    # txh:<кошелек>:<размер> или txh:<кошелек>:<размер>:<направление>:<время, мкс>:<пропуск>
+    try:
+        wallet_id, limit = int(parts[1]), int(parts[2])
+        direction, cursor = OLDER, None
+        if len(parts) == 6:
+            direction, cursor = parts[3], (int(parts[4]), int(parts[5]))
+    except (IndexError, ValueError):
+        await callback_query.answer("Ошибка обработки действия")
+        return
+    
+    if limit not in (5, 10, 20) or direction not in (OLDER, NEWER):
+        await callback_query.answer("Ошибка обработки действия")
+        return
+    
+    if not await check_wallet_access(callback_query, wallet_id):
+        return
+    
+    await get_wallet_transactions(callback_query, wallet_id, limit, direction, cursor)
+    await callback_query.answer()
+
+# Обработчик загрузки истории транзакций у провайдера
+@router.callback_query(F.data.startswith("txb:"))
+async def transaction_history_backfill(callback_query: CallbackQuery):
+    """Обработчик дополнения локальной истории транзакциями от провайдера"""
+    parts = callback_query.data.split(":")
+    
+    try:
+        wallet_id, limit = int(parts[1]), int(parts[2])
+    except (IndexError, ValueError):
+        await callback_query.answer("Ошибка обработки действия")
+        return
+    
+    if not await check_wallet_access(callback_query, wallet_id):
+        return
+    
+    # Ответ на запрос нужно отправить быстро, а загрузка может занять несколько секунд
+    await callback_query.answer("⏳ Загрузка истории...")
+    
+    async with async_session() as session:
+        wallet = await get_wallet_by_id(session, wallet_id)
+    
+    added = await backfill_wallet_history(wallet)
+    # Полная история (в том числе продолжение прерванной загрузки) - фоновым заданием
+    await enqueue_backfill(wallet_id)
+    logger.info(f"Пользователь {callback_query.from_user.id} дополнил историю кошелька {wallet_id}: {added} транзакций")
+    
+    await get_wallet_transactions(callback_query, wallet_id, limit)
+
+def format_balances(wallets, balances: Dict[int, Optional[float]], pending: Set[int]) -> str:
+    """
+    Формирует текст со списком балансов кошельков и итогом в USD
+
+    :param wallets: Кошельки пользователя
+    :param balances: Балансы {ID кошелька: баланс или None, если получить не удалось}
+    :param pending: ID кошельков, балансы которых еще запрашиваются
+    :return: Текст сообщения
+    """
+    message_text = f"💰 <b>Баланс ваших кошельков:</b>\n\n"
+    
+    for wallet in wallets:
+        balance = balances.get(wallet.id)
+        
+        if wallet.id in pending:
+            balance_text = "⏳ загрузка..."
+        elif balance is None:
+            balance_text = "⚠️ не удалось получить"
+        else:
+            # Форматируем сумму баланса; цена - из кэша котировок, без запроса к сети
+            formatted_balance = f"{balance:.8f}".rstrip('0').rstrip('.')
+            price_usd = get_price(wallet.blockchain_type.value)
+            usd_text = f" (≈ ${balance * price_usd:,.2f})" if price_usd is not None else ""
+            balance_text = f"<b>{formatted_balance} {wallet.blockchain_type.value}</b>{usd_text}"
+        
+        message_text += (
+            f"<b>{wallet.label or 'Без метки'}</b> ({wallet.blockchain_type.value})\n"
+            f"<code>{wallet.address[:8]}...{wallet.address[-6:]}</code>\n"
+            f"Баланс: {balance_text}\n\n"
+        )
+    
+    known = [wallet for wallet in wallets if wallet.id not in pending and balances.get(wallet.id) is not None]
+    if known:
+        # Итог по портфелю считается только по актуальным котировкам
+        total_balance_usd, unpriced = portfolio_total(
+            (wallet.blockchain_type.value, balances[wallet.id]) for wallet in known
+        )
+        if len(unpriced) < len({wallet.blockchain_type.value for wallet in known}):
+            message_text += f"💵 <b>Итого: ≈ ${total_balance_usd:,.2f}</b>\n"
+        if unpriced:
+            message_text += f"<i>Нет актуального курса для: {', '.join(unpriced)}</i>\n"
+    
+    return message_text
 
 # Обработчик команды /balance
 @router.message(Command("balance"))
 @router.message(F.text == "💰 Проверить баланс")
 async def cmd_balance(message: Message):
-    """Обработчик команды проверки баланса кошельков"""
+    """
+    Обработчик команды проверки баланса кошельков
+    
+    Свежие балансы берутся из кэша, который сбрасывает мониторинг при новых
+    транзакциях; остальные запрашиваются параллельно пакетами по блокчейнам.
+    Сообщение обновляется по мере получения результатов не чаще
+    BALANCE_EDIT_INTERVAL, итоговое редактирование выполняется один раз в конце.
+    """
     user_id = message.from_user.id
     
     async with async_session() as session:
         # Получаем список кошельков пользователя
         wallets = await get_user_wallets(session, user_id)
-        
-        if not wallets:
-            # Если у пользователя нет кошельков
-            await message.answer(
-                f"📭 <b>У вас пока нет добавленных кошельков.</b>\n\n"
-                f"Добавьте кошелек с помощью команды /add_wallet",
-                reply_markup=get_main_keyboard()
-            )
-            return
-        
-        # Отправляем сообщение о начале проверки
-        status_message = await message.answer(
-            f"⏳ Проверяю баланс ваших кошельков..."
+    
+    if not wallets:
+        # Если у пользователя нет кошельков
+        await message.answer(
+            f"📭 <b>У вас пока нет добавленных кошельков.</b>\n\n"
+            f"Добавьте кошелек с помощью команды /add_wallet",
+            reply_markup=get_main_keyboard()
         )
-        
-        # Проверяем баланс для каждого кошелька
-        balances = []
-        total_balance_usd = 0
-        
-        for wallet in wallets:
+        return
+    
+    balances = {wallet.id: get_cached_balance(wallet.blockchain_type, wallet.address) for wallet in wallets}
+    
+    # Кошельки без свежего значения в кэше группируем по блокчейнам
+    pending_wallets: Dict[BlockchainType, List[Wallet]] = {}
+    for wallet in wallets:
+        if balances[wallet.id] is None:
+            pending_wallets.setdefault(wallet.blockchain_type, []).append(wallet)
+    pending = {wallet.id for chain_wallets in pending_wallets.values() for wallet in chain_wallets}
+    
+    text = format_balances(wallets, balances, pending)
+    status_message = await message.answer(text)
+    if not pending:
+        return
+    
+    async def fetch_chain(blockchain_type: BlockchainType, chain_wallets: List[Wallet]):
+        try:
+            return chain_wallets, await fetch_balances(blockchain_type, [wallet.address for wallet in chain_wallets])
+        except Exception as e:
+            logger.error(f"Ошибка при проверке балансов {blockchain_type.value}: {e}")
+            return chain_wallets, {}
+    
+    last_edit = time.monotonic()
+    
+    for finished in asyncio.as_completed([
+        fetch_chain(blockchain_type, chain_wallets) for blockchain_type, chain_wallets in pending_wallets.items()
+    ]):
+        chain_wallets, chain_balances = await finished
+        for wallet in chain_wallets:
+            balances[wallet.id] = chain_balances.get(wallet.address)
+            pending.discard(wallet.id)
+        
+        # Промежуточные обновления ограничены по частоте; последнее выполняется после цикла
+        if not pending or time.monotonic() - last_edit < BALANCE_EDIT_INTERVAL:
+            continue
+        
+        new_text = format_balances(wallets, balances, pending)
+        if new_text != text:
+            text = new_text
+            last_edit = time.monotonic()
             try:
-                balance = await get_balance(wallet.blockchain_type, wallet.address)
-                
-                if balance is not None:
-                    # Форматируем сумму баланса
-                    formatted_balance = f"{balance:.8f}".rstrip('0').rstrip('.')
-                    
-                    # Добавляем информацию о балансе
-                    balances.append({
-                        "wallet": wallet,
-                        "balance": balance,
-                        "formatted_balance": formatted_balance
-                    })
-                    
-                    # Здесь можно было бы конвертировать в USD, но для упрощения пропустим
-            except Exception as e:
-                logger.error(f"Ошибка при проверке баланса кошелька {wallet.address}: {e}")
-        
-        # Формируем ответное сообщение
-        if not balances:
-            message_text = (
-                f"⚠️ <b>Не удалось получить информацию о балансе</b>\n\n"
-                f"Произошла ошибка при получении данных о балансе ваших кошельков.\n"
-                f"Пожалуйста, попробуйте позже."
-            )
-        else:
-            message_text = f"💰 <b>Баланс ваших кошельков:</b>\n\n"
-            
-            for item in balances:
-                wallet = item["wallet"]
-                formatted_balance = item["formatted_balance"]
-                
-                message_text += (
-                    f"<b>{wallet.label or 'Без метки'}</b> ({wallet.blockchain_type.value})\n"
-                    f"<code>{wallet.address[:8]}...{wallet.address[-6:]}</code>\n"
-                    f"Баланс: <b>{formatted_balance} {wallet.blockchain_type.value}</b>\n\n"
-                )
-        
-        # Обновляем сообщение с результатами
-        await status_message.edit_text(
-            message_text,
-            reply_markup=get_main_keyboard()
+                await status_message.edit_text(text)
+            except TelegramBadRequest as e:
+                logger.warning(f"Не удалось обновить сообщение с балансом: {e}")
+    
+    if all(balances[wallet.id] is None for wallet in wallets):
+        final_text = (
+            f"⚠️ <b>Не удалось получить информацию о балансе</b>\n\n"
+            f"Произошла ошибка при получении данных о балансе ваших кошельков.\n"
+            f"Пожалуйста, попробуйте позже."
         )
+    else:
+        final_text = format_balances(wallets, balances, pending)
+    
+    # Итоговое обновление сообщения
+    if final_text != text:
+        # Соблюдаем интервал между редактированиями одного сообщения
+        delay = BALANCE_EDIT_INTERVAL - (time.monotonic() - last_edit)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            await status_message.edit_text(final_text)
+        except TelegramBadRequest as e:
+            logger.warning(f"Не удалось обновить сообщение с балансом: {e}")
 
 # Обработчик команды /transactions
 @router.message(Command("transactions"))
@@ -731,8 +912,9 @@ async def cmd_settings(message: Message):
     """Обработчик команды настройки уведомлений"""
     await message.answer(
         f"⚙️ <b>Настройки уведомлений</b>\n\n"
-        f"В данный момент вы получаете уведомления обо всех транзакциях.\n\n"
-        f"Функция детальной настройки уведомлений будет доступна в ближайшее время.",
+        f"Фильтры уведомлений настраиваются командой /filters: минимальная сумма, "
+        f"направление, списки адресов и токенов. Отфильтрованные транзакции не сохраняются "
+        f"и не уведомляются.",
         reply_markup=get_main_keyboard()
     )
 
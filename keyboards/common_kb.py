@@ -1,91 +1,55 @@
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import ReplyKeyboardMarkup, InlineKeyboardMarkup
+
+from keyboards.factory import inline_keyboard, reply_keyboard
+from utils.chains import CHAINS
 
 def get_main_keyboard() -> ReplyKeyboardMarkup:
     """
     Генерирует основную клавиатуру с главными функциями
     """
-    kb = [
-        [
-            KeyboardButton(text="💼 Мои кошельки"),
-            KeyboardButton(text="➕ Добавить кошелек")
-        ],
-        [
-            KeyboardButton(text="💰 Проверить баланс"),
-            KeyboardButton(text="📊 Транзакции")
-        ],
-        [
-            KeyboardButton(text="⭐ Подписка"),
-            KeyboardButton(text="⚙️ Настройки")
-        ],
-        [
-            KeyboardButton(text="ℹ️ Помощь")
-        ]
-    ]
-    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+    return reply_keyboard(
+        ("💼 Мои кошельки", "➕ Добавить кошелек"),
+        ("💰 Проверить баланс", "📊 Транзакции"),
+        ("⭐ Подписка", "⚙️ Настройки"),
+        ("ℹ️ Помощь",)
+    )
 
 def get_cancel_keyboard() -> ReplyKeyboardMarkup:
     """
     Генерирует клавиатуру с единственной кнопкой отмены
     """
-    kb = [[KeyboardButton(text="❌ Отмена")]]
-    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+    return reply_keyboard(("❌ Отмена",))
 
 def get_back_keyboard() -> ReplyKeyboardMarkup:
     """
     Создает клавиатуру с кнопкой возврата назад
     """
-    kb = [[KeyboardButton(text="◀️ Назад")]]
-    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+    return reply_keyboard(("◀️ Назад",))
 
 def get_blockchain_selection_keyboard() -> InlineKeyboardMarkup:
     """
     Генерирует инлайн-клавиатуру для выбора типа блокчейна
     """
-    kb = [
-        [
-            InlineKeyboardButton(
-                text="ETH (Ethereum)",
-                callback_data="blockchain:ETH"
-            ),
-            InlineKeyboardButton(
-                text="BTC (Bitcoin)",
-                callback_data="blockchain:BTC"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text="BNB (Binance Smart Chain)",
-                callback_data="blockchain:BNB"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text="❌ Отмена",
-                callback_data="blockchain:cancel"
-            )
-        ]
-    ]
-    
-    return InlineKeyboardMarkup(inline_keyboard=kb)
+    # По две кнопки в строке, в порядке реестра блокчейнов
+    buttons = [(chain.title, f"blockchain:{chain.blockchain_type.value}") for chain in CHAINS.values()]
+    rows = [tuple(buttons[start:start + 2]) for start in range(0, len(buttons), 2)]
+    return inline_keyboard(*rows, (("❌ Отмена", "blockchain:cancel"),))
 
 def get_yes_no_keyboard(action_prefix: str) -> InlineKeyboardMarkup:
     """
     Генерирует инлайн-клавиатуру для подтверждения действия (Да/Нет)
-    
+
     :param action_prefix: Префикс для callback_data (например, "delete_wallet:123")
     :return: Клавиатура с кнопками Да и Нет
     """
-    kb = [
-        [
-            InlineKeyboardButton(
-                text="✅ Да",
-                callback_data=f"{action_prefix}:yes"
-            ),
-            InlineKeyboardButton(
-                text="❌ Нет",
-                callback_data=f"{action_prefix}:no"
-            )
-        ]
-    ]
-    
-    return InlineKeyboardMarkup(inline_keyboard=kb) 
\ No newline at end of file
+    return inline_keyboard((("✅ Да", f"{action_prefix}:yes"), ("❌ Нет", f"{action_prefix}:no")))
+
+def get_back_inline_keyboard(callback_data: str, explorer_url: str = None) -> InlineKeyboardMarkup:
+    """
+    Генерирует инлайн-клавиатуру с кнопкой возврата и, если задана, ссылкой на обозреватель
+
+    :param callback_data: callback_data кнопки возврата (например, "wallet:123")
+    :param explorer_url: Ссылка на адрес в обозревателе блокчейна
+    """
+    rows = [(("🔍 Просмотреть на обозревателе", None, explorer_url),)] if explorer_url else []
+    return inline_keyboard(*rows, (("◀️ Назад", callback_data),))
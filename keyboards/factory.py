@@ -0,0 +1,48 @@
+"""
+Фабрика клавиатур с кэшем готовых объектов
+
+Клавиатура описывается кортежами строк и кнопок, а объект разметки aiogram
+создается один раз для каждого описания и затем переиспользуется: главное
+меню, выбор блокчейна, тарифы и клавиатуры действий кошелька отправляются
+в каждом ответе, и сборка pydantic-моделей на каждое сообщение не нужна.
+
+Возвращаемые объекты общие для всех вызовов, поэтому их нельзя изменять;
+клавиатуру с другим содержимым нужно описать заново.
+"""
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
+
+# Кнопка: (текст, callback_data) или (текст, None, url)
+ButtonSpec = Tuple[str, ...]
+
+# Число различных клавиатур в кэше (клавиатуры кошельков зависят от их ID)
+KEYBOARD_CACHE_SIZE = 4096
+
+def _inline_button(spec: ButtonSpec) -> InlineKeyboardButton:
+    text, callback_data, *rest = spec
+    url: Optional[str] = rest[0] if rest else None
+    if url:
+        return InlineKeyboardButton(text=text, url=url)
+    return InlineKeyboardButton(text=text, callback_data=callback_data)
+
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def inline_keyboard(*rows: Tuple[ButtonSpec, ...]) -> InlineKeyboardMarkup:
+    """
+    Возвращает инлайн-клавиатуру по описанию строк
+
+    :param rows: Строки клавиатуры, каждая - кортеж кнопок ButtonSpec
+    :return: Общий для одинаковых описаний объект разметки (не изменять)
+    """
+    return InlineKeyboardMarkup(inline_keyboard=[[_inline_button(spec) for spec in row] for row in rows])
+
+@lru_cache(maxsize=64)
+def reply_keyboard(*rows: Tuple[str, ...]) -> ReplyKeyboardMarkup:
+    """
+    Возвращает клавиатуру ответа по текстам кнопок
+
+    :param rows: Строки клавиатуры, каждая - кортеж текстов кнопок
+    :return: Общий для одинаковых описаний объект разметки (не изменять)
+    """
+    return ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text=text) for text in row] for row in rows], resize_keyboard=True)
@@ -1,26 +1,23 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from config import MONTHLY_SUBSCRIPTION_PRICE, YEARLY_SUBSCRIPTION_PRICE
+from keyboards.factory import inline_keyboard
 
 def get_subscription_plans_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура выбора плана подписки"""
-    kb = [
-        [InlineKeyboardButton(text="📆 Месячная подписка (3$)", callback_data="subscription:monthly")],
-        [InlineKeyboardButton(text="📅 Годовая подписка (30$)", callback_data="subscription:yearly")],
-        [InlineKeyboardButton(text="❌ Отмена", callback_data="subscription:cancel")]
-    ]
-    
-    return InlineKeyboardMarkup(inline_keyboard=kb)
+    return inline_keyboard(
+        ((f"📆 Месячная подписка ({MONTHLY_SUBSCRIPTION_PRICE:g}$)", "subscription:monthly"),),
+        ((f"📅 Годовая подписка ({YEARLY_SUBSCRIPTION_PRICE:g}$)", "subscription:yearly"),),
+        (("❌ Отмена", "subscription:cancel"),)
+    )
 
 def get_payment_methods_keyboard(plan_type: str) -> InlineKeyboardMarkup:
     """Клавиатура выбора способа оплаты"""
-    kb = [
-        [InlineKeyboardButton(text="💰 Криптовалюта", callback_data=f"payment:{plan_type}:crypto")],
-        [InlineKeyboardButton(text="💳 Банковская карта", callback_data=f"payment:{plan_type}:card")],
-        [InlineKeyboardButton(text="⬅️ Назад", callback_data=f"payment:{plan_type}:back")],
-        [InlineKeyboardButton(text="❌ Отмена", callback_data="subscription:cancel")]
-    ]
-    
-    return InlineKeyboardMarkup(inline_keyboard=kb)
+    return inline_keyboard(
+        (("💰 Криптовалюта", f"payment:{plan_type}:crypto"),),
+        (("💳 Банковская карта", f"payment:{plan_type}:card"),),
+        (("⬅️ Назад", f"payment:{plan_type}:back"),),
+        (("❌ Отмена", "subscription:cancel"),)
+    )
 
 def get_crypto_selection_keyboard(payment_id: str) -> InlineKeyboardMarkup:
     """Клавиатура выбора криптовалюты для оплаты"""
@@ -1,5 +1,7 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from typing import List
+from typing import List, Optional, Tuple
+
+from keyboards.factory import inline_keyboard
 
 def generate_wallets_keyboard(wallets: List) -> InlineKeyboardMarkup:
     """
@@ -36,62 +38,81 @@ def generate_wallet_actions_keyboard(wallet_id: int) -> InlineKeyboardMarkup:
     """
     Генерирует инлайн-клавиатуру с действиями для выбранного кошелька
     """
-    kb = [
-        [
-            InlineKeyboardButton(
-                text="💰 Баланс",
-                callback_data=f"wallet_action:{wallet_id}:balance"
-            ),
-            InlineKeyboardButton(
-                text="📊 Транзакции",
-                callback_data=f"wallet_action:{wallet_id}:transactions"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text="✏️ Изменить метку",
-                callback_data=f"wallet_action:{wallet_id}:edit_label"
-            ),
-            InlineKeyboardButton(
-                text="🗑️ Удалить",
-                callback_data=f"wallet_action:{wallet_id}:delete"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text="◀️ Назад",
-                callback_data=f"wallet_action:{wallet_id}:back"
-            )
-        ]
-    ]
-    
-    return InlineKeyboardMarkup(inline_keyboard=kb)
+    return inline_keyboard(
+        (("💰 Баланс", f"wallet_action:{wallet_id}:balance"), ("📊 Транзакции", f"wallet_action:{wallet_id}:transactions")),
+        (("✏️ Изменить метку", f"wallet_action:{wallet_id}:edit_label"), ("🗑️ Удалить", f"wallet_action:{wallet_id}:delete")),
+        (("⏱ Подтверждения", f"wallet_action:{wallet_id}:confirmations"),),
+        (("◀️ Назад", f"wallet_action:{wallet_id}:back"),)
+    )
 
 def get_transaction_limit_keyboard(wallet_id: int) -> InlineKeyboardMarkup:
     """
     Генерирует инлайн-клавиатуру для выбора количества транзакций
     """
+    return inline_keyboard(
+        tuple((str(num), f"tx_count:{wallet_id}:{num}") for num in (5, 10, 20)),
+        (("◀️ Назад", f"tx_count:{wallet_id}:back"),)
+    )
+
+def get_confirmations_keyboard(wallet_id: int, options: List[int], current: int) -> InlineKeyboardMarkup:
+    """
+    Генерирует инлайн-клавиатуру для выбора порога подтверждений кошелька
+    """
+    return inline_keyboard(
+        tuple((f"✓ {num}" if num == current else str(num), f"confirmations:{wallet_id}:{num}") for num in options),
+        (("◀️ Назад", f"wallet:{wallet_id}"),)
+    )
+
+def get_history_keyboard(wallet_id: int, size: int, older: Optional[Tuple[int, int]], newer: Optional[Tuple[int, int]], explorer_url: Optional[str] = None) -> InlineKeyboardMarkup:
+    """
+    Генерирует инлайн-клавиатуру страницы истории транзакций
+
+    :param wallet_id: ID кошелька
+    :param size: Текущий размер страницы
+    :param older: Курсор более старой страницы (None - страница последняя)
+    :param newer: Курсор более новой страницы (None - страница первая)
+    :param explorer_url: Ссылка на адрес в обозревателе блокчейна
+    """
     kb = [
         [
             InlineKeyboardButton(
-                text="5",
-                callback_data=f"tx_count:{wallet_id}:5"
-            ),
-            InlineKeyboardButton(
-                text="10",
-                callback_data=f"tx_count:{wallet_id}:10"
-            ),
-            InlineKeyboardButton(
-                text="20",
-                callback_data=f"tx_count:{wallet_id}:20"
-            )
-        ],
-        [
-            InlineKeyboardButton(
-                text="◀️ Назад",
-                callback_data=f"tx_count:{wallet_id}:back"
+                text=f"✓ {num}" if num == size else str(num),
+                callback_data=f"txh:{wallet_id}:{num}"
             )
+            for num in (5, 10, 20)
         ]
     ]
-    
-    return InlineKeyboardMarkup(inline_keyboard=kb)
\ No newline at end of file
+
+    # Курсор помещается в callback_data: время в микросекундах и число пропускаемых транзакций
+    pages_row = []
+    if newer:
+        pages_row.append(InlineKeyboardButton(
+            text="⬅️ Новее",
+            callback_data=f"txh:{wallet_id}:{size}:n:{newer[0]}:{newer[1]}"
+        ))
+    if older:
+        pages_row.append(InlineKeyboardButton(
+            text="Старше ➡️",
+            callback_data=f"txh:{wallet_id}:{size}:o:{older[0]}:{older[1]}"
+        ))
+    if pages_row:
+        kb.append(pages_row)
+
+    kb.append([
+        InlineKeyboardButton(
+            text="🔄 Загрузить из сети",
+            callback_data=f"txb:{wallet_id}:{size}"
+        )
+    ])
+
+    if explorer_url:
+        kb.append([InlineKeyboardButton(text="🔍 Просмотреть на обозревателе", url=explorer_url)])
+
+    kb.append([
+        InlineKeyboardButton(
+            text="◀️ Назад",
+            callback_data=f"wallet:{wallet_id}"
+        )
+    ])
+
+    return InlineKeyboardMarkup(inline_keyboard=kb)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String
+from models.base import Base
+
+class Address(Base):
+    """
+    Словарь адресов блокчейна
+
+    Транзакции ссылаются на адреса отправителя и получателя по целочисленному ID,
+    поэтому строка адреса хранится один раз. Таблица не наследует служебные поля
+    BaseModel: для словаря они только увеличивают размер строк.
+    """
+    __tablename__ = 'addresses'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    address = Column(String(255), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"<Address({self.id}, {self.address})>"
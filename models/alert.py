@@ -0,0 +1,30 @@
+import enum
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Numeric, Boolean, Enum
+from models.base import BaseModel
+
+class AlertMetric(enum.Enum):
+    """Показатель окна: поступления, списания, чистый отток (списания минус поступления), число транзакций"""
+    inflow = "in"
+    outflow = "out"
+    net_outflow = "net"
+    count = "count"
+
+class AlertRule(BaseModel):
+    """Правило оповещения о крупных движениях за окно времени (services/alerts.py)"""
+    __tablename__ = 'alert_rules'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(BigInteger, ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False, index=True)
+    # Кошелек правила; None - все кошельки пользователя
+    wallet_id = Column(Integer, ForeignKey('wallets.id', ondelete='CASCADE'), nullable=True)
+    metric = Column(Enum(AlertMetric), nullable=False)
+    asset = Column(String(64), nullable=False)
+    threshold = Column(Numeric(38, 18), nullable=False)
+    window_hours = Column(Integer, nullable=False, default=1)
+    # True - сумма по всем кошелькам правила, False - каждый кошелек отдельно
+    combined = Column(Boolean, nullable=False, default=False)
+    # Время последнего срабатывания: правило молчит до конца окна
+    last_triggered_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<AlertRule({self.id}, {self.metric.value} {self.asset} >= {self.threshold} за {self.window_hours} ч)>"
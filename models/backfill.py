@@ -0,0 +1,31 @@
+import enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from models.base import BaseModel, Base
+
+class BackfillStatus(enum.Enum):
+    """Состояние задания загрузки истории: pending → running → done / failed"""
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+class BackfillJob(BaseModel):
+    """Задание фоновой загрузки полной истории транзакций кошелька (services/backfill.py)"""
+    __tablename__ = 'backfill_jobs'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    wallet_id = Column(Integer, ForeignKey('wallets.id', ondelete='CASCADE'), nullable=False, unique=True)
+    status = Column(Enum(BackfillStatus), nullable=False, default=BackfillStatus.pending, index=True)
+    # Этап: "native" - транзакции монеты блокчейна, "tokens" - переводы токенов
+    stage = Column(String(16), nullable=False, default="native")
+    # Курсор этапа: наибольший блок, история до которого (включительно) еще не сохранена; None - с вершины цепочки
+    cursor = Column(Integer, nullable=True)
+    pages = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    # Оценка числа транзакций адреса у провайдера (для отображения прогресса), если известна
+    total = Column(Integer, nullable=True)
+    error = Column(String(255), nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<BackfillJob(wallet_id={self.wallet_id}, {self.status.value}, {self.stage}:{self.cursor})>"
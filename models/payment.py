@@ -0,0 +1,36 @@
+import enum
+from sqlalchemy import Column, BigInteger, String, Enum, DateTime, ForeignKey, Numeric, Index
+from models.base import BaseModel, Base
+
+class PaymentStatus(enum.Enum):
+    """Состояние платежа: pending → completed / cancelled / expired (конечные состояния не меняются)"""
+    pending = "pending"
+    completed = "completed"
+    cancelled = "cancelled"
+    expired = "expired"
+
+class Payment(BaseModel):
+    """Платеж за подписку (services/payments.py)"""
+    __tablename__ = 'payments'
+    __table_args__ = (
+        # Очистка ищет старые ожидающие платежи: WHERE status = 'pending' AND created_at < ...
+        Index("ix_payments_status_created_at", "status", "created_at"),
+    )
+
+    payment_id = Column(String(36), primary_key=True)
+    user_id = Column(BigInteger, ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False, index=True)
+    amount = Column(Numeric(10, 2), nullable=False)
+    currency = Column(String(10), nullable=False)
+    payment_method = Column(String(32), nullable=False)
+    plan_type = Column(String(16), nullable=False)
+    status = Column(Enum(PaymentStatus), nullable=False, default=PaymentStatus.pending)
+    # Криптовалюта и адрес для оплаты, выбранные пользователем
+    crypto_currency = Column(String(10), nullable=True)
+    address = Column(String(255), nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    cancelled_at = Column(DateTime, nullable=True)
+    # Время активации подписки по платежу: заполняется один раз условным UPDATE
+    activated_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Payment(id={self.payment_id}, user_id={self.user_id}, status={self.status})>"
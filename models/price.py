@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from models.base import BaseModel, Base
+
+class PriceQuote(BaseModel):
+    """Последняя успешно полученная цена актива в USD (снимок для быстрого старта)"""
+    __tablename__ = 'price_quotes'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Монета блокчейна ("BTC") или токен ("ETH:0x...")
+    asset = Column(String(64), nullable=False, unique=True)
+    price_usd = Column(Float, nullable=False)
+    quoted_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<PriceQuote({self.asset}, {self.price_usd}, {self.quoted_at})>"
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric
+from models.base import Base
+
+class WalletRollup(Base):
+    """
+    Почасовые итоги транзакций кошелька по активу (services/rollups.py)
+
+    Строка обновляется вместе с записью транзакции; правила крупных движений
+    (services/alerts.py) суммируют строки окна вместо перебора транзакций.
+    """
+    __tablename__ = 'wallet_rollups'
+
+    wallet_id = Column(Integer, ForeignKey('wallets.id', ondelete='CASCADE'), primary_key=True)
+    # Начало часа (UTC)
+    hour = Column(DateTime, primary_key=True)
+    # Символ монеты блокчейна или ключ контракта токена (services/rollups.rollup_asset)
+    asset = Column(String(64), primary_key=True)
+    amount_in = Column(Numeric(38, 18), nullable=False, default=0)
+    amount_out = Column(Numeric(38, 18), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<WalletRollup(wallet_id={self.wallet_id}, {self.hour:%Y-%m-%d %H}:00, {self.asset})>"
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Enum
+from models.base import BaseModel, Base
+from models.wallet import BlockchainType
+
+class TokenScanState(BaseModel):
+    """Последний просмотренный блок поиска переводов токенов через eth_getLogs (services/monitor.py)"""
+    __tablename__ = 'token_scan_state'
+
+    blockchain_type = Column(Enum(BlockchainType), primary_key=True)
+    last_block = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<TokenScanState({self.blockchain_type.value}, {self.last_block})>"
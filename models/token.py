@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Enum, UniqueConstraint
+from models.base import BaseModel, Base
+from models.wallet import BlockchainType
+
+class Token(BaseModel):
+    """Метаданные токена ERC-20 / BEP-20 (кэш, чтобы не запрашивать их повторно)"""
+    __tablename__ = 'tokens'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    blockchain_type = Column(Enum(BlockchainType), nullable=False)
+    contract_address = Column(String(42), nullable=False)
+    symbol = Column(String(32), nullable=True)
+    decimals = Column(Integer, nullable=False, default=18)
+
+    __table_args__ = (
+        UniqueConstraint('blockchain_type', 'contract_address', name='uix_token_contract'),
+    )
+
+    def __repr__(self):
+        return f"<Token({self.symbol}, {self.contract_address}, {self.blockchain_type})>"
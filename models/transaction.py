@@ -1,6 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Numeric, Enum, Index
 from sqlalchemy.orm import relationship
 from models.base import BaseModel, Base
+from models.wallet import TransactionType
+from models.address import Address
+import enum
+from typing import Optional
+
+class TransactionStatus(enum.Enum):
+    """Состояние транзакции: seen → confirmed(N) → final / orphaned"""
+    seen = "seen"
+    confirmed = "confirmed"
+    final = "final"
+    orphaned = "orphaned"
 
 class Transaction(BaseModel):
     """Модель транзакции криптовалюты"""
@@ -9,12 +20,46 @@ class Transaction(BaseModel):
     tx_id = Column(String(255), primary_key=True)
     wallet_id = Column(Integer, ForeignKey('wallets.id', ondelete='CASCADE'))
     hash = Column(String(255), nullable=False)
-    from_address = Column(String(255), nullable=True)
-    to_address = Column(String(255), nullable=True)
+    # Адреса отправителя и получателя - ссылки на словарь addresses (services/addresses.py)
+    from_address_id = Column(Integer, ForeignKey('addresses.id'), nullable=True, index=True)
+    to_address_id = Column(Integer, ForeignKey('addresses.id'), nullable=True, index=True)
     value = Column(Numeric(30, 18), nullable=False)
+    fee = Column(Numeric(30, 18), nullable=True)
+    # Направление относительно адреса кошелька (None для записей, сохраненных до появления поля)
+    type = Column(Enum(TransactionType), nullable=True)
     timestamp = Column(DateTime, nullable=False)
     block_number = Column(Integer, nullable=True)
+    block_hash = Column(String(66), nullable=True)
+    # Для переводов токенов: адрес контракта и символ токена
+    token_address = Column(String(42), nullable=True)
+    token_symbol = Column(String(32), nullable=True)
+    status = Column(Enum(TransactionStatus), default=TransactionStatus.seen, index=True)
+    confirmations = Column(Integer, default=0)
     notification_sent = Column(Boolean, default=False)
+    # Загружена из истории (services/history.py, services/backfill.py): уведомления и исправления не отправляются
+    is_historical = Column(Boolean, default=False, nullable=False)
+    # Высота цепочки при исключении из нее: пока задана, транзакция ожидает повторного включения
+    # (services/confirmations.py); None - исключение окончательно или транзакция в цепочке
+    orphaned_at_height = Column(Integer, nullable=True)
+
+    # Строки адресов загружаются вместе с транзакцией одним запросом
+    from_ref = relationship(Address, foreign_keys=[from_address_id], lazy="joined")
+    to_ref = relationship(Address, foreign_keys=[to_address_id], lazy="joined")
+
+    __table_args__ = (
+        # История кошелька листается по ключу (timestamp, tx_id) без OFFSET
+        Index('ix_transactions_wallet_history', 'wallet_id', 'timestamp', 'tx_id'),
+    )
+    
+    @property
+    def from_address(self) -> Optional[str]:
+        """Адрес отправителя"""
+        return self.from_ref.address if self.from_ref else None
+
+    @property
+    def to_address(self) -> Optional[str]:
+        """Адрес получателя"""
+        return self.to_ref.address if self.to_ref else None
     
     def __repr__(self):
-        return f"<Transaction(tx_id={self.tx_id}, hash={self.hash}, value={self.value})>" 
\ No newline at end of file
+        return f"<Transaction(tx_id={self.tx_id}, hash={self.hash}, value={self.value})>"
@@ -1,7 +1,8 @@
 import enum
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, NamedTuple
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum as SQLAlchemyEnum, UniqueConstraint, DateTime
+from decimal import Decimal
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Enum as SQLAlchemyEnum, UniqueConstraint, DateTime, JSON
 from sqlalchemy.orm import relationship
 
 from models.base import BaseModel, Base
@@ -14,6 +15,14 @@ class BlockchainType(enum.Enum):
     BNB = "BNB"
 
 
+# Число десятичных знаков монеты блокчейна (сатоши, wei)
+NATIVE_DECIMALS = {
+    BlockchainType.BTC: 8,
+    BlockchainType.ETH: 18,
+    BlockchainType.BNB: 18
+}
+
+
 class TransactionType(enum.Enum):
     """
     Тип транзакции (входящая или исходящая)
@@ -22,29 +31,54 @@ class TransactionType(enum.Enum):
     OUTGOING = "outgoing"
 
 
-class Transaction:
+class ChainTransaction(NamedTuple):
     """
-    Класс для представления транзакции
+    Нормализованная транзакция блокчейна относительно отслеживаемого адреса
+
+    Неизменяемая запись без __dict__; суммы хранятся точно, в минимальных
+    единицах (wei, сатоши, минимальные единицы токена).
     """
-    def __init__(
-        self,
-        txid: str,
-        date: datetime,
-        amount: float,
-        fee: float,
-        confirmations: int,
-        type: TransactionType,
-        address: str,
-        blockchain_type: BlockchainType
-    ):
-        self.txid = txid
-        self.date = date
-        self.amount = amount
-        self.fee = fee
-        self.confirmations = confirmations
-        self.type = type
-        self.address = address
-        self.blockchain_type = blockchain_type
+    blockchain_type: BlockchainType
+    hash: str
+    address: str  # отслеживаемый адрес, относительно которого определено направление
+    type: TransactionType
+    from_address: str
+    to_address: str
+    value: int
+    fee: int
+    decimals: Optional[int]  # для токенов неизвестно, пока не получены метаданные
+    timestamp: datetime
+    block_number: Optional[int]
+    block_hash: Optional[str]
+    confirmations: int
+    token_address: Optional[str] = None
+    token_symbol: Optional[str] = None
+    transfer_key: Optional[str] = None
+
+    @property
+    def amount(self) -> Decimal:
+        """Сумма в единицах монеты или токена"""
+        return Decimal(self.value).scaleb(-(self.decimals or 0))
+
+    @property
+    def fee_amount(self) -> Decimal:
+        """Комиссия в единицах монеты блокчейна"""
+        return Decimal(self.fee).scaleb(-NATIVE_DECIMALS[self.blockchain_type])
+
+    @property
+    def symbol(self) -> str:
+        """Символ токена или монеты блокчейна"""
+        return self.token_symbol or self.blockchain_type.value
+
+    @property
+    def counterparty(self) -> str:
+        """Адрес второй стороны транзакции"""
+        return self.to_address if self.type == TransactionType.OUTGOING else self.from_address
+
+    @property
+    def key(self) -> str:
+        """Ключ транзакции, уникальный для адреса (хеш и, для токенов, ключ перевода)"""
+        return f"{self.hash}:{self.transfer_key}" if self.transfer_key else self.hash
 
 
 class Wallet(BaseModel):
@@ -57,9 +91,17 @@ class Wallet(BaseModel):
     label = Column(String(255))
     blockchain_type = Column(SQLAlchemyEnum(BlockchainType), nullable=False)
     last_checked_timestamp = Column(DateTime, nullable=True)
+    # Порог подтверждений для уведомления (None - значение по умолчанию для блокчейна)
+    confirmation_threshold = Column(Integer, nullable=True)
+    # Правила фильтра уведомлений кошелька, дополняющие правила пользователя (services/filters.py)
+    alert_filters = Column(JSON, nullable=True)
+    # Результат проверки адреса по контрольной сумме (None - кошелек сохранен до проверки и еще
+    # не проверен, см. services/db.check_stored_addresses); кошельки с False не опрашиваются
+    address_valid = Column(Boolean, nullable=True)
 
     __table_args__ = (
-        UniqueConstraint('user_id', 'address', name='uix_user_address'),
+        # Один адрес EVM может отслеживаться и в ETH, и в BNB
+        UniqueConstraint('user_id', 'blockchain_type', 'address', name='uix_user_chain_address'),
     )
 
     # Связь с пользователем
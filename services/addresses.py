@@ -0,0 +1,126 @@
+"""
+Словарь адресов (таблица addresses)
+
+Транзакции хранят ссылки на адреса отправителя и получателя вместо строк:
+строка адреса записывается один раз, а индексы и строки транзакций остаются
+компактными. intern_addresses возвращает объекты Address для строк адресов,
+добавляя недостающие; compact_addresses удаляет адреса, на которые после
+очистки истории (services/retention.py) не ссылается ни одна транзакция.
+
+Адрес, полученный писателем, может быть еще не привязан к сохраненной
+транзакции. Чтобы очистка не удалила его в этот момент, выдача адресов и
+пакеты очистки выполняются под общей блокировкой, а адреса, выданные после
+предыдущей очистки или во время текущей, ею не удаляются.
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, exists, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.future import select
+
+from models.address import Address
+from models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+# Предел числа параметров в одном запросе (SQLite допускает не менее 999)
+QUERY_CHUNK_SIZE = 500
+
+_lock = asyncio.Lock()
+# ID адресов, выданных после предыдущей очистки (до начала текущей) и во время текущей
+_issued: Set[int] = set()
+_issued_before: Set[int] = set()
+
+def _insert_ignore(session):
+    """INSERT, пропускающий уже существующие адреса (их мог добавить параллельный писатель)"""
+    dialect = session.bind.dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert(Address).on_conflict_do_nothing(index_elements=["address"])
+    if dialect == "postgresql":
+        return postgresql_insert(Address).on_conflict_do_nothing(index_elements=["address"])
+    return insert(Address)
+
+async def _select(session, addresses: List[str]) -> Dict[str, Address]:
+    rows = {}
+    for start in range(0, len(addresses), QUERY_CHUNK_SIZE):
+        result = await session.execute(
+            select(Address).where(Address.address.in_(addresses[start:start + QUERY_CHUNK_SIZE]))
+        )
+        rows.update((row.address, row) for row in result.scalars())
+    return rows
+
+async def intern_addresses(session, addresses: Iterable[Optional[str]]) -> Dict[str, Address]:
+    """
+    Возвращает записи словаря для адресов, добавляя отсутствующие
+
+    Новые адреса добавляются в транзакции сессии и фиксируются вместе с ней.
+
+    :param session: Сессия базы данных
+    :param addresses: Строки адресов (пустые значения пропускаются)
+    :return: Словарь {адрес: Address в сессии}
+    """
+    wanted = list({address for address in addresses if address})
+    if not wanted:
+        return {}
+
+    async with _lock:
+        rows = await _select(session, wanted)
+
+        missing = [address for address in wanted if address not in rows]
+        if missing:
+            await session.execute(_insert_ignore(session), [{"address": address} for address in missing])
+            rows.update(await _select(session, missing))
+
+        _issued.update(row.id for row in rows.values())
+
+    return rows
+
+async def compact_addresses(session_factory, batch_size: int) -> int:
+    """
+    Удаляет адреса, на которые не ссылается ни одна транзакция, пакетами
+
+    :param session_factory: Фабрика сессий базы данных
+    :param batch_size: Количество адресов в одном пакете (одной транзакции)
+    :return: Количество удаленных адресов
+    """
+    global _issued, _issued_before
+
+    # Адреса, выданные до начала очистки, могли еще не попасть в транзакции
+    _issued_before, _issued = _issued, set()
+    unreferenced = (
+        ~exists().where(Transaction.from_address_id == Address.id),
+        ~exists().where(Transaction.to_address_id == Address.id)
+    )
+
+    removed = 0
+    after = 0
+    try:
+        while True:
+            async with _lock:
+                async with session_factory() as session:
+                    result = await session.execute(
+                        select(Address.id)
+                        .where(Address.id > after, *unreferenced)
+                        .order_by(Address.id)
+                        .limit(batch_size)
+                    )
+                    candidates = list(result.scalars().all())
+                    if not candidates:
+                        break
+
+                    after = candidates[-1]
+                    unused = [address_id for address_id in candidates if address_id not in _issued and address_id not in _issued_before]
+                    if unused:
+                        await session.execute(delete(Address).where(Address.id.in_(unused)))
+                        await session.commit()
+                        removed += len(unused)
+
+            # Между пакетами блокировка записи свободна для мониторинга
+            await asyncio.sleep(0)
+    finally:
+        _issued_before = set()
+
+    return removed
@@ -0,0 +1,134 @@
+"""
+Оповещения о крупных движениях по кошелькам за окно времени
+
+Правило (AlertRule) задает показатель (поступления, списания, чистый отток
+или число транзакций) по активу, порог и окно в часах, например «списания
+ETH за 1 час не меньше 100» или «чистый отток USDT за 24 часа». Символ токена
+означает только его известные контракты (utils/chains.KNOWN_TOKENS), другой
+токен задается адресом контракта. Правило
+проверяет каждый кошелек отдельно или сумму по всем кошелькам (combined).
+
+После записи транзакций цикла мониторинг вызывает evaluate_alert_rules для
+измененных кошельков: значения окна читаются из почасовых итогов
+(services/rollups.py), поэтому проверка не зависит от числа транзакций.
+Сработавшее правило молчит до конца своего окна.
+"""
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.future import select
+
+from models.alert import AlertRule, AlertMetric
+from models.user import User
+from models.wallet import Wallet
+from services.metrics import ALERTS_TRIGGERED
+from services.rollups import WindowTotals, EMPTY_TOTALS, get_window_totals, rule_assets
+from utils.notifications import send_threshold_alert
+
+logger = logging.getLogger(__name__)
+
+def metric_value(metric: AlertMetric, totals: WindowTotals) -> Decimal:
+    """Значение показателя правила по итогам окна"""
+    if metric == AlertMetric.inflow:
+        return totals.amount_in
+    if metric == AlertMetric.outflow:
+        return totals.amount_out
+    if metric == AlertMetric.net_outflow:
+        return totals.amount_out - totals.amount_in
+    return Decimal(totals.count)
+
+def combine_totals(totals: Iterable[WindowTotals]) -> WindowTotals:
+    """Сумма итогов нескольких кошельков"""
+    combined = EMPTY_TOTALS
+    for item in totals:
+        combined = WindowTotals(
+            combined.amount_in + item.amount_in,
+            combined.amount_out + item.amount_out,
+            combined.count + item.count
+        )
+    return combined
+
+async def _check_rule(session, rule: AlertRule, wallets: List[Wallet], now: datetime) -> Optional[tuple]:
+    """
+    Проверяет правило по кошелькам
+
+    :return: (значение, кошелек или None для суммы по кошелькам) или None, если порог не достигнут
+    """
+    totals = await get_window_totals(
+        session, [wallet.id for wallet in wallets], rule_assets(rule.asset), now - timedelta(hours=rule.window_hours)
+    )
+
+    if rule.combined:
+        value = metric_value(rule.metric, combine_totals(totals.values()))
+        return (value, None) if value >= rule.threshold else None
+
+    for wallet in wallets:
+        value = metric_value(rule.metric, totals.get(wallet.id, EMPTY_TOTALS))
+        if value >= rule.threshold:
+            return value, wallet
+
+    return None
+
+async def evaluate_alert_rules(bot, session, wallet_ids: Iterable[int]) -> int:
+    """
+    Проверяет правила владельцев измененных кошельков и отправляет оповещения
+
+    :param bot: Объект бота
+    :param session: Сессия базы данных
+    :param wallet_ids: ID кошельков, по которым в цикле сохранены транзакции
+    :return: Количество сработавших правил
+    """
+    changed = set(wallet_ids)
+    if not changed:
+        return 0
+
+    result = await session.execute(
+        select(AlertRule)
+        .join(Wallet, Wallet.user_id == AlertRule.user_id)
+        .where(Wallet.id.in_(changed))
+        .distinct()
+    )
+    rules = list(result.scalars().all())
+    if not rules:
+        return 0
+
+    result = await session.execute(select(Wallet).where(Wallet.user_id.in_({rule.user_id for rule in rules})))
+    user_wallets: Dict[int, List[Wallet]] = {}
+    for wallet in result.scalars().all():
+        user_wallets.setdefault(wallet.user_id, []).append(wallet)
+
+    now = datetime.utcnow()
+    triggered = 0
+
+    for rule in rules:
+        # Окно еще не закончилось после предыдущего срабатывания
+        if rule.last_triggered_at and rule.last_triggered_at > now - timedelta(hours=rule.window_hours):
+            continue
+
+        wallets = [
+            wallet for wallet in user_wallets.get(rule.user_id, [])
+            if (rule.wallet_id is None or wallet.id == rule.wallet_id)
+        ]
+        if not rule.combined:
+            # Значения остальных кошельков не изменились с прошлой проверки
+            wallets = [wallet for wallet in wallets if wallet.id in changed]
+        if not wallets or not changed.intersection(wallet.id for wallet in wallets):
+            continue
+
+        hit = await _check_rule(session, rule, wallets, now)
+        if hit is None:
+            continue
+
+        value, wallet = hit
+        rule.last_triggered_at = now
+        await session.commit()
+
+        ALERTS_TRIGGERED.inc(metric=rule.metric.value)
+        logger.info(f"Сработало правило оповещения {rule.id} пользователя {rule.user_id}: {value}")
+        user = await session.get(User, rule.user_id)
+        await send_threshold_alert(bot, rule.user_id, rule, value, wallet, user.language_code if user else None)
+        triggered += 1
+
+    return triggered
@@ -0,0 +1,271 @@
+"""
+Фоновая загрузка полной истории транзакций кошельков
+
+При добавлении кошелька создается задание BackfillJob. Фоновая задача
+выполняет задания по одному: листает историю адреса у провайдера от новых
+транзакций к старым, ограничивая страницы блоком сверху, и сохраняет
+транзакции пакетами по BACKFILL_INSERT_CHUNK. Курсор (этап и блок)
+фиксируется вместе с пакетом, поэтому после перезапуска бота задание
+продолжается с последнего сохраненного места.
+
+Запросы задания выполняются с наименьшим приоритетом общего ограничителя
+частоты (services/ratelimit.py) и не задерживают мониторинг. Сохраненные
+транзакции помечаются is_historical и никогда не вызывают уведомлений.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.future import select
+
+from config import BACKFILL_PAGE_SIZE, BACKFILL_INSERT_CHUNK, BACKFILL_MAX_RETRIES, BACKFILL_POLL_INTERVAL
+from models.backfill import BackfillJob, BackfillStatus
+from models.user import User
+from models.wallet import BlockchainType, ChainTransaction
+from services.blockchain import get_explorer_history_page, get_btc_history_page, BLOCKCYPHER_HISTORY_PAGE_SIZE
+from services.db import async_session, get_wallet_by_id
+from services.history import store_historical_transactions
+from services.http import scale_interval
+from services.metrics import BACKFILL_TRANSACTIONS, BACKFILL_JOBS
+from services.ratelimit import request_priority, PRIORITY_BACKFILL
+from services.retention import get_retention_cutoff
+from services.tokens import resolve_token_transfers
+from utils.notifications import send_backfill_notification
+
+logger = logging.getLogger(__name__)
+
+# Этапы задания: транзакции монеты блокчейна, затем переводы токенов
+STAGE_NATIVE = "native"
+STAGE_TOKENS = "tokens"
+
+# Будит фоновую задачу при появлении нового задания
+_wakeup = asyncio.Event()
+
+def get_stages(blockchain_type: BlockchainType) -> List[str]:
+    """Этапы загрузки истории для блокчейна"""
+    if blockchain_type in (BlockchainType.ETH, BlockchainType.BNB):
+        return [STAGE_NATIVE, STAGE_TOKENS]
+    return [STAGE_NATIVE]
+
+async def get_backfill_job(session, wallet_id: int) -> Optional[BackfillJob]:
+    """Возвращает задание загрузки истории кошелька, если оно есть"""
+    result = await session.execute(select(BackfillJob).where(BackfillJob.wallet_id == wallet_id))
+    return result.scalars().first()
+
+async def enqueue_backfill(wallet_id: int) -> bool:
+    """
+    Ставит кошелек в очередь загрузки истории
+
+    :param wallet_id: ID кошелька
+    :return: True, если задание создано или перезапущено после ошибки
+    """
+    async with async_session() as session:
+        job = await get_backfill_job(session, wallet_id)
+
+        if job is None:
+            session.add(BackfillJob(wallet_id=wallet_id))
+        elif job.status == BackfillStatus.failed:
+            # Продолжаем с сохраненного курсора
+            job.status = BackfillStatus.pending
+            job.error = None
+        else:
+            return False
+
+        await session.commit()
+
+    _wakeup.set()
+    return True
+
+async def enqueue_backfills(wallet_ids: List[int]) -> None:
+    """
+    Ставит в очередь загрузку истории новых кошельков одной транзакцией
+
+    :param wallet_ids: ID кошельков без заданий (например, после массового добавления)
+    """
+    if not wallet_ids:
+        return
+
+    async with async_session() as session:
+        session.add_all([BackfillJob(wallet_id=wallet_id) for wallet_id in wallet_ids])
+        await session.commit()
+
+    _wakeup.set()
+
+async def _fetch_page(wallet, stage: str, cursor: Optional[int]) -> Optional[Tuple[List[ChainTransaction], int, Optional[int]]]:
+    """
+    Загружает страницу истории этапа
+
+    :return: (транзакции от новых к старым, запрошенный размер страницы, общее число транзакций или None)
+             или None в случае ошибки провайдера
+    """
+    if wallet.blockchain_type == BlockchainType.BTC:
+        page = await get_btc_history_page(wallet.address, cursor, BLOCKCYPHER_HISTORY_PAGE_SIZE)
+        if page is None:
+            return None
+        return page[0], BLOCKCYPHER_HISTORY_PAGE_SIZE, page[1]
+
+    action = "txlist" if stage == STAGE_NATIVE else "tokentx"
+    transactions = await get_explorer_history_page(wallet.blockchain_type, wallet.address, action, cursor, BACKFILL_PAGE_SIZE)
+    if transactions is None:
+        return None
+
+    if stage == STAGE_TOKENS:
+        transactions = await resolve_token_transfers(wallet.blockchain_type, transactions)
+
+    return transactions, BACKFILL_PAGE_SIZE, None
+
+def next_cursor(transactions: List[ChainTransaction], page_size: int, cursor: Optional[int]) -> Tuple[bool, Optional[int]]:
+    """
+    Вычисляет курсор следующей страницы
+
+    Следующая страница начинается с наименьшего блока текущей (включительно): блок
+    мог попасть на страницу не целиком, а повторные транзакции отбрасываются при
+    сохранении. Если вся страница состоит из одного блока, он пропускается, иначе
+    листание не продвинулось бы.
+
+    :param transactions: Транзакции страницы
+    :param page_size: Запрошенный размер страницы
+    :param cursor: Курсор текущей страницы
+    :return: (этап завершен, курсор следующей страницы)
+    """
+    blocks = [tx.block_number for tx in transactions if tx.block_number]
+    if len(transactions) < page_size or not blocks:
+        return True, cursor
+
+    lowest = min(blocks)
+    if cursor is not None and lowest >= cursor:
+        logger.warning(f"Страница истории целиком состоит из блока {lowest}; часть его транзакций может быть пропущена")
+        return False, lowest - 1
+
+    return False, lowest
+
+async def run_backfill_job(bot, job_id: int) -> None:
+    """
+    Выполняет задание загрузки истории до завершения или ошибки
+
+    :param bot: Объект бота (для уведомления о завершении)
+    :param job_id: ID задания
+    """
+    # Запросы этой задачи получают разрешение ограничителя последними
+    request_priority.set(PRIORITY_BACKFILL)
+
+    async with async_session() as session:
+        job = await session.get(BackfillJob, job_id)
+        if job is None:
+            return
+
+        wallet = await get_wallet_by_id(session, job.wallet_id)
+        if wallet is None:
+            # Кошелек удален
+            await session.delete(job)
+            await session.commit()
+            return
+
+        # Транзакции новее первой проверки мониторинга уведомляются им; до нее задание ждет
+        since = wallet.last_checked_timestamp
+        if since is None:
+            return
+
+        # Транзакции старше срока хранения уровня подписки не загружаются: их удалила бы очистка
+        user = await session.get(User, wallet.user_id)
+        cutoff = get_retention_cutoff(user.subscription_level if user else None)
+
+        job.status = BackfillStatus.running
+        await session.commit()
+
+        stages = get_stages(wallet.blockchain_type)
+        log_context = {"wallet": wallet.id, "chain": wallet.blockchain_type.value, "subsystem": "backfill"}
+        buffer: List[ChainTransaction] = []
+        stage, cursor = job.stage, job.cursor
+        failures = 0
+
+        while True:
+            page = await _fetch_page(wallet, stage, cursor)
+
+            if page is None:
+                failures += 1
+                if failures > BACKFILL_MAX_RETRIES:
+                    # Пакет не сохранен: задание продолжится с последнего зафиксированного курсора
+                    job.status = BackfillStatus.failed
+                    job.error = "Провайдер недоступен"
+                    await session.commit()
+                    BACKFILL_JOBS.inc(result="failed")
+                    logger.error(f"Загрузка истории кошелька {wallet.id} остановлена после {failures} ошибок", extra=log_context)
+                    return
+
+                await asyncio.sleep(scale_interval(min(2 ** failures, 60)))
+                continue
+
+            failures = 0
+            transactions, page_size, total = page
+            job.pages += 1
+            if total is not None:
+                job.total = total
+
+            # Неподтвержденные транзакции и транзакции после первой проверки отслеживает мониторинг
+            buffer.extend(
+                tx for tx in transactions
+                if tx.block_number and tx.timestamp <= since and (cutoff is None or tx.timestamp >= cutoff)
+            )
+            stage_done, cursor = next_cursor(transactions, page_size, cursor)
+            if cutoff is not None and any(tx.timestamp < cutoff for tx in transactions):
+                stage_done = True
+
+            finished = False
+            if stage_done:
+                index = stages.index(stage) + 1
+                if index < len(stages):
+                    stage, cursor = stages[index], None
+                else:
+                    finished = True
+
+            if len(buffer) >= BACKFILL_INSERT_CHUNK or stage_done:
+                # Пакет и курсор фиксируются вместе: после перезапуска загрузка продолжится отсюда
+                added = await store_historical_transactions(session, wallet, buffer)
+                job.inserted += added
+                job.stage, job.cursor = stage, cursor
+                if finished:
+                    job.status = BackfillStatus.done
+                    job.finished_at = datetime.utcnow()
+                await session.commit()
+
+                BACKFILL_TRANSACTIONS.inc(added, chain=wallet.blockchain_type.value)
+                logger.info(
+                    f"История кошелька {wallet.id}: +{added} транзакций, этап {job.stage}, блок {job.cursor}",
+                    extra=log_context
+                )
+                buffer = []
+
+            if finished:
+                break
+
+    BACKFILL_JOBS.inc(result="done")
+    await send_backfill_notification(bot, wallet.user_id, wallet, job.inserted, user.language_code if user else None)
+
+async def start_backfill_worker(bot):
+    """Выполняет задания загрузки истории в фоновом режиме"""
+    logger.info("Запуск загрузки истории кошельков")
+
+    while True:
+        _wakeup.clear()
+
+        try:
+            async with async_session() as session:
+                # Задания в состоянии running прерваны перезапуском бота и продолжаются с курсора
+                result = await session.execute(
+                    select(BackfillJob.id)
+                    .where(BackfillJob.status.in_((BackfillStatus.running, BackfillStatus.pending)))
+                    .order_by(BackfillJob.created_at)
+                )
+                job_ids = list(result.scalars().all())
+
+            for job_id in job_ids:
+                await run_backfill_job(bot, job_id)
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке истории кошельков: {e}")
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), scale_interval(BACKFILL_POLL_INTERVAL))
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,53 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import BALANCE_CACHE_TTL
+from models.wallet import BlockchainType
+from services.blockchain import get_balances
+from services.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Кэш балансов в памяти: (блокчейн, адрес) -> (баланс, время получения по time.monotonic())
+# Баланс меняется только транзакциями, поэтому мониторинг сбрасывает запись адреса,
+# как только обнаруживает по нему новую транзакцию; TTL ограничивает остальные случаи.
+_balances: Dict[Tuple[BlockchainType, str], Tuple[float, float]] = {}
+
+def get_cached_balance(blockchain_type: BlockchainType, address: str, max_age: float = BALANCE_CACHE_TTL) -> Optional[float]:
+    """
+    Возвращает баланс из кэша, если он достаточно свежий
+
+    :param blockchain_type: Тип блокчейна
+    :param address: Адрес кошелька
+    :param max_age: Максимальный возраст значения, секунды
+    :return: Баланс или None, если в кэше нет свежего значения
+    """
+    entry = _balances.get((blockchain_type, address))
+    if entry is None or time.monotonic() - entry[1] > max_age:
+        CACHE_REQUESTS.inc(cache="balance", result="miss")
+        return None
+
+    CACHE_REQUESTS.inc(cache="balance", result="hit")
+    return entry[0]
+
+def invalidate_balance(blockchain_type: BlockchainType, address: str) -> None:
+    """Сбрасывает кэшированный баланс адреса (вызывается мониторингом при новой транзакции)"""
+    _balances.pop((blockchain_type, address), None)
+
+async def fetch_balances(blockchain_type: BlockchainType, addresses: List[str]) -> Dict[str, Optional[float]]:
+    """
+    Запрашивает балансы адресов одного блокчейна пакетно и обновляет кэш
+
+    :param blockchain_type: Тип блокчейна
+    :param addresses: Адреса кошельков
+    :return: Словарь {адрес: баланс или None в случае ошибки}
+    """
+    balances = await get_balances(blockchain_type, addresses)
+
+    now = time.monotonic()
+    for address, balance in balances.items():
+        if balance is not None:
+            _balances[(blockchain_type, address)] = (balance, now)
+
+    return balances
@@ -1,88 +1,64 @@
+import asyncio
 import logging
-import aiohttp
 import json
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Tuple, Union
 from enum import Enum
 import os
 from aiohttp import ClientSession
 
-from models.wallet import BlockchainType, TransactionType, Transaction
-from config import ETHERSCAN_API_KEY, BSCSCAN_API_KEY
+from models.wallet import BlockchainType, ChainTransaction, NATIVE_DECIMALS
+from services.decoders import (
+    decode_explorer_tx, decode_token_transfer, decode_transfer_log, log_position, number_repeated_transfers,
+    decode_blockcypher_tx, decode_blockcypher_batch, decode_multiaddr_batch
+)
+from services.http import create_session
+from services.offload import run_decoder, should_offload
+from utils.jsonstream import iter_json_array, loads
+from utils.validation import is_valid_address
+from config import ETHERSCAN_API_KEY, BSCSCAN_API_KEY, ETH_RPC_URL, BSC_RPC_URL, TOKEN_LOG_BLOCK_RANGE
 
 logger = logging.getLogger(__name__)
 
 # API URLs
-ETHERSCAN_API_URL = "https://api.etherscan.io/api"
-BSCSCAN_API_URL = "https://api.bscscan.com/api"
-BLOCKCHAIN_INFO_URL = "https://blockchain.info/rawaddr"
-BLOCKCYPHER_API_URL = "https://api.blockcypher.com/v1/btc/main"
+# (переопределяются через окружение, например для локального имитатора провайдеров из benchmarks/)
+ETHERSCAN_API_URL = os.getenv("ETHERSCAN_API_URL", "https://api.etherscan.io/api")
+BSCSCAN_API_URL = os.getenv("BSCSCAN_API_URL", "https://api.bscscan.com/api")
+BLOCKCHAIN_INFO_URL = os.getenv("BLOCKCHAIN_INFO_URL", "https://blockchain.info/rawaddr")
+BLOCKCHAIN_INFO_MULTIADDR_URL = os.getenv("BLOCKCHAIN_INFO_MULTIADDR_URL", "https://blockchain.info/multiaddr")
+BLOCKCYPHER_API_URL = os.getenv("BLOCKCYPHER_API_URL", "https://api.blockcypher.com/v1/btc/main")
 BLOCKCYPHER_API_KEY = os.getenv("BLOCKCYPHER_API_KEY")
 
-logger = logging.getLogger(__name__)
+# Максимальный размер пакета адресов в одном запросе.
+# Без токена BlockCypher допускает не более 3 адресов в пакетном запросе.
+BLOCKCYPHER_BATCH_SIZE = int(os.getenv("BLOCKCYPHER_BATCH_SIZE", "100" if BLOCKCYPHER_API_KEY else "3"))
+BLOCKCHAIN_INFO_BATCH_SIZE = int(os.getenv("BLOCKCHAIN_INFO_BATCH_SIZE", "100"))
+BLOCKCHAIN_INFO_MULTIADDR_LIMIT = 100  # предел n у blockchain.info multiaddr
+EXPLORER_BALANCE_BATCH_SIZE = 20  # предел balancemulti у Etherscan и BscScan
 
-# API URLs
-ETHERSCAN_API_URL = "https://api.etherscan.io/api"
-BSCSCAN_API_URL = "https://api.bscscan.com/api"
-BLOCKCHAIN_INFO_URL = "https://blockchain.info/rawaddr"
+# Обозреватели с API в стиле Etherscan: (URL, ключ, название)
+EXPLORER_APIS = {
+    BlockchainType.ETH: (ETHERSCAN_API_URL, ETHERSCAN_API_KEY, "Etherscan"),
+    BlockchainType.BNB: (BSCSCAN_API_URL, BSCSCAN_API_KEY, "BscScan")
+}
+
+RPC_URLS = {
+    BlockchainType.ETH: ETH_RPC_URL,
+    BlockchainType.BNB: BSC_RPC_URL
+}
 
 async def validate_address(blockchain_type: BlockchainType, address: str) -> bool:
     """
     Проверяет валидность адреса для указанного блокчейна
     
+    Проверка выполняется локально по формату и контрольной сумме (utils/validation.py):
+    Base58Check и Bech32/Bech32m для BTC, EIP-55 для ETH и BNB.
+    
     :param blockchain_type: Тип блокчейна (ETH, BTC, BNB)
     :param address: Адрес для проверки
     :return: True, если адрес валиден, иначе False
     """
-    try:
-        if blockchain_type == BlockchainType.ETH:
-            # Базовая проверка формата Ethereum-адреса
-            address = address.lower()
-            if not address.startswith('0x'):
-                return False
-            
-            if len(address) != 42:  # 0x + 40 hex chars
-                return False
-            
-            # Проверяем, что все символы после 0x - шестнадцатеричные
-            try:
-                int(address[2:], 16)
-                return True
-            except ValueError:
-                return False
-        
-        elif blockchain_type == BlockchainType.BTC:
-            # Базовая проверка формата Bitcoin-адреса
-            # Bitcoin-адреса могут начинаться с 1, 3 или bc1
-            if not (address.startswith('1') or address.startswith('3') or address.startswith('bc1')):
-                return False
-            
-            if len(address) < 26 or len(address) > 35:
-                return False
-                
-            return True
-        
-        elif blockchain_type == BlockchainType.BNB:
-            # Адреса BNB на Binance Smart Chain имеют такой же формат, как и Ethereum
-            address = address.lower()
-            if not address.startswith('0x'):
-                return False
-            
-            if len(address) != 42:  # 0x + 40 hex chars
-                return False
-            
-            # Проверяем, что все символы после 0x - шестнадцатеричные
-            try:
-                int(address[2:], 16)
-                return True
-            except ValueError:
-                return False
-        
-        return False
-    
-    except Exception as e:
-        logger.error(f"Ошибка при валидации адреса {address} для {blockchain_type.value}: {e}")
-        return False
+    return is_valid_address(blockchain_type, address.strip())
 
 async def check_address_valid(blockchain_type: BlockchainType, address: str) -> bool:
     """
@@ -128,7 +104,67 @@ async def get_balance(blockchain_type: BlockchainType, address: str) -> Optional
     """
     return await check_balance(blockchain_type, address)
 
-async def get_transactions(blockchain_type: BlockchainType, address: str, limit: int = 10) -> List[Dict[str, Any]]:
+async def get_balances(blockchain_type: BlockchainType, addresses: List[str]) -> Dict[str, Optional[float]]:
+    """
+    Получает балансы нескольких адресов одного блокчейна пакетными запросами
+
+    :param blockchain_type: Тип блокчейна (ETH, BTC, BNB)
+    :param addresses: Адреса кошельков
+    :return: Словарь {адрес: баланс или None в случае ошибки}
+    """
+    if blockchain_type == BlockchainType.BTC:
+        return await check_btc_balances(addresses)
+    if blockchain_type in EXPLORER_APIS:
+        return await check_explorer_balances(blockchain_type, addresses)
+
+    return {address: None for address in addresses}
+
+async def check_explorer_balances(blockchain_type: BlockchainType, addresses: List[str]) -> Dict[str, Optional[float]]:
+    """
+    Получает балансы адресов через action=balancemulti обозревателя (до 20 адресов в запросе)
+
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :param addresses: Адреса кошельков
+    :return: Словарь {адрес: баланс или None в случае ошибки}
+    """
+    api_url, api_key, provider = EXPLORER_APIS[blockchain_type]
+    addresses = list(dict.fromkeys(addresses))
+    balances: Dict[str, Optional[float]] = {address: None for address in addresses}
+    by_lower = {address.lower(): address for address in addresses}
+
+    try:
+        async with create_session() as session:
+            for batch in _chunked(addresses, EXPLORER_BALANCE_BATCH_SIZE):
+                params = {
+                    "module": "account",
+                    "action": "balancemulti",
+                    "address": ",".join(batch),
+                    "tag": "latest",
+                    "apikey": api_key
+                }
+
+                async with session.get(api_url, params=params) as response:
+                    if response.status != 200:
+                        logger.error(f"Ошибка API {provider} ({response.status}): {await response.text()}")
+                        continue
+
+                    data = loads(await response.read())
+
+                if data.get("status") != "1":
+                    logger.error(f"Ошибка API {provider}: {data.get('message', 'Unknown error')}")
+                    continue
+
+                for item in data.get("result", []):
+                    address = by_lower.get((item.get("account") or "").lower())
+                    if address:
+                        balances[address] = int(item.get("balance") or 0) / 10**NATIVE_DECIMALS[blockchain_type]
+
+    except Exception as e:
+        logger.error(f"Ошибка при получении балансов {blockchain_type.value}: {e}")
+
+    return balances
+
+async def get_transactions(blockchain_type: BlockchainType, address: str, limit: int = 10) -> List[ChainTransaction]:
     """
     Получает список транзакций для указанного адреса
     
@@ -151,7 +187,7 @@ async def get_transactions(blockchain_type: BlockchainType, address: str, limit:
         logger.error(f"Ошибка при получении транзакций для {address} ({blockchain_type.value}): {e}")
         return []
 
-async def check_new_transactions(blockchain_type: BlockchainType, address: str, last_checked: datetime = None) -> List[Dict[str, Any]]:
+async def check_new_transactions(blockchain_type: BlockchainType, address: str, last_checked: datetime = None) -> List[ChainTransaction]:
     """
     Проверяет новые транзакции с момента последней проверки
     
@@ -162,23 +198,25 @@ async def check_new_transactions(blockchain_type: BlockchainType, address: str,
     """
     try:
         transactions = await get_transactions(blockchain_type, address, 20)
-        
-        if not last_checked:
-            return transactions[:5]  # Возвращаем только 5 последних транзакций, если нет времени последней проверки
-        
-        # Фильтруем транзакции, которые произошли после последней проверки
-        new_transactions = []
-        for tx in transactions:
-            tx_timestamp = tx.get('timestamp')
-            if tx_timestamp and tx_timestamp > last_checked:
-                new_transactions.append(tx)
-        
-        return new_transactions
+        return filter_new_transactions(transactions, last_checked)
     
     except Exception as e:
         logger.error(f"Ошибка при проверке новых транзакций для {address} ({blockchain_type.value}): {e}")
         return []
 
+def filter_new_transactions(transactions: List[ChainTransaction], last_checked: datetime = None) -> List[ChainTransaction]:
+    """
+    Отбирает транзакции, произошедшие после последней проверки
+    
+    :param transactions: Список транзакций (от новых к старым)
+    :param last_checked: Время последней проверки
+    :return: Список новых транзакций
+    """
+    if not last_checked:
+        return transactions[:5]  # Возвращаем только 5 последних транзакций, если нет времени последней проверки
+    
+    return [tx for tx in transactions if tx.timestamp > last_checked]
+
 # Ethereum-specific functions
 async def check_eth_balance(address: str) -> Optional[float]:
     """
@@ -196,13 +234,13 @@ async def check_eth_balance(address: str) -> Optional[float]:
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with create_session() as session:
             async with session.get(ETHERSCAN_API_URL, params=params) as response:
                 if response.status != 200:
                     logger.error(f"Ошибка API Etherscan ({response.status}): {await response.text()}")
                     return None
                 
-                data = await response.json()
+                data = loads(await response.read())
                 
                 if data.get("status") != "1":
                     error_message = data.get("message", "Unknown error")
@@ -219,14 +257,18 @@ async def check_eth_balance(address: str) -> Optional[float]:
         logger.error(f"Ошибка при получении баланса ETH для {address}: {e}")
         return None
 
-async def get_eth_transactions(address: str, limit: int = 10) -> List[Dict[str, Any]]:
+async def get_explorer_transactions(blockchain_type: BlockchainType, address: str, limit: int = 10) -> List[ChainTransaction]:
     """
-    Получает список транзакций для Ethereum-адреса
+    Получает список транзакций адреса через обозреватель в стиле Etherscan (txlist)
     
-    :param address: Ethereum-адрес
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :param address: Адрес кошелька
     :param limit: Максимальное количество транзакций
     :return: Список транзакций
     """
+    api_url, api_key, provider = EXPLORER_APIS[blockchain_type]
+    # Ошибки провайдера повторяются для каждого кошелька, поэтому их частота ограничивается
+    log_context = {"hot_path": "provider.error", "provider": provider, "chain": blockchain_type.value}
     params = {
         "module": "account",
         "action": "txlist",
@@ -236,17 +278,17 @@ async def get_eth_transactions(address: str, limit: int = 10) -> List[Dict[str,
         "page": "1",
         "offset": str(min(limit, 100)),  # Максимум 100 транзакций
         "sort": "desc",  # От новых к старым
-        "apikey": ETHERSCAN_API_KEY
+        "apikey": api_key
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(ETHERSCAN_API_URL, params=params) as response:
+        async with create_session() as session:
+            async with session.get(api_url, params=params) as response:
                 if response.status != 200:
-                    logger.error(f"Ошибка API Etherscan ({response.status}): {await response.text()}")
+                    logger.error(f"Ошибка API {provider} ({response.status}): {await response.text()}", extra=log_context)
                     return []
                 
-                data = await response.json()
+                data = loads(await response.read())
                 
                 if data.get("status") != "1":
                     error_message = data.get("message", "Unknown error")
@@ -255,200 +297,263 @@ async def get_eth_transactions(address: str, limit: int = 10) -> List[Dict[str,
                     if "No transactions found" in error_message:
                         return []
                     
-                    logger.error(f"Ошибка API Etherscan: {error_message}")
+                    logger.error(f"Ошибка API {provider}: {error_message}", extra=log_context)
                     return []
                 
-                transactions = data.get("result", [])
-                formatted_transactions = []
-                
-                for tx in transactions[:limit]:
-                    # Convert timestamp to datetime
-                    timestamp = datetime.fromtimestamp(int(tx.get("timeStamp", 0)))
-                    
-                    # Convert value from wei to ETH
-                    value_wei = int(tx.get("value", "0"))
-                    value_eth = value_wei / 10**18
-                    
-                    formatted_tx = {
-                        "hash": tx.get("hash"),
-                        "from": tx.get("from"),
-                        "to": tx.get("to"),
-                        "value": value_eth,
-                        "timestamp": timestamp,
-                        "confirmations": int(tx.get("confirmations", 0)),
-                        "block_number": int(tx.get("blockNumber", 0)),
-                        "block_hash": tx.get("blockHash"),
-                        "gas": int(tx.get("gas", 0)),
-                        "gas_price": int(tx.get("gasPrice", 0)) / 10**9,  # Convert wei to gwei
-                        "is_error": tx.get("isError") == "1"
-                    }
-                    
-                    formatted_transactions.append(formatted_tx)
-                
-                return formatted_transactions
+                return [
+                    decode_explorer_tx(tx, address, blockchain_type)
+                    for tx in data.get("result", [])[:limit]
+                ]
     
     except Exception as e:
-        logger.error(f"Ошибка при получении транзакций ETH для {address}: {e}")
+        logger.error(f"Ошибка при получении транзакций {blockchain_type.value} для {address}: {e}", extra=log_context)
         return []
 
+async def get_eth_transactions(address: str, limit: int = 10) -> List[ChainTransaction]:
+    """
+    Получает список транзакций для Ethereum-адреса
+    
+    :param address: Ethereum-адрес
+    :param limit: Максимальное количество транзакций
+    :return: Список транзакций
+    """
+    return await get_explorer_transactions(BlockchainType.ETH, address, limit)
+
 # Bitcoin-specific functions
+def _chunked(items: List[str], size: int) -> List[List[str]]:
+    """
+    Разбивает список на пакеты заданного размера
+
+    :param items: Исходный список
+    :param size: Максимальный размер пакета
+    :return: Список пакетов
+    """
+    size = max(size, 1)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+async def _fetch_blockcypher_batch(session: ClientSession, addresses: List[str], endpoint: str, params: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Выполняет пакетный запрос BlockCypher для нескольких адресов (адреса через ';')
+
+    :param session: HTTP-сессия
+    :param addresses: Пакет Bitcoin-адресов
+    :param endpoint: Суффикс эндпоинта ("balance" или "full")
+    :param params: Параметры запроса
+    :return: Список объектов адресов или None в случае ошибки
+    """
+    url = f"{BLOCKCYPHER_API_URL}/addrs/{';'.join(addresses)}/{endpoint}"
+    if BLOCKCYPHER_API_KEY:
+        params = {**params, "token": BLOCKCYPHER_API_KEY}
+
+    async with session.get(url, params=params) as response:
+        if response.status != 200:
+            logger.error(f"Ошибка API BlockCypher ({response.status}): {await response.text()}")
+            return None
+
+        data = loads(await response.read())
+
+    # Для одного адреса BlockCypher возвращает объект, для нескольких - список
+    items = data if isinstance(data, list) else [data]
+
+    for item in items:
+        if item.get("error"):
+            logger.error(f"Ошибка API BlockCypher: {item.get('error')}")
+
+    return [item for item in items if not item.get("error")]
+
+async def _stream_blockcypher_transactions(session: ClientSession, addresses: List[str], limit: int) -> Optional[Dict[str, List[ChainTransaction]]]:
+    """
+    Потоково читает пакетный ответ BlockCypher /addrs/{...}/full
+
+    Транзакции декодируются по одной прямо из тела ответа; чтение прекращается,
+    как только для каждого адреса пакета набрано limit транзакций. Крупные ответы
+    с известной длиной при включенном пуле процессов читаются целиком и
+    декодируются в нем (services/offload.py).
+
+    :param session: HTTP-сессия
+    :param addresses: Пакет Bitcoin-адресов
+    :param limit: Максимальное количество транзакций на адрес
+    :return: Словарь {адрес: список транзакций} для адресов, на которые получен ответ (в том числе
+             без транзакций), или None в случае ошибки всего запроса; адреса пакета, отсутствующие
+             в словаре, вернули ошибку
+    """
+    url = f"{BLOCKCYPHER_API_URL}/addrs/{';'.join(addresses)}/full"
+    params = {"limit": limit}
+    if BLOCKCYPHER_API_KEY:
+        params["token"] = BLOCKCYPHER_API_KEY
+
+    transactions: Dict[str, List[ChainTransaction]] = {}
+
+    async with session.get(url, params=params) as response:
+        if response.status != 200:
+            logger.error(f"Ошибка API BlockCypher ({response.status}): {await response.text()}")
+            return None
+
+        if should_offload(response.content_length):
+            return await run_decoder(decode_blockcypher_batch, await response.read(), addresses, limit)
+
+        async for owner, tx in iter_json_array(response.content, "txs", owner_fields=("address", "error"), report_owners=True):
+            # Для одного адреса владелец очевиден, в пакете его указывает поле address
+            address = owner.get("address") or (addresses[0] if len(addresses) == 1 else None)
+            if address not in addresses or owner.get("error"):
+                continue
+
+            address_transactions = transactions.setdefault(address, [])
+            if tx is None:
+                # Объект адреса прочитан целиком: ответ на адрес получен, даже если транзакций нет
+                continue
+            if len(address_transactions) >= limit:
+                continue
+
+            parsed = decode_blockcypher_tx(tx, address)
+            if parsed:
+                address_transactions.append(parsed)
+
+            if len(transactions) == len(addresses) and all(len(txs) >= limit for txs in transactions.values()):
+                break
+
+    return transactions
+
+async def _fetch_blockchain_info_multiaddr(session: ClientSession, addresses: List[str], limit: int) -> Optional[bytes]:
+    """
+    Выполняет запрос multiaddr к blockchain.info для нескольких адресов (адреса через '|')
+
+    :param session: HTTP-сессия
+    :param addresses: Пакет Bitcoin-адресов
+    :param limit: Количество транзакций в ответе
+    :return: Тело ответа или None в случае ошибки
+    """
+    params = {
+        "active": "|".join(addresses),
+        "n": min(limit, BLOCKCHAIN_INFO_MULTIADDR_LIMIT)
+    }
+
+    async with session.get(BLOCKCHAIN_INFO_MULTIADDR_URL, params=params) as response:
+        if response.status != 200:
+            logger.error(f"Ошибка API blockchain.info ({response.status}): {await response.text()}")
+            return None
+
+        return await response.read()
+
+async def check_btc_balances(addresses: List[str]) -> Dict[str, Optional[float]]:
+    """
+    Получает балансы нескольких Bitcoin-адресов пакетными запросами
+
+    :param addresses: Список Bitcoin-адресов
+    :return: Словарь {адрес: баланс в BTC или None в случае ошибки}
+    """
+    addresses = list(dict.fromkeys(addresses))
+    balances: Dict[str, Optional[float]] = {address: None for address in addresses}
+
+    try:
+        async with create_session() as session:
+            for batch in _chunked(addresses, BLOCKCYPHER_BATCH_SIZE):
+                try:
+                    items = await _fetch_blockcypher_batch(session, batch, "balance", {})
+                except Exception as e:
+                    logger.error(f"Ошибка пакетного запроса баланса BlockCypher: {e}")
+                    items = None
+
+                for item in items or []:
+                    if item.get("address") in balances:
+                        # Convert satoshi to BTC (1 BTC = 10^8 satoshi)
+                        balances[item["address"]] = int(item.get("final_balance", 0)) / 10**8
+
+            # Адреса, по которым BlockCypher не ответил, запрашиваем через blockchain.info
+            missing = [address for address, balance in balances.items() if balance is None]
+            for batch in _chunked(missing, BLOCKCHAIN_INFO_BATCH_SIZE):
+                body = await _fetch_blockchain_info_multiaddr(session, batch, 0)
+
+                for item in (loads(body) if body else {}).get("addresses", []):
+                    if item.get("address") in balances:
+                        balances[item["address"]] = int(item.get("final_balance", 0)) / 10**8
+
+    except Exception as e:
+        logger.error(f"Ошибка при получении балансов BTC: {e}")
+
+    return balances
+
 async def check_btc_balance(address: str) -> Optional[float]:
     """
     Получает баланс Bitcoin-адреса
-    
+
     :param address: Bitcoin-адрес
     :return: Баланс в BTC или None в случае ошибки
     """
-    params = {
-        "token": BLOCKCYPHER_API_KEY,
-        "address": address
-    }
-    
+    balances = await check_btc_balances([address])
+    return balances.get(address)
+
+async def get_btc_transactions_batch(addresses: List[str], limit: int = 10) -> Dict[str, List[ChainTransaction]]:
+    """
+    Получает транзакции для нескольких Bitcoin-адресов пакетными запросами
+
+    Адреса группируются в пакеты максимального размера; транзакции из общего ответа
+    распределяются по отслеживаемым адресам.
+
+    :param addresses: Список Bitcoin-адресов
+    :param limit: Максимальное количество транзакций на адрес
+    :return: Словарь {адрес: список транзакций}
+    """
+    addresses = list(dict.fromkeys(addresses))
+    transactions: Dict[str, List[ChainTransaction]] = {address: [] for address in addresses}
+
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(BLOCKCYPHER_API_URL, params=params) as response:
-                if response.status != 200:
-                    logger.error(f"Ошибка API BlockCypher ({response.status}): {await response.text()}")
-                    return None
-                
-                data = await response.json()
-                
-                if data.get("error"):
-                    error_message = data.get("error", "Unknown error")
-                    logger.error(f"Ошибка API BlockCypher: {error_message}")
-                    return None
-                
-                # Convert satoshi to BTC (1 BTC = 10^8 satoshi)
-                balance_sat = int(data.get("final_balance", "0"))
-                balance_btc = balance_sat / 10**8
-                
-                return balance_btc
-    
+        async with create_session() as session:
+            missing = []
+
+            for batch in _chunked(addresses, BLOCKCYPHER_BATCH_SIZE):
+                try:
+                    streamed = await _stream_blockcypher_transactions(session, batch, limit)
+                except Exception as e:
+                    logger.error(f"Ошибка пакетного запроса транзакций BlockCypher: {e}")
+                    streamed = None
+
+                if streamed is None:
+                    missing.extend(batch)
+                    continue
+
+                # Элементы с ошибкой не содержат транзакций адреса: такие адреса запрашиваются у резервного провайдера
+                failed = [address for address in batch if address not in streamed]
+                if failed:
+                    logger.warning(f"BlockCypher не вернул {len(failed)} из {len(batch)} адресов пакета")
+                    missing.extend(failed)
+
+                for address, address_transactions in streamed.items():
+                    transactions[address] = address_transactions
+
+            # Резервный провайдер: blockchain.info multiaddr возвращает общий список транзакций пакета,
+            # поэтому пакет подбирается так, чтобы limit транзакций на адрес помещались в предел n
+            batch_size = min(BLOCKCHAIN_INFO_BATCH_SIZE, BLOCKCHAIN_INFO_MULTIADDR_LIMIT // max(limit, 1))
+            batches = _chunked(missing, batch_size)
+            while batches:
+                batch = batches.pop(0)
+                page_size = min(limit * len(batch), BLOCKCHAIN_INFO_MULTIADDR_LIMIT)
+                body = await _fetch_blockchain_info_multiaddr(session, batch, page_size)
+                if not body:
+                    continue
+
+                batch_transactions, starved = await run_decoder(decode_multiaddr_batch, body, batch, limit, page_size)
+                transactions.update(batch_transactions)
+
+                # Адреса, вытесненные активным соседом по пакету, запрашиваются по одному
+                if len(batch) > 1:
+                    batches.extend([address] for address in starved)
+
     except Exception as e:
-        logger.error(f"Ошибка при получении баланса BTC для {address}: {e}")
-        return None
+        logger.error(f"Ошибка при пакетном получении транзакций BTC: {e}")
+
+    return transactions
 
-async def get_btc_transactions(address: str, limit: int = 10) -> List[Dict[str, Any]]:
+async def get_btc_transactions(address: str, limit: int = 10) -> List[ChainTransaction]:
     """
     Получает список транзакций для Bitcoin-адреса
-    
+
     :param address: Bitcoin-адрес
     :param limit: Максимальное количество транзакций
     :return: Список транзакций
     """
-    params = {
-        "token": BLOCKCYPHER_API_KEY,
-        "limit": limit
-    }
-    
-    try:
-        url = f"{BLOCKCYPHER_API_URL}/addrs/{address}/full"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status != 200:
-                    logger.error(f"Ошибка API BlockCypher ({response.status}): {await response.text()}")
-                    return []
-                
-                data = await response.json()
-                
-                if data.get("error"):
-                    error_message = data.get("error", "Unknown error")
-                    logger.error(f"Ошибка API BlockCypher: {error_message}")
-                    return []
-                
-                transactions = []
-                
-                # Обрабатываем каждую транзакцию
-                for tx in data.get("txs", [])[:limit]:
-                    # Получаем временную метку транзакции
-                    timestamp = tx.get("received")
-                    if timestamp:
-                        tx_date = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    else:
-                        tx_date = datetime.now()
-                    
-                    # Пропускаем транзакции без временной метки
-                    if not tx_date:
-                        continue
-                    
-                    # Определяем тип транзакции (входящая или исходящая)
-                    tx_type = None
-                    value = 0
-                    
-                    # Проверяем входы и выходы транзакции
-                    is_sender = False
-                    is_receiver = False
-                    
-                    # Проверяем, является ли адрес отправителем
-                    for input_tx in tx.get("inputs", []):
-                        input_addresses = input_tx.get("addresses", [])
-                        if address in input_addresses:
-                            is_sender = True
-                            break
-                    
-                    # Проверяем, является ли адрес получателем
-                    for output_tx in tx.get("outputs", []):
-                        output_addresses = output_tx.get("addresses", [])
-                        if address in output_addresses:
-                            is_receiver = True
-                            value += output_tx.get("value", 0)
-                    
-                    # Определяем тип транзакции
-                    if is_sender and is_receiver:
-                        # Это может быть самоотправка или сдача
-                        tx_type = TransactionType.OUTGOING
-                    elif is_sender:
-                        tx_type = TransactionType.OUTGOING
-                    elif is_receiver:
-                        tx_type = TransactionType.INCOMING
-                    else:
-                        # Пропускаем транзакции, не связанные с этим адресом
-                        continue
-                    
-                    # Конвертируем сатоши в BTC
-                    value_btc = value / 10**8
-                    
-                    # Определяем адрес контрагента
-                    counterparty_address = ""
-                    if tx_type == TransactionType.OUTGOING:
-                        # Для исходящих транзакций ищем первый адрес получателя, отличный от нашего
-                        for output in tx.get("outputs", []):
-                            for addr in output.get("addresses", []):
-                                if addr != address:
-                                    counterparty_address = addr
-                                    break
-                            if counterparty_address:
-                                break
-                    else:
-                        # Для входящих транзакций ищем первый адрес отправителя
-                        for input_tx in tx.get("inputs", []):
-                            for addr in input_tx.get("addresses", []):
-                                if addr != address:
-                                    counterparty_address = addr
-                                    break
-                            if counterparty_address:
-                                break
-                    
-                    # Создаем объект транзакции
-                    transaction = {
-                        "hash": tx.get("hash", ""),
-                        "from": address if tx_type == TransactionType.OUTGOING else counterparty_address,
-                        "to": counterparty_address if tx_type == TransactionType.OUTGOING else address,
-                        "value": value_btc,
-                        "timestamp": tx_date,
-                        "confirmations": tx.get("confirmations", 0),
-                        "block_number": tx.get("block_height", 0),
-                        "block_hash": tx.get("block_hash", ""),
-                        "fee": tx.get("fees", 0) / 10**8  # Конвертируем сатоши в BTC
-                    }
-                    
-                    transactions.append(transaction)
-                
-                return transactions
-                
-    except Exception as e:
-        logger.error(f"Ошибка при получении транзакций BTC для {address}: {e}")
-        return []
+    transactions = await get_btc_transactions_batch([address], limit)
+    return transactions.get(address, [])
 
 # Binance Smart Chain-specific functions
 async def check_bnb_balance(address: str) -> Optional[float]:
@@ -467,13 +572,13 @@ async def check_bnb_balance(address: str) -> Optional[float]:
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with create_session() as session:
             async with session.get(BSCSCAN_API_URL, params=params) as response:
                 if response.status != 200:
                     logger.error(f"Ошибка API BscScan ({response.status}): {await response.text()}")
                     return None
                 
-                data = await response.json()
+                data = loads(await response.read())
                 
                 if data.get("status") != "1":
                     error_message = data.get("message", "Unknown error")
@@ -490,7 +595,7 @@ async def check_bnb_balance(address: str) -> Optional[float]:
         logger.error(f"Ошибка при получении баланса BNB для {address}: {e}")
         return None
 
-async def get_bnb_transactions(address: str, limit: int = 10) -> List[Dict[str, Any]]:
+async def get_bnb_transactions(address: str, limit: int = 10) -> List[ChainTransaction]:
     """
     Получает список транзакций для Binance Smart Chain-адреса
     
@@ -498,217 +603,481 @@ async def get_bnb_transactions(address: str, limit: int = 10) -> List[Dict[str,
     :param limit: Максимальное количество транзакций
     :return: Список транзакций
     """
+    return await get_explorer_transactions(BlockchainType.BNB, address, limit)
+
+# Token transfers (ERC-20 / BEP-20)
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+# Селекторы функций symbol() и decimals()
+ERC20_SYMBOL_SELECTOR = "0x95d89b41"
+ERC20_DECIMALS_SELECTOR = "0x313ce567"
+
+def get_rpc_url(blockchain_type: BlockchainType) -> Optional[str]:
+    """
+    Возвращает URL JSON-RPC узла для блокчейна, если он настроен
+    
+    :param blockchain_type: Тип блокчейна
+    :return: URL узла или None
+    """
+    return RPC_URLS.get(blockchain_type)
+
+async def rpc_batch(url: str, calls: List[tuple]) -> List[Any]:
+    """
+    Выполняет пакет JSON-RPC вызовов одним HTTP-запросом
+    
+    :param url: URL JSON-RPC узла
+    :param calls: Список пар (метод, параметры)
+    :return: Список результатов в порядке вызовов (None для неудачных вызовов)
+    """
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    results = [None] * len(calls)
+    
+    if not calls:
+        return results
+    
+    async with create_session() as session:
+        async with session.post(url, json=payload) as response:
+            if response.status != 200:
+                logger.error(f"Ошибка JSON-RPC ({response.status}): {await response.text()}")
+                return results
+            
+            data = loads(await response.read())
+    
+    for item in data if isinstance(data, list) else [data]:
+        if item.get("error"):
+            logger.error(f"Ошибка JSON-RPC: {item['error']}")
+            continue
+        
+        if isinstance(item.get("id"), int) and 0 <= item["id"] < len(results):
+            results[item["id"]] = item.get("result")
+    
+    return results
+
+async def get_block_number(blockchain_type: BlockchainType) -> Optional[int]:
+    """
+    Получает номер последнего блока сети
+    
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :return: Номер блока или None в случае ошибки
+    """
+    try:
+        rpc_url = get_rpc_url(blockchain_type)
+        
+        if rpc_url:
+            result, = await rpc_batch(rpc_url, [("eth_blockNumber", [])])
+            return int(result, 16) if result else None
+        
+        api_url, api_key, provider = EXPLORER_APIS[blockchain_type]
+        params = {
+            "module": "proxy",
+            "action": "eth_blockNumber",
+            "apikey": api_key
+        }
+        
+        async with create_session() as session:
+            async with session.get(api_url, params=params) as response:
+                if response.status != 200:
+                    logger.error(f"Ошибка API {provider} ({response.status}): {await response.text()}")
+                    return None
+                
+                data = loads(await response.read())
+                return int(data["result"], 16)
+    
+    except Exception as e:
+        logger.error(f"Ошибка при получении номера блока ({blockchain_type.value}): {e}")
+        return None
+
+async def get_token_transfers(blockchain_type: BlockchainType, address: str, limit: int = 10) -> List[ChainTransaction]:
+    """
+    Получает переводы токенов для адреса через API обозревателя (tokentx)
+    
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :param address: Адрес кошелька
+    :param limit: Максимальное количество переводов
+    :return: Список переводов токенов
+    """
+    if blockchain_type not in EXPLORER_APIS:
+        return []
+    
+    api_url, api_key, provider = EXPLORER_APIS[blockchain_type]
+    # Ошибки провайдера повторяются для каждого кошелька, поэтому их частота ограничивается
+    log_context = {"hot_path": "provider.error", "provider": provider, "chain": blockchain_type.value}
     params = {
         "module": "account",
-        "action": "txlist",
+        "action": "tokentx",
         "address": address,
-        "startblock": "0",
-        "endblock": "99999999",
         "page": "1",
-        "offset": str(min(limit, 100)),  # Максимум 100 транзакций
-        "sort": "desc",  # От новых к старым
-        "apikey": BSCSCAN_API_KEY
+        "offset": str(min(limit, 100)),
+        "sort": "desc",
+        "apikey": api_key
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(BSCSCAN_API_URL, params=params) as response:
+        async with create_session() as session:
+            async with session.get(api_url, params=params) as response:
                 if response.status != 200:
-                    logger.error(f"Ошибка API BscScan ({response.status}): {await response.text()}")
+                    logger.error(f"Ошибка API {provider} ({response.status}): {await response.text()}", extra=log_context)
                     return []
                 
-                data = await response.json()
+                data = loads(await response.read())
                 
                 if data.get("status") != "1":
                     error_message = data.get("message", "Unknown error")
                     
-                    # Если транзакций нет, это не ошибка
+                    # Если переводов нет, это не ошибка
                     if "No transactions found" in error_message:
                         return []
                     
-                    logger.error(f"Ошибка API BscScan: {error_message}")
+                    logger.error(f"Ошибка API {provider}: {error_message}", extra=log_context)
                     return []
                 
-                transactions = data.get("result", [])
-                formatted_transactions = []
-                
-                for tx in transactions[:limit]:
-                    # Convert timestamp to datetime
-                    timestamp = datetime.fromtimestamp(int(tx.get("timeStamp", 0)))
-                    
-                    # Convert value from wei to BNB
-                    value_wei = int(tx.get("value", "0"))
-                    value_bnb = value_wei / 10**18
-                    
-                    formatted_tx = {
-                        "hash": tx.get("hash"),
-                        "from": tx.get("from"),
-                        "to": tx.get("to"),
-                        "value": value_bnb,
-                        "timestamp": timestamp,
-                        "confirmations": int(tx.get("confirmations", 0)),
-                        "block_number": int(tx.get("blockNumber", 0)),
-                        "block_hash": tx.get("blockHash"),
-                        "gas": int(tx.get("gas", 0)),
-                        "gas_price": int(tx.get("gasPrice", 0)) / 10**9,  # Convert wei to gwei
-                        "is_error": tx.get("isError") == "1"
-                    }
-                    
-                    formatted_transactions.append(formatted_tx)
-                
-                return formatted_transactions
+                items = data.get("result", [])[:limit]
+                return number_repeated_transfers(
+                    [decode_token_transfer(tx, address, blockchain_type) for tx in items],
+                    [log_position(tx) for tx in items]
+                )
     
     except Exception as e:
-        logger.error(f"Ошибка при получении транзакций BNB для {address}: {e}")
+        logger.error(f"Ошибка при получении переводов токенов {blockchain_type.value} для {address}: {e}", extra=log_context)
         return []
 
-async def get_latest_transactions(address: str, blockchain_type: BlockchainType, limit: int = 5) -> List[Transaction]:
+async def get_token_transfer_logs(blockchain_type: BlockchainType, addresses: List[str], from_block: int, to_block: int) -> Optional[Dict[str, List[ChainTransaction]]]:
     """
-    Получает последние транзакции для указанного адреса кошелька.
+    Получает переводы токенов для множества адресов через eth_getLogs
     
-    Args:
-        address: Адрес кошелька
-        blockchain_type: Тип блокчейна
-        limit: Количество транзакций для получения
+    Для всего набора адресов используется один фильтр по топику Transfer
+    (отправитель или получатель), все диапазоны блоков передаются одним пакетом JSON-RPC.
     
-    Returns:
-        Список объектов Transaction с информацией о транзакциях
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :param addresses: Список отслеживаемых адресов
+    :param from_block: Начальный блок (включительно)
+    :param to_block: Конечный блок (включительно)
+    :return: Словарь {адрес в нижнем регистре: список переводов} или None в случае ошибки
     """
-    logger.info(f"Получение {limit} последних транзакций для {address} ({blockchain_type.value})")
+    rpc_url = get_rpc_url(blockchain_type)
+    watched = {address.lower() for address in addresses}
+    
+    if not rpc_url or not watched or from_block > to_block:
+        return {}
+    
+    # Адреса в топиках дополняются нулями до 32 байт
+    padded = ["0x" + "0" * 24 + address[2:] for address in sorted(watched)]
+    
+    calls = []
+    for start in range(from_block, to_block + 1, TOKEN_LOG_BLOCK_RANGE):
+        block_filter = {
+            "fromBlock": hex(start),
+            "toBlock": hex(min(start + TOKEN_LOG_BLOCK_RANGE - 1, to_block))
+        }
+        calls.append(("eth_getLogs", [{**block_filter, "topics": [TRANSFER_TOPIC, padded]}]))
+        calls.append(("eth_getLogs", [{**block_filter, "topics": [TRANSFER_TOPIC, None, padded]}]))
+    
+    try:
+        results = await rpc_batch(rpc_url, calls)
+        
+        if any(result is None for result in results):
+            logger.error(f"Не удалось получить логи переводов токенов {blockchain_type.value} для блоков {from_block}-{to_block}")
+            return None
+        
+        # Исходящие и входящие фильтры могут вернуть один и тот же лог
+        logs = {}
+        for result in results:
+            for log in result:
+                # У ERC-721 Transfer четыре топика (tokenId индексирован) - такие логи пропускаем
+                if len(log.get("topics", [])) == 3 and not log.get("removed"):
+                    logs[(log["transactionHash"], log["logIndex"])] = log
+        
+        # Временные метки блоков запрашиваем одним пакетом
+        block_numbers = sorted({log["blockNumber"] for log in logs.values()})
+        blocks = await rpc_batch(rpc_url, [("eth_getBlockByNumber", [number, False]) for number in block_numbers])
+        timestamps = {
+            number: datetime.utcfromtimestamp(int(block["timestamp"], 16))
+            for number, block in zip(block_numbers, blocks) if block
+        }
+        
+        transfers: Dict[str, List[ChainTransaction]] = {address: [] for address in watched}
+        
+        # Логи в порядке цепочки: одинаковые переводы транзакции нумеруются по порядку логов
+        ordered = sorted(logs.values(), key=lambda log: (int(log["blockNumber"], 16), log_position(log)))
+        for log in ordered:
+            participants = {"0x" + log["topics"][1][-40:], "0x" + log["topics"][2][-40:]}
+            
+            for address in participants & watched:
+                transfers[address].append(
+                    decode_transfer_log(log, address, blockchain_type, timestamps.get(log["blockNumber"]), to_block)
+                )
+        
+        # От новых к старым, как и в ответах обозревателей
+        for address, address_transfers in transfers.items():
+            numbered = number_repeated_transfers(address_transfers)
+            numbered.sort(key=lambda tx: tx.block_number, reverse=True)
+            transfers[address] = numbered
+        
+        return transfers
+    
+    except Exception as e:
+        logger.error(f"Ошибка при получении логов переводов токенов {blockchain_type.value}: {e}")
+        return None
+
+def _decode_abi_string(result: Optional[str]) -> Optional[str]:
+    """Декодирует строку ABI (string или bytes32) из результата eth_call"""
+    if not result or result == "0x":
+        return None
+    
+    raw = bytes.fromhex(result[2:])
+    
+    # Динамическая строка: смещение, длина, данные
+    if len(raw) >= 64 and int.from_bytes(raw[:32], "big") == 32:
+        length = int.from_bytes(raw[32:64], "big")
+        return raw[64:64 + length].decode("utf-8", "ignore") or None
+    
+    # Некоторые старые токены возвращают bytes32
+    return raw.rstrip(b"\x00").decode("utf-8", "ignore") or None
+
+async def fetch_token_metadata(blockchain_type: BlockchainType, contracts: List[str]) -> Dict[str, tuple]:
+    """
+    Запрашивает symbol() и decimals() контрактов токенов одним пакетом JSON-RPC
+    
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :param contracts: Адреса контрактов
+    :return: Словарь {адрес контракта: (символ, decimals)} для успешно прочитанных контрактов
+    """
+    rpc_url = get_rpc_url(blockchain_type)
+    if not rpc_url or not contracts:
+        return {}
+    
+    calls = []
+    for contract in contracts:
+        calls.append(("eth_call", [{"to": contract, "data": ERC20_SYMBOL_SELECTOR}, "latest"]))
+        calls.append(("eth_call", [{"to": contract, "data": ERC20_DECIMALS_SELECTOR}, "latest"]))
+    
+    try:
+        results = await rpc_batch(rpc_url, calls)
+    except Exception as e:
+        logger.error(f"Ошибка при получении метаданных токенов {blockchain_type.value}: {e}")
+        return {}
     
-    if blockchain_type == BlockchainType.ETH:
+    metadata = {}
+    for i, contract in enumerate(contracts):
+        symbol_result, decimals_result = results[2 * i], results[2 * i + 1]
+        
+        if not decimals_result or decimals_result == "0x":
+            continue
+        
         try:
-            api_key = os.getenv("ETHERSCAN_API_KEY")
-            if not api_key:
-                logger.error("ETHERSCAN_API_KEY не найден в переменных окружения")
-                return []
+            metadata[contract] = (_decode_abi_string(symbol_result), int(decimals_result, 16))
+        except ValueError as e:
+            logger.warning(f"Некорректные метаданные токена {contract}: {e}")
+    
+    return metadata
+
+# Chain head and block hashes (confirmation tracking)
+async def get_chain_height(blockchain_type: BlockchainType) -> Optional[int]:
+    """
+    Получает высоту последнего блока сети
+    
+    :param blockchain_type: Тип блокчейна (ETH, BTC, BNB)
+    :return: Высота блока или None в случае ошибки
+    """
+    if blockchain_type != BlockchainType.BTC:
+        return await get_block_number(blockchain_type)
+    
+    params = {"token": BLOCKCYPHER_API_KEY} if BLOCKCYPHER_API_KEY else {}
+    
+    try:
+        async with create_session() as session:
+            async with session.get(BLOCKCYPHER_API_URL, params=params) as response:
+                if response.status != 200:
+                    logger.error(f"Ошибка API BlockCypher ({response.status}): {await response.text()}")
+                    return None
                 
-            # Формируем URL для API Etherscan
-            base_url = "https://api.etherscan.io/api"
-            
-            # Получаем транзакции, где адрес является отправителем
-            params = {
-                "module": "account",
-                "action": "txlist",
-                "address": address,
-                "startblock": 0,
-                "endblock": 99999999,
-                "page": 1,
-                "offset": limit,
-                "sort": "desc",
-                "apikey": api_key
-            }
+                data = loads(await response.read())
+                return int(data["height"])
+    
+    except Exception as e:
+        logger.error(f"Ошибка при получении высоты блокчейна BTC: {e}")
+        return None
+
+async def get_block_hashes(blockchain_type: BlockchainType, heights: List[int]) -> Dict[int, str]:
+    """
+    Получает хеши канонических блоков для набора высот пакетным запросом
+    
+    Для BTC используются пакетные запросы BlockCypher (высоты через ';'), для ETH и BNB -
+    пакет JSON-RPC eth_getBlockByNumber, а без настроенного узла - прокси обозревателя.
+    
+    :param blockchain_type: Тип блокчейна (ETH, BTC, BNB)
+    :param heights: Высоты блоков
+    :return: Словарь {высота: хеш блока} для успешно полученных блоков
+    """
+    heights = sorted(set(heights))
+    hashes: Dict[int, str] = {}
+    
+    if not heights:
+        return hashes
+    
+    try:
+        if blockchain_type == BlockchainType.BTC:
+            params = {"token": BLOCKCYPHER_API_KEY} if BLOCKCYPHER_API_KEY else {}
             
-            async with ClientSession() as session:
-                async with session.get(base_url, params=params) as response:
-                    if response.status != 200:
-                        logger.error(f"Ошибка API Etherscan: {response.status}")
-                        return []
-                    
-                    data = await response.json()
-                    
-                    if data["status"] != "1":
-                        logger.error(f"Ошибка API Etherscan: {data.get('message', 'Неизвестная ошибка')}")
-                        return []
-                    
-                    transactions = []
+            async with create_session() as session:
+                for batch in _chunked([str(height) for height in heights], BLOCKCYPHER_BATCH_SIZE):
+                    url = f"{BLOCKCYPHER_API_URL}/blocks/{';'.join(batch)}"
                     
-                    # Обрабатываем каждую транзакцию
-                    for tx in data["result"][:limit]:
-                        # Конвертируем временную метку из строки в число
-                        timestamp = int(tx.get("timeStamp", 0)) if tx.get("timeStamp") else 0
-                        
-                        # Пропускаем транзакции без временной метки
-                        if timestamp == 0:
+                    async with session.get(url, params={**params, "limit": 1}) as response:
+                        if response.status != 200:
+                            logger.error(f"Ошибка API BlockCypher ({response.status}): {await response.text()}")
                             continue
-                            
-                        tx_date = datetime.fromtimestamp(timestamp) if timestamp else None
                         
-                        # Пропускаем, если дата не определена
-                        if not tx_date:
-                            continue
-                        
-                        # Конвертируем значение из Wei в Ether
-                        value_wei = int(tx.get("value", "0"))
-                        value_eth = value_wei / 10**18
-                        
-                        # Определяем тип транзакции (входящая или исходящая)
-                        tx_type = TransactionType.OUTGOING if tx.get("from", "").lower() == address.lower() else TransactionType.INCOMING
-                        
-                        # Создаем объект транзакции
-                        transaction = Transaction(
-                            txid=tx.get("hash", ""),
-                            date=tx_date,
-                            amount=value_eth,
-                            fee=float(tx.get("gasPrice", 0)) * float(tx.get("gasUsed", 0)) / 10**18,
-                            confirmations=int(tx.get("confirmations", 0)) if tx.get("confirmations") else 0,
-                            type=tx_type,
-                            address=tx.get("to" if tx_type == TransactionType.OUTGOING else "from", ""),
-                            blockchain_type=blockchain_type
-                        )
-                        
-                        transactions.append(transaction)
+                        data = loads(await response.read())
                     
-                    return transactions
-                        
-        except Exception as e:
-            logger.error(f"Ошибка при получении транзакций ETH: {e}")
-            return []
+                    for block in data if isinstance(data, list) else [data]:
+                        if block.get("hash") and block.get("height") is not None:
+                            hashes[int(block["height"])] = block["hash"]
             
-    elif blockchain_type == BlockchainType.BTC:
-        try:
-            # Получаем транзакции через BlockCypher API
-            raw_transactions = await get_btc_transactions(address, limit)
-            
-            if not raw_transactions:
-                return []
-            
-            transactions = []
+            return hashes
+        
+        rpc_url = get_rpc_url(blockchain_type)
+        
+        if rpc_url:
+            blocks = await rpc_batch(rpc_url, [("eth_getBlockByNumber", [hex(height), False]) for height in heights])
+        else:
+            # У обозревателей нет пакетного режима - запрашиваем высоты параллельно
+            api_url, api_key, provider = EXPLORER_APIS[blockchain_type]
             
-            # Преобразуем сырые данные транзакций в объекты Transaction
-            for tx in raw_transactions:
-                # Получаем дату транзакции
-                tx_date = tx.get("timestamp")
-                if not isinstance(tx_date, datetime):
-                    continue
-                
-                # Получаем сумму транзакции
-                value_btc = tx.get("value", 0)
-                
-                # Определяем тип транзакции
-                from_address = tx.get("from", "")
-                to_address = tx.get("to", "")
-                
-                if from_address.lower() == address.lower():
-                    tx_type = TransactionType.OUTGOING
-                    counterparty_address = to_address
-                else:
-                    tx_type = TransactionType.INCOMING
-                    counterparty_address = from_address
-                
-                # Создаем объект транзакции
-                transaction = Transaction(
-                    txid=tx.get("hash", ""),
-                    date=tx_date,
-                    amount=value_btc,
-                    fee=tx.get("fee", 0),
-                    confirmations=tx.get("confirmations", 0),
-                    type=tx_type,
-                    address=counterparty_address,
-                    blockchain_type=blockchain_type
-                )
+            async with create_session() as session:
+                async def fetch_block(height: int) -> Optional[Dict[str, Any]]:
+                    params = {
+                        "module": "proxy",
+                        "action": "eth_getBlockByNumber",
+                        "tag": hex(height),
+                        "boolean": "false",
+                        "apikey": api_key
+                    }
+                    async with session.get(api_url, params=params) as response:
+                        if response.status != 200:
+                            logger.error(f"Ошибка API {provider} ({response.status}): {await response.text()}")
+                            return None
+                        
+                        data = loads(await response.read())
+                        return data.get("result") if isinstance(data.get("result"), dict) else None
                 
-                transactions.append(transaction)
-            
-            return transactions
-            
-        except Exception as e:
-            logger.error(f"Ошибка при получении транзакций BTC: {e}")
-            return []
-            
-    elif blockchain_type == BlockchainType.BNB:
-        # Заглушка для BNB
-        logger.warning("Получение транзакций для BNB пока не реализовано")
-        return []
+                blocks = await asyncio.gather(*[fetch_block(height) for height in heights])
         
-    return [] 
\ No newline at end of file
+        for height, block in zip(heights, blocks):
+            if block and block.get("hash"):
+                hashes[height] = block["hash"]
+    
+    except Exception as e:
+        logger.error(f"Ошибка при получении хешей блоков ({blockchain_type.value}): {e}")
+    
+    return hashes
+
+# Загрузка полной истории адреса страницами (services/backfill.py)
+BLOCKCYPHER_HISTORY_PAGE_SIZE = 50  # предел limit у BlockCypher /addrs/{address}/full
+
+async def get_explorer_history_page(blockchain_type: BlockchainType, address: str, action: str, end_block: Optional[int], page_size: int) -> Optional[List[ChainTransaction]]:
+    """
+    Получает страницу истории адреса у обозревателя в стиле Etherscan
+
+    Страница ограничивается блоком сверху, а не номером: обозреватели не отдают
+    больше 10000 записей по номеру страницы, а граница по блоку работает для
+    адресов с любой длиной истории.
+
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :param address: Адрес кошелька
+    :param action: "txlist" (транзакции) или "tokentx" (переводы токенов)
+    :param end_block: Наибольший блок страницы (включительно); None - вершина цепочки
+    :param page_size: Размер страницы (не более 10000)
+    :return: Транзакции от новых к старым или None в случае ошибки
+    """
+    api_url, api_key, provider = EXPLORER_APIS[blockchain_type]
+    log_context = {"hot_path": "provider.error", "provider": provider, "chain": blockchain_type.value}
+    params = {
+        "module": "account",
+        "action": action,
+        "address": address,
+        "startblock": "0",
+        "endblock": str(end_block if end_block is not None else 99999999),
+        "page": "1",
+        "offset": str(page_size),
+        "sort": "desc",
+        "apikey": api_key
+    }
+    decode = decode_explorer_tx if action == "txlist" else decode_token_transfer
+
+    try:
+        async with create_session() as session:
+            async with session.get(api_url, params=params) as response:
+                if response.status != 200:
+                    logger.error(f"Ошибка API {provider} ({response.status}): {await response.text()}", extra=log_context)
+                    return None
+
+                data = loads(await response.read())
+
+        if data.get("status") != "1":
+            error_message = data.get("message", "Unknown error")
+
+            # История закончилась
+            if "No transactions found" in error_message:
+                return []
+
+            logger.error(f"Ошибка API {provider}: {error_message}", extra=log_context)
+            return None
+
+        items = data.get("result", [])
+        decoded = [decode(tx, address, blockchain_type) for tx in items]
+        if action == "tokentx":
+            decoded = number_repeated_transfers(decoded, [log_position(tx) for tx in items])
+        return decoded
+
+    except Exception as e:
+        logger.error(f"Ошибка при получении истории {blockchain_type.value} для {address}: {e}", extra=log_context)
+        return None
+
+async def get_btc_history_page(address: str, end_block: Optional[int], page_size: int = BLOCKCYPHER_HISTORY_PAGE_SIZE) -> Optional[Tuple[List[ChainTransaction], Optional[int]]]:
+    """
+    Получает страницу истории Bitcoin-адреса у BlockCypher
+
+    :param address: Bitcoin-адрес
+    :param end_block: Наибольший блок страницы (включительно); None - вершина цепочки
+    :param page_size: Размер страницы
+    :return: (транзакции от новых к старым, общее число транзакций адреса) или None в случае ошибки
+    """
+    params: Dict[str, Any] = {"limit": min(page_size, BLOCKCYPHER_HISTORY_PAGE_SIZE)}
+    if end_block is not None:
+        params["before"] = end_block + 1  # before у BlockCypher не включает границу
+
+    try:
+        async with create_session() as session:
+            items = await _fetch_blockcypher_batch(session, [address], "full", params)
+
+        if not items:
+            return None
+
+        item = items[0]
+        transactions = [tx for tx in (decode_blockcypher_tx(raw, address) for raw in item.get("txs", [])) if tx]
+        return transactions, item.get("n_tx")
+
+    except Exception as e:
+        logger.error(f"Ошибка при получении истории BTC для {address}: {e}")
+        return None
+
+async def get_latest_transactions(address: str, blockchain_type: BlockchainType, limit: int = 5) -> List[ChainTransaction]:
+    """
+    Получает последние транзакции для указанного адреса кошелька.
+    
+    Args:
+        address: Адрес кошелька
+        blockchain_type: Тип блокчейна
+        limit: Количество транзакций для получения
+    
+    Returns:
+        Список нормализованных транзакций (ChainTransaction)
+    """
+    logger.info(f"Получение {limit} последних транзакций для {address} ({blockchain_type.value})")
+    
+    return await get_transactions(blockchain_type, address, limit)
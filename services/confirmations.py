@@ -0,0 +1,234 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_
+from sqlalchemy.future import select
+
+from config import CONFIRMATION_OPTIONS, CONFIRMATION_THRESHOLDS, ORPHAN_GRACE_DEPTH, PENDING_TX_TIMEOUT, REORG_WATCH_DEPTH
+from models.transaction import Transaction, TransactionStatus
+from models.wallet import Wallet, BlockchainType, ChainTransaction
+from services.blockchain import get_chain_height, get_block_hashes
+from services.metrics import NOTIFICATION_QUEUE_DEPTH
+from services.rollups import remove_from_rollup
+from utils.notifications import send_transaction_notification, send_transaction_correction
+
+logger = logging.getLogger(__name__)
+
+# Состояния, которые еще отслеживаются на каждом цикле мониторинга
+PENDING_STATUSES = (TransactionStatus.seen, TransactionStatus.confirmed)
+
+# Уведомленные окончательные транзакции проверяются на реорганизацию, пока у них
+# меньше порог + REORG_WATCH_DEPTH подтверждений; в запросе используется наибольший
+# возможный порог, точная граница для кошелька проверяется в is_reorg_watched
+MAX_WATCH_CONFIRMATIONS = max(CONFIRMATION_OPTIONS + list(CONFIRMATION_THRESHOLDS.values())) + REORG_WATCH_DEPTH
+
+def get_confirmation_threshold(wallet) -> int:
+    """
+    Возвращает порог подтверждений для уведомления по кошельку
+
+    :param wallet: Объект кошелька
+    :return: Порог, выбранный пользователем, или значение по умолчанию для блокчейна
+    """
+    if wallet.confirmation_threshold is not None:
+        return wallet.confirmation_threshold
+
+    return CONFIRMATION_THRESHOLDS.get(wallet.blockchain_type.value, 1)
+
+def apply_confirmations(transaction: Transaction, confirmations: int, threshold: int) -> TransactionStatus:
+    """
+    Переводит транзакцию в состояние, соответствующее числу подтверждений
+
+    :param transaction: Транзакция
+    :param confirmations: Текущее число подтверждений
+    :param threshold: Порог окончательности
+    :return: Новое состояние транзакции
+    """
+    transaction.confirmations = max(confirmations, 0)
+
+    if transaction.confirmations >= threshold:
+        transaction.status = TransactionStatus.final
+    elif transaction.confirmations > 0:
+        transaction.status = TransactionStatus.confirmed
+    else:
+        transaction.status = TransactionStatus.seen
+
+    return transaction.status
+
+def is_reorg_watched(transaction: Transaction, threshold: int) -> bool:
+    """
+    Проверяет, отслеживается ли окончательная транзакция на реорганизацию
+
+    :param transaction: Транзакция в состоянии final
+    :param threshold: Порог окончательности кошелька
+    :return: True, если о транзакции уведомили и она еще не ушла на REORG_WATCH_DEPTH блоков за порог
+    """
+    return bool(transaction.notification_sent) and transaction.confirmations < threshold + REORG_WATCH_DEPTH
+
+def refresh_block_position(transaction: Transaction, tx: ChainTransaction) -> bool:
+    """
+    Обновляет блок уже сохраненной транзакции по свежим данным провайдера
+
+    Транзакция могла попасть в блок после первого обнаружения или быть
+    повторно включена в другой блок после реорганизации.
+
+    :param transaction: Сохраненная транзакция
+    :param tx: Транзакция от провайдера
+    :return: True, если позиция транзакции изменилась
+    """
+    block_number = tx.block_number
+    block_hash = tx.block_hash
+
+    # Окончательные транзакции уточняют блок, пока отслеживаются на реорганизацию
+    # (например, уведомление с порогом 0 отправлено до включения в блок)
+    if transaction.status == TransactionStatus.final:
+        if not transaction.notification_sent or transaction.confirmations >= MAX_WATCH_CONFIRMATIONS:
+            return False
+    elif transaction.status not in PENDING_STATUSES and transaction.status != TransactionStatus.orphaned:
+        return False
+
+    if not block_number or (transaction.block_number == block_number and transaction.block_hash == block_hash):
+        return False
+
+    transaction.block_number = block_number
+    transaction.block_hash = block_hash
+
+    # Транзакция снова в канонической цепочке и продвигается по подтверждениям заново
+    if transaction.status == TransactionStatus.orphaned:
+        if transaction.orphaned_at_height is None:
+            # Исправление уже отправлено: о повторном включении уведомим после подтверждения
+            transaction.notification_sent = False
+        transaction.status = TransactionStatus.seen
+        transaction.orphaned_at_height = None
+
+    return True
+
+async def orphan_transaction(session, transaction: Transaction, wallet, head: int) -> None:
+    """
+    Отмечает транзакцию исключенной из цепочки; сессия не фиксируется
+
+    Исправление не отправляется сразу: транзакция ожидает повторного включения
+    ORPHAN_GRACE_DEPTH блоков (мониторинг запрашивает ее снова, get_unmined_transactions).
+
+    :param session: Сессия базы данных
+    :param transaction: Транзакция
+    :param wallet: Кошелек транзакции
+    :param head: Текущая высота цепочки
+    """
+    transaction.status = TransactionStatus.orphaned
+    transaction.orphaned_at_height = head
+    await remove_from_rollup(session, wallet, transaction)
+
+async def advance_pending_transactions(bot, session, languages: Optional[Dict[int, str]] = None) -> None:
+    """
+    Продвигает незавершенные транзакции по текущей высоте цепочки
+
+    Для каждого блокчейна выполняется один запрос высоты и один пакетный запрос хешей
+    блоков, в которых находятся незавершенные транзакции; сами транзакции повторно не
+    запрашиваются. Транзакции, достигшие порога, уведомляются. Уведомленные транзакции
+    проверяются еще REORG_WATCH_DEPTH блоков после порога. Транзакция из отброшенного
+    блока ожидает повторного включения ORPHAN_GRACE_DEPTH блоков; если она так и не
+    попала в цепочку, пользователь получает сообщение-исправление. Загруженные из истории
+    транзакции (is_historical) только продвигаются, без уведомлений.
+
+    :param bot: Объект бота
+    :param session: Сессия базы данных
+    :param languages: Языки пользователей для текста уведомлений (get_user_languages)
+    """
+    result = await session.execute(
+        select(Transaction, Wallet)
+        .join(Wallet, Transaction.wallet_id == Wallet.id)
+        .where(or_(
+            Transaction.status.in_(PENDING_STATUSES),
+            and_(
+                Transaction.status == TransactionStatus.final,
+                Transaction.notification_sent.is_(True),
+                Transaction.confirmations < MAX_WATCH_CONFIRMATIONS
+            ),
+            and_(
+                Transaction.status == TransactionStatus.orphaned,
+                Transaction.orphaned_at_height.is_not(None)
+            )
+        ))
+    )
+    rows = result.all()
+
+    if not rows:
+        return
+
+    by_chain: Dict[BlockchainType, List[Tuple[Transaction, Wallet]]] = {}
+    for transaction, wallet in rows:
+        by_chain.setdefault(wallet.blockchain_type, []).append((transaction, wallet))
+
+    now = datetime.utcnow()
+    notifications = []
+    corrections = []
+
+    for blockchain_type, items in by_chain.items():
+        head = await get_chain_height(blockchain_type)
+        if head is None:
+            continue
+
+        canonical = await get_block_hashes(
+            blockchain_type,
+            [
+                transaction.block_number for transaction, _ in items
+                if transaction.block_number and transaction.block_hash and transaction.status != TransactionStatus.orphaned
+            ]
+        )
+
+        for transaction, wallet in items:
+            if transaction.status == TransactionStatus.orphaned:
+                # Повторно не включена за ORPHAN_GRACE_DEPTH блоков: исключение окончательно
+                if head - transaction.orphaned_at_height >= ORPHAN_GRACE_DEPTH:
+                    transaction.orphaned_at_height = None
+                    if transaction.notification_sent:
+                        corrections.append((transaction, wallet))
+                continue
+
+            threshold = get_confirmation_threshold(wallet)
+            if transaction.status == TransactionStatus.final and not is_reorg_watched(transaction, threshold):
+                # Ушла за глубину проверки: перестанет загружаться, когда число подтверждений
+                # превысит MAX_WATCH_CONFIRMATIONS
+                if transaction.block_number:
+                    transaction.confirmations = max(head - transaction.block_number + 1, 0)
+                continue
+
+            if not transaction.block_number:
+                # Транзакция еще не включена в блок; слишком долго ожидающие считаем отброшенными
+                if transaction.created_at and (now - transaction.created_at).total_seconds() > PENDING_TX_TIMEOUT:
+                    await orphan_transaction(session, transaction, wallet, head)
+                continue
+
+            canonical_hash = canonical.get(transaction.block_number)
+            if canonical_hash and transaction.block_hash and canonical_hash.lower() != transaction.block_hash.lower():
+                logger.warning(f"Транзакция {transaction.hash} исключена из цепочки ({blockchain_type.value}, блок {transaction.block_number})")
+                await orphan_transaction(session, transaction, wallet, head)
+                continue
+
+            if transaction.status == TransactionStatus.final:
+                # Окончательное состояние не откатывается, обновляется только глубина
+                transaction.confirmations = max(head - transaction.block_number + 1, 0)
+                continue
+
+            status = apply_confirmations(transaction, head - transaction.block_number + 1, threshold)
+            if status == TransactionStatus.final and not transaction.notification_sent and not transaction.is_historical:
+                notifications.append((transaction, wallet))
+
+    await session.commit()
+
+    NOTIFICATION_QUEUE_DEPTH.inc(len(notifications) + len(corrections))
+    languages = languages or {}
+
+    for transaction, wallet in notifications:
+        if await send_transaction_notification(bot, wallet.user_id, transaction, wallet, languages.get(wallet.user_id)):
+            transaction.notification_sent = True
+        NOTIFICATION_QUEUE_DEPTH.dec()
+
+    for transaction, wallet in corrections:
+        await send_transaction_correction(bot, wallet.user_id, transaction, wallet, languages.get(wallet.user_id))
+        NOTIFICATION_QUEUE_DEPTH.dec()
+
+    await session.commit()
+
+    if notifications or corrections:
+        logger.info(f"Подтверждения: {len(notifications)} окончательных, {len(corrections)} исправлений")
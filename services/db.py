@@ -1,8 +1,12 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.future import select
+from sqlalchemy import event, inspect, update
+import asyncio
 import logging
 import os
+import time
+from typing import Dict, Optional
 
 from config import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
 from models.base import Base
@@ -10,10 +14,21 @@ from models.user import User
 from models.wallet import Wallet
 from models.transaction import Transaction
 from models.subscription import Subscription
+from models.token import Token
+from models.price import PriceQuote
+from models.address import Address
+from models.backfill import BackfillJob
+from models.rollup import WalletRollup
+from models.alert import AlertRule
+from models.payment import Payment
+from models.scan_state import TokenScanState
+from services.metrics import DB_COMMIT_SECONDS
+from services.schema import upgrade_schema
+from utils.validation import is_valid_address, validate_addresses
 
 # Формирование строки подключения
 # Для тестирования используем SQLite
-DATABASE_URL = "sqlite+aiosqlite:///crypto_monitor.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///crypto_monitor.db")
 
 # Создаем движок базы данных
 engine = create_async_engine(DATABASE_URL, echo=False)
@@ -27,17 +42,78 @@ async_session = sessionmaker(
 
 logger = logging.getLogger(__name__)
 
+# Размер пакета ID кошельков в запросах UPDATE при проверке сохраненных адресов
+ADDRESS_CHECK_CHUNK = 500
+
+# Измерение длительности фиксации: AsyncSession выполняет commit через синхронную Session,
+# поэтому события before_commit/after_commit охватывают flush и COMMIT
+@event.listens_for(Session, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+@event.listens_for(Session, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+@event.listens_for(Session, "after_rollback")
+def _commit_failed(session):
+    session.info.pop("commit_started", None)
+
 async def init_db():
     """Инициализация базы данных и создание таблиц"""
     try:
         async with engine.begin() as conn:
+            existing_tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
             # Создание всех таблиц, которые еще не существуют
             await conn.run_sync(Base.metadata.create_all)
+            # Таблицы прежних версий дополняются новыми столбцами и индексами
+            changes = await conn.run_sync(upgrade_schema, existing_tables)
+        if changes:
+            logger.info(f"Схема базы данных обновлена: {', '.join(changes)}")
+        await check_stored_addresses()
         logger.info("База данных инициализирована")
     except Exception as e:
         logger.error(f"Ошибка при инициализации базы данных: {e}")
         raise
 
+async def check_stored_addresses() -> int:
+    """
+    Проверяет адреса кошельков, сохраненных до проверки контрольных сумм
+
+    Выполняется при запуске для кошельков без результата проверки (address_valid IS NULL),
+    поэтому каждый адрес проверяется один раз. Кошельки с некорректным адресом помечаются
+    и больше не опрашиваются мониторингом.
+
+    :return: Количество кошельков с некорректным адресом
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(Wallet.id, Wallet.blockchain_type, Wallet.address).where(Wallet.address_valid.is_(None))
+        )
+        rows = result.all()
+        if not rows:
+            return 0
+
+        # Проверка EIP-55 без pycryptodome медленная: выполняется вне цикла событий
+        checks = await asyncio.to_thread(validate_addresses, [(blockchain_type, address) for _, blockchain_type, address in rows])
+
+        valid = [wallet_id for (wallet_id, _, _), ok in zip(rows, checks) if ok]
+        invalid = [(wallet_id, address) for (wallet_id, _, address), ok in zip(rows, checks) if not ok]
+        for wallet_id, address in invalid:
+            logger.warning(f"Кошелек {wallet_id} отключен от мониторинга: некорректный адрес {address}")
+
+        for ids, is_valid in ((valid, True), ([wallet_id for wallet_id, _ in invalid], False)):
+            for start in range(0, len(ids), ADDRESS_CHECK_CHUNK):
+                await session.execute(
+                    update(Wallet).where(Wallet.id.in_(ids[start:start + ADDRESS_CHECK_CHUNK])).values(address_valid=is_valid)
+                )
+        await session.commit()
+
+    logger.info(f"Проверено адресов сохраненных кошельков: {len(rows)}, некорректных: {len(invalid)}")
+    return len(invalid)
+
 async def get_session():
     """Возвращает сессию базы данных"""
     async with async_session() as session:
@@ -69,6 +145,11 @@ async def get_or_create_user(session, user_id, username=None, full_name=None, la
     
     return user
 
+async def get_user_languages(session) -> Dict[int, Optional[str]]:
+    """Возвращает языки пользователей {ID пользователя: language_code} для выбора каталога сообщений"""
+    result = await session.execute(select(User.user_id, User.language_code).where(User.language_code.is_not(None)))
+    return dict(result.all())
+
 # Функции для работы с кошельками
 async def get_user_wallets(session, user_id):
     """Получает список кошельков пользователя"""
@@ -82,12 +163,22 @@ async def get_wallets_count(session, user_id):
     return len(wallets)
 
 async def add_wallet(session, user_id, address, blockchain_type, label=None):
-    """Добавляет новый кошелек для пользователя"""
+    """
+    Добавляет новый кошелек для пользователя
+
+    Адрес проверяется здесь, при записи: мониторинг опрашивает сохраненные адреса без повторной проверки.
+
+    :raises ValueError: Если адрес не прошел проверку контрольной суммы
+    """
+    if not is_valid_address(blockchain_type, address):
+        raise ValueError(f"Некорректный адрес {blockchain_type.value}: {address}")
+
     wallet = Wallet(
         user_id=user_id,
         address=address,
         blockchain_type=blockchain_type,
-        label=label
+        label=label,
+        address_valid=True
     )
     session.add(wallet)
     await session.commit()
@@ -0,0 +1,329 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from models.wallet import BlockchainType, TransactionType, ChainTransaction, NATIVE_DECIMALS
+from utils.jsonstream import loads
+
+# Декодеры ответов провайдеров в ChainTransaction.
+# Функции не выполняют сетевых запросов и используются и мониторингом, и обработчиками.
+
+def _utc(seconds: Any) -> datetime:
+    """Преобразует unix-время в наивный datetime в UTC"""
+    return datetime.utcfromtimestamp(int(seconds or 0))
+
+def transfer_key(token_address: str, from_address: str, to_address: str, raw_value: int) -> str:
+    """
+    Возвращает короткий ключ перевода токена внутри транзакции
+
+    Одна транзакция может содержать несколько переводов, поэтому хеша недостаточно.
+    Ключ не зависит от источника данных (обозреватель или узел). Одинаковые переводы
+    внутри транзакции различаются порядковым номером (number_repeated_transfers).
+    """
+    data = f"{token_address}|{from_address}|{to_address}|{raw_value}".lower()
+    return hashlib.sha1(data.encode()).hexdigest()[:12]
+
+def log_position(item: Dict[str, Any]) -> int:
+    """Номер лога в блоке (logIndex) из ответа узла (hex) или обозревателя (десятичное число); 0, если его нет"""
+    value = item.get("logIndex")
+    if value in (None, ""):
+        return 0
+    return int(value, 16) if str(value).startswith("0x") else int(value)
+
+def number_repeated_transfers(transfers: List[ChainTransaction], positions: Optional[Sequence[Any]] = None) -> List[ChainTransaction]:
+    """
+    Различает одинаковые переводы внутри одной транзакции
+
+    Первый перевод сохраняет ключ transfer_key, n-й повтор получает суффикс "-n" в порядке
+    логов транзакции. Номер в транзакции, в отличие от logIndex, не меняется при повторном
+    включении транзакции в другой блок, а ключи ранее сохраненных переводов остаются прежними.
+
+    :param transfers: Переводы токенов одного адреса
+    :param positions: Позиции логов (например, logIndex) в том же порядке; None - порядок списка
+    :return: Переводы в исходном порядке
+    """
+    order = range(len(transfers)) if positions is None else sorted(range(len(transfers)), key=positions.__getitem__)
+    result = list(transfers)
+    seen: Dict[Tuple[str, Optional[str]], int] = {}
+
+    for index in order:
+        tx = result[index]
+        key = (tx.hash, tx.transfer_key)
+        repeat = seen.get(key, 0)
+        seen[key] = repeat + 1
+        if repeat:
+            result[index] = tx._replace(transfer_key=f"{tx.transfer_key}-{repeat}")
+
+    return result
+
+def decode_explorer_tx(tx: Dict[str, Any], address: str, blockchain_type: BlockchainType) -> ChainTransaction:
+    """
+    Декодирует транзакцию txlist обозревателя в стиле Etherscan (Etherscan, BscScan)
+
+    :param tx: Транзакция из ответа API
+    :param address: Отслеживаемый адрес
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :return: Нормализованная транзакция
+    """
+    from_address = tx.get("from") or ""
+    to_address = tx.get("to") or ""  # пусто при создании контракта
+
+    return ChainTransaction(
+        blockchain_type=blockchain_type,
+        hash=tx.get("hash", ""),
+        address=address,
+        type=TransactionType.OUTGOING if from_address.lower() == address.lower() else TransactionType.INCOMING,
+        from_address=from_address,
+        to_address=to_address,
+        value=int(tx.get("value") or 0),
+        fee=int(tx.get("gasPrice") or 0) * int(tx.get("gasUsed") or 0),
+        decimals=NATIVE_DECIMALS[blockchain_type],
+        timestamp=_utc(tx.get("timeStamp")),
+        block_number=int(tx.get("blockNumber") or 0) or None,
+        block_hash=tx.get("blockHash") or None,
+        confirmations=int(tx.get("confirmations") or 0)
+    )
+
+def decode_token_transfer(tx: Dict[str, Any], address: str, blockchain_type: BlockchainType) -> ChainTransaction:
+    """
+    Декодирует перевод токена из ответа tokentx обозревателя
+
+    :param tx: Перевод из ответа API
+    :param address: Отслеживаемый адрес
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :return: Нормализованная транзакция
+    """
+    token_address = (tx.get("contractAddress") or "").lower()
+    from_address = tx.get("from") or ""
+    to_address = tx.get("to") or ""
+    value = int(tx.get("value") or 0)
+
+    return ChainTransaction(
+        blockchain_type=blockchain_type,
+        hash=tx.get("hash", ""),
+        address=address,
+        type=TransactionType.OUTGOING if from_address.lower() == address.lower() else TransactionType.INCOMING,
+        from_address=from_address,
+        to_address=to_address,
+        value=value,
+        fee=int(tx.get("gasPrice") or 0) * int(tx.get("gasUsed") or 0),
+        decimals=int(tx["tokenDecimal"]) if tx.get("tokenDecimal") else None,
+        timestamp=_utc(tx.get("timeStamp")),
+        block_number=int(tx.get("blockNumber") or 0) or None,
+        block_hash=tx.get("blockHash") or None,
+        confirmations=int(tx.get("confirmations") or 0),
+        token_address=token_address,
+        token_symbol=tx.get("tokenSymbol") or None,
+        transfer_key=transfer_key(token_address, from_address, to_address, value)
+    )
+
+def decode_transfer_log(
+    log: Dict[str, Any],
+    address: str,
+    blockchain_type: BlockchainType,
+    timestamp: Optional[datetime],
+    head: int
+) -> ChainTransaction:
+    """
+    Декодирует лог ERC-20 Transfer из ответа eth_getLogs
+
+    :param log: Лог из ответа узла (три топика: сигнатура, отправитель, получатель)
+    :param address: Отслеживаемый адрес
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :param timestamp: Время блока
+    :param head: Высота последнего блока для расчета подтверждений
+    :return: Нормализованная транзакция; decimals и символ заполняются по метаданным токена
+    """
+    token_address = log["address"].lower()
+    from_address = "0x" + log["topics"][1][-40:]
+    to_address = "0x" + log["topics"][2][-40:]
+    value = int((log.get("data") or "0x")[2:] or "0", 16)
+    block_number = int(log["blockNumber"], 16)
+
+    return ChainTransaction(
+        blockchain_type=blockchain_type,
+        hash=log["transactionHash"],
+        address=address,
+        type=TransactionType.OUTGOING if from_address == address.lower() else TransactionType.INCOMING,
+        from_address=from_address,
+        to_address=to_address,
+        value=value,
+        fee=0,
+        decimals=None,
+        timestamp=timestamp or datetime.utcnow(),
+        block_number=block_number,
+        block_hash=log.get("blockHash") or None,
+        confirmations=max(head - block_number + 1, 0),
+        token_address=token_address,
+        transfer_key=transfer_key(token_address, from_address, to_address, value)
+    )
+
+def decode_blockcypher_tx(tx: Dict[str, Any], address: str) -> Optional[ChainTransaction]:
+    """
+    Декодирует транзакцию BlockCypher относительно отслеживаемого адреса
+
+    Для входящих транзакций сумма - выходы на адрес, для исходящих - выходы
+    на другие адреса (без сдачи).
+
+    :param tx: Транзакция из ответа BlockCypher
+    :param address: Отслеживаемый Bitcoin-адрес
+    :return: Нормализованная транзакция или None, если транзакция не связана с адресом
+    """
+    inputs = tx.get("inputs", [])
+    outputs = tx.get("outputs", [])
+
+    is_sender = any(address in (part.get("addresses") or []) for part in inputs)
+    received = sum(part.get("value", 0) for part in outputs if address in (part.get("addresses") or []))
+    is_receiver = any(address in (part.get("addresses") or []) for part in outputs)
+
+    # Самоотправка и транзакции со сдачей считаются исходящими
+    if is_sender:
+        tx_type = TransactionType.OUTGOING
+        value = sum(part.get("value", 0) for part in outputs if address not in (part.get("addresses") or []))
+        parts = outputs
+    elif is_receiver:
+        tx_type = TransactionType.INCOMING
+        value = received
+        parts = inputs
+    else:
+        return None
+
+    # Первый получатель для исходящих, первый отправитель для входящих
+    counterparty = next((addr for part in parts for addr in (part.get("addresses") or []) if addr != address), "")
+
+    received_at = tx.get("received")
+    if received_at:
+        timestamp = datetime.fromisoformat(received_at.replace('Z', '+00:00')).replace(tzinfo=None)
+    else:
+        timestamp = datetime.utcnow()
+
+    block_number = tx.get("block_height") or 0
+
+    return ChainTransaction(
+        blockchain_type=BlockchainType.BTC,
+        hash=tx.get("hash", ""),
+        address=address,
+        type=tx_type,
+        from_address=address if tx_type == TransactionType.OUTGOING else counterparty,
+        to_address=counterparty if tx_type == TransactionType.OUTGOING else address,
+        value=value,
+        fee=int(tx.get("fees") or 0),
+        decimals=NATIVE_DECIMALS[BlockchainType.BTC],
+        timestamp=timestamp,
+        block_number=block_number if block_number > 0 else None,  # -1 для неподтвержденных
+        block_hash=tx.get("block_hash") or None,
+        confirmations=int(tx.get("confirmations") or 0)
+    )
+
+def decode_blockchain_info_tx(tx: Dict[str, Any], address: str, latest_height: int = 0) -> Optional[ChainTransaction]:
+    """
+    Декодирует транзакцию blockchain.info (multiaddr) относительно отслеживаемого адреса
+
+    :param tx: Транзакция из ответа blockchain.info
+    :param address: Отслеживаемый Bitcoin-адрес
+    :param latest_height: Высота последнего блока для расчета подтверждений
+    :return: Нормализованная транзакция или None, если транзакция не связана с адресом
+    """
+    inputs = [part.get("prev_out") or {} for part in tx.get("inputs", [])]
+    outputs = tx.get("out", [])
+
+    if any(part.get("addr") == address for part in inputs):
+        tx_type = TransactionType.OUTGOING
+        value = sum(part.get("value", 0) for part in outputs if part.get("addr") != address)
+        parts = outputs
+    elif any(part.get("addr") == address for part in outputs):
+        tx_type = TransactionType.INCOMING
+        value = sum(part.get("value", 0) for part in outputs if part.get("addr") == address)
+        parts = inputs
+    else:
+        return None
+
+    counterparty = next((part["addr"] for part in parts if part.get("addr") and part["addr"] != address), "")
+    block_number = tx.get("block_height") or None
+
+    return ChainTransaction(
+        blockchain_type=BlockchainType.BTC,
+        hash=tx.get("hash", ""),
+        address=address,
+        type=tx_type,
+        from_address=address if tx_type == TransactionType.OUTGOING else counterparty,
+        to_address=counterparty if tx_type == TransactionType.OUTGOING else address,
+        value=value,
+        fee=int(tx.get("fee") or 0),
+        decimals=NATIVE_DECIMALS[BlockchainType.BTC],
+        timestamp=_utc(tx.get("time")),
+        block_number=block_number,
+        block_hash=None,
+        confirmations=latest_height - block_number + 1 if block_number and latest_height >= block_number else 0
+    )
+
+# Декодеры целых ответов: принимают тело ответа в байтах и возвращают компактные
+# ChainTransaction, поэтому могут выполняться в процессах services.offload.
+
+def decode_blockcypher_batch(body: bytes, addresses: List[str], limit: int) -> Dict[str, List[ChainTransaction]]:
+    """
+    Декодирует пакетный ответ BlockCypher /addrs/{...}/full и сопоставляет транзакции адресам
+
+    :param body: Тело ответа
+    :param addresses: Пакет Bitcoin-адресов запроса
+    :param limit: Максимальное количество транзакций на адрес
+    :return: Словарь {адрес: список транзакций} для адресов, присутствующих в ответе
+    """
+    data = loads(body)
+    items = data if isinstance(data, list) else [data]
+    wanted = set(addresses)
+    transactions: Dict[str, List[ChainTransaction]] = {}
+
+    for item in items:
+        # Для одного адреса владелец очевиден, в пакете его указывает поле address
+        address = item.get("address") or (addresses[0] if len(addresses) == 1 else None)
+        if address not in wanted or item.get("error"):
+            continue
+
+        address_transactions = transactions.setdefault(address, [])
+        for tx in item.get("txs") or []:
+            if len(address_transactions) >= limit:
+                break
+            parsed = decode_blockcypher_tx(tx, address)
+            if parsed:
+                address_transactions.append(parsed)
+
+    return transactions
+
+def decode_multiaddr_batch(body: bytes, addresses: List[str], limit: int, page_size: int) -> Tuple[Dict[str, List[ChainTransaction]], List[str]]:
+    """
+    Декодирует ответ blockchain.info multiaddr и распределяет общий список транзакций по адресам
+
+    Ответ ограничен page_size последними транзакциями всего пакета: если страница заполнена,
+    активный адрес может вытеснить остальные. Такие адреса (получено меньше limit транзакций
+    при n_tx больше полученного) возвращаются отдельным списком для повторного запроса.
+
+    :param body: Тело ответа
+    :param addresses: Пакет Bitcoin-адресов запроса
+    :param limit: Максимальное количество транзакций на адрес
+    :param page_size: Количество транзакций, запрошенное для пакета (параметр n)
+    :return: Словарь {адрес: список транзакций} и список адресов, получивших неполный ответ
+    """
+    data = loads(body)
+    latest_height = (data.get("info") or {}).get("latest_block", {}).get("height", 0)
+    transactions: Dict[str, List[ChainTransaction]] = {address: [] for address in addresses}
+    txs = data.get("txs", [])
+
+    for tx in txs:
+        for address in addresses:
+            if len(transactions[address]) >= limit:
+                continue
+
+            parsed = decode_blockchain_info_tx(tx, address, latest_height)
+            if parsed:
+                transactions[address].append(parsed)
+
+    starved = []
+    if len(txs) >= page_size:
+        n_tx = {item.get("address"): int(item.get("n_tx", 0)) for item in data.get("addresses", [])}
+        starved = [
+            address for address in addresses
+            if len(transactions[address]) < min(limit, n_tx.get(address, limit))
+        ]
+
+    return transactions, starved
@@ -0,0 +1,275 @@
+"""
+Выгрузка истории транзакций в файл (/export)
+
+Команда ставит задание в очередь и сразу отвечает пользователю; фоновые
+обработчики выполняют задания по одному. Транзакции читаются из базы данных
+потоком (server-side cursor, пакетами по EXPORT_CHUNK_SIZE) и дописываются
+в сжатый gzip файл CSV или JSONL во временном каталоге, поэтому в памяти
+одновременно находится только один пакет. Готовый файл отправляется
+документом Telegram и удаляется.
+
+Размер выгрузки ограничен числом строк по уровню подписки
+(EXPORT_ROWS_FREE, EXPORT_ROWS_PREMIUM) и пределом размера файла,
+который принимает Telegram. При превышении лимита выгружаются самые
+новые транзакции (в файле они по-прежнему идут от старых к новым).
+"""
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from aiogram.types import FSInputFile
+from sqlalchemy import and_, or_
+from sqlalchemy.future import select
+
+from config import EXPORT_ROWS_FREE, EXPORT_ROWS_PREMIUM, EXPORT_CHUNK_SIZE, EXPORT_QUEUE_SIZE, EXPORT_WORKERS
+from models.transaction import Transaction
+from models.user import User, SubscriptionLevel
+from models.wallet import Wallet
+from services.db import async_session
+from services.metrics import EXPORT_JOBS, EXPORTED_ROWS, EXPORT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+
+# Telegram принимает от бота файлы до 50 МБ; запас - на недописанный буфер gzip
+EXPORT_MAX_BYTES = 48 * 1024 * 1024
+
+# Столбцы выгрузки (транзакция и кошелек)
+EXPORT_FIELDS = (
+    "wallet_id", "chain", "wallet_address", "wallet_label",
+    "hash", "type", "from", "to", "value", "symbol", "token_address", "fee",
+    "timestamp", "block_number", "status", "confirmations", "is_historical"
+)
+
+# Лимит строк выгрузки по уровням подписки
+EXPORT_ROW_LIMITS = {
+    SubscriptionLevel.free: EXPORT_ROWS_FREE,
+    SubscriptionLevel.premium: EXPORT_ROWS_PREMIUM
+}
+
+class ExportJob(NamedTuple):
+    """Задание выгрузки: кто запросил, кому отправить, чью историю и в каком формате"""
+    requester_id: int
+    chat_id: int
+    user_id: int
+    wallet_id: Optional[int]
+    format: str
+
+_queue: Optional[asyncio.Queue] = None
+# Запросившие пользователи с заданием в очереди или в работе: одно задание на пользователя
+_active = set()
+
+def transaction_record(transaction: Transaction) -> Dict[str, Any]:
+    """
+    Запись транзакции для выгрузки и архива (services/retention.py)
+
+    :param transaction: Транзакция
+    :return: Словарь с простыми значениями, пригодный для JSON
+    """
+    return {
+        "tx_id": transaction.tx_id,
+        "wallet_id": transaction.wallet_id,
+        "hash": transaction.hash,
+        "from": transaction.from_address,
+        "to": transaction.to_address,
+        "value": format(transaction.value, "f"),
+        "fee": format(transaction.fee, "f") if transaction.fee is not None else None,
+        "type": transaction.type.value if transaction.type else None,
+        "timestamp": transaction.timestamp.isoformat(),
+        "block_number": transaction.block_number,
+        "block_hash": transaction.block_hash,
+        "token_address": transaction.token_address,
+        "token_symbol": transaction.token_symbol,
+        "status": transaction.status.value if transaction.status else None,
+        "confirmations": transaction.confirmations,
+        "is_historical": transaction.is_historical
+    }
+
+def _export_row(transaction: Transaction, wallet: Wallet) -> Dict[str, Any]:
+    record = transaction_record(transaction)
+    record.update(
+        chain=wallet.blockchain_type.value,
+        wallet_address=wallet.address,
+        wallet_label=wallet.label or "",
+        symbol=record["token_symbol"] or wallet.blockchain_type.value
+    )
+    return {field: record[field] for field in EXPORT_FIELDS}
+
+class _ExportWriter:
+    """Сжатый файл выгрузки; запись выполняется в потоке, чтобы не блокировать цикл событий"""
+
+    def __init__(self, path: str, format: str):
+        self.format = format
+        self._raw = open(path, "wb")
+        self._text = io.TextIOWrapper(gzip.GzipFile(fileobj=self._raw, mode="wb"), encoding="utf-8", newline="")
+        self._csv = None
+        if format == FORMAT_CSV:
+            self._csv = csv.DictWriter(self._text, EXPORT_FIELDS)
+            self._csv.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]) -> int:
+        """Дописывает строки и возвращает текущий размер сжатого файла"""
+        if self._csv is not None:
+            self._csv.writerows(rows)
+        else:
+            self._text.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+        return self._raw.tell()
+
+    def close(self) -> None:
+        self._text.close()
+        self._raw.close()
+
+async def _get_export_wallets(session, job: ExportJob) -> Dict[int, Wallet]:
+    query = select(Wallet).where(Wallet.user_id == job.user_id)
+    if job.wallet_id is not None:
+        query = query.where(Wallet.id == job.wallet_id)
+    result = await session.execute(query)
+    return {wallet.id: wallet for wallet in result.scalars().all()}
+
+async def write_export(session, job: ExportJob, path: str, max_rows: int) -> Tuple[int, bool]:
+    """
+    Записывает историю транзакций задания в файл
+
+    :param session: Сессия базы данных
+    :param job: Задание выгрузки
+    :param path: Путь к файлу
+    :param max_rows: Наибольшее число строк
+    :return: (число строк, выгрузка обрезана по лимиту)
+    """
+    wallets = await _get_export_wallets(session, job)
+    if not wallets:
+        return 0, False
+
+    scope = Transaction.wallet_id.in_(list(wallets))
+    truncated = False
+
+    # Граница лимита: (max_rows + 1)-я транзакция от самой новой. Если она есть,
+    # выгружаются только более новые транзакции
+    boundary = (await session.execute(
+        select(Transaction.timestamp, Transaction.tx_id)
+        .where(scope)
+        .order_by(Transaction.timestamp.desc(), Transaction.tx_id.desc())
+        .offset(max_rows)
+        .limit(1)
+    )).first()
+    if boundary is not None:
+        truncated = True
+        scope = and_(scope, or_(
+            Transaction.timestamp > boundary.timestamp,
+            and_(Transaction.timestamp == boundary.timestamp, Transaction.tx_id > boundary.tx_id)
+        ))
+
+    query = (
+        select(Transaction)
+        .where(scope)
+        .order_by(Transaction.wallet_id, Transaction.timestamp, Transaction.tx_id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+    writer = _ExportWriter(path, job.format)
+    rows = 0
+    try:
+        result = await session.stream(query)
+        async for partition in result.scalars().partitions():
+            size = await asyncio.to_thread(writer.write, [_export_row(tx, wallets[tx.wallet_id]) for tx in partition])
+            rows += len(partition)
+
+            if size >= EXPORT_MAX_BYTES:
+                truncated = True
+                break
+
+        # Закрываем курсор, если чтение остановлено до конца результата
+        await result.close()
+    finally:
+        await asyncio.to_thread(writer.close)
+
+    return rows, truncated
+
+async def run_export_job(bot, job: ExportJob) -> None:
+    """
+    Выполняет задание выгрузки и отправляет файл пользователю
+
+    :param bot: Объект бота
+    :param job: Задание выгрузки
+    """
+    started = time.perf_counter()
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=f".{job.format}.gz")
+    os.close(fd)
+
+    try:
+        async with async_session() as session:
+            user = await session.get(User, job.user_id)
+            level = user.subscription_level if user and user.subscription_level else SubscriptionLevel.free
+            rows, truncated = await write_export(session, job, path, EXPORT_ROW_LIMITS[level])
+
+        if not rows:
+            await bot.send_message(job.chat_id, "📭 Нет транзакций для выгрузки.")
+            EXPORT_JOBS.inc(result="empty")
+            return
+
+        scope = f"wallet{job.wallet_id}" if job.wallet_id else f"user{job.user_id}"
+        filename = f"transactions-{scope}-{datetime.utcnow():%Y%m%d}.{job.format}.gz"
+        caption = f"📦 Выгружено транзакций: {rows}"
+        if truncated:
+            caption += "\n⚠️ Выгрузка обрезана по лимиту вашего тарифа или размеру файла."
+
+        await bot.send_document(job.chat_id, FSInputFile(path, filename=filename), caption=caption)
+
+        EXPORT_JOBS.inc(result="truncated" if truncated else "ok")
+        EXPORTED_ROWS.inc(rows)
+        logger.info(f"Выгрузка {scope}: {rows} транзакций, {os.path.getsize(path)} байт")
+    except Exception as e:
+        EXPORT_JOBS.inc(result="error")
+        logger.error(f"Ошибка при выгрузке истории пользователя {job.user_id}: {e}")
+        try:
+            await bot.send_message(job.chat_id, "❌ Не удалось выполнить выгрузку. Попробуйте позже.")
+        except Exception:
+            pass
+    finally:
+        EXPORT_SECONDS.observe(time.perf_counter() - started)
+        os.remove(path)
+
+def enqueue_export(job: ExportJob) -> Optional[int]:
+    """
+    Ставит задание выгрузки в очередь
+
+    :param job: Задание выгрузки
+    :return: Позиция в очереди (1 - следующее) или None, если у пользователя уже есть
+             задание или очередь заполнена
+    """
+    if _queue is None or job.requester_id in _active:
+        return None
+
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        return None
+
+    _active.add(job.requester_id)
+    return _queue.qsize()
+
+async def _export_worker(bot) -> None:
+    while True:
+        job = await _queue.get()
+        try:
+            await run_export_job(bot, job)
+        finally:
+            _active.discard(job.requester_id)
+            _queue.task_done()
+
+async def start_export_workers(bot):
+    """Запускает обработчики очереди выгрузок в фоновом режиме"""
+    global _queue
+    _queue = asyncio.Queue(maxsize=EXPORT_QUEUE_SIZE)
+    logger.info(f"Запуск выгрузки истории ({EXPORT_WORKERS} обработчиков)")
+    await asyncio.gather(*[_export_worker(bot) for _ in range(EXPORT_WORKERS)])
@@ -0,0 +1,157 @@
+"""
+Фильтры уведомлений о транзакциях
+
+Правила задаются для пользователя (User.notification_settings["filters"])
+и могут быть переопределены для отдельного кошелька (Wallet.alert_filters):
+значения кошелька заменяют одноименные правила пользователя.
+
+Правила:
+    min_value - минимальная сумма в единицах монеты или токена
+    direction - "incoming" или "outgoing" (не задано - оба направления)
+    allow     - уведомлять только о транзакциях с этими адресами
+    deny      - не уведомлять о транзакциях с этими адресами
+    tokens    - уведомлять только о переводах этих токенов (символ или адрес
+                контракта); транзакции монеты блокчейна не затрагиваются
+
+Мониторинг проверяет транзакции до записи в базу данных: отфильтрованные
+транзакции не сохраняются и не уведомляются, поэтому поток пыли на адрес
+биржи не стоит ни записей, ни сообщений Telegram. Правила компилируются
+в предикат один раз и кэшируются по их содержимому.
+"""
+import json
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from models.wallet import ChainTransaction, TransactionType
+
+# Предикат: True - транзакцию нужно сохранить и уведомить
+AlertFilter = Callable[[ChainTransaction], bool]
+
+RULE_NAMES = ("min_value", "direction", "allow", "deny", "tokens")
+DIRECTIONS = {direction.value: direction for direction in TransactionType}
+
+class FilterRuleError(ValueError):
+    """Недопустимое значение правила фильтра"""
+
+def normalize_address(address: Optional[str]) -> str:
+    """Адреса EVM сравниваются без учета регистра, остальные - как есть"""
+    if not address:
+        return ""
+    return address.lower() if address.startswith("0x") else address
+
+def validate_rule(name: str, value: Any) -> Any:
+    """
+    Проверяет и приводит значение правила к хранимому виду
+
+    :param name: Имя правила (RULE_NAMES)
+    :param value: Значение (строка для min_value и direction, список строк для остальных)
+    :return: Значение для сохранения в JSON
+    :raises FilterRuleError: Если правило неизвестно или значение недопустимо
+    """
+    if name == "min_value":
+        try:
+            amount = Decimal(str(value))
+        except InvalidOperation:
+            raise FilterRuleError(f"Некорректная сумма: {value}")
+        if not amount.is_finite() or amount < 0:
+            raise FilterRuleError(f"Некорректная сумма: {value}")
+        return str(amount)
+
+    if name == "direction":
+        if value not in DIRECTIONS:
+            raise FilterRuleError(f"Направление должно быть одним из: {', '.join(DIRECTIONS)}")
+        return value
+
+    if name in ("allow", "deny", "tokens"):
+        values = [item.strip() for item in value if item and item.strip()]
+        if not values:
+            raise FilterRuleError("Список не может быть пустым")
+        return values
+
+    raise FilterRuleError(f"Неизвестное правило: {name}")
+
+def merge_rules(user_settings: Optional[Dict[str, Any]], wallet_rules: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Объединяет правила пользователя и кошелька
+
+    :param user_settings: User.notification_settings
+    :param wallet_rules: Wallet.alert_filters
+    :return: Действующие правила кошелька
+    """
+    rules = dict((user_settings or {}).get("filters") or {})
+    rules.update(wallet_rules or {})
+    return {name: value for name, value in rules.items() if name in RULE_NAMES and value not in (None, [], "")}
+
+def _address_set(addresses: Iterable[str]) -> frozenset:
+    return frozenset(normalize_address(address) for address in addresses)
+
+@lru_cache(maxsize=1024)
+def _compile(key: str) -> Optional[AlertFilter]:
+    rules = json.loads(key)
+    checks = []
+
+    if "min_value" in rules:
+        min_value = Decimal(rules["min_value"])
+        checks.append(lambda tx: tx.amount >= min_value)
+
+    if "direction" in rules:
+        direction = DIRECTIONS[rules["direction"]]
+        checks.append(lambda tx: tx.type == direction)
+
+    if "allow" in rules:
+        allowed = _address_set(rules["allow"])
+        checks.append(lambda tx: normalize_address(tx.counterparty) in allowed)
+
+    if "deny" in rules:
+        denied = _address_set(rules["deny"])
+        checks.append(lambda tx: normalize_address(tx.counterparty) not in denied)
+
+    if "tokens" in rules:
+        tokens = frozenset(token.lower() for token in rules["tokens"])
+        checks.append(lambda tx: not tx.token_address or tx.token_address.lower() in tokens or (tx.token_symbol or "").lower() in tokens)
+
+    if not checks:
+        return None
+
+    # Самые дешевые и избирательные проверки (сумма, направление) идут первыми
+    return lambda tx: all(check(tx) for check in checks)
+
+def compile_filter(rules: Dict[str, Any]) -> Optional[AlertFilter]:
+    """
+    Компилирует правила в предикат
+
+    :param rules: Действующие правила (merge_rules)
+    :return: Предикат или None, если правил нет и проверять нечего
+    """
+    if not rules:
+        return None
+    return _compile(json.dumps(rules, sort_keys=True))
+
+def get_alert_filter(wallet, user_settings: Optional[Dict[str, Any]]) -> Optional[AlertFilter]:
+    """
+    Возвращает предикат фильтра для кошелька
+
+    :param wallet: Объект кошелька
+    :param user_settings: Настройки уведомлений владельца кошелька
+    :return: Предикат или None
+    """
+    return compile_filter(merge_rules(user_settings, wallet.alert_filters))
+
+def describe_rules(rules: Dict[str, Any]) -> str:
+    """Текстовое описание правил для сообщений бота"""
+    if not rules:
+        return "не заданы (уведомления обо всех транзакциях)"
+
+    lines = []
+    if "min_value" in rules:
+        lines.append(f"• Минимальная сумма: {rules['min_value']}")
+    if "direction" in rules:
+        lines.append("• Только входящие" if rules["direction"] == TransactionType.INCOMING.value else "• Только исходящие")
+    if "allow" in rules:
+        lines.append(f"• Только адреса: {', '.join(rules['allow'])}")
+    if "deny" in rules:
+        lines.append(f"• Кроме адресов: {', '.join(rules['deny'])}")
+    if "tokens" in rules:
+        lines.append(f"• Токены: {', '.join(rules['tokens'])}")
+    return "\n".join(lines)
@@ -0,0 +1,206 @@
+"""
+История транзакций кошелька из локальной таблицы transactions
+
+Мониторинг уже сохраняет каждую обнаруженную транзакцию, поэтому просмотр
+истории - чтение из базы данных по индексу (wallet_id, timestamp, tx_id)
+вместо запроса к провайдеру. Страницы листаются по ключу (timestamp, tx_id):
+tx_id длиннее лимита callback_data Telegram (64 байта), поэтому курсор
+содержит время граничной транзакции в микросекундах и число уже показанных
+транзакций с тем же временем, которые пропускаются (обычно 0).
+
+Пробелы (транзакции до добавления кошелька) заполняются по запросу:
+backfill_wallet_history загружает историю у провайдера и сохраняет
+недостающие записи без уведомлений.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from config import HISTORY_BACKFILL_LIMIT
+from models.transaction import Transaction
+from models.wallet import BlockchainType, ChainTransaction
+from services.addresses import intern_addresses
+from services.blockchain import get_transactions, get_token_transfers, filter_new_transactions
+from services.confirmations import apply_confirmations, get_confirmation_threshold
+from services.db import async_session
+from services.tokens import resolve_token_transfers
+
+logger = logging.getLogger(__name__)
+
+# Направления листания
+OLDER = "o"
+NEWER = "n"
+
+# Курсор страницы: (время транзакции в микросекундах от эпохи, число пропускаемых транзакций с этим временем)
+Cursor = Tuple[int, int]
+
+EPOCH = datetime(1970, 1, 1)
+
+# Одновременные загрузки истории одного кошелька объединяются
+_backfill_locks: Dict[int, asyncio.Lock] = {}
+
+class HistoryPage(NamedTuple):
+    """Страница истории (от новых к старым) и курсоры соседних страниц"""
+    transactions: List[Transaction]
+    older: Optional[Cursor]
+    newer: Optional[Cursor]
+
+def _to_us(timestamp: datetime) -> int:
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+def _from_us(us: int) -> datetime:
+    return EPOCH + timedelta(microseconds=us)
+
+async def _count_ties(session, wallet_id: int, transaction: Transaction, direction: str) -> int:
+    """Число транзакций с тем же временем, что у transaction, включая ее, в порядке листания"""
+    tx_id_bound = Transaction.tx_id >= transaction.tx_id if direction == OLDER else Transaction.tx_id <= transaction.tx_id
+    result = await session.execute(
+        select(func.count())
+        .select_from(Transaction)
+        .where(Transaction.wallet_id == wallet_id, Transaction.timestamp == transaction.timestamp, tx_id_bound)
+    )
+    return result.scalar_one()
+
+async def get_history_page(session, wallet_id: int, size: int, direction: str = OLDER, cursor: Optional[Cursor] = None) -> HistoryPage:
+    """
+    Возвращает страницу истории кошелька
+
+    :param session: Сессия базы данных
+    :param wallet_id: ID кошелька
+    :param size: Размер страницы
+    :param direction: OLDER - транзакции старше курсора, NEWER - новее
+    :param cursor: Курсор из предыдущей страницы (None - самые новые транзакции)
+    :return: Страница истории
+    """
+    query = select(Transaction).where(Transaction.wallet_id == wallet_id)
+
+    if cursor is None or direction == OLDER:
+        query = query.order_by(Transaction.timestamp.desc(), Transaction.tx_id.desc())
+        if cursor is not None:
+            query = query.where(Transaction.timestamp <= _from_us(cursor[0])).offset(cursor[1])
+    else:
+        query = query.order_by(Transaction.timestamp.asc(), Transaction.tx_id.asc())
+        query = query.where(Transaction.timestamp >= _from_us(cursor[0])).offset(cursor[1])
+
+    # Лишняя строка показывает, есть ли транзакции дальше в направлении листания
+    result = await session.execute(query.limit(size + 1))
+    transactions = list(result.scalars().all())
+    has_more = len(transactions) > size
+    transactions = transactions[:size]
+
+    if cursor is not None and (not transactions or (direction == NEWER and not has_more)):
+        # Дошли до самых новых транзакций или курсор устарел: показываем первую страницу целиком
+        return await get_history_page(session, wallet_id, size)
+
+    if cursor is None:
+        has_older, has_newer = has_more, False
+    elif direction == OLDER:
+        has_older, has_newer = has_more, True
+    else:
+        transactions.reverse()
+        has_older, has_newer = True, has_more
+
+    older = newer = None
+    if has_older:
+        last = transactions[-1]
+        older = (_to_us(last.timestamp), await _count_ties(session, wallet_id, last, OLDER))
+    if has_newer:
+        first = transactions[0]
+        newer = (_to_us(first.timestamp), await _count_ties(session, wallet_id, first, NEWER))
+
+    return HistoryPage(transactions, older, newer)
+
+async def store_historical_transactions(session, wallet, transactions: List[ChainTransaction]) -> int:
+    """
+    Добавляет в сессию исторические транзакции кошелька, которых еще нет в базе данных
+
+    Записи помечаются is_historical и не вызывают уведомлений; сессия не фиксируется.
+
+    :param session: Сессия базы данных
+    :param wallet: Объект кошелька
+    :param transactions: Транзакции от провайдера
+    :return: Количество добавленных транзакций
+    """
+    candidates = {f"{tx.key}:{wallet.id}": tx for tx in transactions}
+    if not candidates:
+        return 0
+
+    result = await session.execute(
+        select(Transaction.tx_id).where(Transaction.tx_id.in_(list(candidates)))
+    )
+    stored = set(result.scalars().all())
+
+    threshold = get_confirmation_threshold(wallet)
+    new = [(tx_id, tx) for tx_id, tx in candidates.items() if tx_id not in stored]
+    addresses = await intern_addresses(session, [
+        address for _, tx in new for address in (tx.from_address, tx.to_address)
+    ])
+
+    rows = []
+    for tx_id, tx in new:
+        transaction = Transaction(
+            tx_id=tx_id,
+            wallet_id=wallet.id,
+            hash=tx.hash,
+            from_ref=addresses.get(tx.from_address),
+            to_ref=addresses.get(tx.to_address),
+            value=tx.amount,
+            fee=tx.fee_amount,
+            type=tx.type,
+            timestamp=tx.timestamp,
+            block_number=tx.block_number,
+            block_hash=tx.block_hash,
+            token_address=tx.token_address,
+            token_symbol=tx.token_symbol,
+            is_historical=True
+        )
+        apply_confirmations(transaction, tx.confirmations if tx.block_number else 0, threshold)
+        rows.append(transaction)
+
+    # Новые строки вставляются одним пакетом при фиксации
+    session.add_all(rows)
+    return len(rows)
+
+async def _fetch_history(wallet) -> List[List[ChainTransaction]]:
+    """Загружает у провайдера последние транзакции и переводы токенов кошелька (от новых к старым)"""
+    groups = [await get_transactions(wallet.blockchain_type, wallet.address, HISTORY_BACKFILL_LIMIT)]
+
+    if wallet.blockchain_type in (BlockchainType.ETH, BlockchainType.BNB):
+        transfers = await get_token_transfers(wallet.blockchain_type, wallet.address, HISTORY_BACKFILL_LIMIT)
+        groups.append(await resolve_token_transfers(wallet.blockchain_type, transfers))
+
+    return groups
+
+async def backfill_wallet_history(wallet) -> int:
+    """
+    Дополняет локальную историю кошелька транзакциями от провайдера
+
+    Транзакции, которые мониторинг еще должен обнаружить как новые, пропускаются:
+    о них придет обычное уведомление. Остальные сохраняются как исторические,
+    без уведомлений.
+
+    :param wallet: Объект кошелька
+    :return: Количество добавленных транзакций
+    """
+    lock = _backfill_locks.setdefault(wallet.id, asyncio.Lock())
+
+    async with lock:
+        candidates = []
+        for group in await _fetch_history(wallet):
+            # Мониторинг отбирает новые транзакции и переводы токенов по отдельности
+            unseen = {tx.key for tx in filter_new_transactions(group, wallet.last_checked_timestamp)}
+            candidates.extend(tx for tx in group if tx.key not in unseen)
+
+        if not candidates:
+            return 0
+
+        async with async_session() as session:
+            added = await store_historical_transactions(session, wallet, candidates)
+            await session.commit()
+
+    logger.info(f"История кошелька {wallet.id} дополнена: {added} транзакций", extra={"wallet": wallet.id})
+    return added
@@ -0,0 +1,291 @@
+import asyncio
+import atexit
+import base64
+import gzip
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import aiohttp
+from yarl import URL
+
+from config import HTTP_RECORD_DIR, HTTP_REPLAY_PATH, HTTP_REPLAY_SPEED
+from services.metrics import PROVIDER_REQUEST_SECONDS, PROVIDER_REQUESTS, provider_trace_config, request_labels
+from services.ratelimit import rate_limit_trace_config
+
+logger = logging.getLogger(__name__)
+
+# Параметры запроса, которые не записываются в файлы и не участвуют в сопоставлении
+SECRET_PARAMS = {"apikey", "api_key", "token", "key"}
+
+def create_session(**kwargs):
+    """
+    Создает HTTP-сессию для запросов к провайдерам блокчейн-данных
+
+    Все запросы к внешним API проходят через сессии, созданные этой функцией,
+    поэтому измерение задержек и ошибок подключается в одном месте. При заданном
+    HTTP_REPLAY_PATH ответы берутся из записанных файлов без обращения к сети,
+    при заданном HTTP_RECORD_DIR обмены с провайдерами дополнительно записываются.
+    Запросы к сети проходят через общий ограничитель частоты (services/ratelimit.py);
+    ожидание токена не входит в измеряемую задержку провайдера.
+    """
+    if HTTP_REPLAY_PATH:
+        return ReplaySession(_get_replay_store(), HTTP_REPLAY_SPEED)
+
+    if HTTP_RECORD_DIR:
+        return RecordingSession(_get_recorder(), **kwargs)
+
+    return aiohttp.ClientSession(trace_configs=[rate_limit_trace_config(), provider_trace_config()], **kwargs)
+
+def scale_interval(seconds: float) -> float:
+    """
+    Масштабирует паузу между циклами при воспроизведении
+
+    :param seconds: Пауза в реальном режиме
+    :return: Пауза, ускоренная в HTTP_REPLAY_SPEED раз (0 - без пауз)
+    """
+    if not HTTP_REPLAY_PATH:
+        return seconds
+
+    return seconds / HTTP_REPLAY_SPEED if HTTP_REPLAY_SPEED > 0 else 0
+
+def request_key(method: str, url, params: Optional[Dict[str, Any]] = None, body: Any = None) -> str:
+    """
+    Возвращает ключ запроса для сопоставления записи и воспроизведения
+
+    Параметры сортируются, секретные параметры отбрасываются, тело JSON
+    сериализуется с упорядоченными ключами.
+    """
+    url = URL(str(url))
+    if params:
+        url = url.update_query({name: str(value) for name, value in params.items() if value is not None})
+
+    query = sorted((name, value) for name, value in url.query.items() if name.lower() not in SECRET_PARAMS)
+    key = f"{method.upper()} {url.with_query(query)}"
+
+    if body is not None:
+        key += " " + json.dumps(body, sort_keys=True, separators=(",", ":"))
+
+    return key
+
+class _BodyStream:
+    """Минимальная замена aiohttp.StreamReader для уже прочитанного тела"""
+
+    def __init__(self, body: bytes):
+        self._body = body
+        self._pos = 0
+
+    async def read(self, n: int = -1) -> bytes:
+        end = len(self._body) if n < 0 else self._pos + n
+        chunk, self._pos = self._body[self._pos:end], min(end, len(self._body))
+        return chunk
+
+    async def iter_chunked(self, n: int):
+        while self._pos < len(self._body):
+            yield await self.read(n)
+
+class RecordedResponse:
+    """Ответ с телом в памяти, совместимый с используемой частью aiohttp.ClientResponse"""
+
+    def __init__(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.status = status
+        self.content_type = content_type
+        self.content = _BodyStream(body)
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: str = "utf-8") -> str:
+        return self._body.decode(encoding, errors="replace")
+
+    async def json(self, **kwargs) -> Any:
+        return json.loads(self._body)
+
+    def release(self) -> None:
+        pass
+
+class _RequestContext:
+    """Позволяет использовать session.get(...) в async with, как у aiohttp"""
+
+    def __init__(self, coro):
+        self._coro = coro
+
+    async def __aenter__(self) -> RecordedResponse:
+        return await self._coro
+
+    async def __aexit__(self, *exc) -> bool:
+        return False
+
+class _ProviderSession:
+    """Общая часть сессий записи и воспроизведения"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    def get(self, url, **kwargs) -> _RequestContext:
+        return _RequestContext(self._request("GET", url, **kwargs))
+
+    def post(self, url, **kwargs) -> _RequestContext:
+        return _RequestContext(self._request("POST", url, **kwargs))
+
+    async def _request(self, method: str, url, **kwargs) -> RecordedResponse:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+class TrafficRecorder:
+    """Запись обменов с провайдерами в сжатый JSONL (одна запись на строку)"""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        name = f"provider-{datetime.utcnow():%Y%m%d-%H%M%S}-{os.getpid()}.jsonl.gz"
+        self.path = os.path.join(directory, name)
+        self._file = gzip.open(self.path, "at", encoding="utf-8")
+        self._started = time.monotonic()
+        self._count = 0
+        atexit.register(self.close)
+        logger.info(f"Запись обменов с провайдерами в {self.path}")
+
+    def write(self, key: str, status: int, content_type: str, body: bytes, elapsed: float) -> None:
+        try:
+            text, encoding = body.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(body).decode("ascii"), "base64"
+
+        record = {
+            "t": round(time.monotonic() - self._started, 6),
+            "key": key,
+            "status": status,
+            "content_type": content_type,
+            "elapsed": round(elapsed, 6),
+            "encoding": encoding,
+            "body": text,
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        self._count += 1
+        if self._count % 100 == 0:
+            self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+class RecordingSession(_ProviderSession):
+    """Сессия, выполняющая настоящие запросы и записывающая их"""
+
+    def __init__(self, recorder: TrafficRecorder, **kwargs):
+        self._recorder = recorder
+        self._session = aiohttp.ClientSession(trace_configs=[rate_limit_trace_config(), provider_trace_config()], **kwargs)
+
+    async def _request(self, method: str, url, **kwargs) -> RecordedResponse:
+        started = time.perf_counter()
+
+        async with self._session.request(method, url, **kwargs) as response:
+            # Тело читается целиком: потоковый разбор при записи не нужен
+            body = await response.read()
+            status, content_type = response.status, response.content_type
+
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("json"))
+        self._recorder.write(key, status, content_type, body, time.perf_counter() - started)
+        return RecordedResponse(status, body, content_type)
+
+    async def close(self) -> None:
+        await self._session.close()
+
+class ReplayStore:
+    """
+    Записанные ответы, сгруппированные по ключу запроса
+
+    Повторные запросы с одним ключом получают ответы в порядке записи; когда
+    записи заканчиваются, повторяется последний ответ.
+    """
+
+    def __init__(self, path: str):
+        self.responses: Dict[str, Deque[Dict[str, Any]]] = {}
+        self.last: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+        files = [path] if os.path.isfile(path) else sorted(
+            os.path.join(path, name) for name in os.listdir(path) if name.endswith(".jsonl.gz")
+        )
+
+        for file_path in files:
+            with gzip.open(file_path, "rt", encoding="utf-8") as file:
+                for line in file:
+                    record = json.loads(line)
+                    self.responses.setdefault(record["key"], deque()).append(record)
+
+        logger.info(f"Загружено {sum(map(len, self.responses.values()))} записанных ответов из {len(files)} файлов")
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        queue = self.responses.get(key)
+        if queue:
+            self.last[key] = queue.popleft()
+
+        record = self.last.get(key)
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return record
+
+class ReplaySession(_ProviderSession):
+    """Сессия, отвечающая записанными ответами без обращения к сети"""
+
+    def __init__(self, store: ReplayStore, speed: float):
+        self._store = store
+        self._speed = speed
+
+    async def _request(self, method: str, url, **kwargs) -> RecordedResponse:
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("json"))
+        record = self._store.next(key)
+        provider, endpoint = request_labels(key.split(" ")[1])
+
+        if record is None:
+            logger.warning(f"Нет записанного ответа для {key[:200]}")
+            PROVIDER_REQUESTS.inc(provider=provider, endpoint=endpoint, result="http_error")
+            return RecordedResponse(404, b"No recorded response", "text/plain")
+
+        # Исходная задержка ответа, ускоренная в speed раз (0 - без задержки)
+        delay = record["elapsed"] / self._speed if self._speed > 0 else 0
+        if delay:
+            await asyncio.sleep(delay)
+
+        body = record["body"].encode("utf-8") if record["encoding"] == "utf-8" else base64.b64decode(record["body"])
+
+        PROVIDER_REQUEST_SECONDS.observe(delay, provider=provider, endpoint=endpoint)
+        PROVIDER_REQUESTS.inc(provider=provider, endpoint=endpoint, result="ok" if record["status"] < 400 else "http_error")
+        return RecordedResponse(record["status"], body, record["content_type"])
+
+_recorder: Optional[TrafficRecorder] = None
+_replay_store: Optional[ReplayStore] = None
+
+def _get_recorder() -> TrafficRecorder:
+    global _recorder
+    if _recorder is None:
+        _recorder = TrafficRecorder(HTTP_RECORD_DIR)
+    return _recorder
+
+def _get_replay_store() -> ReplayStore:
+    global _replay_store
+    if _replay_store is None:
+        _replay_store = ReplayStore(HTTP_REPLAY_PATH)
+    return _replay_store
+
+def replay_stats() -> Tuple[int, int]:
+    """Возвращает (найденные, ненайденные) запросы при воспроизведении"""
+    if _replay_store is None:
+        return (0, 0)
+    return (_replay_store.hits, _replay_store.misses)
@@ -0,0 +1,214 @@
+"""
+Массовое добавление кошельков из файла (/import)
+
+Файл CSV или текстовый читается построчно. Строка содержит адрес и,
+необязательно, блокчейн и метку: "адрес", "адрес,метка" или
+"блокчейн,адрес,метка"; без блокчейна используется выбранный в команде.
+Пустые строки, комментарии (#) и строка заголовка пропускаются.
+
+Файл читается и адреса проверяются по контрольным суммам одним пакетом
+в отдельном потоке (utils/validation.py, без обращения к провайдерам), повторы
+отбрасываются одним запросом к кошелькам пользователя, новые кошельки
+добавляются многострочными INSERT по IMPORT_INSERT_CHUNK строк. Загрузка истории
+ставится в очередь одним пакетом, а балансы новых адресов запрашиваются
+в фоне пакетами с фоновым приоритетом ограничителя частоты, поэтому
+импорт тысяч адресов не задерживает мониторинг.
+"""
+import asyncio
+import csv
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import insert, tuple_
+from sqlalchemy.future import select
+
+from config import IMPORT_MAX_LINES, IMPORT_INSERT_CHUNK, IMPORT_WARMUP_BATCH
+from models.wallet import Wallet, BlockchainType
+from services.backfill import enqueue_backfills
+from services.balances import fetch_balances
+from services.db import async_session
+from services.ratelimit import request_priority, PRIORITY_BACKFILL
+from utils.validation import validate_addresses
+
+logger = logging.getLogger(__name__)
+
+# Фоновые задачи прогрева балансов (ссылки удерживаются до завершения)
+_warmup_tasks: Set[asyncio.Task] = set()
+
+class ImportEntry(NamedTuple):
+    """Строка файла импорта"""
+    line: int
+    blockchain_type: BlockchainType
+    address: str
+    label: Optional[str]
+
+@dataclass
+class ImportResult:
+    """Итог импорта: добавленные кошельки и номера отклоненных строк по причинам"""
+    added: List[Wallet] = field(default_factory=list)
+    duplicates: List[int] = field(default_factory=list)
+    invalid: List[int] = field(default_factory=list)
+    over_limit: List[int] = field(default_factory=list)
+    truncated: bool = False
+
+def address_key(blockchain_type: BlockchainType, address: str) -> Tuple[BlockchainType, str]:
+    """Ключ для поиска повторов: блокчейн и адрес (адреса EVM не зависят от регистра)"""
+    return blockchain_type, address.lower() if blockchain_type != BlockchainType.BTC else address
+
+def parse_import_lines(lines: Iterable[str], default_chain: Optional[BlockchainType]) -> Iterator[Tuple[int, Optional[ImportEntry]]]:
+    """
+    Разбирает строки файла импорта
+
+    :param lines: Строки файла
+    :param default_chain: Блокчейн для строк без явного блокчейна
+    :return: Пары (номер строки, запись или None для некорректной строки)
+    """
+    for number, row in enumerate(csv.reader(lines), start=1):
+        fields = [item.strip() for item in row]
+        if not fields or not fields[0] or fields[0].startswith("#"):
+            continue
+
+        if fields[0].lower() in ("chain", "blockchain", "address"):
+            # Строка заголовка
+            continue
+
+        blockchain_type = default_chain
+        if fields[0].upper() in BlockchainType.__members__:
+            blockchain_type = BlockchainType[fields[0].upper()]
+            fields = fields[1:]
+
+        if blockchain_type is None or not fields or not fields[0]:
+            yield number, None
+            continue
+
+        label = fields[1][:255] if len(fields) > 1 and fields[1] else None
+        yield number, ImportEntry(number, blockchain_type, fields[0], label)
+
+def read_import_lines(lines: Iterable[str], default_chain: Optional[BlockchainType]) -> Tuple[ImportResult, List[ImportEntry]]:
+    """
+    Читает, разбирает и проверяет строки файла импорта
+
+    Синхронная функция: чтение файла и проверка контрольных сумм тысяч адресов
+    выполняются в потоке (import_wallets), не задерживая цикл событий.
+
+    :param lines: Строки файла
+    :param default_chain: Блокчейн для строк без явного блокчейна
+    :return: Итог импорта с отклоненными строками и записи с корректными адресами
+    """
+    result = ImportResult()
+    parsed: List[ImportEntry] = []
+
+    for number, entry in parse_import_lines(lines, default_chain):
+        if number > IMPORT_MAX_LINES:
+            result.truncated = True
+            break
+        if entry is None:
+            result.invalid.append(number)
+        else:
+            parsed.append(entry)
+
+    # Контрольные суммы адресов проверяются одним пакетом
+    entries: List[ImportEntry] = []
+    for entry, valid in zip(parsed, validate_addresses((entry.blockchain_type, entry.address) for entry in parsed)):
+        if valid:
+            entries.append(entry)
+        else:
+            result.invalid.append(entry.line)
+    result.invalid.sort()
+
+    return result, entries
+
+async def import_wallets(user_id: int, lines: Iterable[str], default_chain: Optional[BlockchainType],
+                         limit: Optional[int]) -> ImportResult:
+    """
+    Добавляет кошельки пользователя из строк файла
+
+    :param user_id: ID пользователя
+    :param lines: Строки файла (читаются в отдельном потоке)
+    :param default_chain: Блокчейн для строк без явного блокчейна
+    :param limit: Наибольшее число кошельков пользователя (None - без ограничения)
+    :return: Итог импорта
+    """
+    result, entries = await asyncio.to_thread(read_import_lines, lines, default_chain)
+
+    async with async_session() as session:
+        # Повторы среди уже добавленных кошельков - одним запросом
+        existing = await session.execute(select(Wallet.blockchain_type, Wallet.address).where(Wallet.user_id == user_id))
+        known = {address_key(blockchain_type, address) for blockchain_type, address in existing.all()}
+        capacity = None if limit is None else max(limit - len(known), 0)
+
+        new: List[ImportEntry] = []
+        for entry in entries:
+            key = address_key(entry.blockchain_type, entry.address)
+            if key in known:
+                result.duplicates.append(entry.line)
+            elif capacity is not None and len(new) >= capacity:
+                result.over_limit.append(entry.line)
+            else:
+                known.add(key)
+                new.append(entry)
+
+        if not new:
+            return result
+
+        now = datetime.utcnow()
+        chunks = [new[start:start + IMPORT_INSERT_CHUNK] for start in range(0, len(new), IMPORT_INSERT_CHUNK)]
+        for chunk in chunks:
+            await session.execute(insert(Wallet).values([
+                {
+                    "user_id": user_id,
+                    "address": entry.address,
+                    "blockchain_type": entry.blockchain_type,
+                    "label": entry.label,
+                    "address_valid": True,
+                    "created_at": now,
+                    "updated_at": now
+                }
+                for entry in chunk
+            ]))
+        await session.commit()
+
+        # ID новых кошельков нужны для очереди загрузки истории
+        for chunk in chunks:
+            wallets = await session.execute(
+                select(Wallet).where(
+                    Wallet.user_id == user_id,
+                    tuple_(Wallet.blockchain_type, Wallet.address).in_([(entry.blockchain_type, entry.address) for entry in chunk])
+                )
+            )
+            result.added.extend(wallets.scalars().all())
+
+    await enqueue_backfills([wallet.id for wallet in result.added])
+    logger.info(f"Пользователь {user_id} импортировал {len(result.added)} кошельков")
+    return result
+
+async def warm_balances(wallets: List[Wallet]) -> None:
+    """
+    Запрашивает балансы новых кошельков пакетами, чтобы /balance сразу брал их из кэша
+
+    :param wallets: Новые кошельки
+    """
+    # Запросы прогрева уступают мониторингу и обработчикам пользователей
+    request_priority.set(PRIORITY_BACKFILL)
+
+    by_chain: Dict[BlockchainType, List[str]] = {}
+    for wallet in wallets:
+        by_chain.setdefault(wallet.blockchain_type, []).append(wallet.address)
+
+    for blockchain_type, addresses in by_chain.items():
+        for start in range(0, len(addresses), IMPORT_WARMUP_BATCH):
+            try:
+                await fetch_balances(blockchain_type, addresses[start:start + IMPORT_WARMUP_BATCH])
+            except Exception as e:
+                logger.error(f"Ошибка при прогреве балансов ({blockchain_type.value}): {e}")
+
+def schedule_balance_warmup(wallets: List[Wallet]) -> None:
+    """Запускает прогрев балансов новых кошельков фоновой задачей"""
+    if not wallets:
+        return
+
+    task = asyncio.create_task(warm_balances(wallets))
+    _warmup_tasks.add(task)
+    task.add_done_callback(_warmup_tasks.discard)
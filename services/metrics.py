@@ -0,0 +1,311 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from aiohttp import TraceConfig, web
+
+logger = logging.getLogger(__name__)
+
+# Метрики в текстовом формате Prometheus без внешних зависимостей.
+# Все значения изменяются только из потока цикла событий, поэтому блокировки не нужны.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    """Экранирует значение метки"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Формирует блок меток {name="value",...}"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Базовая метрика с набором меток"""
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames and self.type_name != "histogram":
+            self._values[()] = 0
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}, получены {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """Произвольное текущее значение"""
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам (обычно длительностей в секундах)"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # [счетчики корзин..., сумма, количество]
+            state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        state[-2] += value
+        state[-1] += 1
+
+    def snapshot(self, **labels: str) -> Tuple[int, float]:
+        """Возвращает (количество, сумма) наблюдений"""
+        state = self._values.get(self._key(labels))
+        return (state[-1], state[-2]) if state else (0, 0.0)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Измеряет длительность блока кода"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        for key, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}"
+
+def render_metrics() -> str:
+    """Возвращает все метрики в текстовом формате Prometheus"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+# Цикл мониторинга
+MONITOR_CYCLE_SECONDS = Histogram(
+    "monitor_cycle_seconds", "Длительность цикла мониторинга кошельков",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+MONITOR_LAG_SECONDS = Gauge(
+    "monitor_lag_seconds", "Время с последней проверки самого давно проверенного кошелька на начало цикла"
+)
+MONITOR_WALLETS_CHECKED = Counter("monitor_wallets_checked_total", "Количество проверенных кошельков")
+MONITOR_WALLETS_PER_SECOND = Gauge("monitor_wallets_per_second", "Скорость проверки кошельков в последнем цикле")
+MONITOR_LAST_CYCLE_TIMESTAMP = Gauge("monitor_last_cycle_timestamp_seconds", "Unix-время завершения последнего цикла")
+
+# Запросы к провайдерам блокчейн-данных
+PROVIDER_REQUEST_SECONDS = Histogram(
+    "provider_request_seconds", "Время до получения заголовков ответа провайдера",
+    ("provider", "endpoint")
+)
+PROVIDER_REQUESTS = Counter(
+    "provider_requests_total", "Запросы к провайдерам по результату (ok, http_error, exception)",
+    ("provider", "endpoint", "result")
+)
+
+# Ожидание токена общего ограничителя частоты (services/ratelimit.py)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "rate_limit_wait_seconds", "Ожидание разрешения на запрос к провайдеру по приоритету",
+    ("provider", "priority"), buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+# Загрузка истории кошельков (services/backfill.py)
+BACKFILL_TRANSACTIONS = Counter("backfill_transactions_total", "Транзакции, сохраненные загрузкой истории", ("chain",))
+BACKFILL_JOBS = Counter("backfill_jobs_total", "Завершенные задания загрузки истории по результату", ("result",))
+
+# Очистка истории (services/retention.py)
+RETENTION_ROWS = Counter("retention_rows_deleted_total", "Транзакции, удаленные по сроку хранения", ("tier",))
+
+# Фильтры уведомлений (services/filters.py)
+TRANSACTIONS_FILTERED = Counter("transactions_filtered_total", "Транзакции, отброшенные фильтрами уведомлений", ("chain",))
+
+# Оповещения о крупных движениях (services/alerts.py)
+ALERTS_TRIGGERED = Counter("alerts_triggered_total", "Сработавшие правила оповещений по показателю", ("metric",))
+
+# Выгрузка истории (services/export.py)
+EXPORT_JOBS = Counter("export_jobs_total", "Задания выгрузки истории по результату", ("result",))
+EXPORTED_ROWS = Counter("export_rows_total", "Транзакции, выгруженные в файлы")
+EXPORT_SECONDS = Histogram("export_seconds", "Длительность задания выгрузки истории", buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
+
+# Кэши
+CACHE_REQUESTS = Counter("cache_requests_total", "Обращения к кэшам по результату (hit, miss)", ("cache", "result"))
+
+# База данных
+DB_COMMIT_SECONDS = Histogram(
+    "db_commit_seconds", "Длительность фиксации транзакций базы данных",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# Платежи (services/payments.py)
+PAYMENT_TRANSITIONS = Counter("payment_transitions_total", "Переходы платежей в конечные состояния", ("status",))
+
+# Уведомления
+NOTIFICATION_QUEUE_DEPTH = Gauge("notification_queue_depth", "Уведомления, ожидающие отправки")
+NOTIFICATION_SEND_SECONDS = Histogram("notification_send_seconds", "Длительность отправки уведомления", ("kind",))
+NOTIFICATIONS_SENT = Counter("notifications_sent_total", "Отправленные уведомления по результату", ("kind", "result"))
+NOTIFICATION_BODY_CACHE = Counter(
+    "notification_body_cache_total", "Общая часть уведомлений о транзакции: из кэша (hit) или сформирована (miss)", ("result",)
+)
+
+# Декодирование ответов (services/offload.py)
+OFFLOAD_DECODE_SECONDS = Histogram(
+    "offload_decode_seconds", "Длительность декодирования ответа провайдера (inline или в пуле процессов)",
+    ("decoder", "mode")
+)
+
+# Цикл событий
+LOOP_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "Задержка пробуждения сторожевой задачи относительно расписания", buckets=LOOP_BUCKETS
+)
+EVENT_LOOP_STALLS = Counter(
+    "event_loop_stalls_total", "Блокировки цикла событий дольше порога по подсистеме", ("subsystem",)
+)
+EVENT_LOOP_STALL_SECONDS = Histogram(
+    "event_loop_stall_seconds", "Длительность блокировок цикла событий", ("subsystem",), buckets=LOOP_BUCKETS
+)
+
+# Известные провайдеры: часть имени хоста -> метка provider
+PROVIDER_HOSTS = {
+    "etherscan": "etherscan",
+    "bscscan": "bscscan",
+    "blockcypher": "blockcypher",
+    "blockchain.info": "blockchain_info",
+    "coingecko": "coingecko",
+}
+
+def request_labels(url) -> Tuple[str, str]:
+    """
+    Возвращает метки (provider, endpoint) запроса с ограниченным числом значений
+
+    Адреса и хеши в метки не попадают: для обозревателей используется параметр action,
+    для BlockCypher - первые сегменты пути, для JSON-RPC узлов - "rpc".
+
+    :param url: URL запроса вместе с параметрами (str или yarl.URL)
+    """
+    parts = urlsplit(str(url))
+    host = parts.hostname or ""
+    provider = next((label for marker, label in PROVIDER_HOSTS.items() if marker in host), None)
+
+    if provider is None:
+        return "rpc", "rpc"
+
+    action = dict(parse_qsl(parts.query)).get("action")
+    if action:
+        return provider, action
+
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if provider == "coingecko":
+        # /api/v3/simple/token_price/{platform} -> simple/token_price
+        return provider, "/".join(segments[2:4]) or "root"
+
+    if provider == "blockcypher":
+        # /v1/btc/main/addrs/{addrs}/balance -> addrs/balance, /v1/btc/main/blocks/{h} -> blocks
+        tail = segments[3:]
+        if not tail:
+            return provider, "root"
+        return provider, "/".join([tail[0]] + tail[2:3])
+
+    return provider, segments[0] if segments else "root"
+
+async def _on_request_start(session, context, params) -> None:
+    context.start = time.perf_counter()
+    context.labels = request_labels(params.url)
+
+async def _on_request_end(session, context, params) -> None:
+    provider, endpoint = context.labels
+    PROVIDER_REQUEST_SECONDS.observe(time.perf_counter() - context.start, provider=provider, endpoint=endpoint)
+    result = "ok" if params.response.status < 400 else "http_error"
+    PROVIDER_REQUESTS.inc(provider=provider, endpoint=endpoint, result=result)
+
+async def _on_request_exception(session, context, params) -> None:
+    provider, endpoint = context.labels
+    PROVIDER_REQUEST_SECONDS.observe(time.perf_counter() - context.start, provider=provider, endpoint=endpoint)
+    PROVIDER_REQUESTS.inc(provider=provider, endpoint=endpoint, result="exception")
+
+def provider_trace_config() -> TraceConfig:
+    """Возвращает TraceConfig aiohttp, измеряющий запросы к провайдерам"""
+    trace_config = TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return trace_config
+
+async def _metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+async def start_metrics_server(host: str, port: int) -> Optional[web.AppRunner]:
+    """
+    Запускает HTTP-эндпоинт /metrics
+
+    :param host: Адрес для прослушивания
+    :param port: Порт; 0 отключает эндпоинт
+    :return: AppRunner для остановки сервера или None
+    """
+    if not port:
+        return None
+
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_handler)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.error(f"Не удалось запустить эндпоинт метрик на {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
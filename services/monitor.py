@@ -1,67 +1,414 @@
 import asyncio
 import logging
+import time
 from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from config import MONITOR_INTERVAL
-from models.wallet import Wallet, BlockchainType
-from models.transaction import Transaction
-from services.blockchain import get_transactions
-from services.db import async_session
+from config import MONITOR_INTERVAL, ORPHAN_GRACE_DEPTH, TOKEN_LOG_BLOCK_RANGE, TOKEN_LOG_CATCHUP_BLOCKS
+from models.wallet import Wallet, BlockchainType, ChainTransaction
+from models.transaction import Transaction, TransactionStatus
+from models.user import User
+from models.scan_state import TokenScanState
+from services.addresses import intern_addresses
+from services.alerts import evaluate_alert_rules
+from services.balances import invalidate_balance
+from services.blockchain import (
+    filter_new_transactions, get_btc_transactions_batch, get_block_number,
+    get_rpc_url, get_token_transfers, get_token_transfer_logs, get_transactions
+)
+from services.confirmations import (
+    advance_pending_transactions, apply_confirmations, get_confirmation_threshold, refresh_block_position
+)
+from services.db import async_session, get_user_languages
+from services.filters import AlertFilter, get_alert_filter
+from services.http import scale_interval
+from services.metrics import (
+    MONITOR_CYCLE_SECONDS, MONITOR_LAG_SECONDS, MONITOR_LAST_CYCLE_TIMESTAMP,
+    MONITOR_WALLETS_CHECKED, MONITOR_WALLETS_PER_SECOND, NOTIFICATION_QUEUE_DEPTH, TRANSACTIONS_FILTERED
+)
+from services.profiling import record_cycle
+from services.rollups import add_to_rollup
+from services.tokens import resolve_token_transfers
 from utils.notifications import send_transaction_notification
 
 logger = logging.getLogger(__name__)
 
-async def check_wallet_transactions(bot, wallet, session):
-    """Проверяет новые транзакции для кошелька и отправляет уведомления"""
-    logger.info(f"Проверка транзакций для кошелька {wallet.address} ({wallet.blockchain_type.value})")
+# Последний просмотренный блок при поиске переводов токенов через eth_getLogs; сохраняется
+# в таблице token_scan_state, чтобы после перезапуска продолжить с того же блока
+_token_scan_state: Dict[BlockchainType, int] = {}
+
+async def get_unmined_transactions(session) -> Set[Tuple[int, str]]:
+    """
+    Возвращает пары (ID кошелька, хеш) сохраненных транзакций, еще не включенных в блок
+
+    Сюда же входят транзакции, исключенные из цепочки и ожидающие повторного включения
+    (orphaned_at_height задана): провайдер возвращает их снова, если они попали в новый блок.
+    """
+    result = await session.execute(
+        select(Transaction.wallet_id, Transaction.hash).where(or_(
+            # Окончательные без блока - уведомленные при пороге 0, они еще проверяются на реорганизацию
+            and_(
+                Transaction.status.in_((TransactionStatus.seen, TransactionStatus.final)),
+                Transaction.block_number.is_(None)
+            ),
+            and_(
+                Transaction.status == TransactionStatus.orphaned,
+                Transaction.orphaned_at_height.is_not(None)
+            )
+        ))
+    )
+    return {(wallet_id, tx_hash) for wallet_id, tx_hash in result.all()}
+
+def select_new_transactions(wallet, transactions: List[ChainTransaction],
+                            unmined: Set[Tuple[int, str]] = frozenset()) -> List[ChainTransaction]:
+    """
+    Отбирает транзакции после последней проверки кошелька и ранее обнаруженные транзакции вне блоков
+
+    Время транзакции, повторно включенной в блок, обычно старше последней проверки,
+    поэтому такие транзакции не отбрасываются по времени.
+
+    :param wallet: Объект кошелька
+    :param transactions: Транзакции адреса от провайдера
+    :param unmined: Пары (ID кошелька, хеш) из get_unmined_transactions
+    :return: Транзакции для обработки
+    """
+    new_transactions = filter_new_transactions(transactions, wallet.last_checked_timestamp)
+    return new_transactions + [
+        tx for tx in transactions
+        if (wallet.id, tx.hash) in unmined and tx not in new_transactions
+    ]
+
+async def fetch_wallet_transactions(wallets, unmined: Set[Tuple[int, str]] = frozenset()) -> Dict[int, List[ChainTransaction]]:
+    """
+    Получает новые транзакции для набора кошельков
     
-    # Определяем время последней проверки
-    from_timestamp = wallet.last_checked_timestamp
+    BTC-адреса всех кошельков объединяются в пакетные запросы, остальные
+    блокчейны опрашиваются параллельно по одному адресу.
     
-    # Получаем транзакции
-    transactions = await get_transactions(wallet.blockchain_type, wallet.address, from_timestamp)
+    :param wallets: Список кошельков
+    :param unmined: Ранее обнаруженные транзакции вне блоков; они возвращаются повторно,
+                    чтобы обновить их позицию после включения в блок
+    :return: Словарь {ID кошелька: список новых транзакций}
+    """
+    results = {}
+    
+    btc_wallets = [wallet for wallet in wallets if wallet.blockchain_type == BlockchainType.BTC]
+    other_wallets = [wallet for wallet in wallets if wallet.blockchain_type != BlockchainType.BTC]
+    
+    if btc_wallets:
+        btc_transactions = await get_btc_transactions_batch([wallet.address for wallet in btc_wallets], 20)
+        
+        for wallet in btc_wallets:
+            results[wallet.id] = select_new_transactions(wallet, btc_transactions.get(wallet.address, []), unmined)
+    
+    other_transactions = await asyncio.gather(*[
+        get_transactions(wallet.blockchain_type, wallet.address, 20)
+        for wallet in other_wallets
+    ], return_exceptions=True)
+    
+    for wallet, transactions in zip(other_wallets, other_transactions):
+        if isinstance(transactions, Exception):
+            logger.error(f"Ошибка при проверке новых транзакций для {wallet.address} ({wallet.blockchain_type.value}): {transactions}")
+            transactions = []
+        results[wallet.id] = select_new_transactions(wallet, transactions, unmined)
+    
+    # Переводы токенов ERC-20 / BEP-20
+    token_transfers = await fetch_token_transfers(other_wallets, unmined)
+    for wallet_id, transfers in token_transfers.items():
+        results[wallet_id] = results.get(wallet_id, []) + transfers
+    
+    return results
+
+async def _get_token_scan_state(blockchain_type: BlockchainType) -> Optional[int]:
+    """Последний просмотренный блок: из памяти или, после перезапуска, из базы данных"""
+    if blockchain_type not in _token_scan_state:
+        async with async_session() as session:
+            state = await session.get(TokenScanState, blockchain_type)
+        if state is None:
+            return None
+        _token_scan_state[blockchain_type] = state.last_block
+    return _token_scan_state[blockchain_type]
+
+async def _save_token_scan_state(blockchain_type: BlockchainType, last_block: int) -> None:
+    """Сохраняет последний просмотренный блок"""
+    _token_scan_state[blockchain_type] = last_block
+    async with async_session() as session:
+        await session.merge(TokenScanState(blockchain_type=blockchain_type, last_block=last_block))
+        await session.commit()
+
+async def _scan_token_logs(blockchain_type: BlockchainType, addresses: List[str]) -> Tuple[Dict[str, List[ChainTransaction]], Optional[int]]:
+    """
+    Читает логи Transfer для всех адресов блокчейна с последнего просмотренного блока
+
+    После простоя пропущенные блоки просматриваются по TOKEN_LOG_CATCHUP_BLOCKS за цикл,
+    начиная с сохраненной позиции, поэтому переводы за время простоя не теряются.
+
+    :return: (переводы по адресам в нижнем регистре, блок, просмотренный до этого вызова)
+    """
+    head = await get_block_number(blockchain_type)
+    if head is None:
+        return {}, None
+    
+    # Последние ORPHAN_GRACE_DEPTH блоков просматриваются повторно: после реорганизации в них
+    # могут быть заново включены переводы, ожидающие повторного включения (get_unmined_transactions)
+    last_scanned = await _get_token_scan_state(blockchain_type)
+    from_block = (last_scanned - ORPHAN_GRACE_DEPTH if last_scanned is not None else head - TOKEN_LOG_BLOCK_RANGE) + 1
+    to_block = min(head, from_block + TOKEN_LOG_CATCHUP_BLOCKS - 1)
+    if to_block < from_block:
+        return {}, last_scanned
+    
+    transfers = await get_token_transfer_logs(blockchain_type, addresses, from_block, to_block)
+    
+    # При ошибке не сдвигаем позицию, чтобы не пропустить переводы
+    if transfers is None:
+        return {}, last_scanned
+    
+    if last_scanned is None or to_block > last_scanned:
+        await _save_token_scan_state(blockchain_type, to_block)
+    return transfers, last_scanned
+
+async def fetch_token_transfers(wallets, unmined: Set[Tuple[int, str]] = frozenset()) -> Dict[int, List[ChainTransaction]]:
+    """
+    Получает новые переводы токенов для кошельков ETH и BNB
+    
+    При настроенном JSON-RPC узле все адреса блокчейна проверяются одним фильтром
+    eth_getLogs, иначе для каждого адреса запрашивается tokentx обозревателя.
+    
+    :param wallets: Список кошельков
+    :param unmined: Ранее обнаруженные транзакции вне блоков (см. fetch_wallet_transactions)
+    :return: Словарь {ID кошелька: список новых переводов токенов}
+    """
+    results = {}
+    
+    for blockchain_type in (BlockchainType.ETH, BlockchainType.BNB):
+        chain_wallets = [wallet for wallet in wallets if wallet.blockchain_type == blockchain_type]
+        if not chain_wallets:
+            continue
+        
+        if get_rpc_url(blockchain_type):
+            transfers, last_scanned = await _scan_token_logs(blockchain_type, [wallet.address for wallet in chain_wallets])
+            for wallet in chain_wallets:
+                address_transfers = transfers.get(wallet.address.lower(), [])
+                if last_scanned is None:
+                    # Первый просмотр: последние TOKEN_LOG_BLOCK_RANGE блоков отбираются по времени
+                    results[wallet.id] = select_new_transactions(wallet, address_transfers, unmined)
+                    continue
+                # Новые переводы - из блоков после прошлого просмотра (при догоняющем просмотре
+                # после простоя их время старше последней проверки кошелька)
+                results[wallet.id] = [
+                    tx for tx in address_transfers
+                    if tx.block_number > last_scanned or (wallet.id, tx.hash) in unmined
+                ]
+        else:
+            chain_transfers = await asyncio.gather(*[
+                get_token_transfers(blockchain_type, wallet.address, 20) for wallet in chain_wallets
+            ])
+            for wallet, transfers in zip(chain_wallets, chain_transfers):
+                results[wallet.id] = select_new_transactions(wallet, transfers, unmined)
+        
+        # Метаданные токенов (символ, decimals) разрешаем одним вызовом на блокчейн
+        resolved = iter(await resolve_token_transfers(
+            blockchain_type,
+            [tx for wallet in chain_wallets for tx in results[wallet.id]]
+        ))
+        for wallet in chain_wallets:
+            results[wallet.id] = [next(resolved) for _ in results[wallet.id]]
+    
+    return results
+
+async def get_alert_filters(session, wallets) -> Dict[int, AlertFilter]:
+    """
+    Возвращает предикаты фильтров уведомлений кошельков
+
+    :param session: Сессия базы данных
+    :param wallets: Список кошельков
+    :return: Словарь {ID кошелька: предикат}; кошельки без правил отсутствуют
+    """
+    result = await session.execute(
+        select(User.user_id, User.notification_settings).where(User.notification_settings.is_not(None))
+    )
+    user_settings = dict(result.all())
+
+    filters = {}
+    for wallet in wallets:
+        alert_filter = get_alert_filter(wallet, user_settings.get(wallet.user_id))
+        if alert_filter is not None:
+            filters[wallet.id] = alert_filter
+    return filters
+
+def apply_alert_filter(wallet, transactions: List[ChainTransaction], alert_filter: AlertFilter,
+                       unmined: Set[Tuple[int, str]] = frozenset()) -> List[ChainTransaction]:
+    """
+    Отбрасывает транзакции, не прошедшие фильтр уведомлений кошелька
+
+    Уже сохраненные транзакции вне блоков пропускаются всегда: их позиция
+    должна обновиться, даже если правила изменились после сохранения.
+
+    :param wallet: Объект кошелька
+    :param transactions: Новые транзакции кошелька
+    :param alert_filter: Предикат фильтра
+    :param unmined: Пары (ID кошелька, хеш) сохраненных транзакций вне блоков
+    :return: Транзакции для сохранения
+    """
+    passed = [tx for tx in transactions if (wallet.id, tx.hash) in unmined or alert_filter(tx)]
+    if len(passed) < len(transactions):
+        TRANSACTIONS_FILTERED.inc(len(transactions) - len(passed), chain=wallet.blockchain_type.value)
+    return passed
+
+async def check_wallet_transactions(bot, wallet, session, transactions, language_code: Optional[str] = None) -> int:
+    """
+    Сохраняет новые транзакции кошелька и отправляет уведомления
+
+    :param language_code: Язык владельца кошелька для текста уведомлений
+    :return: Количество сохраненных транзакций
+    """
+    log_context = {"wallet": wallet.id, "chain": wallet.blockchain_type.value}
+    stored = 0
+    logger.debug(
+        f"Проверка транзакций для кошелька {wallet.address}",
+        extra={**log_context, "hot_path": "monitor.wallet_check"}
+    )
     
     # Если транзакции обнаружены
     if transactions:
-        logger.info(f"Обнаружено {len(transactions)} новых транзакций для кошелька {wallet.address}")
+        logger.info(f"Обнаружено {len(transactions)} новых транзакций для кошелька {wallet.address}", extra=log_context)
+        
+        # Баланс адреса изменился: кэш /balance запросит его заново
+        invalidate_balance(wallet.blockchain_type, wallet.address)
+        
+        threshold = get_confirmation_threshold(wallet)
+        
+        # Адреса отправителей и получателей сохраняются в словаре адресов
+        addresses = await intern_addresses(session, [
+            address for tx in transactions for address in (tx.from_address, tx.to_address)
+        ])
         
         # Обрабатываем каждую транзакцию
-        for tx_data in transactions:
+        for tx in transactions:
+            # Одна и та же транзакция может отслеживаться несколькими кошельками,
+            # а одна транзакция может содержать несколько переводов токенов
+            tx_id = f"{tx.key}:{wallet.id}"
+            
             # Проверяем, существует ли уже такая транзакция
             result = await session.execute(
-                select(Transaction).where(Transaction.tx_id == tx_data["tx_id"])
+                select(Transaction).where(Transaction.tx_id == tx_id)
             )
             existing_tx = result.scalars().first()
             
-            if not existing_tx:
-                # Создаем новую запись о транзакции
-                new_tx = Transaction(
-                    tx_id=tx_data["tx_id"],
-                    wallet_id=wallet.wallet_id,
-                    hash=tx_data["hash"],
-                    from_address=tx_data["from"],
-                    to_address=tx_data["to"],
-                    value=tx_data["value"],
-                    timestamp=tx_data["timestamp"],
-                    block_number=tx_data["block_number"],
-                    notification_sent=False
-                )
-                
-                session.add(new_tx)
-                await session.commit()
-                
-                # Отправляем уведомление
-                await send_transaction_notification(bot, wallet.user_id, new_tx, wallet)
+            if existing_tx:
+                # Транзакция могла попасть в блок или быть перевключена после реорганизации
+                was_orphaned = existing_tx.status == TransactionStatus.orphaned
+                if refresh_block_position(existing_tx, tx) and was_orphaned and not existing_tx.is_historical:
+                    # При исключении из цепочки транзакция была вычтена из итогов
+                    await add_to_rollup(session, wallet, tx)
+                continue
+            
+            # Создаем новую запись о транзакции
+            new_tx = Transaction(
+                tx_id=tx_id,
+                wallet_id=wallet.id,
+                hash=tx.hash,
+                from_ref=addresses.get(tx.from_address),
+                to_ref=addresses.get(tx.to_address),
+                value=tx.amount,
+                fee=tx.fee_amount,
+                type=tx.type,
+                timestamp=tx.timestamp,
+                block_number=tx.block_number,
+                block_hash=tx.block_hash,
+                token_address=tx.token_address,
+                token_symbol=tx.token_symbol,
+                notification_sent=False
+            )
+            
+            # Уведомляем сразу только о транзакциях, уже достигших порога подтверждений;
+            # остальные продвигаются в advance_pending_transactions
+            confirmations = tx.confirmations if new_tx.block_number else 0
+            status = apply_confirmations(new_tx, confirmations, threshold)
+            
+            session.add(new_tx)
+            # Почасовые итоги фиксируются вместе с транзакцией
+            await add_to_rollup(session, wallet, tx)
+            await session.commit()
+            stored += 1
+            
+            if status == TransactionStatus.final:
+                # Отправляем уведомление и отмечаем, что оно отправлено
+                NOTIFICATION_QUEUE_DEPTH.inc()
+                sent = await send_transaction_notification(bot, wallet.user_id, new_tx, wallet, language_code)
+                NOTIFICATION_QUEUE_DEPTH.dec()
                 
-                # Отмечаем, что уведомление отправлено
-                new_tx.notification_sent = True
-                await session.commit()
+                if sent:
+                    new_tx.notification_sent = True
+                    await session.commit()
     
     # Обновляем время последней проверки
     wallet.last_checked_timestamp = datetime.utcnow()
     await session.commit()
+    
+    return stored
+
+async def run_monitor_cycle(bot) -> int:
+    """
+    Выполняет один цикл мониторинга всех кошельков
+
+    :param bot: Объект бота
+    :return: Количество проверенных кошельков
+    """
+    async with async_session() as session:
+        # Получаем кошельки из базы данных; адреса, не прошедшие проверку при запуске, не опрашиваются
+        result = await session.execute(select(Wallet).where(Wallet.address_valid.is_not(False)))
+        wallets = result.scalars().all()
+        
+        if not wallets:
+            logger.info("Нет кошельков для мониторинга")
+            return 0
+        
+        logger.info(f"Проверка {len(wallets)} кошельков")
+        cycle_start = time.perf_counter()
+        
+        # Отставание: сколько ждал кошелек, проверенный раньше всех остальных
+        now = datetime.utcnow()
+        MONITOR_LAG_SECONDS.set(max(
+            (now - (wallet.last_checked_timestamp or wallet.created_at or now)).total_seconds()
+            for wallet in wallets
+        ))
+        
+        # Запрашиваем транзакции у провайдеров (BTC - пакетами)
+        unmined = await get_unmined_transactions(session)
+        transactions = await fetch_wallet_transactions(wallets, unmined)
+        alert_filters = await get_alert_filters(session, wallets)
+        languages = await get_user_languages(session)
+        changed = set()
+        
+        # Сессия не допускает параллельного использования, поэтому записываем последовательно
+        for wallet in wallets:
+            wallet_transactions = transactions.get(wallet.id, [])
+            
+            # Фильтры уведомлений применяются до записи: отброшенные транзакции не сохраняются
+            if wallet_transactions and wallet.id in alert_filters:
+                wallet_transactions = apply_alert_filter(wallet, wallet_transactions, alert_filters[wallet.id], unmined)
+            
+            if await check_wallet_transactions(bot, wallet, session, wallet_transactions, languages.get(wallet.user_id)):
+                changed.add(wallet.id)
+        
+        # Продвигаем незавершенные транзакции по текущей высоте цепочки
+        await advance_pending_transactions(bot, session, languages)
+        
+        # Правила крупных движений проверяются по итогам только для измененных кошельков
+        await evaluate_alert_rules(bot, session, changed)
+        
+        duration = time.perf_counter() - cycle_start
+        MONITOR_CYCLE_SECONDS.observe(duration)
+        MONITOR_WALLETS_CHECKED.inc(len(wallets))
+        MONITOR_WALLETS_PER_SECOND.set(len(wallets) / duration if duration > 0 else 0)
+        MONITOR_LAST_CYCLE_TIMESTAMP.set(time.time())
+        record_cycle(duration, len(wallets))
+        
+        return len(wallets)
 
 async def monitor_wallets(bot):
     """Периодически проверяет все кошельки на наличие новых транзакций"""
@@ -69,25 +416,12 @@ async def monitor_wallets(bot):
     
     while True:
         try:
-            async with async_session() as session:
-                # Получаем все кошельки из базы данных
-                result = await session.execute(select(Wallet))
-                wallets = result.scalars().all()
-                
-                if wallets:
-                    logger.info(f"Проверка {len(wallets)} кошельков")
-                    
-                    # Запускаем проверку кошельков параллельно
-                    tasks = [check_wallet_transactions(bot, wallet, session) for wallet in wallets]
-                    await asyncio.gather(*tasks)
-                else:
-                    logger.info("Нет кошельков для мониторинга")
-                
+            await run_monitor_cycle(bot)
         except Exception as e:
             logger.error(f"Ошибка при мониторинге кошельков: {e}")
         
-        # Ждем перед следующей проверкой
-        await asyncio.sleep(MONITOR_INTERVAL)
+        # Ждем перед следующей проверкой (при воспроизведении записей - ускоренно)
+        await asyncio.sleep(scale_interval(MONITOR_INTERVAL))
 
 async def start_wallet_monitor(bot):
     """Запускает мониторинг кошельков в фоновом режиме"""
@@ -0,0 +1,76 @@
+"""
+Вынос декодирования крупных ответов провайдеров в пул процессов
+
+Разбор JSON и нормализация транзакций выполняются в потоке цикла событий и на
+больших пакетных ответах (сотни BTC-адресов) занимают заметное время CPU. При
+OFFLOAD_WORKERS > 0 ответы размером от OFFLOAD_MIN_BYTES передаются в
+ProcessPoolExecutor байтами, а обратно возвращаются готовые ChainTransaction,
+так что бот использует несколько ядер без разделения на шарды. Небольшие ответы
+декодируются на месте: передача между процессами для них дороже самого разбора.
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from config import OFFLOAD_WORKERS, OFFLOAD_MIN_BYTES
+from services.metrics import OFFLOAD_DECODE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: дочерние процессы не наследуют потоки логирования и сторожевой задачи
+        _executor = ProcessPoolExecutor(OFFLOAD_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        logger.info(f"Пул декодирования запущен: {OFFLOAD_WORKERS} процессов")
+    return _executor
+
+def should_offload(size: Optional[int]) -> bool:
+    """
+    Проверяет, стоит ли декодировать ответ указанного размера в пуле процессов
+
+    :param size: Размер тела ответа в байтах (None, если неизвестен)
+    :return: True, если пул включен и ответ не меньше OFFLOAD_MIN_BYTES
+    """
+    return OFFLOAD_WORKERS > 0 and size is not None and size >= OFFLOAD_MIN_BYTES
+
+async def run_decoder(decoder: Callable[..., Any], body: bytes, *args) -> Any:
+    """
+    Выполняет decoder(body, *args) в пуле процессов или на месте
+
+    Декодер должен быть функцией уровня модуля (services.decoders), а его
+    аргументы и результат - сериализуемыми pickle.
+
+    :param decoder: Функция декодирования
+    :param body: Тело ответа
+    :return: Результат декодера
+    """
+    name = decoder.__name__
+    started = time.perf_counter()
+
+    if should_offload(len(body)):
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(_get_executor(), decoder, body, *args)
+            OFFLOAD_DECODE_SECONDS.observe(time.perf_counter() - started, decoder=name, mode="process")
+            return result
+        except BrokenProcessPool:
+            # Процесс пула завершился аварийно: пересоздаем пул при следующем вызове
+            logger.error(f"Пул декодирования поврежден, {name} выполняется на месте")
+            shutdown_offload()
+
+    result = decoder(body, *args)
+    OFFLOAD_DECODE_SECONDS.observe(time.perf_counter() - started, decoder=name, mode="inline")
+    return result
+
+def shutdown_offload() -> None:
+    """Останавливает пул процессов, если он был запущен"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
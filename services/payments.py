@@ -1,39 +1,144 @@
+"""
+Платежи за подписку
+
+Платежи хранятся в таблице payments, поэтому переживают перезапуск и общие
+для нескольких экземпляров бота. Смена состояния выполняется условным UPDATE
+(... WHERE status = 'pending'): из нескольких одновременных попыток завершить
+или отменить платеж срабатывает только одна.
+
+Платежи текущих сессий оплаты держатся в памяти процесса: ожидающий платеж
+берется из кэша не дольше PAYMENT_CACHE_TTL секунд (его может изменить другой
+экземпляр), конечные состояния не меняются и кэшируются до вытеснения.
+Фоновая задача раз в PAYMENT_SWEEP_INTERVAL секунд одним запросом переводит
+в expired платежи, не оплаченные за PAYMENT_TTL секунд.
+"""
+import asyncio
 import logging
+import random
+import time
 import uuid
-import aiohttp
-import json
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, NamedTuple, Optional
 
-from config import CRYPTO_PAYMENT_API_KEY, CRYPTO_PAYMENT_API_SECRET
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from config import CRYPTO_PAYMENT_API_KEY, CRYPTO_PAYMENT_API_SECRET, PAYMENT_TTL, PAYMENT_SWEEP_INTERVAL, PAYMENT_CACHE_TTL
+from models.payment import Payment, PaymentStatus
 from models.subscription import Subscription, SubscriptionStatus
+from services.db import async_session
+from services.metrics import PAYMENT_TRANSITIONS
 
 logger = logging.getLogger(__name__)
 
 # В учебных целях используем имитацию API платежной системы
 # В реальном приложении здесь должны быть настоящие запросы к API платежных систем
 
-# Имитируем хранилище платежей для тестирования
-MOCK_PAYMENTS = {}
+# Наибольшее число платежей в кэше процесса
+PAYMENT_CACHE_SIZE = 10000
+
+class PaymentInfo(NamedTuple):
+    """Неизменяемый снимок платежа для кэша"""
+    payment_id: str
+    user_id: int
+    amount: Decimal
+    currency: str
+    payment_method: str
+    plan_type: str
+    status: PaymentStatus
+    crypto_currency: Optional[str]
+    address: Optional[str]
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, payment: Payment) -> "PaymentInfo":
+        return cls(*(getattr(payment, field) for field in cls._fields))
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Данные платежа для обработчиков (состояние - строкой)"""
+        data = self._asdict()
+        data["status"] = self.status.value
+        return data
+
+# payment_id -> (снимок, время загрузки по time.monotonic)
+_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+def _remember(info: PaymentInfo) -> PaymentInfo:
+    _cache[info.payment_id] = (info, time.monotonic())
+    _cache.move_to_end(info.payment_id)
+    if len(_cache) > PAYMENT_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return info
+
+async def get_payment(payment_id: str) -> Optional[PaymentInfo]:
+    """
+    Возвращает платеж из кэша или базы данных
+
+    :param payment_id: ID платежа
+    :return: Снимок платежа или None, если платеж не найден
+    """
+    cached = _cache.get(payment_id)
+    if cached is not None:
+        info, loaded_at = cached
+        if info.status != PaymentStatus.pending or time.monotonic() - loaded_at < PAYMENT_CACHE_TTL:
+            return info
+
+    async with async_session() as session:
+        payment = await session.get(Payment, payment_id)
+        if payment is None:
+            _cache.pop(payment_id, None)
+            return None
+        return _remember(PaymentInfo.from_model(payment))
+
+async def _finish_payment(payment_id: str, status: PaymentStatus, **values) -> Optional[PaymentInfo]:
+    """
+    Переводит ожидающий платеж в конечное состояние
+
+    :return: Актуальный снимок платежа (состояние могло быть изменено раньше другим запросом)
+             или None, если платеж не найден
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            update(Payment)
+            .where(Payment.payment_id == payment_id, Payment.status == PaymentStatus.pending)
+            .values(status=status, updated_at=datetime.utcnow(), **values)
+        )
+        await session.commit()
+        if result.rowcount:
+            PAYMENT_TRANSITIONS.inc(status=status.value)
+
+        payment = await session.get(Payment, payment_id)
+        if payment is None:
+            _cache.pop(payment_id, None)
+            return None
+        return _remember(PaymentInfo.from_model(payment))
 
 async def create_payment(user_id, amount, currency, payment_method, plan_type):
     """Создает новый платеж"""
     try:
         # Генерируем уникальный ID платежа
         payment_id = str(uuid.uuid4())
-        
-        # Создаем запись о платеже в нашем мок-хранилище
-        MOCK_PAYMENTS[payment_id] = {
-            "user_id": user_id,
-            "amount": amount,
-            "currency": currency,
-            "payment_method": payment_method,
-            "status": "pending",
-            "created_at": datetime.utcnow(),
-            "plan_type": plan_type
-        }
-        
+
+        payment = Payment(
+            payment_id=payment_id,
+            user_id=user_id,
+            amount=Decimal(str(amount)),
+            currency=currency,
+            payment_method=payment_method,
+            plan_type=plan_type,
+            status=PaymentStatus.pending,
+            created_at=datetime.utcnow()
+        )
+
+        async with async_session() as session:
+            session.add(payment)
+            await session.commit()
+
+        _remember(PaymentInfo.from_model(payment))
         logger.info(f"Создан новый платеж: {payment_id} для пользователя {user_id}")
-        
+
         return payment_id
     except Exception as e:
         logger.error(f"Ошибка при создании платежа: {e}")
@@ -44,30 +149,35 @@ async def get_payment_address(payment_id, crypto_currency):
     try:
         # Это мок-функция, в реальном приложении здесь будет запрос к API
         # для получения адреса кошелька для оплаты
-        
+
         # Имитируем разные адреса для разных криптовалют
         addresses = {
             "BTC": "bc1qxy2kgdygjrsqtzq2n0yrf2493p83kkfjhx0wlh",
             "ETH": "0x71C7656EC7ab88b098defB751B7401B5f6d8976F",
             "USDT": "TNPeeaaFB7K9cmo4uQpcU32zBp8RJVMN9H"
         }
-        
-        # Обновляем информацию о платеже в нашем мок-хранилище
-        if payment_id in MOCK_PAYMENTS:
-            MOCK_PAYMENTS[payment_id]["crypto_currency"] = crypto_currency
-            MOCK_PAYMENTS[payment_id]["address"] = addresses.get(crypto_currency)
-            
-            return {
-                "status": "success",
-                "address": addresses.get(crypto_currency),
-                "amount": MOCK_PAYMENTS[payment_id]["amount"],
-                "currency": crypto_currency
-            }
-        else:
-            return {
-                "status": "error",
-                "message": "Платеж не найден"
-            }
+        address = addresses.get(crypto_currency)
+
+        # Сохраняем выбранную криптовалюту и адрес в платеже
+        async with async_session() as session:
+            payment = await session.get(Payment, payment_id)
+            if payment is None:
+                return {
+                    "status": "error",
+                    "message": "Платеж не найден"
+                }
+
+            payment.crypto_currency = crypto_currency
+            payment.address = address
+            await session.commit()
+            _remember(PaymentInfo.from_model(payment))
+
+        return {
+            "status": "success",
+            "address": address,
+            "amount": payment.amount,
+            "currency": crypto_currency
+        }
     except Exception as e:
         logger.error(f"Ошибка при получении адреса для оплаты: {e}")
         return {
@@ -80,19 +190,18 @@ async def check_payment_status(payment_id):
     try:
         # В реальном приложении здесь будет запрос к API платежной системы
         # Для тестирования просто вернем сохраненный статус
-        
-        if payment_id in MOCK_PAYMENTS:
+        info = await get_payment(payment_id)
+
+        if info is not None:
             # С вероятностью 30% имитируем успешную оплату
             # В реальном приложении этого кода не будет
-            import random
-            if random.random() < 0.3 and MOCK_PAYMENTS[payment_id]["status"] == "pending":
-                MOCK_PAYMENTS[payment_id]["status"] = "completed"
-                MOCK_PAYMENTS[payment_id]["completed_at"] = datetime.utcnow()
-            
+            if random.random() < 0.3 and info.status == PaymentStatus.pending:
+                info = await _finish_payment(payment_id, PaymentStatus.completed, completed_at=datetime.utcnow()) or info
+
             return {
                 "status": "success",
-                "payment_status": MOCK_PAYMENTS[payment_id]["status"],
-                "payment_data": MOCK_PAYMENTS[payment_id]
+                "payment_status": info.status.value,
+                "payment_data": info.as_dict()
             }
         else:
             return {
@@ -110,15 +219,18 @@ async def cancel_payment(payment_id):
     """Отменяет платеж"""
     try:
         # В реальном приложении здесь будет запрос к API платежной системы
-        
-        if payment_id in MOCK_PAYMENTS:
-            MOCK_PAYMENTS[payment_id]["status"] = "cancelled"
-            MOCK_PAYMENTS[payment_id]["cancelled_at"] = datetime.utcnow()
-            
+        info = await _finish_payment(payment_id, PaymentStatus.cancelled, cancelled_at=datetime.utcnow())
+
+        if info is not None and info.status == PaymentStatus.cancelled:
             return {
                 "status": "success",
                 "message": "Платеж отменен"
             }
+        elif info is not None:
+            return {
+                "status": "error",
+                "message": f"Платеж уже в состоянии {info.status.value}"
+            }
         else:
             return {
                 "status": "error",
@@ -131,53 +243,118 @@ async def cancel_payment(payment_id):
             "message": str(e)
         }
 
-async def activate_subscription(session, user_id, payment_id, plan_type):
+async def expire_payments() -> int:
+    """
+    Переводит в expired ожидающие платежи старше PAYMENT_TTL одним запросом
+
+    :return: Количество истекших платежей
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=PAYMENT_TTL)
+    async with async_session() as session:
+        result = await session.execute(
+            update(Payment)
+            .where(Payment.status == PaymentStatus.pending, Payment.created_at < cutoff)
+            .values(status=PaymentStatus.expired, cancelled_at=datetime.utcnow(), updated_at=datetime.utcnow())
+        )
+        await session.commit()
+
+    # Снимки истекших платежей в кэше устарели
+    for payment_id, (info, _) in list(_cache.items()):
+        if info.status == PaymentStatus.pending and info.created_at < cutoff:
+            del _cache[payment_id]
+
+    if result.rowcount:
+        PAYMENT_TRANSITIONS.inc(result.rowcount, status=PaymentStatus.expired.value)
+    return result.rowcount
+
+async def start_payment_sweeper():
+    """Периодически отменяет неоплаченные платежи с истекшим сроком в фоновом режиме"""
+    logger.info("Запуск очистки истекших платежей")
+
+    while True:
+        try:
+            expired = await expire_payments()
+            if expired:
+                logger.info(f"Истекло неоплаченных платежей: {expired}")
+        except Exception as e:
+            logger.error(f"Ошибка при очистке истекших платежей: {e}")
+
+        await asyncio.sleep(PAYMENT_SWEEP_INTERVAL)
+
+async def activate_subscription(session, user_id, payment_id, plan_type=None):
     """Активирует подписку для пользователя после подтверждения платежа"""
     try:
         from models.user import User, SubscriptionLevel
-        
-        # Определяем срок действия подписки
+
+        # Платеж забирается условным UPDATE (... WHERE activated_at IS NULL): из нескольких
+        # одновременных проверок (повторное нажатие, другой экземпляр бота) подписку создает одна,
+        # а при ошибке ниже отметка откатывается вместе с транзакцией
         now = datetime.utcnow()
+        result = await session.execute(
+            update(Payment)
+            .where(
+                Payment.payment_id == payment_id,
+                Payment.user_id == user_id,
+                Payment.status == PaymentStatus.completed,
+                Payment.activated_at.is_(None)
+            )
+            .values(activated_at=now, updated_at=now)
+        )
+
+        payment = await session.get(Payment, payment_id)
+        if payment is None or payment.user_id != user_id or payment.status != PaymentStatus.completed:
+            await session.rollback()
+            logger.error(f"Платеж {payment_id} пользователя {user_id} не найден или не оплачен")
+            return False
+
+        if not result.rowcount:
+            # Подписка по платежу уже активирована: повторная проверка ее не продлевает
+            await session.rollback()
+            return True
+
+        # План берется из платежа: состояние диалога может быть на другом экземпляре бота
+        plan_type = payment.plan_type or plan_type
+
+        # Определяем срок действия подписки
         if plan_type == "monthly":
             subscription_end = now + timedelta(days=30)
         elif plan_type == "yearly":
             subscription_end = now + timedelta(days=365)
         else:
+            await session.rollback()
             return False
-        
-        # Обновляем пользователя
-        from sqlalchemy.future import select
-        
+
         # Получаем пользователя
         result = await session.execute(select(User).where(User.user_id == user_id))
         user = result.scalars().first()
-        
+
         if user:
             # Обновляем его подписку
             user.subscription_level = SubscriptionLevel.premium
             user.subscription_expiry = subscription_end
-            
+
             # Создаем запись о подписке
             subscription = Subscription(
                 user_id=user_id,
-                payment_method=MOCK_PAYMENTS[payment_id].get("payment_method", "unknown"),
+                payment_method=payment.payment_method,
                 payment_id=payment_id,
-                amount=MOCK_PAYMENTS[payment_id].get("amount", 0),
-                currency=MOCK_PAYMENTS[payment_id].get("currency", "USD"),
+                amount=payment.amount,
+                currency=payment.currency,
                 status=SubscriptionStatus.active,
                 subscription_start=now,
                 subscription_end=subscription_end
             )
-            
+
             session.add(subscription)
             await session.commit()
-            
+
             logger.info(f"Активирована подписка для пользователя {user_id}, план: {plan_type}")
             return True
         else:
+            await session.rollback()
             logger.error(f"Пользователь не найден: {user_id}")
             return False
     except Exception as e:
         logger.error(f"Ошибка при активации подписки: {e}")
         await session.rollback()
-        return False 
\ No newline at end of file
+        return False
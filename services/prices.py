@@ -0,0 +1,212 @@
+"""
+Котировки монет и токенов в USD
+
+Фоновое обновление (start_price_updater) раз в PRICE_REFRESH_INTERVAL
+запрашивает цены у провайдера в стиле CoinGecko и хранит их в памяти
+(_quotes) и в таблице price_quotes, откуда последний снимок загружается
+при запуске. Обработчики читают цены только из кэша (get_price) и не
+обращаются к сети; котировки старше PRICE_MAX_AGE не используются.
+
+Котируются монеты блокчейнов, известные токены (KNOWN_TOKENS) и токены
+из сохраненных транзакций кошельков пользователей. Таблица tokens
+сюда не входит: в ней метаданные всех встреченных контрактов, в том
+числе спам-токенов, рассылаемых на адреса.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.future import select
+
+from config import PRICE_API_URL, PRICE_REFRESH_INTERVAL, PRICE_MAX_AGE
+from models.price import PriceQuote
+from models.transaction import Transaction
+from models.wallet import BlockchainType, Wallet
+from services.db import async_session
+from services.http import create_session, scale_interval
+from services.metrics import CACHE_REQUESTS
+from utils.chains import KNOWN_TOKENS
+from utils.jsonstream import loads
+
+logger = logging.getLogger(__name__)
+
+# Идентификаторы монет блокчейнов у провайдера цен (API в стиле CoinGecko)
+NATIVE_PRICE_IDS = {
+    BlockchainType.BTC: "bitcoin",
+    BlockchainType.ETH: "ethereum",
+    BlockchainType.BNB: "binancecoin"
+}
+
+# Платформы токенов у провайдера цен
+TOKEN_PLATFORMS = {
+    BlockchainType.ETH: "ethereum",
+    BlockchainType.BNB: "binance-smart-chain"
+}
+
+# Максимум контрактов в одном запросе цен токенов
+TOKEN_PRICE_BATCH_SIZE = 100
+
+# Кэш котировок в памяти: актив -> (цена в USD, время котировки)
+_quotes: Dict[str, Tuple[float, datetime]] = {}
+
+def token_asset(blockchain_type: BlockchainType, contract: str) -> str:
+    """Ключ котировки токена"""
+    return f"{blockchain_type.value}:{contract.lower()}"
+
+def get_price(asset: str, max_age: float = PRICE_MAX_AGE) -> Optional[float]:
+    """
+    Возвращает цену актива из кэша без обращения к сети
+
+    :param asset: Монета блокчейна ("BTC") или ключ токена (token_asset)
+    :param max_age: Максимальный возраст котировки, секунды
+    :return: Цена в USD или None, если котировки нет или она устарела
+    """
+    quote = _quotes.get(asset)
+    if quote is None or datetime.utcnow() - quote[1] > timedelta(seconds=max_age):
+        CACHE_REQUESTS.inc(cache="price", result="miss")
+        return None
+
+    CACHE_REQUESTS.inc(cache="price", result="hit")
+    return quote[0]
+
+def portfolio_total(holdings: Iterable[Tuple[str, float]]) -> Tuple[float, List[str]]:
+    """
+    Считает стоимость портфеля по кэшированным котировкам
+
+    :param holdings: Пары (актив, количество)
+    :return: (сумма в USD по активам с актуальной ценой, активы без актуальной цены)
+    """
+    total = 0.0
+    unpriced = []
+
+    for asset, amount in holdings:
+        price = get_price(asset)
+        if price is None:
+            if asset not in unpriced:
+                unpriced.append(asset)
+        else:
+            total += amount * price
+
+    return total, unpriced
+
+async def _fetch_json(session, url: str, params: Dict[str, str]) -> Optional[Dict]:
+    async with session.get(url, params=params) as response:
+        if response.status != 200:
+            logger.error(f"Ошибка API цен ({response.status}): {await response.text()}")
+            return None
+        return loads(await response.read())
+
+async def fetch_quotes(token_contracts: Dict[BlockchainType, List[str]]) -> Dict[str, float]:
+    """
+    Запрашивает котировки монет одним пакетным запросом и токенов - по одному запросу на платформу
+
+    :param token_contracts: Контракты токенов по блокчейнам
+    :return: Словарь {актив: цена в USD}
+    """
+    prices: Dict[str, float] = {}
+
+    async with create_session() as session:
+        data = await _fetch_json(session, f"{PRICE_API_URL}/simple/price", {
+            "ids": ",".join(NATIVE_PRICE_IDS.values()),
+            "vs_currencies": "usd"
+        })
+        for blockchain_type, price_id in NATIVE_PRICE_IDS.items():
+            price = ((data or {}).get(price_id) or {}).get("usd")
+            if price is not None:
+                prices[blockchain_type.value] = float(price)
+
+        for blockchain_type, contracts in token_contracts.items():
+            platform = TOKEN_PLATFORMS.get(blockchain_type)
+            if not platform or not contracts:
+                continue
+
+            # Длина URL ограничена, поэтому контракты передаются пакетами
+            for start in range(0, len(contracts), TOKEN_PRICE_BATCH_SIZE):
+                data = await _fetch_json(session, f"{PRICE_API_URL}/simple/token_price/{platform}", {
+                    "contract_addresses": ",".join(contracts[start:start + TOKEN_PRICE_BATCH_SIZE]),
+                    "vs_currencies": "usd"
+                })
+                for contract, quote in (data or {}).items():
+                    if (quote or {}).get("usd") is not None:
+                        prices[token_asset(blockchain_type, contract)] = float(quote["usd"])
+
+    return prices
+
+async def load_price_snapshot():
+    """Загружает последний сохраненный снимок котировок в кэш (при запуске бота)"""
+    async with async_session() as session:
+        result = await session.execute(select(PriceQuote))
+        for quote in result.scalars().all():
+            _quotes[quote.asset] = (quote.price_usd, quote.quoted_at)
+
+    logger.info(f"Загружено {len(_quotes)} сохраненных котировок")
+
+async def get_quoted_tokens(session) -> Dict[BlockchainType, List[str]]:
+    """
+    Возвращает контракты токенов, котировки которых нужно обновлять
+
+    :param session: Сессия базы данных
+    :return: Известные токены и токены из транзакций кошельков по блокчейнам
+    """
+    contracts = {
+        blockchain_type: set(tokens.values())
+        for blockchain_type, tokens in KNOWN_TOKENS.items()
+    }
+
+    result = await session.execute(
+        select(Wallet.blockchain_type, Transaction.token_address)
+        .join(Wallet, Wallet.id == Transaction.wallet_id)
+        .where(Transaction.token_address.is_not(None))
+        .distinct()
+    )
+    for blockchain_type, contract in result.all():
+        contracts.setdefault(blockchain_type, set()).add(contract.lower())
+
+    return {blockchain_type: sorted(tokens) for blockchain_type, tokens in contracts.items()}
+
+async def refresh_prices() -> int:
+    """
+    Обновляет котировки монет и токенов (get_quoted_tokens) и сохраняет снимок
+
+    :return: Количество обновленных котировок
+    """
+    async with async_session() as session:
+        token_contracts = await get_quoted_tokens(session)
+
+    prices = await fetch_quotes(token_contracts)
+    if not prices:
+        return 0
+
+    now = datetime.utcnow()
+    for asset, price in prices.items():
+        _quotes[asset] = (price, now)
+
+    async with async_session() as session:
+        # Сохраняем снимок: обновляем существующие строки, добавляем новые
+        result = await session.execute(select(PriceQuote).where(PriceQuote.asset.in_(list(prices))))
+        stored = {quote.asset: quote for quote in result.scalars().all()}
+
+        for asset, price in prices.items():
+            quote = stored.get(asset)
+            if quote is None:
+                session.add(PriceQuote(asset=asset, price_usd=price, quoted_at=now))
+            else:
+                quote.price_usd, quote.quoted_at = price, now
+
+        await session.commit()
+
+    return len(prices)
+
+async def start_price_updater():
+    """Периодически обновляет котировки в фоновом режиме"""
+    logger.info("Запуск обновления котировок")
+
+    while True:
+        try:
+            count = await refresh_prices()
+            logger.debug(f"Обновлено {count} котировок")
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении котировок: {e}")
+
+        await asyncio.sleep(scale_interval(PRICE_REFRESH_INTERVAL))
@@ -0,0 +1,270 @@
+"""
+Профилирование работающего бота по запросу администратора
+
+Пока профилирование выключено, модуль ничего не делает: нет потоков, трассировки
+памяти и фабрики задач. Сеанс профилирования (команда /profile или сигнал SIGUSR1)
+на заданное время включает:
+- поток, который с интервалом PROFILE_SAMPLE_INTERVAL снимает стек основного
+  потока (цикла событий) и считает, где проходит время;
+- учет времени создания asyncio-задач для дампа самых долгих ожидающих корутин;
+- tracemalloc для снимка крупнейших выделений памяти за время сеанса.
+По завершении формируются текстовые отчеты, которые отправляются администратору.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import PROFILE_SAMPLE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Отчет: (имя файла, содержимое)
+Report = Tuple[str, bytes]
+
+# Время создания (или первого обнаружения) задач
+_task_seen: "weakref.WeakKeyDictionary[asyncio.Task, float]" = weakref.WeakKeyDictionary()
+
+class SamplingProfiler:
+    """Статистический профилировщик одного потока на основе sys._current_frames()"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = os.path.relpath(code.co_filename) if code.co_filename.startswith(os.getcwd()) else code.co_filename
+            label = f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+
+            if stack:
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        """Стеки в свернутом формате (flamegraph.pl, speedscope)"""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self, limit: int = 40) -> str:
+        """Функции с наибольшим собственным и суммарным временем"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+
+        samples = self.samples or 1
+        lines = [f"Сэмплов: {self.samples}, интервал: {self.interval * 1000:.1f} мс", ""]
+
+        for title, counter in (("Собственное время", own), ("Суммарное время", total)):
+            lines.append(title)
+            for label, count in counter.most_common(limit):
+                lines.append(f"{count / samples * 100:6.1f}%  {count:7d}  {label}")
+            lines.append("")
+
+        return "\n".join(lines)
+
+def _await_chain(coro) -> List[str]:
+    """Цепочка ожидания корутины от внешней к самой вложенной"""
+    chain = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        code = frame.f_code
+        chain.append(f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return chain
+
+def dump_tasks(limit: int = 30) -> str:
+    """
+    Формирует дамп ожидающих asyncio-задач, начиная с самых долгих
+
+    Возраст задачи известен точно для задач, созданных во время сеанса
+    профилирования; для остальных это время с их первого обнаружения.
+
+    :param limit: Максимальное количество задач в дампе
+    :return: Текст дампа
+    """
+    now = time.monotonic()
+    tasks = [task for task in asyncio.all_tasks() if not task.done()]
+    for task in tasks:
+        _task_seen.setdefault(task, now)
+
+    tasks.sort(key=lambda task: _task_seen[task])
+    lines = [f"Ожидающих задач: {len(tasks)}", ""]
+
+    for task in tasks[:limit]:
+        chain = _await_chain(task.get_coro())
+        lines.append(f"{now - _task_seen[task]:10.1f} с  {task.get_name()}")
+        lines.extend(f"              {location}" for location in chain)
+        lines.append("")
+
+    return "\n".join(lines)
+
+def _memory_report(snapshot: tracemalloc.Snapshot, limit: int = 30) -> str:
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+    statistics = snapshot.statistics("lineno")
+    total = sum(stat.size for stat in statistics)
+
+    lines = [f"Память, выделенная за время сеанса и не освобожденная: {total / 2**20:.1f} МБ", ""]
+    for stat in statistics[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:10.1f} КБ  {stat.count:8d}  {frame.filename}:{frame.lineno}")
+
+    return "\n".join(lines)
+
+class ProfilingSession:
+    """Сеанс профилирования; создается и завершается в потоке цикла событий"""
+
+    def __init__(self, seconds: float, deliver: Callable[[List[Report]], Awaitable[None]]):
+        self.seconds = seconds
+        self.deliver = deliver
+        self.started_at = datetime.utcnow()
+        self.cycles: List[Tuple[float, int]] = []
+        self._stopped = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._previous_factory = self._loop.get_task_factory()
+        self._own_tracemalloc = not tracemalloc.is_tracing()
+        self._profiler = SamplingProfiler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+
+    def _task_factory(self, loop, coro, **kwargs):
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        _task_seen[task] = time.monotonic()
+        return task
+
+    def start(self) -> None:
+        if self._own_tracemalloc:
+            tracemalloc.start(1)
+
+        # Задачи, существовавшие до сеанса, отсчитываются от его начала
+        now = time.monotonic()
+        for task in asyncio.all_tasks():
+            _task_seen.setdefault(task, now)
+
+        self._loop.set_task_factory(self._task_factory)
+        self._profiler.start()
+
+    async def run(self) -> None:
+        try:
+            await asyncio.wait_for(self._stopped.wait(), self.seconds)
+        except asyncio.TimeoutError:
+            pass
+
+        reports = self.finish()
+        try:
+            await self.deliver(reports)
+        except Exception as e:
+            logger.error(f"Ошибка при отправке отчетов профилирования: {e}")
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def finish(self) -> List[Report]:
+        self._profiler.stop()
+        self._loop.set_task_factory(self._previous_factory)
+
+        tasks = dump_tasks()
+        snapshot = tracemalloc.take_snapshot()
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+
+        elapsed = (datetime.utcnow() - self.started_at).total_seconds()
+        header = f"Профилирование {self.started_at:%Y-%m-%d %H:%M:%S} UTC, {elapsed:.1f} с\n"
+        if self.cycles:
+            header += "Циклы мониторинга (секунды, кошельки): " + ", ".join(
+                f"{seconds:.2f}/{wallets}" for seconds, wallets in self.cycles
+            ) + "\n"
+
+        stamp = f"{self.started_at:%Y%m%d-%H%M%S}"
+        return [
+            (f"profile-{stamp}.txt", (header + "\n" + self._profiler.summary()).encode("utf-8")),
+            (f"stacks-{stamp}.collapsed", self._profiler.collapsed().encode("utf-8")),
+            (f"tasks-{stamp}.txt", tasks.encode("utf-8")),
+            (f"memory-{stamp}.txt", _memory_report(snapshot).encode("utf-8")),
+        ]
+
+_session: Optional[ProfilingSession] = None
+
+def is_profiling() -> bool:
+    return _session is not None
+
+def start_profiling(seconds: float, deliver: Callable[[List[Report]], Awaitable[None]]) -> bool:
+    """
+    Запускает сеанс профилирования; вызывается из цикла событий
+
+    :param seconds: Длительность сеанса
+    :param deliver: Корутина, получающая отчеты после завершения
+    :return: False, если сеанс уже идет
+    """
+    global _session
+    if _session is not None:
+        return False
+
+    session = ProfilingSession(seconds, deliver)
+    session.start()
+    _session = session
+    logger.info(f"Профилирование запущено на {seconds:.0f} с")
+
+    async def run() -> None:
+        global _session
+        try:
+            await session.run()
+        finally:
+            _session = None
+            logger.info("Профилирование завершено")
+
+    asyncio.create_task(run(), name="profiling-session")
+    return True
+
+def stop_profiling() -> bool:
+    """Досрочно завершает сеанс; отчеты отправляются как при обычном завершении"""
+    if _session is None:
+        return False
+    _session.stop()
+    return True
+
+def record_cycle(seconds: float, wallets: int) -> None:
+    """Запоминает длительность цикла мониторинга, если идет профилирование"""
+    if _session is not None:
+        _session.cycles.append((seconds, wallets))
@@ -0,0 +1,110 @@
+"""
+Общее ограничение частоты запросов к провайдерам с приоритетами
+
+Все HTTP-сессии из services.http.create_session проходят через ограничитель:
+перед отправкой запроса трассировка aiohttp ожидает токен в корзине
+провайдера (PROVIDER_RATE_LIMITS, запросов в секунду). Ожидающие запросы
+получают токены в порядке приоритета, поэтому фоновые задачи (загрузка
+истории) расходуют только ту часть лимита, которую не использует мониторинг
+и обработчики пользователей, и не вызывают ошибок превышения лимита у них.
+
+Приоритет задается для текущей задачи asyncio через request_priority.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import TraceConfig
+
+from config import PROVIDER_RATE_LIMITS
+from services.metrics import RATE_LIMIT_WAIT_SECONDS, request_labels
+
+# Приоритеты запросов: меньшее значение обслуживается раньше
+PRIORITY_REALTIME = 0
+PRIORITY_BACKFILL = 2
+
+request_priority: ContextVar[int] = ContextVar("request_priority", default=PRIORITY_REALTIME)
+
+class PriorityRateLimiter:
+    """Корзина токенов, которая выдает токены ожидающим в порядке приоритета"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: int = PRIORITY_REALTIME) -> None:
+        """Ожидает токен; запросы с меньшим значением priority обслуживаются первыми"""
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        self._schedule()
+        await future
+
+    def _schedule(self) -> None:
+        if self._timer is None and self._waiters:
+            delay = max((1 - self._tokens) / self.rate, 0)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._release)
+
+    def _release(self) -> None:
+        self._timer = None
+        self._refill()
+
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            # Ожидание могло быть отменено (например, по таймауту запроса)
+            if not future.done():
+                self._tokens -= 1
+                future.set_result(None)
+
+        self._schedule()
+
+_limiters: Dict[str, PriorityRateLimiter] = {}
+
+def get_limiter(provider: str) -> Optional[PriorityRateLimiter]:
+    """
+    Возвращает ограничитель провайдера
+
+    :param provider: Метка провайдера (services.metrics.request_labels)
+    :return: Ограничитель или None, если лимит для провайдера не задан
+    """
+    rate = PROVIDER_RATE_LIMITS.get(provider)
+    if not rate:
+        return None
+
+    if provider not in _limiters:
+        _limiters[provider] = PriorityRateLimiter(rate)
+    return _limiters[provider]
+
+async def _on_request_start(session, context, params) -> None:
+    provider, _ = request_labels(params.url)
+    limiter = get_limiter(provider)
+    if limiter is None:
+        return
+
+    priority = request_priority.get()
+    started = time.perf_counter()
+    await limiter.acquire(priority)
+    RATE_LIMIT_WAIT_SECONDS.observe(time.perf_counter() - started, provider=provider, priority=str(priority))
+
+def rate_limit_trace_config() -> TraceConfig:
+    """Возвращает TraceConfig aiohttp, ожидающий токен провайдера перед каждым запросом"""
+    trace_config = TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    return trace_config
@@ -0,0 +1,164 @@
+"""
+Хранение истории транзакций: сроки по уровням подписки, очистка и архивация
+
+Транзакции старше срока хранения уровня подписки владельца кошелька
+(RETENTION_DAYS_FREE, RETENTION_DAYS_PREMIUM; 0 - хранить бессрочно)
+удаляются фоновой задачей небольшими пакетами: каждый пакет - отдельная
+короткая транзакция базы данных, поэтому блокировка записи не удерживается
+надолго и мониторинг не ждет очистки. Незавершенные транзакции (seen,
+confirmed) не удаляются.
+
+При заданном RETENTION_ARCHIVE_DIR удаляемые строки предварительно
+дописываются в сжатый JSONL-файл (gzip, по файлу на день). После очистки
+из словаря адресов удаляются адреса без ссылок (services/addresses.py),
+а почасовые итоги старше наибольшего окна правил оповещений.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.future import select
+
+from config import (
+    ALERT_MAX_WINDOW_HOURS, RETENTION_DAYS_FREE, RETENTION_DAYS_PREMIUM, RETENTION_INTERVAL, RETENTION_BATCH_SIZE, RETENTION_ARCHIVE_DIR
+)
+from models.rollup import WalletRollup
+from models.transaction import Transaction, TransactionStatus
+from models.user import User, SubscriptionLevel
+from models.wallet import Wallet
+from services.addresses import compact_addresses
+from services.db import async_session
+from services.export import transaction_record
+from services.metrics import RETENTION_ROWS
+from services.rollups import hour_start
+
+logger = logging.getLogger(__name__)
+
+# Сроки хранения по уровням подписки, дни
+RETENTION_DAYS = {
+    SubscriptionLevel.free: RETENTION_DAYS_FREE,
+    SubscriptionLevel.premium: RETENTION_DAYS_PREMIUM
+}
+
+# Состояния, в которых транзакция больше не меняется и может быть удалена
+SETTLED_STATUSES = (TransactionStatus.final, TransactionStatus.orphaned)
+
+def get_retention_cutoff(level: Optional[SubscriptionLevel]) -> Optional[datetime]:
+    """
+    Возвращает границу хранения для уровня подписки
+
+    :param level: Уровень подписки (None - бесплатный)
+    :return: Транзакции старше этого времени удаляются; None - хранить бессрочно
+    """
+    days = RETENTION_DAYS.get(level or SubscriptionLevel.free, 0)
+    if days <= 0:
+        return None
+    return datetime.utcnow() - timedelta(days=days)
+
+def _write_archive(path: str, records: List[Dict[str, Any]]) -> None:
+    """Дописывает записи в архив; каждый пакет - отдельный член gzip, файл остается читаемым целиком"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+    with gzip.open(path, "at", encoding="utf-8") as archive:
+        archive.write(data)
+
+async def purge_transactions(level: SubscriptionLevel, cutoff: datetime, batch_size: int = RETENTION_BATCH_SIZE) -> int:
+    """
+    Удаляет завершенные транзакции кошельков уровня подписки старше границы
+
+    :param level: Уровень подписки владельцев кошельков
+    :param cutoff: Граница хранения
+    :param batch_size: Количество транзакций в одном пакете
+    :return: Количество удаленных транзакций
+    """
+    level_filter = User.subscription_level == level
+    if level == SubscriptionLevel.free:
+        # Уровень не задан - бесплатный
+        level_filter = level_filter | User.subscription_level.is_(None)
+
+    # Условие по кошелькам использует индекс (wallet_id, timestamp, tx_id)
+    wallet_ids = select(Wallet.id).join(User, Wallet.user_id == User.user_id).where(level_filter)
+
+    archive_path = None
+    if RETENTION_ARCHIVE_DIR:
+        archive_path = os.path.join(RETENTION_ARCHIVE_DIR, f"transactions-{datetime.utcnow():%Y%m%d}.jsonl.gz")
+
+    removed = 0
+    while True:
+        async with async_session() as session:
+            result = await session.execute(
+                select(Transaction)
+                .where(
+                    Transaction.wallet_id.in_(wallet_ids),
+                    Transaction.timestamp < cutoff,
+                    Transaction.status.in_(SETTLED_STATUSES),
+                    # Исключенные транзакции, ожидающие повторного включения, еще меняются
+                    Transaction.orphaned_at_height.is_(None)
+                )
+                .limit(batch_size)
+            )
+            batch = list(result.scalars().all())
+            if not batch:
+                break
+
+            if archive_path:
+                # Архив записывается до удаления: при сбое строки останутся в базе
+                await asyncio.to_thread(_write_archive, archive_path, [transaction_record(tx) for tx in batch])
+
+            await session.execute(delete(Transaction).where(Transaction.tx_id.in_([tx.tx_id for tx in batch])))
+            await session.commit()
+
+        removed += len(batch)
+        RETENTION_ROWS.inc(len(batch), tier=level.value)
+
+        # Пауза между пакетами: блокировка записи свободна для мониторинга
+        await asyncio.sleep(0.05)
+
+    return removed
+
+async def purge_rollups() -> int:
+    """
+    Удаляет почасовые итоги, вышедшие за наибольшее окно правил оповещений
+
+    :return: Количество удаленных строк
+    """
+    cutoff = hour_start(datetime.utcnow() - timedelta(hours=ALERT_MAX_WINDOW_HOURS))
+    async with async_session() as session:
+        result = await session.execute(delete(WalletRollup).where(WalletRollup.hour < cutoff))
+        await session.commit()
+    return result.rowcount
+
+async def run_retention() -> Dict[str, int]:
+    """
+    Выполняет очистку истории по всем уровням подписки, сжатие словаря адресов и очистку итогов
+
+    :return: Количество удаленных транзакций по уровням, адресов ("addresses") и итогов ("rollups")
+    """
+    stats = {}
+    for level in RETENTION_DAYS:
+        cutoff = get_retention_cutoff(level)
+        if cutoff is not None:
+            stats[level.value] = await purge_transactions(level, cutoff)
+
+    stats["addresses"] = await compact_addresses(async_session, RETENTION_BATCH_SIZE)
+    stats["rollups"] = await purge_rollups()
+    return stats
+
+async def start_retention_worker():
+    """Периодически очищает устаревшую историю транзакций в фоновом режиме"""
+    logger.info("Запуск очистки истории транзакций")
+
+    while True:
+        try:
+            stats = await run_retention()
+            if any(stats.values()):
+                logger.info(f"Очистка истории: {stats}")
+        except Exception as e:
+            logger.error(f"Ошибка при очистке истории транзакций: {e}")
+
+        await asyncio.sleep(RETENTION_INTERVAL)
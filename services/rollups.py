@@ -0,0 +1,145 @@
+"""
+Почасовые итоги транзакций кошельков (таблица wallet_rollups)
+
+Мониторинг добавляет каждую новую транзакцию в строку итогов ее часа в той же
+фиксации, что и саму транзакцию, поэтому итоги всегда согласованы с таблицей
+transactions. Суммы за окно времени читаются из нескольких строк итогов по
+ключу (wallet_id, hour) вместо перебора транзакций.
+
+Учитываются транзакции, обнаруженные мониторингом; загруженная история
+(is_historical) в итоги не попадает - она старше любых окон оповещений.
+Транзакции, исключенные из цепочки, вычитаются из итогов (remove_from_rollup)
+и добавляются снова, если попадают в новый блок.
+
+Актив итогов - символ монеты блокчейна для переводов монеты и ключ контракта
+(services/prices.token_asset) для токенов: символ токена задает его создатель,
+поэтому токен с символом "ETH" или "USDT" не попадает в итоги настоящего актива.
+Правила оповещений переводят символ в ключи через rule_assets.
+"""
+import re
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from models.rollup import WalletRollup
+from models.wallet import BlockchainType, ChainTransaction, TransactionType
+from services.prices import token_asset
+from utils.chains import CHAINS, KNOWN_TOKENS
+
+# Адрес контракта токена в правиле оповещения
+_CONTRACT_RE = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
+class WindowTotals(NamedTuple):
+    """Итоги кошелька за окно по одному активу"""
+    amount_in: Decimal
+    amount_out: Decimal
+    count: int
+
+EMPTY_TOTALS = WindowTotals(Decimal(0), Decimal(0), 0)
+
+def hour_start(timestamp: datetime) -> datetime:
+    """Начало часа, к которому относится время"""
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+def rollup_asset(blockchain_type: BlockchainType, token_address: Optional[str]) -> str:
+    """Актив итогов: символ монеты блокчейна или ключ контракта токена"""
+    if token_address:
+        return token_asset(blockchain_type, token_address)
+    return CHAINS[blockchain_type].symbol
+
+def rule_assets(asset: str) -> Tuple[str, ...]:
+    """
+    Переводит актив правила оповещения в активы итогов
+
+    :param asset: Символ монеты блокчейна, известного токена (KNOWN_TOKENS) или адрес контракта
+    :return: Активы итогов во всех блокчейнах; пустой кортеж для неизвестного символа
+    """
+    if _CONTRACT_RE.match(asset):
+        return tuple(token_asset(blockchain_type, asset) for blockchain_type in KNOWN_TOKENS)
+
+    symbol = asset.upper()
+    natives = [chain.symbol for chain in CHAINS.values() if chain.symbol == symbol]
+    tokens = [
+        token_asset(blockchain_type, tokens[symbol])
+        for blockchain_type, tokens in KNOWN_TOKENS.items() if symbol in tokens
+    ]
+    return tuple(natives + tokens)
+
+async def _apply_to_rollup(session, wallet, timestamp: datetime, tx_type, amount: Decimal,
+                           token_address: Optional[str], sign: int) -> None:
+    key = (wallet.id, hour_start(timestamp), rollup_asset(wallet.blockchain_type, token_address))
+
+    # Строка часа обычно уже в сессии: повторные транзакции того же часа обходятся без запроса
+    rollup = await session.get(WalletRollup, key)
+    if rollup is None:
+        if sign < 0:
+            # Транзакция не попадала в итоги (например, сохранена до их появления)
+            return
+        rollup = WalletRollup(
+            wallet_id=key[0], hour=key[1], asset=key[2],
+            amount_in=Decimal(0), amount_out=Decimal(0), count=0
+        )
+        session.add(rollup)
+
+    if tx_type == TransactionType.INCOMING:
+        rollup.amount_in += sign * amount
+    else:
+        rollup.amount_out += sign * amount
+    rollup.count = max(rollup.count + sign, 0)
+
+async def add_to_rollup(session, wallet, tx: ChainTransaction) -> None:
+    """
+    Добавляет транзакцию в итоги ее часа; сессия не фиксируется
+
+    :param session: Сессия базы данных
+    :param wallet: Объект кошелька
+    :param tx: Транзакция от провайдера
+    """
+    await _apply_to_rollup(session, wallet, tx.timestamp, tx.type, tx.amount, tx.token_address, 1)
+
+async def remove_from_rollup(session, wallet, transaction) -> None:
+    """
+    Вычитает сохраненную транзакцию, исключенную из цепочки, из итогов ее часа; сессия не фиксируется
+
+    :param session: Сессия базы данных
+    :param wallet: Объект кошелька
+    :param transaction: Сохраненная транзакция (models.transaction.Transaction)
+    """
+    if transaction.is_historical:
+        return
+    await _apply_to_rollup(
+        session, wallet, transaction.timestamp, transaction.type, Decimal(transaction.value),
+        transaction.token_address, -1
+    )
+
+async def get_window_totals(session, wallet_ids: Iterable[int], assets: Iterable[str], since: datetime) -> Dict[int, WindowTotals]:
+    """
+    Возвращает итоги кошельков по активу с начала окна
+
+    :param session: Сессия базы данных
+    :param wallet_ids: ID кошельков
+    :param assets: Активы итогов (rule_assets): монета или один токен в разных блокчейнах
+    :param since: Начало окна (округляется вниз до часа)
+    :return: Словарь {ID кошелька: итоги}; кошельки без транзакций в окне отсутствуют
+    """
+    result = await session.execute(
+        select(
+            WalletRollup.wallet_id,
+            func.sum(WalletRollup.amount_in),
+            func.sum(WalletRollup.amount_out),
+            func.sum(WalletRollup.count)
+        )
+        .where(
+            WalletRollup.wallet_id.in_(list(wallet_ids)),
+            WalletRollup.hour >= hour_start(since),
+            WalletRollup.asset.in_(list(assets))
+        )
+        .group_by(WalletRollup.wallet_id)
+    )
+    return {
+        wallet_id: WindowTotals(Decimal(amount_in or 0), Decimal(amount_out or 0), int(count or 0))
+        for wallet_id, amount_in, amount_out, count in result.all()
+    }
@@ -0,0 +1,163 @@
+"""
+Обновление схемы существующей базы данных при запуске
+
+Base.metadata.create_all создает только отсутствующие таблицы и не меняет
+существующие, поэтому база, созданная прежней версией бота, не содержит
+новых столбцов и индексов. upgrade_schema выполняется в init_db после
+create_all и приводит такие таблицы к текущим моделям:
+
+- добавляет недостающие столбцы (ALTER TABLE ... ADD COLUMN) со значением
+  по умолчанию из модели или из LEGACY_VALUES для уже сохраненных строк;
+- создает недостающие индексы;
+- переносит адреса транзакций из строковых столбцов from_address/to_address
+  в словарь addresses (services/addresses.py) и удаляет прежние столбцы;
+- заменяет ограничение уникальности кошельков (user_id, address) на
+  (user_id, blockchain_type, address); SQLite не изменяет ограничения через
+  ALTER TABLE, поэтому таблица wallets пересоздается с копированием строк.
+
+Остальные изменения, которые нельзя выполнить через ALTER TABLE (новые первичные
+ключи и ограничения уникальности существующих таблиц), не выполняются.
+"""
+import logging
+from typing import Dict, List, Tuple
+
+from sqlalchemy import Column, MetaData, Table, inspect, literal, text
+from sqlalchemy.schema import AddConstraint
+from sqlalchemy.engine import Connection
+from sqlalchemy.types import SchemaType
+
+from models.base import Base
+from models.transaction import TransactionStatus
+
+logger = logging.getLogger(__name__)
+
+# Значения новых столбцов для строк, сохраненных прежней версией, если они отличаются
+# от значения по умолчанию модели: транзакции, записанные до отслеживания подтверждений,
+# уже уведомлены или пропущены и считаются окончательными
+LEGACY_VALUES: Dict[Tuple[str, str], object] = {
+    ("transactions", "status"): TransactionStatus.final,
+}
+
+# Строковые адреса транзакций прежней версии: столбец строки -> столбец ссылки на addresses
+LEGACY_ADDRESS_COLUMNS = {
+    "from_address": "from_address_id",
+    "to_address": "to_address_id",
+}
+
+def _literal_sql(connection: Connection, column: Column, value) -> str:
+    """Значение для DDL в синтаксисе диалекта"""
+    return str(literal(value, column.type).compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+
+def _add_column(connection: Connection, table: Table, column: Column) -> None:
+    """Добавляет столбец модели в существующую таблицу"""
+    preparer = connection.dialect.identifier_preparer
+    if isinstance(column.type, SchemaType):
+        # Например, тип ENUM в PostgreSQL создается отдельно от столбца
+        column.type.create(connection, checkfirst=True)
+
+    value = LEGACY_VALUES.get((table.name, column.name))
+    if value is None and column.default is not None and column.default.is_scalar:
+        value = column.default.arg
+
+    ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} " \
+          f"{column.type.compile(dialect=connection.dialect)}"
+    if value is not None:
+        ddl += f" DEFAULT {_literal_sql(connection, column, value)}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+    connection.execute(text(ddl))
+
+def _move_legacy_addresses(connection: Connection, columns: List[str]) -> None:
+    """Переносит строковые адреса транзакций в словарь addresses и удаляет прежние столбцы"""
+    legacy = [name for name in LEGACY_ADDRESS_COLUMNS if name in columns]
+
+    # Недостающие адреса добавляются одним запросом для обоих столбцов
+    sources = " UNION ".join(f"SELECT {name} AS address FROM transactions WHERE {name} IS NOT NULL" for name in legacy)
+    connection.execute(text(
+        f"INSERT INTO addresses (address) SELECT legacy.address FROM ({sources}) AS legacy "
+        f"WHERE NOT EXISTS (SELECT 1 FROM addresses WHERE addresses.address = legacy.address)"
+    ))
+
+    for name in legacy:
+        reference = LEGACY_ADDRESS_COLUMNS[name]
+        connection.execute(text(
+            f"UPDATE transactions SET {reference} = "
+            f"(SELECT addresses.id FROM addresses WHERE addresses.address = transactions.{name}) "
+            f"WHERE {name} IS NOT NULL AND {reference} IS NULL"
+        ))
+
+    # ALTER TABLE ... DROP COLUMN есть в SQLite начиная с 3.35; в более старых версиях
+    # прежние столбцы остаются (они допускают NULL и больше не заполняются)
+    try:
+        with connection.begin_nested():
+            for name in legacy:
+                connection.execute(text(f"ALTER TABLE transactions DROP COLUMN {name}"))
+    except Exception as e:
+        logger.warning(f"Прежние столбцы адресов транзакций не удалены: {e}")
+
+# Прежнее ограничение уникальности кошельков: один адрес пользователя в любом блокчейне
+LEGACY_WALLET_CONSTRAINT = "uix_user_address"
+
+def _rebuild_wallets(connection: Connection) -> None:
+    """Заменяет ограничение уникальности кошельков (user_id, address) на текущее ограничение модели"""
+    wallets = Base.metadata.tables["wallets"]
+    if connection.dialect.name != "sqlite":
+        connection.execute(text(f"ALTER TABLE wallets DROP CONSTRAINT {LEGACY_WALLET_CONSTRAINT}"))
+        for constraint in wallets.constraints:
+            if constraint.name == "uix_user_chain_address":
+                connection.execute(AddConstraint(constraint))
+        return
+
+    # SQLite: новая таблица с текущей схемой, копирование строк и замена прежней таблицы.
+    # Ссылки других таблиц на wallets заданы по имени и после переименования остаются верными.
+    metadata = MetaData()
+    Base.metadata.tables["users"].to_metadata(metadata)
+    rebuilt = wallets.to_metadata(metadata, name="wallets_rebuilt")
+    rebuilt.create(connection)
+    columns = ", ".join(connection.dialect.identifier_preparer.quote(column.name) for column in wallets.columns)
+    connection.execute(text(f"INSERT INTO wallets_rebuilt ({columns}) SELECT {columns} FROM wallets"))
+    connection.execute(text("DROP TABLE wallets"))
+    connection.execute(text("ALTER TABLE wallets_rebuilt RENAME TO wallets"))
+
+def upgrade_schema(connection: Connection, existing_tables: List[str]) -> List[str]:
+    """
+    Приводит таблицы, существовавшие до create_all, к текущим моделям
+
+    :param connection: Синхронное соединение (AsyncConnection.run_sync) внутри транзакции
+    :param existing_tables: Таблицы, существовавшие до вызова create_all
+    :return: Описание выполненных изменений
+    """
+    inspector = inspect(connection)
+    changes = []
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        columns = [column["name"] for column in inspector.get_columns(table.name)]
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            if column.primary_key:
+                logger.warning(f"Столбец первичного ключа {table.name}.{column.name} нельзя добавить в существующую таблицу")
+                continue
+            _add_column(connection, table, column)
+            changes.append(f"{table.name}.{column.name}")
+
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(connection)
+                changes.append(f"индекс {index.name}")
+
+        if table.name == "transactions" and any(name in columns for name in LEGACY_ADDRESS_COLUMNS):
+            _move_legacy_addresses(connection, columns)
+            changes.append("адреса транзакций перенесены в addresses")
+
+        if table.name == "wallets" and any(
+            constraint["name"] == LEGACY_WALLET_CONSTRAINT for constraint in inspector.get_unique_constraints(table.name)
+        ):
+            _rebuild_wallets(connection)
+            changes.append("ограничение уникальности кошельков учитывает блокчейн")
+
+    return changes
@@ -0,0 +1,106 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.future import select
+
+from models.token import Token
+from models.wallet import BlockchainType, ChainTransaction
+from services.blockchain import fetch_token_metadata
+from services.db import async_session
+from services.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# decimals по умолчанию, если метаданные токена получить не удалось
+DEFAULT_TOKEN_DECIMALS = 18
+
+# Кэш метаданных токенов в памяти: (блокчейн, контракт) -> (символ, decimals)
+_token_cache: Dict[Tuple[BlockchainType, str], Tuple[Optional[str], int]] = {}
+
+async def get_token_metadata(
+    blockchain_type: BlockchainType,
+    contracts: List[str],
+    hints: Optional[Dict[str, Tuple[Optional[str], int]]] = None
+) -> Dict[str, Tuple[Optional[str], int]]:
+    """
+    Возвращает метаданные токенов, обращаясь к сети только для неизвестных контрактов
+
+    Порядок поиска: кэш в памяти, таблица tokens, подсказки из ответа обозревателя,
+    пакетный запрос к узлу. Найденные метаданные сохраняются в таблицу tokens.
+
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :param contracts: Адреса контрактов
+    :param hints: Метаданные, уже известные из ответа API {контракт: (символ, decimals)}
+    :return: Словарь {контракт: (символ, decimals)}
+    """
+    contracts = list(dict.fromkeys(contract.lower() for contract in contracts))
+    missing = [contract for contract in contracts if (blockchain_type, contract) not in _token_cache]
+
+    CACHE_REQUESTS.inc(len(contracts) - len(missing), cache="token_metadata", result="hit")
+    CACHE_REQUESTS.inc(len(missing), cache="token_metadata", result="miss")
+
+    if missing:
+        async with async_session() as session:
+            result = await session.execute(
+                select(Token).where(
+                    Token.blockchain_type == blockchain_type,
+                    Token.contract_address.in_(missing)
+                )
+            )
+
+            for token in result.scalars().all():
+                _token_cache[(blockchain_type, token.contract_address)] = (token.symbol, token.decimals)
+
+            missing = [contract for contract in missing if (blockchain_type, contract) not in _token_cache]
+
+            if missing:
+                found = {contract: hints[contract] for contract in missing if hints and contract in hints}
+                unresolved = [contract for contract in missing if contract not in found]
+
+                if unresolved:
+                    found.update(await fetch_token_metadata(blockchain_type, unresolved))
+
+                for contract, (symbol, decimals) in found.items():
+                    _token_cache[(blockchain_type, contract)] = (symbol, decimals)
+                    session.add(Token(
+                        blockchain_type=blockchain_type,
+                        contract_address=contract,
+                        symbol=symbol,
+                        decimals=decimals
+                    ))
+
+                if found:
+                    try:
+                        await session.commit()
+                        logger.info(f"Сохранены метаданные {len(found)} токенов ({blockchain_type.value})")
+                    except Exception as e:
+                        await session.rollback()
+                        logger.error(f"Ошибка при сохранении метаданных токенов: {e}")
+
+    return {
+        contract: _token_cache[(blockchain_type, contract)]
+        for contract in contracts if (blockchain_type, contract) in _token_cache
+    }
+
+async def resolve_token_transfers(blockchain_type: BlockchainType, transfers: List[ChainTransaction]) -> List[ChainTransaction]:
+    """
+    Дополняет переводы токенов символом и decimals
+
+    :param blockchain_type: Тип блокчейна (ETH, BNB)
+    :param transfers: Переводы токенов
+    :return: Переводы в том же порядке с заполненными token_symbol и decimals
+    """
+    if not transfers:
+        return transfers
+
+    hints = {
+        tx.token_address: (tx.token_symbol, tx.decimals)
+        for tx in transfers if tx.decimals is not None
+    }
+    metadata = await get_token_metadata(blockchain_type, [tx.token_address for tx in transfers], hints)
+
+    resolved = []
+    for tx in transfers:
+        symbol, decimals = metadata.get(tx.token_address, (tx.token_symbol, tx.decimals or DEFAULT_TOKEN_DECIMALS))
+        resolved.append(tx._replace(token_symbol=symbol, decimals=decimals))
+
+    return resolved
@@ -0,0 +1,122 @@
+"""
+Сторожевая задача цикла событий
+
+Задача в цикле событий засыпает на WATCHDOG_INTERVAL и измеряет, насколько
+позже расписания она проснулась (задержка цикла). Отдельный поток следит за
+ее пробуждениями: если цикл не отвечает дольше WATCHDOG_SLOW_CALLBACK, поток
+снимает стек потока цикла событий - это стек кода, который его блокирует.
+Когда цикл освобождается, блокировка записывается в метрики и в лог вместе
+со стеком и подсистемой (модулем бота, в котором находится блокирующий код).
+
+В отличие от режима отладки asyncio (slow_callback_duration), стек указывает
+на конкретную строку, а не только на колбэк, и накладные расходы постоянны.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Optional, Tuple
+
+from services.metrics import EVENT_LOOP_LAG_SECONDS, EVENT_LOOP_STALL_SECONDS, EVENT_LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+# Корень проекта: кадры из этих файлов определяют подсистему
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _subsystem(frame) -> str:
+    """
+    Определяет подсистему по самому вложенному кадру кода бота
+
+    :param frame: Текущий кадр потока цикла событий
+    :return: Модуль бота (например, services.blockchain) или пакет сторонней библиотеки
+    """
+    library = None
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+
+        if filename.startswith(PROJECT_ROOT) and filename.endswith(".py") and "site-packages" not in filename:
+            module = os.path.splitext(os.path.relpath(filename, PROJECT_ROOT))[0]
+            return module.replace(os.sep, ".")
+
+        if library is None and "site-packages" in filename:
+            library = filename.split("site-packages" + os.sep, 1)[1].split(os.sep, 1)[0]
+
+        frame = frame.f_back
+
+    return library or "other"
+
+class LoopWatchdog:
+    """Измеряет задержку цикла событий и ловит блокирующие его колбэки"""
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._beat = time.monotonic()
+        self._stall: Optional[Tuple[str, str]] = None  # (подсистема, стек), снятые потоком
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _watch(self, thread_id: int) -> None:
+        """Поток наблюдения: снимает стек цикла событий, если тот не просыпается вовремя"""
+        poll = min(self.interval, self.threshold) / 2
+
+        while not self._stop.wait(poll):
+            late = time.monotonic() - self._beat - self.interval
+            if late <= self.threshold or self._stall is not None:
+                continue
+
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self._stall = (_subsystem(frame), "".join(traceback.format_stack(frame)))
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._beat = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._watch, args=(threading.get_ident(),), name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+        try:
+            while True:
+                scheduled = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                lag = max(loop.time() - scheduled, 0.0)
+
+                self._beat = time.monotonic()
+                stall, self._stall = self._stall, None
+
+                EVENT_LOOP_LAG_SECONDS.observe(lag)
+                if lag > self.threshold:
+                    self._report(lag, stall)
+        finally:
+            self._stop.set()
+
+    def _report(self, lag: float, stall: Optional[Tuple[str, str]]) -> None:
+        # Стек не снят, если блокировка закончилась между опросами потока
+        subsystem, stack = stall or ("unknown", None)
+
+        EVENT_LOOP_STALLS.inc(subsystem=subsystem)
+        EVENT_LOOP_STALL_SECONDS.observe(lag, subsystem=subsystem)
+        logger.warning(
+            f"Цикл событий был заблокирован на {lag:.3f} с ({subsystem})",
+            extra={"hot_path": "watchdog.stall", "subsystem": subsystem, "duration": round(lag, 3), "stack": stack}
+        )
+
+def start_watchdog(interval: float, threshold: float) -> Optional[asyncio.Task]:
+    """
+    Запускает сторожевую задачу цикла событий
+
+    :param interval: Интервал замеров задержки, секунды; 0 отключает сторожевую задачу
+    :param threshold: Блокировка дольше этого времени считается медленным колбэком
+    :return: Задача для отмены при остановке или None
+    """
+    if interval <= 0:
+        return None
+
+    watchdog = LoopWatchdog(interval, threshold)
+    return asyncio.create_task(watchdog.run(), name="loop-watchdog")
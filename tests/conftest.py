@@ -0,0 +1,48 @@
+"""
+Общие настройки тестов
+
+Тесты работают с временной базой SQLite: DATABASE_URL задается до импорта
+services.db. Асинхронный код выполняется через asyncio.run внутри теста
+(фикстура run_db), движок закрывается в том же цикле событий.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_db_dir = tempfile.mkdtemp(prefix="wallet-monitor-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("BOT_TOKEN", "123456:TEST-abcdefghijklmnopqrstuvwxyz")
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("LOG_DIR", os.path.join(_db_dir, "logs"))
+
+import pytest
+
+from models.base import Base
+from services.db import engine, async_session
+
+@pytest.fixture
+def run_db():
+    """
+    Выполняет корутину на чистой базе данных
+
+    :return: Функция run(test, create_tables=True), где test - async-функция, принимающая
+             фабрику сессий; при create_tables=False база остается пустой
+    """
+    def run(test, create_tables=True):
+        async def wrapper():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+                if create_tables:
+                    await conn.run_sync(Base.metadata.create_all)
+            try:
+                return await test(async_session)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(wrapper())
+
+    return run
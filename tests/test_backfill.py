@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.future import select
+
+from models.backfill import BackfillJob, BackfillStatus
+from models.transaction import Transaction
+from models.user import User
+from models.wallet import BlockchainType, ChainTransaction, TransactionType, Wallet
+from services import backfill
+from services.backfill import next_cursor
+
+NOW = datetime.utcnow()
+ADDRESS = "bc1qbackfill"
+
+def _tx(block, index=0):
+    return ChainTransaction(
+        BlockchainType.BTC, f"{block:04x}{index:02x}" * 4, ADDRESS, TransactionType.INCOMING, "bc1qsender", ADDRESS,
+        1000, 0, 8, NOW - timedelta(minutes=200 - block), block, None, 6
+    )
+
+@pytest.mark.parametrize("blocks, page_size, cursor, expected", [
+    ([100, 99, 98], 5, None, (True, None)),        # неполная страница - этап завершен
+    ([100, 99, 98], 3, None, (False, 98)),         # следующая страница начинается с блока 98 включительно
+    ([98, 98, 98], 3, 98, (False, 97)),            # страница из одного блока: блок пропускается
+    ([97, 97, 96], 3, 98, (False, 96)),
+])
+def test_next_cursor(blocks, page_size, cursor, expected):
+    assert next_cursor([_tx(block, i) for i, block in enumerate(blocks)], page_size, cursor) == expected
+
+def test_next_cursor_without_blocks_finishes_stage():
+    assert next_cursor([_tx(1)._replace(block_number=None)] * 3, 3, 50) == (True, 50)
+
+class FakeProvider:
+    """История адреса: по две транзакции в блоках 101..110; после fail_after страниц провайдер недоступен"""
+
+    def __init__(self, fail_after=None):
+        self.history = [_tx(block, i) for block in range(110, 100, -1) for i in range(2)]
+        self.fail_after = fail_after
+        self.cursors = []
+
+    async def fetch_page(self, wallet, stage, cursor):
+        if self.fail_after is not None and len(self.cursors) >= self.fail_after:
+            return None
+        self.cursors.append(cursor)
+        page = [tx for tx in self.history if cursor is None or tx.block_number <= cursor][:5]
+        return page, 5, len(self.history)
+
+def test_failed_job_resumes_from_saved_cursor(monkeypatch, run_db):
+    notified = []
+
+    async def notify(bot, user_id, wallet, inserted, language_code=None):
+        notified.append(inserted)
+
+    monkeypatch.setattr(backfill, "BACKFILL_INSERT_CHUNK", 5)
+    monkeypatch.setattr(backfill, "BACKFILL_MAX_RETRIES", 0)
+    monkeypatch.setattr(backfill, "send_backfill_notification", notify)
+
+    async def test(session_factory):
+        async with session_factory() as session:
+            session.add(User(user_id=1))
+            session.add(Wallet(id=1, user_id=1, address=ADDRESS, blockchain_type=BlockchainType.BTC, last_checked_timestamp=NOW))
+            session.add(BackfillJob(id=1, wallet_id=1))
+            await session.commit()
+
+        broken = FakeProvider(fail_after=2)
+        monkeypatch.setattr(backfill, "_fetch_page", broken.fetch_page)
+        await backfill.run_backfill_job(None, 1)
+
+        async with session_factory() as session:
+            job = await session.get(BackfillJob, 1)
+            failed = (job.status, job.cursor)
+
+        await backfill.enqueue_backfill(1)
+        healthy = FakeProvider()
+        monkeypatch.setattr(backfill, "_fetch_page", healthy.fetch_page)
+        await backfill.run_backfill_job(None, 1)
+
+        async with session_factory() as session:
+            job = await session.get(BackfillJob, 1)
+            stored = (await session.execute(select(Transaction.hash))).scalars().all()
+            return broken.cursors, failed, healthy.cursors, job.status, stored
+
+    broken_cursors, failed, cursors, status, stored = run_db(test)
+
+    # Две страницы зафиксированы вместе с курсором (блок 106), затем провайдер отказал
+    assert broken_cursors == [None, 108]
+    assert failed == (BackfillStatus.failed, 106)
+    # Перезапуск продолжается с сохраненного блока, а не с начала истории
+    assert cursors[0] == 106
+    assert status == BackfillStatus.done
+    assert sorted(stored) == sorted({tx.hash for tx in FakeProvider().history})
+    assert notified == [len(stored)]
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import services.blockchain as blockchain
+from utils.jsonstream import JsonArrayStream
+
+BATCH = ["1Active", "1Empty", "1Failed"]
+TX = {
+    "hash": "aa" * 32, "confirmed": "2024-01-01T00:00:00Z", "block_height": 1, "fees": 0,
+    "inputs": [{"addresses": ["1Sender"], "output_value": 1000}],
+    "outputs": [{"addresses": ["1Active"], "value": 1000}],
+}
+BODY = json.dumps([
+    {"address": "1Active", "txs": [TX]},
+    {"address": "1Empty", "txs": []},
+    {"address": "1Failed", "error": "Limits reached."},
+]).encode()
+
+class _Content:
+    async def iter_chunked(self, size):
+        for i in range(0, len(BODY), 7):
+            yield BODY[i:i + 7]
+
+class _Response:
+    status = 200
+    content_length = None
+    content = _Content()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+class _Session:
+    def get(self, url, **kwargs):
+        return _Response()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+def test_stream_reports_owners_without_items():
+    stream = JsonArrayStream("txs", ("address", "error"), report_owners=True)
+    items = [item for i in range(0, len(BODY), 5) for item in stream.feed(BODY[i:i + 5])]
+
+    owners = [owner for owner, item in items if item is None]
+    assert owners == [{"address": "1Active"}, {"address": "1Empty"}, {"address": "1Failed", "error": "Limits reached."}]
+    assert [item["hash"] for owner, item in items if item is not None] == [TX["hash"]]
+
+def test_errored_addresses_go_to_fallback(monkeypatch):
+    fallback = []
+
+    async def fetch_multiaddr(session, batch, limit):
+        fallback.extend(batch)
+        return None
+
+    monkeypatch.setattr(blockchain, "create_session", _Session)
+    monkeypatch.setattr(blockchain, "BLOCKCYPHER_BATCH_SIZE", len(BATCH))
+    monkeypatch.setattr(blockchain, "_fetch_blockchain_info_multiaddr", fetch_multiaddr)
+
+    transactions = asyncio.run(blockchain.get_btc_transactions_batch(BATCH))
+
+    assert fallback == ["1Failed"]
+    assert len(transactions["1Active"]) == 1
+    assert transactions["1Empty"] == []
+
+def _history(address, count, newest):
+    return [
+        {"hash": f"{address}-{i}", "time": newest - i, "block_height": 1, "fee": 0,
+         "inputs": [{"prev_out": {"addr": "1Sender", "value": 1}}], "out": [{"addr": address, "value": 1}]}
+        for i in range(count)
+    ]
+
+def test_busy_address_does_not_starve_multiaddr_batch(monkeypatch):
+    # У активного адреса 150 транзакций новее любой транзакции соседей по пакету
+    histories = {
+        "1Busy": _history("1Busy", 150, 2_000_000),
+        "1Quiet": _history("1Quiet", 3, 1_000_000),
+        "1Rare": _history("1Rare", 12, 1_000_000),
+        "1Empty": [],
+    }
+    requests = []
+
+    async def stream_blockcypher(session, batch, limit):
+        return None
+
+    async def fetch_multiaddr(session, batch, n):
+        requests.append((tuple(batch), n))
+        txs = sorted((tx for address in batch for tx in histories[address]), key=lambda tx: -tx["time"])
+        return json.dumps({
+            "addresses": [{"address": address, "n_tx": len(histories[address])} for address in batch],
+            "txs": txs[:n],
+        }).encode()
+
+    monkeypatch.setattr(blockchain, "create_session", _Session)
+    monkeypatch.setattr(blockchain, "_stream_blockcypher_transactions", stream_blockcypher)
+    monkeypatch.setattr(blockchain, "_fetch_blockchain_info_multiaddr", fetch_multiaddr)
+
+    transactions = asyncio.run(blockchain.get_btc_transactions_batch(list(histories), limit=30))
+
+    assert {address: len(txs) for address, txs in transactions.items()} == {"1Busy": 30, "1Quiet": 3, "1Rare": 12, "1Empty": 0}
+    # Пакет уменьшен до 100 // limit адресов, повторно запрашиваются только вытесненные адреса
+    assert requests == [(("1Busy", "1Quiet", "1Rare"), 90), (("1Empty",), 30), (("1Quiet",), 30), (("1Rare",), 30)]
@@ -0,0 +1,195 @@
+from datetime import datetime
+
+import pytest
+
+from config import ORPHAN_GRACE_DEPTH, REORG_WATCH_DEPTH
+from models.transaction import Transaction, TransactionStatus
+from models.user import User
+from models.wallet import Wallet, BlockchainType, ChainTransaction, TransactionType
+from services import confirmations, monitor
+
+BLOCK = 100
+BLOCK_HASH = "0x" + "aa" * 32
+OTHER_HASH = "0x" + "bb" * 32
+THRESHOLD = 3
+TX_HASH = "0x" + "cc" * 32
+# Ключ записи, который мониторинг строит по хешу и ID кошелька
+TX_ID = f"{TX_HASH}:1"
+
+def _patch_chain(monkeypatch, head, block_hash):
+    """Подменяет провайдеров и отправку; возвращает состояние цепочки и отправленные сообщения"""
+    chain = {"head": head, "block_hash": block_hash}
+
+    async def get_chain_height(blockchain_type):
+        return chain["head"]
+
+    async def get_block_hashes(blockchain_type, block_numbers):
+        return {number: chain["block_hash"] for number in block_numbers}
+
+    sent = {"chain": chain, "notifications": [], "corrections": []}
+
+    async def send_transaction_notification(bot, user_id, transaction, wallet, language_code=None):
+        sent["notifications"].append(transaction.tx_id)
+        return True
+
+    async def send_transaction_correction(bot, user_id, transaction, wallet, language_code=None):
+        sent["corrections"].append(transaction.tx_id)
+        return True
+
+    monkeypatch.setattr(confirmations, "get_chain_height", get_chain_height)
+    monkeypatch.setattr(confirmations, "get_block_hashes", get_block_hashes)
+    monkeypatch.setattr(confirmations, "send_transaction_notification", send_transaction_notification)
+    monkeypatch.setattr(confirmations, "send_transaction_correction", send_transaction_correction)
+    return sent
+
+async def _add_transaction(session_factory, **values):
+    async with session_factory() as session:
+        session.add(User(user_id=1))
+        wallet = Wallet(user_id=1, address="0x" + "11" * 20, blockchain_type=BlockchainType.ETH, confirmation_threshold=THRESHOLD)
+        session.add(wallet)
+        await session.flush()
+        session.add(Transaction(
+            tx_id=TX_ID, wallet_id=wallet.id, hash=TX_HASH, value=1, timestamp=datetime.utcnow(),
+            block_number=BLOCK, block_hash=BLOCK_HASH, **values
+        ))
+        await session.commit()
+
+async def _advance(session_factory):
+    async with session_factory() as session:
+        await confirmations.advance_pending_transactions(None, session)
+    async with session_factory() as session:
+        return await session.get(Transaction, TX_ID)
+
+def test_orphaned_notified_transaction_gets_correction_after_grace_depth(monkeypatch, run_db):
+    sent = _patch_chain(monkeypatch, head=BLOCK + THRESHOLD, block_hash=OTHER_HASH)
+
+    async def test(session_factory):
+        await _add_transaction(
+            session_factory, status=TransactionStatus.final, confirmations=THRESHOLD, notification_sent=True
+        )
+        orphaned = await _advance(session_factory)
+        corrections = list(sent["corrections"])
+
+        # Транзакция так и не включена повторно за ORPHAN_GRACE_DEPTH блоков
+        sent["chain"]["head"] += ORPHAN_GRACE_DEPTH
+        return orphaned, corrections, await _advance(session_factory)
+
+    orphaned, corrections, settled = run_db(test)
+
+    assert orphaned.status == TransactionStatus.orphaned
+    assert orphaned.orphaned_at_height == BLOCK + THRESHOLD
+    assert corrections == []
+    assert settled.status == TransactionStatus.orphaned and settled.orphaned_at_height is None
+    assert sent["corrections"] == [TX_ID]
+
+def test_notification_then_reorg(monkeypatch, run_db):
+    sent = _patch_chain(monkeypatch, head=BLOCK + THRESHOLD - 1, block_hash=BLOCK_HASH)
+
+    async def test(session_factory):
+        await _add_transaction(session_factory, status=TransactionStatus.confirmed, confirmations=1)
+        notified = await _advance(session_factory)
+
+        # Следующий цикл: блок транзакции заменен другим
+        sent["chain"].update(head=BLOCK + THRESHOLD, block_hash=OTHER_HASH)
+        orphaned = await _advance(session_factory)
+        sent["chain"]["head"] += ORPHAN_GRACE_DEPTH
+        await _advance(session_factory)
+        return notified, orphaned
+
+    notified, orphaned = run_db(test)
+
+    assert notified.status == TransactionStatus.final and notified.notification_sent
+    assert orphaned.status == TransactionStatus.orphaned
+    assert sent["notifications"] == [TX_ID]
+    assert sent["corrections"] == [TX_ID]
+
+def test_orphan_then_reinclusion(monkeypatch, run_db):
+    sent = _patch_chain(monkeypatch, head=BLOCK + THRESHOLD, block_hash=OTHER_HASH)
+    monkeypatch.setattr(monitor, "send_transaction_notification", confirmations.send_transaction_notification)
+
+    async def test(session_factory):
+        await _add_transaction(
+            session_factory, status=TransactionStatus.final, confirmations=THRESHOLD, notification_sent=True
+        )
+        await _advance(session_factory)
+
+        async with session_factory() as session:
+            wallet = await session.get(Wallet, 1)
+            orphaned = await session.get(Transaction, TX_ID)
+            # Исключенная транзакция снова запрашивается у провайдера, хотя она старше последней проверки
+            wallet.last_checked_timestamp = datetime.utcnow()
+            await session.commit()
+            unmined = await monitor.get_unmined_transactions(session)
+
+            # Та же транзакция в блоке, заменившем прежний
+            remined = ChainTransaction(
+                BlockchainType.ETH, orphaned.hash, wallet.address, TransactionType.INCOMING, "0x" + "22" * 20,
+                wallet.address, 10 ** 18, 0, 18, orphaned.timestamp, BLOCK, OTHER_HASH, 1
+            )
+            selected = monitor.select_new_transactions(wallet, [remined], unmined)
+            await monitor.check_wallet_transactions(None, wallet, session, selected)
+
+        reincluded = await _advance(session_factory)
+        sent["chain"]["head"] += ORPHAN_GRACE_DEPTH
+        return unmined, selected, reincluded, await _advance(session_factory)
+
+    unmined, selected, reincluded, later = run_db(test)
+
+    assert (1, TX_HASH) in unmined
+    assert len(selected) == 1
+    assert reincluded.status == TransactionStatus.final and reincluded.block_hash == OTHER_HASH
+    assert reincluded.orphaned_at_height is None and reincluded.notification_sent
+    assert later.status == TransactionStatus.final
+    # Ни исправления, ни повторного уведомления
+    assert sent["corrections"] == []
+    assert sent["notifications"] == []
+
+def test_final_transaction_past_watch_depth_is_not_rechecked(monkeypatch, run_db):
+    sent = _patch_chain(monkeypatch, head=BLOCK + THRESHOLD + REORG_WATCH_DEPTH, block_hash=OTHER_HASH)
+
+    async def test(session_factory):
+        await _add_transaction(
+            session_factory, status=TransactionStatus.final,
+            confirmations=THRESHOLD + REORG_WATCH_DEPTH, notification_sent=True
+        )
+        return await _advance(session_factory)
+
+    transaction = run_db(test)
+
+    assert transaction.status == TransactionStatus.final
+    assert sent["corrections"] == []
+
+@pytest.mark.parametrize("orphaned_at_height, notify_again", [
+    (BLOCK + THRESHOLD, False),  # включена повторно в пределах ORPHAN_GRACE_DEPTH: исправления не было
+    (None, True),                # исправление уже отправлено: о повторном включении сообщаем снова
+])
+def test_reinclusion_resets_orphaned_state(orphaned_at_height, notify_again):
+    transaction = Transaction(
+        tx_id=TX_ID, hash=TX_HASH, block_number=BLOCK, block_hash=BLOCK_HASH, status=TransactionStatus.orphaned,
+        notification_sent=True, orphaned_at_height=orphaned_at_height
+    )
+    remined = ChainTransaction(
+        BlockchainType.ETH, TX_HASH, "0x" + "11" * 20, TransactionType.INCOMING, "0x" + "22" * 20,
+        "0x" + "11" * 20, 1, 0, 18, datetime.utcnow(), BLOCK + 1, OTHER_HASH, 1
+    )
+
+    assert confirmations.refresh_block_position(transaction, remined)
+    assert (transaction.block_number, transaction.block_hash) == (BLOCK + 1, OTHER_HASH)
+    assert transaction.status == TransactionStatus.seen and transaction.orphaned_at_height is None
+    assert transaction.notification_sent is not notify_again
+    # Повторные данные о том же блоке ничего не меняют
+    assert not confirmations.refresh_block_position(transaction, remined)
+
+def test_orphaned_unnotified_transaction_gets_no_correction(monkeypatch, run_db):
+    sent = _patch_chain(monkeypatch, head=BLOCK + 1, block_hash=OTHER_HASH)
+
+    async def test(session_factory):
+        await _add_transaction(session_factory, status=TransactionStatus.confirmed, confirmations=1)
+        await _advance(session_factory)
+        sent["chain"]["head"] += ORPHAN_GRACE_DEPTH
+        return await _advance(session_factory)
+
+    settled = run_db(test)
+
+    assert settled.status == TransactionStatus.orphaned and settled.orphaned_at_height is None
+    assert sent["corrections"] == [] and sent["notifications"] == []
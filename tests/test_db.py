@@ -0,0 +1,65 @@
+from sqlalchemy import insert
+from sqlalchemy.future import select
+
+import services.db as db
+from models.user import User
+from models.wallet import Wallet, BlockchainType
+
+VALID_EVM = "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed"
+BAD_CHECKSUM_EVM = "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAeD"
+VALID_BTC = "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4"
+
+def test_stored_addresses_are_checked_once(run_db, monkeypatch):
+    checked = []
+    validate = db.validate_addresses
+
+    def counting_validate(items):
+        items = list(items)
+        checked.extend(items)
+        return validate(items)
+
+    monkeypatch.setattr(db, "validate_addresses", counting_validate)
+
+    async def test(session_factory):
+        async with session_factory() as session:
+            session.add(User(user_id=1))
+            await session.flush()
+            # Кошельки прежней версии: без результата проверки
+            await session.execute(insert(Wallet), [
+                {"user_id": 1, "address": VALID_EVM, "blockchain_type": BlockchainType.ETH},
+                {"user_id": 1, "address": BAD_CHECKSUM_EVM, "blockchain_type": BlockchainType.BNB},
+                {"user_id": 1, "address": VALID_BTC, "blockchain_type": BlockchainType.BTC},
+            ])
+            await session.commit()
+
+        invalid = await db.check_stored_addresses()
+        await db.check_stored_addresses()
+
+        async with session_factory() as session:
+            result = await session.execute(select(Wallet.address, Wallet.address_valid).order_by(Wallet.id))
+            flags = result.all()
+            result = await session.execute(select(Wallet.address).where(Wallet.address_valid.is_not(False)))
+            monitored = result.scalars().all()
+        return invalid, flags, monitored
+
+    invalid, flags, monitored = run_db(test)
+
+    assert invalid == 1
+    assert flags == [(VALID_EVM, True), (BAD_CHECKSUM_EVM, False), (VALID_BTC, True)]
+    assert sorted(monitored) == sorted([VALID_EVM, VALID_BTC])
+    # Повторный запуск не проверяет уже проверенные адреса
+    assert len(checked) == 3
+
+def test_add_wallet_rejects_invalid_address(run_db):
+    async def test(session_factory):
+        async with session_factory() as session:
+            session.add(User(user_id=1))
+            await session.commit()
+            wallet = await db.add_wallet(session, 1, VALID_EVM, BlockchainType.ETH)
+            try:
+                await db.add_wallet(session, 1, BAD_CHECKSUM_EVM, BlockchainType.ETH)
+            except ValueError:
+                return wallet.address_valid, True
+            return wallet.address_valid, False
+
+    assert run_db(test) == (True, True)
@@ -0,0 +1,51 @@
+from models.wallet import BlockchainType
+from services.decoders import decode_token_transfer, decode_transfer_log, log_position, number_repeated_transfers
+
+ADDRESS = "0x" + "11" * 20
+SENDER = "0x" + "22" * 20
+TOKEN = "0x" + "ab" * 20
+TX_HASH = "0x" + "cc" * 32
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+def _log(log_index, value=1000, block="0x64"):
+    return {
+        "address": TOKEN, "transactionHash": TX_HASH, "blockNumber": block, "logIndex": hex(log_index),
+        "topics": [TRANSFER_TOPIC, "0x" + "0" * 24 + SENDER[2:], "0x" + "0" * 24 + ADDRESS[2:]],
+        "data": hex(value),
+    }
+
+def _explorer(log_index, value=1000):
+    return {
+        "hash": TX_HASH, "contractAddress": TOKEN, "from": SENDER, "to": ADDRESS, "value": str(value),
+        "tokenDecimal": "6", "timeStamp": "1700000000", "blockNumber": "100", "logIndex": str(log_index),
+    }
+
+def test_identical_transfers_in_one_transaction_get_distinct_keys():
+    transfers = number_repeated_transfers(
+        [decode_transfer_log(_log(index), ADDRESS, BlockchainType.ETH, None, 100) for index in (3, 4, 7)]
+    )
+
+    assert len({tx.key for tx in transfers}) == 3
+    # Первый перевод сохраняет прежний ключ
+    assert transfers[0].key == decode_transfer_log(_log(3), ADDRESS, BlockchainType.ETH, None, 100).key
+
+def test_explorer_and_node_keys_match():
+    node = number_repeated_transfers([decode_transfer_log(_log(index), ADDRESS, BlockchainType.ETH, None, 100) for index in (3, 4)])
+    # Обозреватель возвращает переводы в другом порядке: номер определяется по logIndex
+    items = [_explorer(4), _explorer(3)]
+    explorer = number_repeated_transfers(
+        [decode_token_transfer(item, ADDRESS, BlockchainType.ETH) for item in items],
+        [log_position(item) for item in items]
+    )
+
+    assert sorted(tx.key for tx in explorer) == sorted(tx.key for tx in node)
+    assert explorer[1].key == node[0].key
+
+def test_different_transfers_keep_their_keys():
+    transfers = [decode_transfer_log(_log(index, value), ADDRESS, BlockchainType.ETH, None, 100) for index, value in ((1, 5), (2, 6))]
+    assert number_repeated_transfers(transfers) == transfers
+
+def test_log_position_formats():
+    assert log_position({"logIndex": "0x1a"}) == 26
+    assert log_position({"logIndex": "26"}) == 26
+    assert log_position({}) == 0
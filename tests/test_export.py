@@ -0,0 +1,82 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from models.transaction import Transaction
+from models.user import User
+from models.wallet import Wallet, BlockchainType
+from services import export
+from services.export import ExportJob, FORMAT_JSONL, enqueue_export, write_export
+
+START = datetime(2024, 1, 1)
+
+@pytest.fixture
+def export_history(run_db, tmp_path):
+    """
+    Выгружает историю двух кошельков пользователя 1 с чередующимися транзакциями
+
+    :return: Функция export(max_rows, wallet_id=None) -> (строки файла, число строк, обрезана ли выгрузка)
+    """
+    def run(max_rows, wallet_id=None):
+        path = str(tmp_path / "export.jsonl.gz")
+
+        async def test(session_factory):
+            async with session_factory() as session:
+                await session.execute(insert(User), [{"user_id": 1}, {"user_id": 2}])
+                await session.execute(insert(Wallet), [
+                    {"id": 1, "user_id": 1, "address": "bc1qfirst", "blockchain_type": BlockchainType.BTC},
+                    {"id": 2, "user_id": 1, "address": "bc1qsecond", "blockchain_type": BlockchainType.BTC},
+                    {"id": 3, "user_id": 2, "address": "bc1qother", "blockchain_type": BlockchainType.BTC},
+                ])
+                # Минута i: транзакция кошелька 1 (четные) или 2 (нечетные); у двух последних одинаковое время
+                await session.execute(insert(Transaction), [
+                    {"tx_id": f"tx{i}", "wallet_id": 1 + i % 2, "hash": f"h{i}", "value": i,
+                     "timestamp": START + timedelta(minutes=min(i, 8))}
+                    for i in range(10)
+                ] + [{"tx_id": "foreign", "wallet_id": 3, "hash": "f", "value": 1, "timestamp": START + timedelta(days=1)}])
+                await session.commit()
+
+                job = ExportJob(1, 1, 1, wallet_id, FORMAT_JSONL)
+                rows, truncated = await write_export(session, job, path, max_rows)
+
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                return [json.loads(line) for line in file], rows, truncated
+
+        return run_db(test)
+
+    return run
+
+def test_capped_export_keeps_newest_rows(export_history):
+    records, rows, truncated = export_history(max_rows=5)
+
+    assert (rows, truncated) == (5, True)
+    # Самые новые 5 транзакций (tx9 и tx8 совпадают по времени), в файле - от старых к новым по кошелькам
+    assert [(record["wallet_id"], record["hash"]) for record in records] == [
+        (1, "h6"), (1, "h8"), (2, "h5"), (2, "h7"), (2, "h9")
+    ]
+
+def test_export_within_limit_is_complete(export_history):
+    records, rows, truncated = export_history(max_rows=10)
+
+    assert (rows, truncated) == (10, False)
+    assert "f" not in {record["hash"] for record in records}
+
+def test_wallet_export_is_capped_within_wallet(export_history):
+    records, rows, truncated = export_history(max_rows=2, wallet_id=2)
+
+    assert truncated
+    assert [record["hash"] for record in records] == ["h7", "h9"]
+
+def test_one_job_per_requester(monkeypatch):
+    monkeypatch.setattr(export, "_queue", asyncio.Queue(maxsize=10))
+    monkeypatch.setattr(export, "_active", set())
+    admin, user = 100, 1
+
+    # Администратор выгружает историю пользователя: это не мешает выгрузке самого пользователя
+    assert enqueue_export(ExportJob(admin, admin, user, None, FORMAT_JSONL)) == 1
+    assert enqueue_export(ExportJob(user, user, user, None, FORMAT_JSONL)) == 2
+    assert enqueue_export(ExportJob(admin, admin, 2, None, FORMAT_JSONL)) is None
@@ -0,0 +1,84 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from models.wallet import BlockchainType, ChainTransaction, TransactionType
+from services.filters import FilterRuleError, compile_filter, get_alert_filter, merge_rules, validate_rule
+from services.monitor import apply_alert_filter
+
+WALLET_ADDRESS = "0x" + "11" * 20
+EXCHANGE = "0xAbCdEf" + "00" * 17
+TOKEN = "0xDAC17F958D2ee523a2206206994597C13D831ec7"
+
+def _tx(value=10**18, counterparty=EXCHANGE, tx_type=TransactionType.INCOMING, token_address=None, token_symbol=None, tx_hash="0x01"):
+    incoming = tx_type == TransactionType.INCOMING
+    return ChainTransaction(
+        blockchain_type=BlockchainType.ETH, hash=tx_hash, address=WALLET_ADDRESS, type=tx_type,
+        from_address=counterparty if incoming else WALLET_ADDRESS, to_address=WALLET_ADDRESS if incoming else counterparty,
+        value=value, fee=0, decimals=18, timestamp=datetime(2024, 1, 1), block_number=None, block_hash=None,
+        confirmations=0, token_address=token_address, token_symbol=token_symbol,
+    )
+
+@pytest.mark.parametrize("name, value, expected", [
+    ("min_value", "0.50", "0.50"),
+    ("min_value", 2, "2"),
+    ("direction", "incoming", "incoming"),
+    ("allow", [" 0xabc ", "", "bc1q"], ["0xabc", "bc1q"]),
+])
+def test_validate_rule_accepts(name, value, expected):
+    assert validate_rule(name, value) == expected
+
+@pytest.mark.parametrize("name, value", [
+    ("min_value", "-1"),
+    ("min_value", "abc"),
+    ("min_value", "NaN"),
+    ("min_value", "Infinity"),
+    ("direction", "sideways"),
+    ("deny", ["", "  "]),
+    ("max_value", "1"),
+])
+def test_validate_rule_rejects(name, value):
+    with pytest.raises(FilterRuleError):
+        validate_rule(name, value)
+
+def test_wallet_rules_override_user_rules():
+    user_settings = {"filters": {"min_value": "5", "direction": "outgoing", "deny": [EXCHANGE]}}
+    wallet_rules = {"min_value": "0.1", "deny": [], "unknown": 1}
+
+    # Пустое правило кошелька снимает правило пользователя, неизвестные правила отбрасываются
+    assert merge_rules(user_settings, wallet_rules) == {"min_value": "0.1", "direction": "outgoing"}
+    assert merge_rules(None, None) == {}
+
+def test_evm_address_lists_ignore_case():
+    deny = compile_filter({"deny": [EXCHANGE.upper().replace("0X", "0x")]})
+    allow = compile_filter({"allow": [EXCHANGE.lower()]})
+
+    assert not deny(_tx())
+    assert allow(_tx())
+    assert not allow(_tx(counterparty="0x" + "22" * 20))
+
+def test_non_evm_addresses_are_case_sensitive():
+    allow = compile_filter({"allow": ["bc1qexample"]})
+    tx = _tx()._replace(blockchain_type=BlockchainType.BTC, from_address="BC1QEXAMPLE")
+
+    assert not allow(tx)
+
+def test_token_rules_leave_native_transfers_alone():
+    tokens = compile_filter({"tokens": ["usdt"]})
+
+    assert tokens(_tx())
+    assert tokens(_tx(token_address=TOKEN, token_symbol="USDT"))
+    assert compile_filter({"tokens": [TOKEN]})(_tx(token_address=TOKEN.lower(), token_symbol="USDT"))
+    assert not tokens(_tx(token_address="0x" + "99" * 20, token_symbol="SPAM"))
+
+def test_known_unmined_transactions_bypass_filter():
+    wallet = SimpleNamespace(id=7, blockchain_type=BlockchainType.ETH, alert_filters={"min_value": "1"})
+    alert_filter = get_alert_filter(wallet, None)
+    dust, known, large = _tx(value=10, tx_hash="0xd1"), _tx(value=10, tx_hash="0xd2"), _tx(tx_hash="0xd3")
+
+    passed = apply_alert_filter(wallet, [dust, known, large], alert_filter, unmined={(7, "0xd2")})
+
+    assert passed == [known, large]
+    # Пара учитывает кошелек: тот же хеш другого кошелька фильтруется
+    assert apply_alert_filter(wallet, [known], alert_filter, unmined={(8, "0xd2")}) == []
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from models.transaction import Transaction
+from models.user import User
+from models.wallet import Wallet, BlockchainType
+from services.history import NEWER, OLDER, _to_us, get_history_page
+
+START = datetime(2024, 1, 1)
+# Три транзакции в одну секунду (одинаковый timestamp) и tx_id, упорядоченные не так, как вставка
+TIMES = {"a": 0, "b": 1, "e": 2, "c": 2, "d": 2, "f": 3, "g": 4}
+NEWEST_FIRST = ["g", "f", "e", "d", "c", "b", "a"]
+
+async def _seed(session):
+    await session.execute(insert(User), [{"user_id": 1}])
+    await session.execute(insert(Wallet), [{"id": 1, "user_id": 1, "address": "bc1qw", "blockchain_type": BlockchainType.BTC}])
+    await session.execute(insert(Transaction), [
+        {"tx_id": tx_id, "wallet_id": 1, "hash": tx_id, "value": 1, "timestamp": START + timedelta(seconds=seconds)}
+        for tx_id, seconds in TIMES.items()
+    ])
+    await session.commit()
+
+async def _walk(session, size):
+    """Листает историю до конца в сторону старых транзакций и обратно"""
+    page = await get_history_page(session, 1, size)
+    pages = [[tx.tx_id for tx in page.transactions]]
+    while page.older:
+        page = await get_history_page(session, 1, size, OLDER, page.older)
+        pages.append([tx.tx_id for tx in page.transactions])
+
+    back = []
+    while page.newer:
+        page = await get_history_page(session, 1, size, NEWER, page.newer)
+        back.append([tx.tx_id for tx in page.transactions])
+    return pages, back
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7])
+def test_pages_cover_history_once_across_equal_timestamps(run_db, size):
+    async def test(session_factory):
+        async with session_factory() as session:
+            await _seed(session)
+            return await _walk(session, size)
+
+    pages, back = run_db(test)
+
+    assert [tx_id for page in pages for tx_id in page] == NEWEST_FIRST
+    assert all(len(page) == size for page in pages[:-1])
+    # Обратно страницы те же, последняя - первая страница целиком
+    assert back == pages[-2::-1]
+
+def test_stale_cursor_falls_back_to_first_page(run_db):
+    async def test(session_factory):
+        async with session_factory() as session:
+            await _seed(session)
+            future = (_to_us(START + timedelta(days=1)), 0)
+            past = (_to_us(START - timedelta(days=1)), 0)
+            return (
+                await get_history_page(session, 1, 2, NEWER, future),
+                await get_history_page(session, 1, 2, OLDER, past),
+            )
+
+    newer, older = run_db(test)
+
+    for page in (newer, older):
+        assert [tx.tx_id for tx in page.transactions] == ["g", "f"]
+        assert page.newer is None and page.older is not None
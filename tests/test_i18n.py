@@ -0,0 +1,59 @@
+import json
+import re
+
+import pytest
+
+from config import DEFAULT_LANGUAGE, LOCALES_DIR
+from utils import i18n
+from utils.i18n import compile_template, get_language, load_catalogs, render
+
+def _write(directory, language, templates):
+    (directory / f"{language}.json").write_text(json.dumps(templates, ensure_ascii=False), encoding="utf-8")
+
+def test_shipped_catalogs_are_complete():
+    catalogs = load_catalogs(LOCALES_DIR)
+
+    assert DEFAULT_LANGUAGE in catalogs and "en" in catalogs
+    for language, catalog in catalogs.items():
+        assert catalog.keys() == catalogs[DEFAULT_LANGUAGE].keys(), language
+
+@pytest.mark.parametrize("language_code, expected", [
+    ("en", "en"),
+    ("EN-us", "en"),
+    ("pt-br", DEFAULT_LANGUAGE),
+    ("", DEFAULT_LANGUAGE),
+    (None, DEFAULT_LANGUAGE),
+])
+def test_language_selection(language_code, expected):
+    assert get_language(language_code) == expected
+
+def test_missing_translation_falls_back_to_default(tmp_path, monkeypatch):
+    _write(tmp_path, DEFAULT_LANGUAGE, {"greeting": "Привет, {name}", "bye": "Пока"})
+    _write(tmp_path, "en", {"greeting": "Hello, {name}"})
+    monkeypatch.setattr(i18n, "_catalogs", load_catalogs(str(tmp_path)))
+
+    assert render("greeting", "en", name="Ann") == "Hello, Ann"
+    assert render("bye", "en") == "Пока"
+
+def test_constant_template_keeps_escaped_braces():
+    assert compile_template("json", "{{ok}}").render({}) == "{ok}"
+
+@pytest.mark.parametrize("templates, message", [
+    ({"en": {"tx": "{amount.real}"}}, "недопустимое поле"),
+    ({"en": {"tx": "{values[0]}"}}, "недопустимое поле"),
+    ({"en": {"tx": "{amount"}}, "Шаблон tx"),
+    ({"en": {"tx": "Sent {value}"}}, "поля ['value'] вместо ['amount']"),
+])
+def test_invalid_catalogs_are_rejected(tmp_path, templates, message):
+    _write(tmp_path, DEFAULT_LANGUAGE, {"tx": "Отправлено {amount}"})
+    for language, catalog in templates.items():
+        _write(tmp_path, language, catalog)
+
+    with pytest.raises(ValueError, match=re.escape(message)):
+        load_catalogs(str(tmp_path))
+
+def test_default_catalog_is_required(tmp_path):
+    _write(tmp_path, "en", {"tx": "{amount}"})
+
+    with pytest.raises(ValueError):
+        load_catalogs(str(tmp_path))
@@ -0,0 +1,59 @@
+import threading
+
+from models.user import User
+from models.wallet import BlockchainType
+from services import importer
+from utils.validation import encode_segwit_address
+
+VALID_BTC = encode_segwit_address(0, bytes(range(20)))
+VALID_ETH = "0x52908400098527886E0F7030069857D2E4169EE7"
+
+def test_import_validates_off_the_event_loop(monkeypatch, run_db):
+    threads = []
+    validate_addresses = importer.validate_addresses
+
+    def recording_validate(items):
+        threads.append(threading.current_thread())
+        return validate_addresses(items)
+
+    monkeypatch.setattr(importer, "validate_addresses", recording_validate)
+
+    lines = [
+        "chain,address,label\n",
+        f"{VALID_BTC},main\n",
+        f"ETH,{VALID_ETH},token\n",
+        f"ETH,{VALID_ETH.lower()}\n",
+        "ETH,0x52908400098527886E0F7030069857D2E4169Ee7\n",
+        "not-an-address\n",
+    ]
+
+    async def test(session_factory):
+        async with session_factory() as session:
+            session.add(User(user_id=1))
+            await session.commit()
+        return await importer.import_wallets(1, lines, BlockchainType.BTC, None)
+
+    result = run_db(test)
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert sorted(wallet.address for wallet in result.added) == sorted([VALID_BTC, VALID_ETH])
+    assert result.duplicates == [4]
+    assert result.invalid == [5, 6]
+
+def test_same_evm_address_on_two_chains(run_db):
+    lines = [
+        f"ETH,{VALID_ETH}\n",
+        f"BNB,{VALID_ETH}\n",
+        f"BNB,{VALID_ETH.lower()}\n",
+    ]
+
+    async def test(session_factory):
+        async with session_factory() as session:
+            session.add(User(user_id=1))
+            await session.commit()
+        return await importer.import_wallets(1, lines, None, None)
+
+    result = run_db(test)
+
+    assert sorted(wallet.blockchain_type.value for wallet in result.added) == ["BNB", "ETH"]
+    assert result.duplicates == [3]
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from config import ORPHAN_GRACE_DEPTH, TOKEN_LOG_BLOCK_RANGE, TOKEN_LOG_CATCHUP_BLOCKS
+from models.wallet import BlockchainType, ChainTransaction, TransactionType
+from services import monitor
+
+ADDRESS = "0x" + "AB" * 20
+
+def _transfer(block, tx_hash):
+    return ChainTransaction(
+        BlockchainType.ETH, tx_hash, ADDRESS.lower(), TransactionType.INCOMING, "0x" + "22" * 20, ADDRESS.lower(),
+        1, 0, 6, datetime(2024, 1, 1), block, None, 1, "0x" + "cc" * 20, None, "key"
+    )
+
+def test_token_scan_resumes_from_saved_block_after_restart(monkeypatch, run_db):
+    chain = {"head": 1_000_000}
+    scanned = []
+
+    async def get_block_number(blockchain_type):
+        return chain["head"]
+
+    async def get_token_transfer_logs(blockchain_type, addresses, from_block, to_block):
+        scanned.append((from_block, to_block))
+        return {}
+
+    monkeypatch.setattr(monitor, "get_block_number", get_block_number)
+    monkeypatch.setattr(monitor, "get_token_transfer_logs", get_token_transfer_logs)
+    monkeypatch.setattr(monitor, "_token_scan_state", {})
+
+    async def test(session_factory):
+        await monitor._scan_token_logs(BlockchainType.ETH, ["0x" + "11" * 20])
+
+        # Перезапуск после простоя длиннее TOKEN_LOG_BLOCK_RANGE
+        monitor._token_scan_state.clear()
+        chain["head"] += TOKEN_LOG_CATCHUP_BLOCKS + 5 * TOKEN_LOG_BLOCK_RANGE
+        await monitor._scan_token_logs(BlockchainType.ETH, ["0x" + "11" * 20])
+        await monitor._scan_token_logs(BlockchainType.ETH, ["0x" + "11" * 20])
+
+    run_db(test)
+
+    first, catchup, rest = scanned
+    assert first == (1_000_000 - TOKEN_LOG_BLOCK_RANGE + 1, 1_000_000)
+    # Продолжение с сохраненного блока, а не с head - TOKEN_LOG_BLOCK_RANGE
+    assert catchup == (1_000_000 - ORPHAN_GRACE_DEPTH + 1, 1_000_000 - ORPHAN_GRACE_DEPTH + TOKEN_LOG_CATCHUP_BLOCKS)
+    assert rest == (catchup[1] - ORPHAN_GRACE_DEPTH + 1, chain["head"])
+
+def test_rescanned_grace_blocks_are_not_delivered_again(monkeypatch):
+    # Просмотр повторно читает последние ORPHAN_GRACE_DEPTH блоков до сохраненного блока 100
+    transfers = [_transfer(101, "0xnew"), _transfer(99, "0xold"), _transfer(98, "0xpending")]
+
+    async def scan_token_logs(blockchain_type, addresses):
+        return {ADDRESS.lower(): transfers}, 100
+
+    async def resolve(blockchain_type, items):
+        return items
+
+    monkeypatch.setattr(monitor, "get_rpc_url", lambda blockchain_type: "http://node" if blockchain_type == BlockchainType.ETH else None)
+    monkeypatch.setattr(monitor, "_scan_token_logs", scan_token_logs)
+    monkeypatch.setattr(monitor, "resolve_token_transfers", resolve)
+    wallet = SimpleNamespace(id=5, address=ADDRESS, blockchain_type=BlockchainType.ETH, last_checked_timestamp=datetime(2025, 1, 1))
+
+    results = asyncio.run(monitor.fetch_token_transfers([wallet], unmined={(5, "0xpending")}))
+
+    # Блоки после прошлого просмотра - новые, несмотря на время старше последней проверки;
+    # из повторно прочитанных блоков - только уже известные транзакции вне блоков
+    assert [tx.hash for tx in results[5]] == ["0xnew", "0xpending"]
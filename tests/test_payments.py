@@ -0,0 +1,51 @@
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from models.payment import Payment, PaymentStatus
+from models.subscription import Subscription
+from models.user import User
+from services.payments import activate_subscription
+
+async def _add_payment(session_factory, status=PaymentStatus.completed):
+    async with session_factory() as session:
+        session.add(User(user_id=1))
+        session.add(Payment(
+            payment_id="payment-1", user_id=1, amount=Decimal("3.00"), currency="USD",
+            payment_method="crypto", plan_type="monthly", status=status, created_at=datetime.utcnow()
+        ))
+        await session.commit()
+
+async def _count_subscriptions(session_factory):
+    async with session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(Subscription))
+
+async def _activate(session_factory, user_id=1):
+    async with session_factory() as session:
+        return await activate_subscription(session, user_id, "payment-1")
+
+def test_concurrent_activation_creates_one_subscription(run_db):
+    async def test(session_factory):
+        await _add_payment(session_factory)
+        results = await asyncio.gather(*[_activate(session_factory) for _ in range(3)])
+        return results, await _count_subscriptions(session_factory)
+
+    results, subscriptions = run_db(test)
+
+    assert results == [True, True, True]
+    assert subscriptions == 1
+
+def test_activation_rejects_unpaid_or_foreign_payment(run_db):
+    async def test(session_factory):
+        await _add_payment(session_factory, status=PaymentStatus.pending)
+        unpaid = await _activate(session_factory)
+        foreign = await _activate(session_factory, user_id=2)
+        return unpaid, foreign, await _count_subscriptions(session_factory)
+
+    unpaid, foreign, subscriptions = run_db(test)
+
+    assert not unpaid and not foreign
+    assert subscriptions == 0
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from models.token import Token
+from models.transaction import Transaction
+from models.user import User
+from models.wallet import BlockchainType, Wallet
+from services import prices
+from utils.chains import KNOWN_TOKENS
+
+HELD = "0x" + "aa" * 20
+SPAM = "0x" + "bb" * 20
+
+def test_cached_price_expires(monkeypatch):
+    now = datetime.utcnow()
+    monkeypatch.setattr(prices, "_quotes", {
+        "BTC": (60000.0, now - timedelta(seconds=10)),
+        "ETH": (3000.0, now - timedelta(hours=1)),
+    })
+
+    assert prices.get_price("BTC", max_age=60) == 60000.0
+    assert prices.get_price("ETH", max_age=60) is None
+    assert prices.get_price("BNB") is None
+
+    total, unpriced = prices.portfolio_total([("BTC", 0.5), ("ETH", 2), ("BTC", 0.5), ("ETH", 1)])
+    assert (total, unpriced) == (60000.0, ["ETH"])
+
+def test_refresh_quotes_known_and_held_tokens_only(monkeypatch, run_db):
+    requested = {}
+
+    async def fetch_quotes(token_contracts):
+        requested.update(token_contracts)
+        return {"ETH": 3000.0, prices.token_asset(BlockchainType.ETH, HELD): 2.5}
+
+    monkeypatch.setattr(prices, "fetch_quotes", fetch_quotes)
+    monkeypatch.setattr(prices, "_quotes", {})
+
+    async def test(session_factory):
+        async with session_factory() as session:
+            user = User(user_id=1)
+            wallet = Wallet(user=user, address="0x" + "11" * 20, blockchain_type=BlockchainType.ETH)
+            session.add_all([
+                user, wallet,
+                Token(blockchain_type=BlockchainType.ETH, contract_address=HELD.upper().replace("0X", "0x"), symbol="HELD"),
+                Token(blockchain_type=BlockchainType.ETH, contract_address=SPAM, symbol="SPAM"),
+            ])
+            await session.flush()
+            session.add(Transaction(
+                tx_id="held", wallet_id=wallet.id, hash="0x01", value=1, timestamp=datetime.utcnow(),
+                token_address=HELD.upper().replace("0X", "0x"), token_symbol="HELD"
+            ))
+            await session.commit()
+
+        assert await prices.refresh_prices() == 2
+
+        # Снимок переживает перезапуск
+        prices._quotes.clear()
+        await prices.load_price_snapshot()
+
+    run_db(test)
+
+    assert set(requested[BlockchainType.ETH]) == set(KNOWN_TOKENS[BlockchainType.ETH].values()) | {HELD}
+    assert SPAM not in requested[BlockchainType.ETH]
+    assert set(requested[BlockchainType.BNB]) == set(KNOWN_TOKENS[BlockchainType.BNB].values())
+    assert prices.get_price(prices.token_asset(BlockchainType.ETH, HELD)) == 2.5
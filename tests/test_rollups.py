@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from models.transaction import Transaction
+from models.user import User
+from models.wallet import Wallet, BlockchainType, ChainTransaction, TransactionType
+from services.rollups import add_to_rollup, get_window_totals, remove_from_rollup, rule_assets
+from utils.chains import KNOWN_TOKENS
+
+ADDRESS = "0x" + "11" * 20
+SPAM_CONTRACT = "0x" + "ab" * 20
+NOW = datetime.utcnow()
+
+def _transfer(value, token_address=None, token_symbol=None, tx_hash="0x01"):
+    return ChainTransaction(
+        BlockchainType.ETH, tx_hash, ADDRESS, TransactionType.OUTGOING, ADDRESS, "0x" + "22" * 20,
+        value, 0, 0, NOW, 1, None, 1, token_address, token_symbol
+    )
+
+async def _wallet(session):
+    session.add(User(user_id=1))
+    wallet = Wallet(user_id=1, address=ADDRESS, blockchain_type=BlockchainType.ETH)
+    session.add(wallet)
+    await session.flush()
+    return wallet
+
+def test_rule_assets_map_symbols_to_known_contracts():
+    usdt = KNOWN_TOKENS[BlockchainType.ETH]["USDT"]
+
+    assert rule_assets("ETH") == ("ETH",)
+    assert f"ETH:{usdt}" in rule_assets("usdt")
+    assert rule_assets("0x" + "AB" * 20) == (f"ETH:{SPAM_CONTRACT}", f"BNB:{SPAM_CONTRACT}")
+    assert rule_assets("PEPE") == ()
+
+def test_spoofed_token_symbol_is_not_counted_as_native(run_db):
+    async def test(session_factory):
+        async with session_factory() as session:
+            wallet = await _wallet(session)
+            await add_to_rollup(session, wallet, _transfer(5))
+            await add_to_rollup(session, wallet, _transfer(1000, SPAM_CONTRACT, "ETH", "0x02"))
+            await session.commit()
+            return wallet.id, await get_window_totals(session, [wallet.id], rule_assets("ETH"), NOW - timedelta(hours=1))
+
+    wallet_id, totals = run_db(test)
+
+    assert totals[wallet_id].amount_out == Decimal(5)
+    assert totals[wallet_id].count == 1
+
+def test_orphaned_transaction_is_subtracted(run_db):
+    async def test(session_factory):
+        async with session_factory() as session:
+            wallet = await _wallet(session)
+            await add_to_rollup(session, wallet, _transfer(5))
+            await add_to_rollup(session, wallet, _transfer(7, tx_hash="0x02"))
+            orphaned = Transaction(
+                tx_id="0x02", wallet_id=wallet.id, hash="0x02", value=Decimal(7),
+                type=TransactionType.OUTGOING, timestamp=NOW, is_historical=False
+            )
+            await remove_from_rollup(session, wallet, orphaned)
+            await session.commit()
+            return wallet.id, await get_window_totals(session, [wallet.id], ("ETH",), NOW - timedelta(hours=1))
+
+    wallet_id, totals = run_db(test)
+
+    assert totals[wallet_id].amount_out == Decimal(5)
+    assert totals[wallet_id].count == 1
@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.types import Chat, Message, Update, User
+
+from app import register_all_handlers
+
+@pytest.fixture(scope="module")
+def route():
+    """
+    Диспетчер с обработчиками приложения; возвращает функцию, определяющую обработчик текста
+
+    Внутренний мидлварь получает выбранный обработчик и не вызывает его,
+    поэтому запросы к Telegram и базе данных не выполняются.
+    """
+    dp = Dispatcher()
+    register_all_handlers(dp)
+    bot = Bot("123456:TEST-abcdefghijklmnopqrstuvwxyz")
+    chosen = []
+
+    async def record_handler(handler, event, data):
+        chosen.append(data["handler"].callback.__name__)
+
+    dp.message.middleware(record_handler)
+
+    def route(text):
+        chosen.clear()
+        message = Message(
+            message_id=1, date=datetime.utcnow(), text=text,
+            chat=Chat(id=1, type="private"), from_user=User(id=1, is_bot=False, first_name="Test")
+        )
+        asyncio.run(dp.feed_update(bot, Update(update_id=1, message=message)))
+        return chosen[0] if chosen else None
+
+    return route
+
+@pytest.mark.parametrize("text, handler", [
+    ("/filters", "cmd_filters"),
+    ("/alerts", "cmd_alerts"),
+    ("/add_wallet", "cmd_add_wallet"),
+    ("/balance", "cmd_balance"),
+    ("/subscribe", "cmd_subscribe"),
+    ("/help", "cmd_help"),
+    ("/no_such_command", "cmd_unknown"),
+])
+def test_commands_reach_their_handlers(route, text, handler):
+    assert route(text) == handler
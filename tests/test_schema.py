@@ -0,0 +1,73 @@
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.future import select
+
+from models.transaction import Transaction, TransactionStatus
+from models.wallet import Wallet, BlockchainType
+from services.db import engine, init_db
+
+# Таблицы в том виде, в котором их создавала версия бота до словаря адресов и подтверждений
+LEGACY_TABLES = [
+    """CREATE TABLE users (
+        user_id BIGINT NOT NULL, username VARCHAR(255), full_name VARCHAR(255), language_code VARCHAR(10),
+        subscription_level VARCHAR(7), subscription_expiry DATETIME, notification_settings JSON,
+        created_at DATETIME, updated_at DATETIME, PRIMARY KEY (user_id)
+    )""",
+    """CREATE TABLE wallets (
+        id INTEGER NOT NULL, user_id INTEGER NOT NULL, address VARCHAR(255) NOT NULL, label VARCHAR(255),
+        blockchain_type VARCHAR(3) NOT NULL, last_checked_timestamp DATETIME, created_at DATETIME, updated_at DATETIME,
+        PRIMARY KEY (id), CONSTRAINT uix_user_address UNIQUE (user_id, address),
+        FOREIGN KEY(user_id) REFERENCES users (user_id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE transactions (
+        tx_id VARCHAR(255) NOT NULL, wallet_id INTEGER, hash VARCHAR(255) NOT NULL,
+        from_address VARCHAR(255), to_address VARCHAR(255), value NUMERIC(30, 18) NOT NULL,
+        timestamp DATETIME NOT NULL, block_number INTEGER, notification_sent BOOLEAN,
+        created_at DATETIME, updated_at DATETIME, PRIMARY KEY (tx_id),
+        FOREIGN KEY(wallet_id) REFERENCES wallets (id) ON DELETE CASCADE
+    )""",
+    "INSERT INTO users (user_id) VALUES (1)",
+    "INSERT INTO wallets (id, user_id, address, blockchain_type) VALUES (1, 1, '0xwallet', 'ETH')",
+    """INSERT INTO transactions (tx_id, wallet_id, hash, from_address, to_address, value, timestamp, notification_sent)
+       VALUES ('a', 1, '0xa', '0xsender', '0xwallet', 1, '2023-01-01 00:00:00', 1),
+              ('b', 1, '0xb', '0xwallet', '0xsender', 2, '2023-01-02 00:00:00', 1)""",
+]
+
+def test_init_db_upgrades_legacy_transactions(run_db):
+    async def test(session_factory):
+        async with engine.begin() as conn:
+            for statement in LEGACY_TABLES:
+                await conn.execute(text(statement))
+
+        await init_db()
+
+        async with engine.connect() as conn:
+            columns = await conn.run_sync(lambda sync_conn: [c["name"] for c in inspect(sync_conn).get_columns("transactions")])
+            constraints = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_unique_constraints("wallets"))
+            references = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_foreign_keys("transactions"))
+
+        async with session_factory() as session:
+            result = await session.execute(select(Transaction).order_by(Transaction.tx_id))
+            legacy = result.scalars().all()
+
+            # Новые записи используют текущую схему
+            wallet = await session.get(Wallet, 1)
+            session.add(Transaction(tx_id="c", wallet_id=wallet.id, hash="0xc", value=3, timestamp=datetime.utcnow()))
+            # Тот же адрес в другом блокчейне допускается ограничением уникальности
+            session.add(Wallet(user_id=1, address=wallet.address, blockchain_type=BlockchainType.BNB))
+            await session.commit()
+
+        # Повторный запуск ничего не меняет
+        await init_db()
+        return columns, legacy, constraints, references
+
+    columns, legacy, constraints, references = run_db(test, create_tables=False)
+
+    assert "from_address" not in columns and "to_address" not in columns
+    assert {"from_address_id", "to_address_id", "status", "is_historical"} <= set(columns)
+    assert [(tx.from_address, tx.to_address) for tx in legacy] == [("0xsender", "0xwallet"), ("0xwallet", "0xsender")]
+    assert legacy[0].from_ref.id == legacy[1].to_ref.id
+    assert all(tx.status == TransactionStatus.final and not tx.is_historical for tx in legacy)
+    assert [(c["name"], c["column_names"]) for c in constraints] == [("uix_user_chain_address", ["user_id", "blockchain_type", "address"])]
+    assert "wallets" in {reference["referred_table"] for reference in references}
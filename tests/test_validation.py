@@ -0,0 +1,137 @@
+import random
+
+import pytest
+
+from models.wallet import BlockchainType
+from utils.validation import (
+    _keccak256_python, base58check_decode, decode_segwit_address, encode_segwit_address,
+    is_valid_address, is_valid_btc_address, is_valid_evm_address, keccak256, to_checksum_address
+)
+
+# BIP-173 / BIP-350: корректные адреса основной сети
+VALID_SEGWIT = [
+    "BC1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4",
+    "bc1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3qccfmv3",
+    "bc1pw508d6qejxtdg4y5r3zarvary0c5xw7kw508d6qejxtdg4y5r3zarvary0c5xw7kt5nd6y",
+    "BC1SW50QGDZ25J",
+    "bc1zw508d6qejxtdg4y5r3zarvaryvaxxpcs",
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0",
+]
+
+# BIP-173 / BIP-350: некорректные адреса (у большинства верная контрольная сумма одного из вариантов)
+INVALID_SEGWIT = [
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqh2y7hd",  # версия 1 с Bech32 вместо Bech32m
+    "BC1S0XLXVLHEMJA6C4DQV22UAPCTQUPFHLXM9H8Z3K2E72Q4K9HCZ7VQ54WELL",  # версия 16 с Bech32
+    "bc1pw508d6qejxtdg4y5r3zarvary0c5xw7kw508d6qejxtdg4y5r3zarvary0c5xw7k7grplx",  # BIP-173 v1, по BIP-350 неверен
+    "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kemeawh",  # версия 0 с Bech32m
+    "BC130XLXVLHEMJA6C4DQV22UAPCTQUPFHLXM9H8Z3K2E72Q4K9HCZ7VQ7ZWS8R",  # версия свидетеля 17
+    "bc1rw5uspcuh",  # программа 1 байт
+    "bc1pw5dgrnzv",  # программа 1 байт
+    "bc10w508d6qejxtdg4y5r3zarvary0c5xw7kw508d6qejxtdg4y5r3zarvary0c5xw7kw5rljs90",  # программа 41 байт
+    "BC1QR508D6QEJXTDG4Y5R3ZARVARYV98GJ9P",  # версия 0 с программой 16 байт
+    "bc1zw508d6qejxtdg4y5r3zarvaryvqyzf3du",  # дополнение больше 4 бит
+    "bc1gmk9yu",  # пустая часть данных
+    "bc1p38j9r5y49hruaue7wxjce0updqjuyyx0kh56v8s25huc6995vvpql3jow4",  # символ 'o' вне алфавита
+    "bc1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4",  # смешанный регистр
+    "tb1qw508d6qejxtdg4y5r3zarvary0c5xw7kxpjzsx",  # тестовая сеть
+    "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t5",  # измененная контрольная сумма
+    "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3tё",  # символ вне ASCII
+]
+
+VALID_BASE58 = [
+    "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa",
+    "1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2",
+    "3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy",
+]
+
+INVALID_BASE58 = [
+    "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNb",  # контрольная сумма
+    "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfN0",  # '0' вне алфавита
+    "mipcBbFg9gMiCh81Kj8tqqdgoZub1ZJRfn",  # тестовая сеть (версия 0x6f)
+    "11A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa",  # лишний нулевой байт
+    "1A1zP1eP5QGefi2DMPTfTL5SLmv7Divf",  # слишком короткий
+]
+
+# EIP-55: адреса с контрольной суммой и в одном регистре
+VALID_EVM = [
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed",
+    "0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359",
+    "0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB",
+    "0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb",
+    "0x52908400098527886E0F7030069857D2E4169EE7",
+    "0x8617E340B3D01FA5F11F306F4090FD50E238070D",
+    "0xde709f2102306220921060314715629080e2fb77",
+    "0x27b1fdb04752bbc536007a920d24acb045561c26",
+]
+
+INVALID_EVM = [
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAeD",  # регистр последней буквы
+    "0xfb6916095ca1df60bB79Ce92cE3Ea74c37c5d359",  # регистр первой буквы
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeA",  # 38 символов
+    "5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed00",  # без 0x
+    "0xg2908400098527886e0f7030069857d2e4169ee7",  # не шестнадцатеричный символ
+]
+
+@pytest.mark.parametrize("address", VALID_SEGWIT)
+def test_valid_segwit(address):
+    assert is_valid_btc_address(address)
+    version, program = decode_segwit_address(address)
+    assert encode_segwit_address(version, program) == address.lower()
+
+@pytest.mark.parametrize("address", INVALID_SEGWIT)
+def test_invalid_segwit(address):
+    assert not is_valid_btc_address(address)
+    assert decode_segwit_address(address) is None
+
+@pytest.mark.parametrize("address", VALID_BASE58)
+def test_valid_base58(address):
+    assert is_valid_btc_address(address)
+    assert len(base58check_decode(address)) == 21
+
+@pytest.mark.parametrize("address", INVALID_BASE58)
+def test_invalid_base58(address):
+    assert not is_valid_btc_address(address)
+
+@pytest.mark.parametrize("address", VALID_EVM)
+def test_valid_evm(address):
+    assert is_valid_evm_address(address)
+    assert to_checksum_address(address.lower()) == address or address[2:] in (address[2:].lower(), address[2:].upper())
+
+@pytest.mark.parametrize("address", INVALID_EVM)
+def test_invalid_evm(address):
+    assert not is_valid_evm_address(address)
+
+def test_keccak_fallback_matches_known_digests():
+    assert _keccak256_python(b"").hex() == "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    data = bytes(range(256)) * 2  # несколько блоков
+    assert _keccak256_python(data) == keccak256(data)
+
+def test_fast_segwit_check_matches_decoder():
+    # Быстрая проверка без декодирования программы совпадает с decode_segwit_address
+    rng = random.Random(7)
+    alphabet = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+    for _ in range(2000):
+        version = rng.choice([0, 0, 1, 2, 16])
+        size = rng.choice([20, 32] if version == 0 else [2, 20, 32, 40])
+        address = encode_segwit_address(version, rng.getrandbits(8 * size).to_bytes(size, "big"))
+        index = rng.randrange(3, len(address))
+        typo = address[:index] + rng.choice(alphabet) + address[index + 1:]
+        for candidate in (address, typo, address[:-1]):
+            assert is_valid_btc_address(candidate) == (decode_segwit_address(candidate) is not None)
+
+def test_is_valid_address_dispatches_by_chain():
+    assert is_valid_address(BlockchainType.ETH, VALID_EVM[0])
+    assert is_valid_address(BlockchainType.BNB, VALID_EVM[0])
+    assert not is_valid_address(BlockchainType.BTC, VALID_EVM[0])
+    assert is_valid_address(BlockchainType.BTC, VALID_SEGWIT[0])
+    assert not is_valid_address(BlockchainType.ETH, "")
+
+def test_fast_base58_check_matches_decoder():
+    rng = random.Random(7)
+    alphabet = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+    for address in VALID_BASE58 * 500:
+        index = rng.randrange(len(address))
+        typo = address[:index] + rng.choice(alphabet) + address[index + 1:]
+        payload = base58check_decode(typo)
+        expected = 26 <= len(typo) <= 35 and payload is not None and len(payload) == 21 and payload[0] in (0x00, 0x05)
+        assert is_valid_btc_address(typo) == expected
@@ -0,0 +1,99 @@
+"""
+Реестр поддерживаемых блокчейнов
+
+Сведения о блокчейне, нужные сообщениям и клавиатурам бота (название,
+символ и точность монеты, шаблоны ссылок обозревателя, проверка адреса),
+собраны в одной неизменяемой записи ChainInfo вместо ветвлений по
+blockchain_type в каждом обработчике и уведомлении. Новый блокчейн
+добавляется одной записью в CHAINS, его известные токены - в KNOWN_TOKENS.
+"""
+from typing import Dict, NamedTuple, Optional
+
+from models.wallet import BlockchainType, NATIVE_DECIMALS
+from utils.validation import is_valid_address
+
+class ChainInfo(NamedTuple):
+    """Описание блокчейна"""
+    blockchain_type: BlockchainType
+    name: str
+    symbol: str
+    decimals: int
+    explorer_name: str
+    address_url: str  # шаблон ссылки на адрес ({address})
+    tx_url: str  # шаблон ссылки на транзакцию ({hash})
+
+    @property
+    def title(self) -> str:
+        """Подпись для кнопок: символ и название сети"""
+        return f"{self.symbol} ({self.name})"
+
+    def explorer_address_url(self, address: str) -> str:
+        """Ссылка на адрес в обозревателе блокчейна"""
+        return self.address_url.format(address=address)
+
+    def explorer_tx_url(self, tx_hash: str) -> str:
+        """Ссылка на транзакцию в обозревателе блокчейна"""
+        return self.tx_url.format(hash=tx_hash)
+
+    def is_valid_address(self, address: str) -> bool:
+        """Проверка адреса по формату и контрольной сумме (utils/validation.py)"""
+        return is_valid_address(self.blockchain_type, address)
+
+# Порядок записей - порядок кнопок выбора блокчейна
+CHAINS: Dict[BlockchainType, ChainInfo] = {
+    chain.blockchain_type: chain for chain in (
+        ChainInfo(
+            BlockchainType.ETH, "Ethereum", "ETH", NATIVE_DECIMALS[BlockchainType.ETH], "Etherscan",
+            "https://etherscan.io/address/{address}", "https://etherscan.io/tx/{hash}"
+        ),
+        ChainInfo(
+            BlockchainType.BTC, "Bitcoin", "BTC", NATIVE_DECIMALS[BlockchainType.BTC], "Blockchain.com",
+            "https://www.blockchain.com/btc/address/{address}", "https://www.blockchain.com/btc/tx/{hash}"
+        ),
+        ChainInfo(
+            BlockchainType.BNB, "Binance Smart Chain", "BNB", NATIVE_DECIMALS[BlockchainType.BNB], "BscScan",
+            "https://bscscan.com/address/{address}", "https://bscscan.com/tx/{hash}"
+        )
+    )
+}
+
+# Контракты известных токенов по блокчейнам: символ в правилах оповещений означает
+# только эти контракты, а не любой токен, назвавший себя так же
+KNOWN_TOKENS: Dict[BlockchainType, Dict[str, str]] = {
+    BlockchainType.ETH: {
+        "USDT": "0xdac17f958d2ee523a2206206994597c13d831ec7",
+        "USDC": "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48",
+        "DAI": "0x6b175474e89094c44da98b954eedeac495271d0f",
+    },
+    BlockchainType.BNB: {
+        "USDT": "0x55d398326f99059ff775485246999027b3197955",
+        "USDC": "0x8ac76a51cc950d9822d68b83fe1ad97b32cd580d",
+        "DAI": "0x1af3f329e8be154074d8769d1ffa4ee058b1dbc3",
+    },
+}
+
+def get_chain(blockchain_type: BlockchainType) -> ChainInfo:
+    """Возвращает описание блокчейна"""
+    return CHAINS[blockchain_type]
+
+def explorer_address_url(blockchain_type: BlockchainType, address: str) -> Optional[str]:
+    """
+    Ссылка на адрес в обозревателе блокчейна
+
+    :param blockchain_type: Тип блокчейна
+    :param address: Адрес
+    :return: URL или None для блокчейна без обозревателя
+    """
+    chain = CHAINS.get(blockchain_type)
+    return chain.explorer_address_url(address) if chain else None
+
+def explorer_tx_url(blockchain_type: BlockchainType, tx_hash: str) -> Optional[str]:
+    """
+    Ссылка на транзакцию в обозревателе блокчейна
+
+    :param blockchain_type: Тип блокчейна
+    :param tx_hash: Хеш транзакции
+    :return: URL или None для блокчейна без обозревателя
+    """
+    chain = CHAINS.get(blockchain_type)
+    return chain.explorer_tx_url(tx_hash) if chain else None
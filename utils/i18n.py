@@ -0,0 +1,114 @@
+"""
+Каталоги текстов сообщений по языкам
+
+Каталоги - файлы locales/<язык>.json с шаблонами вида "Сумма: {amount}".
+Они читаются и компилируются один раз при импорте модуля: каждый шаблон
+разбирается заранее, а при отправке сообщения остается только подстановка
+значений (str.format_map). В шаблонах допускаются лишь простые имена полей,
+без обращения к атрибутам и элементам.
+
+Язык выбирается по language_code пользователя Telegram ("en", "en-US" -> "en");
+для языков без каталога и ключей, отсутствующих в каталоге языка, используется
+каталог DEFAULT_LANGUAGE.
+"""
+import json
+import logging
+import os
+from string import Formatter
+from typing import Callable, Dict, NamedTuple, Optional
+
+from config import DEFAULT_LANGUAGE, LOCALES_DIR
+
+logger = logging.getLogger(__name__)
+
+class Template(NamedTuple):
+    """Скомпилированный шаблон"""
+    fields: frozenset
+    render: Callable[[Dict[str, object]], str]
+
+def compile_template(key: str, source: str) -> Template:
+    """
+    Компилирует шаблон
+
+    :param key: Ключ шаблона (для сообщений об ошибках)
+    :param source: Текст шаблона
+    :return: Шаблон
+    :raises ValueError: Если шаблон некорректен или обращается к атрибутам и элементам значений
+    """
+    fields = set()
+    try:
+        for _, name, _, _ in Formatter().parse(source):
+            if name is None:
+                continue
+            if not name.isidentifier():
+                raise ValueError(f"недопустимое поле {{{name}}}")
+            fields.add(name)
+    except ValueError as e:
+        raise ValueError(f"Шаблон {key}: {e}")
+
+    if not fields:
+        # Постоянный текст: подстановка не нужна
+        text = source.format()
+        return Template(frozenset(), lambda values: text)
+    return Template(frozenset(fields), source.format_map)
+
+def load_catalogs(directory: str) -> Dict[str, Dict[str, Template]]:
+    """
+    Загружает и компилирует каталоги всех языков
+
+    :param directory: Каталог с файлами <язык>.json
+    :return: Словарь {язык: {ключ: шаблон}}
+    :raises ValueError: Если шаблон некорректен или его поля расходятся с каталогом DEFAULT_LANGUAGE
+    """
+    catalogs = {}
+    for filename in sorted(os.listdir(directory)):
+        language, extension = os.path.splitext(filename)
+        if extension != ".json":
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as file:
+            catalogs[language.lower()] = {key: compile_template(key, source) for key, source in json.load(file).items()}
+
+    if DEFAULT_LANGUAGE not in catalogs:
+        raise ValueError(f"Нет каталога языка по умолчанию: {os.path.join(directory, DEFAULT_LANGUAGE)}.json")
+
+    # Переводы должны использовать те же поля, что и исходные шаблоны
+    default = catalogs[DEFAULT_LANGUAGE]
+    for language, catalog in catalogs.items():
+        for key, template in catalog.items():
+            if key in default and template.fields != default[key].fields:
+                raise ValueError(f"Шаблон {key} ({language}): поля {sorted(template.fields)} вместо {sorted(default[key].fields)}")
+        missing = default.keys() - catalog.keys()
+        if missing:
+            logger.warning(f"В каталоге {language} нет шаблонов: {', '.join(sorted(missing))}")
+
+    return catalogs
+
+_catalogs = load_catalogs(LOCALES_DIR)
+
+def get_language(language_code: Optional[str]) -> str:
+    """
+    Выбирает каталог по языку пользователя
+
+    :param language_code: Код языка Telegram (например, "en" или "pt-br") или None
+    :return: Язык с каталогом
+    """
+    if language_code:
+        language = language_code.lower()
+        if language in _catalogs:
+            return language
+        language = language.split("-")[0]
+        if language in _catalogs:
+            return language
+    return DEFAULT_LANGUAGE
+
+def render(key: str, language: str, **values) -> str:
+    """
+    Подставляет значения в шаблон
+
+    :param key: Ключ шаблона
+    :param language: Язык (get_language)
+    :param values: Значения полей шаблона
+    :return: Текст сообщения
+    """
+    template = _catalogs[language].get(key) or _catalogs[DEFAULT_LANGUAGE][key]
+    return template.render(values)
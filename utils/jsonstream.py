@@ -0,0 +1,169 @@
+import codecs
+import json
+import logging
+import re
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from config import JSON_BACKEND
+
+logger = logging.getLogger(__name__)
+
+# Необязательный быстрый JSON-бэкенд (включается через JSON_BACKEND=orjson)
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson не установлен
+    orjson = None
+
+if JSON_BACKEND == "orjson" and orjson is None:
+    logger.warning("JSON_BACKEND=orjson, но пакет orjson не установлен - используется стандартный json")
+
+_USE_ORJSON = JSON_BACKEND == "orjson" and orjson is not None
+
+# Структурные символы JSON, которые важны для сканера
+_TOKEN_RE = re.compile(r'[\[\]{}"]')
+# Остаток строки после открывающей кавычки (с учетом экранирования)
+_STRING_TAIL_RE = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+_WHITESPACE = " \t\r\n"
+
+# Элементы массивов декодируются C-сканером стандартного json прямо из буфера
+_decoder = json.JSONDecoder()
+
+def loads(data: Any) -> Any:
+    """
+    Декодирует JSON выбранным бэкендом
+
+    :param data: Строка или байты JSON
+    :return: Декодированное значение
+    """
+    if _USE_ORJSON:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+class _Frame:
+    """Открытый контейнер JSON (объект или массив) на стеке сканера"""
+    __slots__ = ("is_object", "key", "pending_key", "fields")
+
+    def __init__(self, is_object: bool, key: Optional[str]):
+        self.is_object = is_object
+        self.key = key
+        self.pending_key = None
+        self.fields = {}
+
+class JsonArrayStream:
+    """
+    Инкрементальный разбор элементов JSON-массивов с заданным ключом
+
+    Сканер получает тело ответа частями и возвращает каждый элемент массивов
+    с ключом ``key`` (на любом уровне вложенности) сразу после того, как элемент
+    прочитан целиком. Декодируется только сам элемент, полное дерево ответа не
+    строится. Вместе с элементом возвращаются строковые поля объекта-владельца
+    массива из ``owner_fields`` (например, "address" в пакетном ответе BlockCypher),
+    если они встретились до массива. При ``report_owners`` каждый прочитанный
+    целиком объект с такими полями дополнительно возвращается парой (поля, None) -
+    так видны и владельцы пустых массивов.
+    """
+
+    def __init__(self, key: str, owner_fields: Iterable[str] = (), report_owners: bool = False):
+        self.key = key
+        self.owner_fields = frozenset(owner_fields)
+        self.report_owners = report_owners
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._stack: List[_Frame] = []
+
+    def feed(self, chunk: bytes) -> List[Tuple[Dict[str, Any], Any]]:
+        """
+        Передает очередную часть тела ответа
+
+        :param chunk: Байты ответа
+        :return: Список пар (поля владельца, элемент) для полностью прочитанных элементов
+        """
+        buf = self._buf + self._utf8.decode(chunk)
+        pos = 0
+        items = []
+
+        while True:
+            match = _TOKEN_RE.search(buf, pos)
+            if not match:
+                pos = len(buf)
+                break
+
+            i = match.start()
+            char = buf[i]
+            frame = self._stack[-1] if self._stack else None
+
+            if frame is not None and not frame.is_object and frame.key == self.key and char in "{[":
+                # Элемент целевого массива: декодируем его целиком, если он уже в буфере
+                try:
+                    item, pos = _decoder.raw_decode(buf, i)
+                except json.JSONDecodeError:
+                    pos = i  # элемент еще не дочитан
+                    break
+
+                owner = self._stack[-2].fields if len(self._stack) >= 2 and self._stack[-2].is_object else {}
+                items.append((dict(owner), item))
+
+            elif char == '"':
+                tail = _STRING_TAIL_RE.match(buf, i + 1)
+                if not tail:
+                    pos = i  # строка еще не дочитана
+                    break
+
+                end = tail.end()
+
+                if frame is not None and frame.is_object:
+                    # Ключ от значения отличается двоеточием после строки
+                    j = end
+                    while j < len(buf) and buf[j] in _WHITESPACE:
+                        j += 1
+                    if j == len(buf):
+                        pos = i
+                        break
+
+                    if buf[j] == ":":
+                        frame.pending_key = json.loads(buf[i:end])
+                    elif frame.pending_key in self.owner_fields:
+                        frame.fields[frame.pending_key] = json.loads(buf[i:end])
+
+                pos = end
+
+            elif char in "{[":
+                key = frame.pending_key if frame is not None and frame.is_object else None
+                self._stack.append(_Frame(char == "{", key))
+                pos = i + 1
+
+            else:  # '}' или ']'
+                closed = self._stack.pop()
+                if self.report_owners and closed.is_object and closed.fields:
+                    items.append((dict(closed.fields), None))
+                pos = i + 1
+
+        # Отбрасываем уже разобранную часть буфера
+        self._buf = buf[pos:]
+        return items
+
+async def iter_json_array(
+    content,
+    key: str,
+    owner_fields: Iterable[str] = (),
+    chunk_size: int = 64 * 1024,
+    report_owners: bool = False
+) -> AsyncIterator[Tuple[Dict[str, Any], Any]]:
+    """
+    Асинхронно перебирает элементы массивов с ключом ``key`` из потока ответа
+
+    Чтение прекращается, как только потребитель перестает запрашивать элементы,
+    поэтому остаток тела ответа не загружается.
+
+    :param content: Поток тела ответа (aiohttp.StreamReader)
+    :param key: Ключ массива, элементы которого нужно вернуть
+    :param owner_fields: Строковые поля объекта-владельца массива
+    :param chunk_size: Размер читаемых частей
+    :param report_owners: Возвращать также (поля владельца, None) для каждого прочитанного объекта-владельца
+    """
+    stream = JsonArrayStream(key, owner_fields, report_owners)
+
+    async for chunk in content.iter_chunked(chunk_size):
+        for item in stream.feed(chunk):
+            yield item
@@ -1,43 +1,201 @@
+import atexit
+import copy
+import json
 import logging
-import sys
 import os
+import queue
+import sys
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional
+
+from config import (
+    LOG_DIR, LOG_FORMAT, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL, LOG_BACKUP_COUNT, LOG_HOT_PATH_RATE
+)
+
+# Поля контекста, которые передаются через extra и попадают в структурированный вывод
+CONTEXT_FIELDS = ("wallet", "chain", "provider", "endpoint", "user", "subsystem", "duration", "suppressed", "stack")
+
+_listener: Optional[QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись как одну строку JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class ContextFormatter(logging.Formatter):
+    """Текстовый формат с полями контекста в конце строки"""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        text = super().formatMessage(record)
+        context = " ".join(
+            f"{field}={getattr(record, field)}" for field in CONTEXT_FIELDS
+            if field != "stack" and getattr(record, field, None) is not None
+        )
+        if context:
+            text = f"{text} [{context}]"
+
+        # Стек (например, от сторожевой задачи цикла событий) выводится отдельными строками
+        stack = getattr(record, "stack", None)
+        return f"{text}\n{stack}" if stack else text
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """
+    Ротация файла по размеру и по времени
+
+    Файл ротируется при превышении max_bytes или при пересечении границы
+    интервала (для суток - полночь UTC); архивы нумеруются .1, .2, ...
+    """
+
+    def __init__(self, filename: str, max_bytes: int, interval: int, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.interval = interval
+
+        # Файл, оставшийся от предыдущего запуска, ротируется по времени своего последнего изменения
+        started = os.path.getmtime(filename) if os.path.exists(filename) else time.time()
+        self.rollover_at = self._next_rollover(started)
+
+    def _next_rollover(self, now: float) -> float:
+        return (now // self.interval + 1) * self.interval if self.interval > 0 else float("inf")
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = self._next_rollover(time.time())
+
+class HotPathFilter(logging.Filter):
+    """
+    Ограничивает частоту сообщений из горячих путей
+
+    Записи с extra={"hot_path": "<ключ>"} пропускаются не чаще rate раз в секунду
+    на ключ (с запасом burst); остальные отбрасываются до постановки в очередь,
+    а их количество добавляется к следующей пропущенной записи в поле suppressed.
+    Записи без hot_path не ограничиваются.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self._buckets: Dict[str, List[float]] = {}  # ключ -> [токены, время, отброшено]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "hot_path", None)
+        if key is None or self.rate <= 0:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(key, [self.burst, now, 0])
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                return False
+
+            bucket[0] = tokens - 1
+            if bucket[2]:
+                record.suppressed = int(bucket[2])
+                bucket[2] = 0
+
+        return True
+
+class _QueueHandler(QueueHandler):
+    """QueueHandler, сохраняющий поля контекста и оставляющий форматирование обработчикам"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
 
 def setup_logging(log_level=logging.INFO):
-    """Настраивает логирование для приложения"""
-    
+    """
+    Настраивает неблокирующее логирование для приложения
+
+    Корневой логгер только кладет записи в очередь; запись в файл и в консоль
+    выполняет QueueListener в отдельном потоке, поэтому ввод-вывод не блокирует
+    цикл событий. Файл logs/bot.log пишется в JSON с ротацией по размеру и времени.
+    """
+    global _listener
+
+    root_logger = logging.getLogger()
+    if _listener is not None:
+        return root_logger
+
     # Создаем директорию для логов, если её нет
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
-    # Формат логов
-    log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    formatter = logging.Formatter(log_format)
-    
-    # Имя файла логов с текущей датой
-    today = datetime.now().strftime("%Y-%m-%d")
-    log_file = os.path.join(log_dir, f"bot_{today}.log")
-    
-    # Настройка обработчика файлов
-    file_handler = logging.FileHandler(log_file)
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    # Файл: JSON с ротацией по размеру и времени
+    file_handler = SizeAndTimeRotatingFileHandler(
+        os.path.join(LOG_DIR, "bot.log"), LOG_MAX_BYTES, LOG_ROTATE_INTERVAL, LOG_BACKUP_COUNT
+    )
     file_handler.setLevel(log_level)
-    file_handler.setFormatter(formatter)
-    
-    # Настройка обработчика консоли
+    file_handler.setFormatter(JsonFormatter())
+
+    # Консоль: текст (по умолчанию) или JSON
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
-    console_handler.setFormatter(formatter)
-    
-    # Настройка корневого логгера
-    root_logger = logging.getLogger()
+    console_handler.setFormatter(
+        JsonFormatter() if LOG_FORMAT == "json"
+        else ContextFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    )
+
+    # Корневой логгер пишет только в очередь
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(HotPathFilter(LOG_HOT_PATH_RATE))
+
     root_logger.setLevel(log_level)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
-    
+    root_logger.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
     # Отключаем логи сторонних библиотек, которые нам не нужны
     for logger_name in ["aiohttp", "aiogram"]:
         logger = logging.getLogger(logger_name)
         logger.setLevel(logging.WARNING)
-    
-    return root_logger 
\ No newline at end of file
+
+    return root_logger
+
+def stop_logging() -> None:
+    """Дописывает оставшиеся в очереди записи и останавливает поток логирования"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,73 +1,208 @@
 import logging
+from collections import OrderedDict
 from aiogram import Bot
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from services.metrics import NOTIFICATION_SEND_SECONDS, NOTIFICATIONS_SENT, NOTIFICATION_BODY_CACHE
+from utils.chains import explorer_address_url, explorer_tx_url, get_chain
+from utils.i18n import get_language, render
 
 logger = logging.getLogger(__name__)
 
-async def send_transaction_notification(bot: Bot, user_id: int, transaction, wallet):
-    """Отправляет уведомление о новой транзакции пользователю"""
+# Общая часть уведомлений о транзакции (сумма, адреса, время, хеш) одинакова для всех
+# кошельков, отслеживающих адрес: она формируется один раз на язык и транзакцию
+NOTIFICATION_BODY_CACHE_SIZE = 4096
+_body_cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+
+def _format_amount(value) -> str:
+    return f"{value:.8f}".rstrip('0').rstrip('.') if value else "0"
+
+def _short(address: Optional[str], language: str) -> str:
+    return f"{address[:8]}...{address[-6:]}" if address else render("common.unknown", language)
+
+def format_wallet_summary(wallet, language: str) -> str:
+    """Строки «Кошелёк» и «Адрес» для сообщений о кошельке"""
+    return render(
+        "wallet.summary", language,
+        label=wallet.label or render("common.no_label", language),
+        chain=wallet.blockchain_type.value,
+        address=f"{wallet.address[:8]}...{wallet.address[-6:]}"
+    )
+
+def _transaction_body(transaction, wallet, language: str) -> str:
+    # Ключ транзакции без ID кошелька (tx_id = "<ключ>:<ID кошелька>")
+    key = (language, wallet.blockchain_type.value, transaction.tx_id.rsplit(":", 1)[0])
+    body = _body_cache.get(key)
+    if body is not None:
+        _body_cache.move_to_end(key)
+        NOTIFICATION_BODY_CACHE.inc(result="hit")
+        return body
+
+    NOTIFICATION_BODY_CACHE.inc(result="miss")
+    body = render(
+        "tx.body", language,
+        amount=_format_amount(transaction.value),
+        currency=transaction.token_symbol or get_chain(wallet.blockchain_type).symbol,
+        sender=_short(transaction.from_address, language),
+        recipient=_short(transaction.to_address, language),
+        time=transaction.timestamp.strftime(render("tx.time_format", language)) if transaction.timestamp else render("common.unknown", language),
+        hash=f"{transaction.hash[:10]}...{transaction.hash[-8:]}"
+    )
+    _body_cache[key] = body
+    if len(_body_cache) > NOTIFICATION_BODY_CACHE_SIZE:
+        _body_cache.popitem(last=False)
+    return body
+
+def format_transaction_message(transaction, wallet, language: str) -> str:
+    """
+    Текст уведомления о транзакции: заголовок кошелька и общая для подписчиков адреса часть
+
+    :param transaction: Транзакция (Transaction)
+    :param wallet: Кошелек получателя уведомления
+    :param language: Язык (get_language)
+    :return: Текст сообщения
+    """
+    incoming = wallet.address.lower() == (transaction.to_address or "").lower()
+    header = render(
+        "tx.header", language,
+        direction=render("tx.incoming" if incoming else "tx.outgoing", language),
+        wallet=format_wallet_summary(wallet, language)
+    )
+    return header + _transaction_body(transaction, wallet, language)
+
+async def send_transaction_notification(bot: Bot, user_id: int, transaction, wallet, language_code: Optional[str] = None):
+    """
+    Отправляет уведомление о новой транзакции пользователю
+
+    :param bot: Объект бота
+    :param user_id: ID пользователя
+    :param transaction: Транзакция (Transaction)
+    :param wallet: Кошелек пользователя
+    :param language_code: Язык пользователя (User.language_code)
+    :return: True, если сообщение отправлено
+    """
     try:
-        # Определяем тип транзакции (входящая или исходящая)
-        tx_type = "входящая" if wallet.address.lower() == transaction.to_address.lower() else "исходящая"
-        
-        # Определяем символ валюты в зависимости от типа блокчейна
-        currency = {
-            "ETH": "ETH",
-            "BTC": "BTC",
-            "BNB": "BNB"
-        }.get(wallet.blockchain_type.value, "")
-        
-        # Форматируем сумму транзакции
-        amount = f"{transaction.value:.8f}".rstrip('0').rstrip('.') if transaction.value else "0"
-        
-        # Форматируем дату и время транзакции
-        timestamp = transaction.timestamp.strftime("%d.%m.%Y %H:%M:%S UTC") if transaction.timestamp else "неизвестно"
-        
-        # Сокращаем адреса для читаемости
-        from_addr_short = f"{transaction.from_address[:8]}...{transaction.from_address[-6:]}" if transaction.from_address else "неизвестно"
-        to_addr_short = f"{transaction.to_address[:8]}...{transaction.to_address[-6:]}" if transaction.to_address else "неизвестно"
-        
-        # Формируем текст уведомления
-        message_text = (
-            f"🔔 <b>Новая {tx_type} транзакция!</b>\n\n"
-            f"<b>Кошелёк:</b> {wallet.label or 'Без метки'} ({wallet.blockchain_type.value})\n"
-            f"<b>Адрес:</b> {wallet.address[:8]}...{wallet.address[-6:]}\n\n"
-            f"<b>Сумма:</b> {amount} {currency}\n"
-            f"<b>От:</b> {from_addr_short}\n"
-            f"<b>Кому:</b> {to_addr_short}\n"
-            f"<b>Время:</b> {timestamp}\n\n"
-            f"<b>Хеш транзакции:</b> {transaction.hash[:10]}...{transaction.hash[-8:]}"
-        )
+        language = get_language(language_code)
+        message_text = format_transaction_message(transaction, wallet, language)
         
         # Формируем URL для просмотра транзакции в обозревателе блокчейна
-        explorer_url = None
-        if wallet.blockchain_type.value == "ETH":
-            explorer_url = f"https://etherscan.io/tx/{transaction.hash}"
-        elif wallet.blockchain_type.value == "BTC":
-            explorer_url = f"https://www.blockchain.com/btc/tx/{transaction.hash}"
-        elif wallet.blockchain_type.value == "BNB":
-            explorer_url = f"https://bscscan.com/tx/{transaction.hash}"
+        explorer_url = explorer_tx_url(wallet.blockchain_type, transaction.hash)
         
         # Добавляем кнопку для просмотра транзакции, если есть URL
         if explorer_url:
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            keyboard = InlineKeyboardMarkup()
-            keyboard.add(InlineKeyboardButton("Просмотреть транзакцию", url=explorer_url))
+            keyboard = InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text=render("tx.view_button", language), url=explorer_url)]
+            ])
             
             # Отправляем сообщение с кнопкой
-            await bot.send_message(user_id, message_text, parse_mode="HTML", reply_markup=keyboard)
+            with NOTIFICATION_SEND_SECONDS.time(kind="transaction"):
+                await bot.send_message(user_id, message_text, parse_mode="HTML", reply_markup=keyboard)
         else:
             # Отправляем сообщение без кнопки
-            await bot.send_message(user_id, message_text, parse_mode="HTML")
+            with NOTIFICATION_SEND_SECONDS.time(kind="transaction"):
+                await bot.send_message(user_id, message_text, parse_mode="HTML")
         
+        NOTIFICATIONS_SENT.inc(kind="transaction", result="ok")
         logger.info(f"Отправлено уведомление о транзакции пользователю {user_id}")
         return True
         
     except Exception as e:
+        NOTIFICATIONS_SENT.inc(kind="transaction", result="error")
         logger.error(f"Ошибка при отправке уведомления: {e}")
         return False
 
+async def send_transaction_correction(bot: Bot, user_id: int, transaction, wallet, language_code: Optional[str] = None):
+    """Отправляет исправление к уведомлению о транзакции, исключенной из цепочки (реорганизация)"""
+    try:
+        language = get_language(language_code)
+        message_text = render(
+            "correction.text", language,
+            wallet=format_wallet_summary(wallet, language),
+            amount=_format_amount(transaction.value),
+            currency=transaction.token_symbol or get_chain(wallet.blockchain_type).symbol,
+            hash=f"{transaction.hash[:10]}...{transaction.hash[-8:]}"
+        )
+        
+        with NOTIFICATION_SEND_SECONDS.time(kind="correction"):
+            await bot.send_message(user_id, message_text, parse_mode="HTML")
+        
+        NOTIFICATIONS_SENT.inc(kind="correction", result="ok")
+        logger.info(f"Отправлено исправление по транзакции {transaction.hash} пользователю {user_id}")
+        return True
+        
+    except Exception as e:
+        NOTIFICATIONS_SENT.inc(kind="correction", result="error")
+        logger.error(f"Ошибка при отправке исправления: {e}")
+        return False
+
+async def send_backfill_notification(bot: Bot, user_id: int, wallet, inserted: int, language_code: Optional[str] = None) -> bool:
+    """
+    Сообщает пользователю о завершении загрузки истории кошелька
+
+    :param bot: Объект бота
+    :param user_id: ID пользователя
+    :param wallet: Объект кошелька
+    :param inserted: Количество загруженных транзакций
+    :param language_code: Язык пользователя (User.language_code)
+    :return: True, если сообщение отправлено
+    """
+    try:
+        language = get_language(language_code)
+        message_text = render("backfill.text", language, wallet=format_wallet_summary(wallet, language), count=inserted)
+        
+        with NOTIFICATION_SEND_SECONDS.time(kind="backfill"):
+            await bot.send_message(user_id, message_text, parse_mode="HTML")
+        
+        NOTIFICATIONS_SENT.inc(kind="backfill", result="ok")
+        return True
+        
+    except Exception as e:
+        NOTIFICATIONS_SENT.inc(kind="backfill", result="error")
+        logger.error(f"Ошибка при отправке уведомления о загрузке истории: {e}")
+        return False
+
+async def send_threshold_alert(bot: Bot, user_id: int, rule, value, wallet=None, language_code: Optional[str] = None) -> bool:
+    """
+    Отправляет оповещение о сработавшем правиле крупных движений
+
+    :param bot: Объект бота
+    :param user_id: ID пользователя
+    :param rule: Правило (AlertRule)
+    :param value: Значение показателя за окно
+    :param wallet: Кошелек, по которому сработало правило (None - сумма по кошелькам)
+    :param language_code: Язык пользователя (User.language_code)
+    :return: True, если сообщение отправлено
+    """
+    try:
+        language = get_language(language_code)
+        count = rule.metric.value == "count"
+        unit = "" if count else f" {rule.asset}"
+        
+        message_text = render(
+            "threshold.text", language,
+            rule_id=rule.id,
+            scope=format_wallet_summary(wallet, language) if wallet else render("threshold.all_wallets", language),
+            metric=render(f"threshold.metric.{rule.metric.value}", language),
+            hours=rule.window_hours,
+            value=str(value) if count else _format_amount(value),
+            threshold=f"{rule.threshold:.8f}".rstrip('0').rstrip('.'),
+            unit=unit
+        )
+        
+        with NOTIFICATION_SEND_SECONDS.time(kind="threshold"):
+            await bot.send_message(user_id, message_text, parse_mode="HTML")
+        
+        NOTIFICATIONS_SENT.inc(kind="threshold", result="ok")
+        return True
+        
+    except Exception as e:
+        NOTIFICATIONS_SENT.inc(kind="threshold", result="error")
+        logger.error(f"Ошибка при отправке оповещения по правилу: {e}")
+        return False
+
 async def format_transaction_notification(wallet, transaction) -> str:
     """
     Форматирует уведомление о новой транзакции
@@ -85,7 +220,7 @@ async def format_transaction_notification(wallet, transaction) -> str:
     formatted_value = f"{value:.8f}".rstrip('0').rstrip('.')
     
     # Определяем символ валюты
-    currency = wallet.blockchain_type.value
+    currency = get_chain(wallet.blockchain_type).symbol
     
     # Форматируем время
     timestamp = transaction.get("timestamp")
@@ -117,21 +252,14 @@ async def format_transaction_notification(wallet, transaction) -> str:
     )
     
     # Добавляем ссылку на обозреватель блокчейна
-    explorer_url = None
-    
-    if wallet.blockchain_type.value == "ETH":
-        explorer_url = f"https://etherscan.io/tx/{transaction.get('hash')}"
-    elif wallet.blockchain_type.value == "BTC":
-        explorer_url = f"https://www.blockchain.com/btc/tx/{transaction.get('hash')}"
-    elif wallet.blockchain_type.value == "BNB":
-        explorer_url = f"https://bscscan.com/tx/{transaction.get('hash')}"
+    explorer_url = explorer_tx_url(wallet.blockchain_type, transaction.get('hash'))
     
     if explorer_url:
         message += f"\n<a href='{explorer_url}'>Посмотреть на обозревателе</a>"
     
     return message
 
-async def send_balance_notification(bot, user_id: int, wallet, balance: float) -> None:
+async def send_balance_notification(bot, user_id: int, wallet, balance: float, language_code: Optional[str] = None) -> None:
     """
     Отправляет уведомление о текущем балансе кошелька
     
@@ -139,30 +267,21 @@ async def send_balance_notification(bot, user_id: int, wallet, balance: float) -
     :param user_id: ID пользователя
     :param wallet: Объект кошелька
     :param balance: Текущий баланс
+    :param language_code: Язык пользователя (код Telegram)
     """
     try:
-        # Форматируем сумму баланса
-        formatted_balance = f"{balance:.8f}".rstrip('0').rstrip('.')
-        
-        # Создаем сообщение
-        message = (
-            f"💰 <b>Текущий баланс кошелька</b>\n\n"
-            f"<b>Кошелек:</b> {wallet.label or 'Без метки'} ({wallet.blockchain_type.value})\n"
-            f"<b>Адрес:</b> {wallet.address[:8]}...{wallet.address[-6:]}\n\n"
-            f"<b>Баланс:</b> {formatted_balance} {wallet.blockchain_type.value}\n"
+        language = get_language(language_code)
+        message = render(
+            "balance.text", language,
+            wallet=format_wallet_summary(wallet, language),
+            balance=f"{balance:.8f}".rstrip('0').rstrip('.'),
+            currency=get_chain(wallet.blockchain_type).symbol
         )
         
-        # Формируем URL для просмотра кошелька в обозревателе блокчейна
-        explorer_url = None
-        if wallet.blockchain_type.value == "ETH":
-            explorer_url = f"https://etherscan.io/address/{wallet.address}"
-        elif wallet.blockchain_type.value == "BTC":
-            explorer_url = f"https://www.blockchain.com/btc/address/{wallet.address}"
-        elif wallet.blockchain_type.value == "BNB":
-            explorer_url = f"https://bscscan.com/address/{wallet.address}"
-        
+        # Ссылка на кошелек в обозревателе блокчейна
+        explorer_url = explorer_address_url(wallet.blockchain_type, wallet.address)
         if explorer_url:
-            message += f"\n<a href='{explorer_url}'>Посмотреть на обозревателе</a>"
+            message += render("common.explorer_link", language, url=explorer_url)
         
         # Отправляем сообщение
         await bot.send_message(
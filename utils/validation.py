@@ -0,0 +1,470 @@
+"""
+Проверка адресов блокчейнов по контрольным суммам, без обращения к провайдерам
+
+BTC: Base58Check (P2PKH, P2SH) и Bech32 / Bech32m (SegWit v0, Taproot и
+остальные версии свидетеля, BIP-173 / BIP-350). ETH, BNB: формат 0x + 40
+шестнадцатеричных символов и, для адресов в смешанном регистре, контрольная
+сумма EIP-55 (keccak-256).
+
+Таблицы (алфавиты, шаги полинома Bech32, константы раундов Keccak)
+вычисляются один раз при импорте. Keccak-256 берется из pycryptodome
+(requirements.txt); без пакета используется медленная реализация на чистом
+Python. Адреса проверяются один раз, при записи кошелька (services/db.add_wallet,
+services/importer.py), а кошельки, сохраненные до появления проверки, - при
+запуске (services/db.check_stored_addresses): мониторинг опрашивает сохраненные
+адреса без повторной проверки. Результаты кэшируются для повторных добавлений
+того же адреса.
+"""
+import hashlib
+import logging
+import re
+from functools import lru_cache, reduce
+from operator import getitem, xor
+from typing import Iterable, List, Optional, Tuple
+
+from models.wallet import BlockchainType
+
+logger = logging.getLogger(__name__)
+
+# Быстрый keccak-256 (pycryptodome)
+try:
+    from Crypto.Hash import keccak as _keccak_backend
+except ImportError:  # pragma: no cover - pycryptodome не установлен
+    _keccak_backend = None
+
+# --- Keccak-256 ---
+
+# Константы раундов и смещения циклических сдвигов Keccak-f[1600]
+_KECCAK_RC = (
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008
+)
+_KECCAK_ROTATIONS = (
+    0, 1, 62, 28, 27,
+    36, 44, 6, 55, 20,
+    3, 10, 43, 25, 39,
+    41, 45, 15, 21, 8,
+    18, 2, 61, 56, 14
+)
+_MASK64 = (1 << 64) - 1
+_KECCAK256_RATE = 136
+
+def _keccak_f(lanes: List[int]) -> None:
+    """
+    Перестановка Keccak-f[1600] над 25 дорожками по 64 бита (на месте)
+
+    Раунд развернут: дорожки - локальные переменные a0..a24 (индекс x + 5y),
+    сдвиги шага rho и перестановка pi подставлены из _KECCAK_ROTATIONS.
+    """
+    mask = _MASK64
+    (a0, a1, a2, a3, a4, a5, a6, a7, a8, a9, a10, a11, a12,
+     a13, a14, a15, a16, a17, a18, a19, a20, a21, a22, a23, a24) = lanes
+
+    for rc in _KECCAK_RC:
+        # theta
+        c0 = a0 ^ a5 ^ a10 ^ a15 ^ a20
+        c1 = a1 ^ a6 ^ a11 ^ a16 ^ a21
+        c2 = a2 ^ a7 ^ a12 ^ a17 ^ a22
+        c3 = a3 ^ a8 ^ a13 ^ a18 ^ a23
+        c4 = a4 ^ a9 ^ a14 ^ a19 ^ a24
+        d0 = c4 ^ (((c1 << 1) | (c1 >> 63)) & mask)
+        d1 = c0 ^ (((c2 << 1) | (c2 >> 63)) & mask)
+        d2 = c1 ^ (((c3 << 1) | (c3 >> 63)) & mask)
+        d3 = c2 ^ (((c4 << 1) | (c4 >> 63)) & mask)
+        d4 = c3 ^ (((c0 << 1) | (c0 >> 63)) & mask)
+
+        # rho и pi
+        b0 = a0 ^ d0
+        t = a1 ^ d1
+        b10 = ((t << 1) | (t >> 63)) & mask
+        t = a2 ^ d2
+        b20 = ((t << 62) | (t >> 2)) & mask
+        t = a3 ^ d3
+        b5 = ((t << 28) | (t >> 36)) & mask
+        t = a4 ^ d4
+        b15 = ((t << 27) | (t >> 37)) & mask
+        t = a5 ^ d0
+        b16 = ((t << 36) | (t >> 28)) & mask
+        t = a6 ^ d1
+        b1 = ((t << 44) | (t >> 20)) & mask
+        t = a7 ^ d2
+        b11 = ((t << 6) | (t >> 58)) & mask
+        t = a8 ^ d3
+        b21 = ((t << 55) | (t >> 9)) & mask
+        t = a9 ^ d4
+        b6 = ((t << 20) | (t >> 44)) & mask
+        t = a10 ^ d0
+        b7 = ((t << 3) | (t >> 61)) & mask
+        t = a11 ^ d1
+        b17 = ((t << 10) | (t >> 54)) & mask
+        t = a12 ^ d2
+        b2 = ((t << 43) | (t >> 21)) & mask
+        t = a13 ^ d3
+        b12 = ((t << 25) | (t >> 39)) & mask
+        t = a14 ^ d4
+        b22 = ((t << 39) | (t >> 25)) & mask
+        t = a15 ^ d0
+        b23 = ((t << 41) | (t >> 23)) & mask
+        t = a16 ^ d1
+        b8 = ((t << 45) | (t >> 19)) & mask
+        t = a17 ^ d2
+        b18 = ((t << 15) | (t >> 49)) & mask
+        t = a18 ^ d3
+        b3 = ((t << 21) | (t >> 43)) & mask
+        t = a19 ^ d4
+        b13 = ((t << 8) | (t >> 56)) & mask
+        t = a20 ^ d0
+        b14 = ((t << 18) | (t >> 46)) & mask
+        t = a21 ^ d1
+        b24 = ((t << 2) | (t >> 62)) & mask
+        t = a22 ^ d2
+        b9 = ((t << 61) | (t >> 3)) & mask
+        t = a23 ^ d3
+        b19 = ((t << 56) | (t >> 8)) & mask
+        t = a24 ^ d4
+        b4 = ((t << 14) | (t >> 50)) & mask
+
+        # chi и iota
+        a0 = b0 ^ (~b1 & b2) ^ rc
+        a1 = b1 ^ (~b2 & b3)
+        a2 = b2 ^ (~b3 & b4)
+        a3 = b3 ^ (~b4 & b0)
+        a4 = b4 ^ (~b0 & b1)
+        a5 = b5 ^ (~b6 & b7)
+        a6 = b6 ^ (~b7 & b8)
+        a7 = b7 ^ (~b8 & b9)
+        a8 = b8 ^ (~b9 & b5)
+        a9 = b9 ^ (~b5 & b6)
+        a10 = b10 ^ (~b11 & b12)
+        a11 = b11 ^ (~b12 & b13)
+        a12 = b12 ^ (~b13 & b14)
+        a13 = b13 ^ (~b14 & b10)
+        a14 = b14 ^ (~b10 & b11)
+        a15 = b15 ^ (~b16 & b17)
+        a16 = b16 ^ (~b17 & b18)
+        a17 = b17 ^ (~b18 & b19)
+        a18 = b18 ^ (~b19 & b15)
+        a19 = b19 ^ (~b15 & b16)
+        a20 = b20 ^ (~b21 & b22)
+        a21 = b21 ^ (~b22 & b23)
+        a22 = b22 ^ (~b23 & b24)
+        a23 = b23 ^ (~b24 & b20)
+        a24 = b24 ^ (~b20 & b21)
+
+    lanes[:] = (a0, a1, a2, a3, a4, a5, a6, a7, a8, a9, a10, a11, a12,
+                a13, a14, a15, a16, a17, a18, a19, a20, a21, a22, a23, a24)
+
+def _keccak256_python(data: bytes) -> bytes:
+    # Дополнение исходного Keccak (0x01), а не SHA3 (0x06): hashlib.sha3_256 не подходит
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(b"\x00" * (-len(padded) % _KECCAK256_RATE))
+    padded[-1] |= 0x80
+
+    lanes = [0] * 25
+    for start in range(0, len(padded), _KECCAK256_RATE):
+        block = padded[start:start + _KECCAK256_RATE]
+        for i in range(_KECCAK256_RATE // 8):
+            lanes[i] ^= int.from_bytes(block[8 * i:8 * i + 8], "little")
+        _keccak_f(lanes)
+
+    return b"".join(lane.to_bytes(8, "little") for lane in lanes[:4])
+
+def keccak256(data: bytes) -> bytes:
+    """
+    Вычисляет хеш Keccak-256 (вариант Ethereum)
+
+    :param data: Данные
+    :return: 32 байта хеша
+    """
+    if _keccak_backend is not None:
+        return _keccak_backend.new(digest_bits=256, data=data).digest()
+    return _keccak256_python(data)
+
+# --- EIP-55 (ETH, BNB) ---
+
+_EVM_ADDRESS_RE = re.compile(r"0x[0-9a-fA-F]{40}")
+
+def to_checksum_address(address: str) -> str:
+    """
+    Возвращает адрес EVM с контрольной суммой EIP-55 в регистре букв
+
+    :param address: Адрес 0x + 40 шестнадцатеричных символов в любом регистре
+    :return: Адрес в смешанном регистре
+    """
+    body = address[2:].lower()
+    digest = keccak256(body.encode("ascii")).hex()
+    return "0x" + "".join(char.upper() if digest[i] >= "8" else char for i, char in enumerate(body))
+
+def is_valid_evm_address(address: str) -> bool:
+    """
+    Проверяет адрес ETH / BNB
+
+    Адрес в одном регистре не содержит контрольной суммы и проверяется только по
+    формату; в смешанном регистре регистр букв должен совпадать с EIP-55.
+
+    :param address: Адрес
+    :return: True, если адрес корректен
+    """
+    if not _EVM_ADDRESS_RE.fullmatch(address):
+        return False
+
+    body = address[2:]
+    if body == body.lower() or body == body.upper():
+        return True
+
+    return to_checksum_address(address) == address
+
+# --- Base58Check (BTC P2PKH, P2SH) ---
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BASE58_VALUES = {char: value for value, char in enumerate(_BASE58_ALPHABET)}
+# Таблица bytes.translate: символ -> значение цифры, 0xFF - символ вне алфавита
+_BASE58_TABLE = bytes(_BASE58_VALUES.get(chr(code), 0xFF) for code in range(256))
+# Версии адресов основной сети: 0x00 - P2PKH (1...), 0x05 - P2SH (3...)
+_sha256 = hashlib.sha256
+_BTC_BASE58_VERSIONS = (0x00, 0x05)
+
+def base58check_decode(address: str) -> Optional[bytes]:
+    """
+    Декодирует строку Base58Check
+
+    :param address: Строка Base58Check
+    :return: Полезные данные (версия и содержимое) или None, если строка или контрольная сумма некорректны
+    """
+    values = _BASE58_VALUES
+    number = 0
+    try:
+        for char in address:
+            number = number * 58 + values[char]
+    except KeyError:
+        return None
+
+    # Ведущие '1' кодируют нулевые байты
+    zeros = len(address) - len(address.lstrip("1"))
+    raw = b"\x00" * zeros + (number.to_bytes((number.bit_length() + 7) // 8, "big") if number else b"")
+    if len(raw) < 5:
+        return None
+
+    payload, checksum = raw[:-4], raw[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        return None
+    return payload
+
+def _is_valid_base58_address(address: str) -> bool:
+    """Проверка адреса 1.../3... без промежуточных срезов (те же правила, что у base58check_decode)"""
+    if not 26 <= len(address) <= 35 or not address.isascii():
+        return False
+
+    digits = address.encode("ascii").translate(_BASE58_TABLE)
+    if 0xFF in digits:
+        return False
+    number = 0
+    for digit in digits:
+        number = number * 58 + digit
+
+    # Версия и 20 байт хеша и 4 байта контрольной суммы; ведущие '1' кодируют нулевые байты
+    size = (number.bit_length() + 7) // 8
+    if size > 25 or len(address) - len(address.lstrip("1")) != 25 - size:
+        return False
+
+    raw = number.to_bytes(25, "big")
+    return raw[0] in _BTC_BASE58_VERSIONS and _sha256(_sha256(raw[:21]).digest()).digest()[:4] == raw[21:]
+
+# --- Bech32 / Bech32m (BTC SegWit, Taproot) ---
+
+_BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_BECH32_VALUES = {char: value for value, char in enumerate(_BECH32_CHARSET)}
+_BECH32_CONST = 1
+_BECH32M_CONST = 0x2BC830A3
+_BECH32_GENERATOR = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+
+# Вклад старших пяти битов состояния в шаг полинома: один поиск вместо пяти условных XOR
+_BECH32_STEP = tuple(
+    _BECH32_GENERATOR[0] * (top & 1) ^ _BECH32_GENERATOR[1] * (top >> 1 & 1) ^ _BECH32_GENERATOR[2] * (top >> 2 & 1)
+    ^ _BECH32_GENERATOR[3] * (top >> 3 & 1) ^ _BECH32_GENERATOR[4] * (top >> 4 & 1)
+    for top in range(32)
+)
+
+def _bech32_polymod(values: Iterable[int], chk: int = 1) -> int:
+    step = _BECH32_STEP
+    for value in values:
+        chk = ((chk & 0x1FFFFFF) << 5) ^ value ^ step[chk >> 25]
+    return chk
+
+def _hrp_expand(hrp: str) -> List[int]:
+    return [ord(char) >> 5 for char in hrp] + [0] + [ord(char) & 31 for char in hrp]
+
+# Состояние полинома после части человекочитаемого префикса основной сети
+_BTC_HRP = "bc"
+_BTC_HRP_STATE = _bech32_polymod(_hrp_expand(_BTC_HRP))
+
+# Полином линеен над GF(2): состояние после n символов равно XOR состояния после n нулей
+# и вкладов каждого символа. _BECH32_SHIFTED[k][value] - вклад значения, за которым
+# следуют k символов; _BECH32_ZEROS[n] - состояние префикса "bc" после n нулей.
+_BECH32_MAX_DATA = 90 - len(_BTC_HRP) - 1
+_BECH32_SHIFTED = [tuple(range(32))]
+_BECH32_ZEROS = [_BTC_HRP_STATE]
+for _ in range(_BECH32_MAX_DATA):
+    _BECH32_SHIFTED.append(tuple(_bech32_polymod((0,), chk) for chk in _BECH32_SHIFTED[-1]))
+    _BECH32_ZEROS.append(_bech32_polymod((0,), _BECH32_ZEROS[-1]))
+# Таблицы вкладов по позициям для каждой длины части данных
+_BECH32_POSITIONS = [tuple(reversed(_BECH32_SHIFTED[:size])) for size in range(_BECH32_MAX_DATA + 1)]
+_BECH32_TABLE = bytes(_BECH32_VALUES.get(chr(code), 0xFF) for code in range(256))
+
+def _convert_bits(data: List[int], from_bits: int, to_bits: int) -> Optional[List[int]]:
+    """Перепаковка групп битов без дополнения (BIP-173); None, если остаток некорректен"""
+    accumulator = 0
+    bits = 0
+    result = []
+    max_value = (1 << to_bits) - 1
+    for value in data:
+        accumulator = (accumulator << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((accumulator >> bits) & max_value)
+    if bits >= from_bits or ((accumulator << (to_bits - bits)) & max_value):
+        return None
+    return result
+
+def decode_segwit_address(address: str, hrp: str = _BTC_HRP) -> Optional[Tuple[int, bytes]]:
+    """
+    Декодирует адрес SegWit (Bech32 для версии 0, Bech32m для версий 1-16)
+
+    :param address: Адрес
+    :param hrp: Ожидаемый человекочитаемый префикс
+    :return: (версия свидетеля, программа) или None, если адрес некорректен
+    """
+    if len(address) > 90 or (address != address.lower() and address != address.upper()):
+        return None
+
+    address = address.lower()
+    separator = address.rfind("1")
+    if address[:separator] != hrp or separator + 7 > len(address):
+        return None
+
+    values = _BECH32_VALUES
+    try:
+        data = [values[char] for char in address[separator + 1:]]
+    except KeyError:
+        return None
+
+    state = _BTC_HRP_STATE if hrp == _BTC_HRP else _bech32_polymod(_hrp_expand(hrp))
+    const = _bech32_polymod(data, state)
+    if const not in (_BECH32_CONST, _BECH32M_CONST):
+        return None
+
+    version = data[0]
+    program = _convert_bits(data[1:-6], 5, 8)
+    if version > 16 or program is None or not 2 <= len(program) <= 40:
+        return None
+    if version == 0 and (len(program) not in (20, 32) or const != _BECH32_CONST):
+        return None
+    if version > 0 and const != _BECH32M_CONST:
+        return None
+
+    return version, bytes(program)
+
+def _convert_bits_padded(program: bytes) -> List[int]:
+    accumulator = 0
+    bits = 0
+    result = []
+    for value in program:
+        accumulator = (accumulator << 8) | value
+        bits += 8
+        while bits >= 5:
+            bits -= 5
+            result.append((accumulator >> bits) & 31)
+    if bits:
+        result.append((accumulator << (5 - bits)) & 31)
+    return result
+
+def encode_segwit_address(version: int, program: bytes, hrp: str = _BTC_HRP) -> str:
+    """
+    Кодирует адрес SegWit (обратная операция к decode_segwit_address)
+
+    :param version: Версия свидетеля (0 - Bech32, 1-16 - Bech32m)
+    :param program: Программа свидетеля
+    :param hrp: Человекочитаемый префикс
+    :return: Адрес
+    """
+    data = [version] + _convert_bits_padded(program)
+    const = _BECH32_CONST if version == 0 else _BECH32M_CONST
+    polymod = _bech32_polymod(data + [0] * 6, _bech32_polymod(_hrp_expand(hrp))) ^ const
+    checksum = [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+    return hrp + "1" + "".join(_BECH32_CHARSET[value] for value in data + checksum)
+
+def _is_valid_segwit_address(address: str) -> bool:
+    """Проверка адреса bc1... без декодирования программы (те же правила, что у decode_segwit_address)"""
+    if len(address) > 90:
+        return False
+    lowered = address.lower()
+    if address != lowered and address != address.upper():
+        return False
+
+    # Префикс "bc1" проверен вызывающей функцией, а '1' не входит в алфавит данных
+    if not lowered.isascii():
+        return False
+    data = lowered[3:].encode("ascii").translate(_BECH32_TABLE)
+    if 0xFF in data or not data:
+        return False
+    # Полином без цикла на Python: вклады символов складываются через map/reduce
+    chk = _BECH32_ZEROS[len(data)] ^ reduce(xor, map(getitem, _BECH32_POSITIONS[len(data)], data))
+    if chk != _BECH32_CONST and chk != _BECH32M_CONST:
+        return False
+
+    # Программа: группы по 5 бит между версией и контрольной суммой
+    groups = len(lowered) - 10
+    size, padding = divmod(groups * 5, 8)
+    if groups < 0 or padding >= 5 or data[-7] & ((1 << padding) - 1):
+        return False
+
+    version = data[0]
+    if version == 0:
+        return chk == _BECH32_CONST and size in (20, 32)
+    return version <= 16 and chk == _BECH32M_CONST and 2 <= size <= 40
+
+def is_valid_btc_address(address: str) -> bool:
+    """
+    Проверяет адрес BTC основной сети: Base58Check (1..., 3...) или Bech32/Bech32m (bc1...)
+
+    :param address: Адрес
+    :return: True, если адрес корректен
+    """
+    if address[:3].lower() == "bc1":
+        return _is_valid_segwit_address(address)
+    return _is_valid_base58_address(address)
+
+# --- Общий интерфейс ---
+
+_VALIDATORS = {
+    BlockchainType.BTC: is_valid_btc_address,
+    BlockchainType.ETH: is_valid_evm_address,
+    BlockchainType.BNB: is_valid_evm_address
+}
+
+@lru_cache(maxsize=65536)
+def is_valid_address(blockchain_type: BlockchainType, address: str) -> bool:
+    """
+    Проверяет адрес блокчейна по формату и контрольной сумме
+
+    :param blockchain_type: Тип блокчейна
+    :param address: Адрес
+    :return: True, если адрес корректен
+    """
+    validator = _VALIDATORS.get(blockchain_type)
+    return bool(address) and validator is not None and validator(address)
+
+def validate_addresses(items: Iterable[Tuple[BlockchainType, str]]) -> List[bool]:
+    """
+    Пакетная проверка адресов (массовое добавление кошельков)
+
+    :param items: Пары (тип блокчейна, адрес)
+    :return: Результаты проверки в порядке входных пар
+    """
+    return [is_valid_address(blockchain_type, address) for blockchain_type, address in items]